@@ -0,0 +1,518 @@
+"""Замеры производительности MBR Analyzer на синтетическом корпусе
+
+Корпус (сектора MBR Windows и GRUB, мусор, цепочки EBR, диски GPT с большим
+числом записей, образ для сканирования) строится из фиксированного зерна,
+поэтому одинаков между запусками и версиями. Каждый замер по умолчанию идет
+в отдельном процессе: пиковая память (RSS) не смешивается между замерами.
+
+    py bench.py -o results.json
+    py bench.py --compare results.json          # сравнение с прошлым прогоном
+    py bench.py --only parse scan --scale 4
+    py bench.py --only startup                  # холодный запуск main.py против бюджета
+"""
+import argparse
+import gc
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+import mbr_analyzer
+
+# Доли видов секторов в корпусе для разбора по одному сектору
+SECTOR_MIX = (
+    ("windows", 0.35),
+    ("grub", 0.25),
+    ("garbage", 0.20),
+    ("gpt_protective", 0.10),
+    ("empty", 0.05),
+    ("no_signature", 0.05),
+)
+
+# Размеры корпуса при --scale 1
+CORPUS_SECTORS = 20000
+CORPUS_EBR_IMAGES = 40
+CORPUS_EBR_LOGICAL = 30
+CORPUS_GPT_IMAGES = 40
+CORPUS_GPT_ENTRIES = 128
+CORPUS_SCAN_MB = 256
+
+# Сигнатуры загрузчиков, по шаблонам которых строится загрузочный код
+WINDOWS_SIGNATURES = ("windows-mbr", "windows-nt6-mbr", "windows-nt5-mbr")
+GRUB_SIGNATURES = ("grub", "grub2-boot-img", "grub-signature")
+
+# Тип раздела GPT "Basic data" и типы разделов MBR для синтетических таблиц
+GPT_BASIC_DATA = uuid.UUID("EBD0A0A2-B9E5-4433-87C0-68B6B72699C7")
+MBR_DATA_TYPES = (0x07, 0x0B, 0x0C, 0x83, 0x82)
+
+# Ухудшение скорости больше этой доли при --compare считается регрессией
+DEFAULT_TOLERANCE = 0.10
+
+# Бюджет холодного запуска main.py (медиана, мс): разовый вызов из скриптов
+STARTUP_BUDGET_MS = 50
+
+# Запусков процесса на один повтор замера startup
+STARTUP_RUNS = 20
+
+def partition_entry(bootable, type_code, lba_start, sectors):
+    """16-байтная запись таблицы разделов (CHS не заполняется)"""
+    return mbr_analyzer.MBR_ENTRY_STRUCT.pack(0x80 if bootable else 0, 0, 0, 0, type_code, 0, 0, 0, lba_start, sectors)
+
+def build_sector(code, entries, signature=b'\x55\xaa'):
+    """Сектор 512 байт: загрузочный код, до 4 записей и сигнатура"""
+    sector = bytearray(512)
+    sector[:len(code)] = code[:446]
+    for index, entry in enumerate(entries):
+        sector[446 + 16 * index:462 + 16 * index] = entry
+    sector[510:] = signature
+    return bytes(sector)
+
+def signature_boot_code(rng, engine, signature_ids):
+    """Загрузочный код со случайным заполнением и шаблоном одной из сигнатур (маски - случайные байты)"""
+    signatures = [s for s in engine.signatures if s["id"] in signature_ids]
+    code = bytearray(rng.randbytes(446))
+    if not signatures:
+        return bytes(code)
+    for pattern in rng.choice(signatures)["patterns"]:
+        offset = pattern["offset"] if pattern["offset"] is not None else rng.randrange(0x40, 0x180)
+        for index, (value, mask) in enumerate(zip(pattern["bytes"], pattern["mask"])):
+            if mask and offset + index < 446:
+                code[offset + index] = value
+    code[0x1B8:0x1BC] = rng.randbytes(4)
+    code[0x1BC:0x1BE] = b'\x00\x00'
+    return bytes(code)
+
+def random_mbr_entries(rng, disk_sectors=1 << 28):
+    """1-4 непересекающихся основных раздела, первый активный"""
+    count = rng.randint(1, 4)
+    lba = 2048
+    entries = []
+    for index in range(count):
+        sectors = rng.randrange(1 << 16, disk_sectors // 8)
+        entries.append(partition_entry(index == 0, rng.choice(MBR_DATA_TYPES), lba, sectors))
+        lba += sectors
+    return entries
+
+def generate_sector(rng, engine, kind):
+    """Один сектор корпуса заданного вида"""
+    if kind == "windows":
+        return build_sector(signature_boot_code(rng, engine, WINDOWS_SIGNATURES), random_mbr_entries(rng))
+    if kind == "grub":
+        return build_sector(signature_boot_code(rng, engine, GRUB_SIGNATURES), random_mbr_entries(rng))
+    if kind == "gpt_protective":
+        code = signature_boot_code(rng, engine, GRUB_SIGNATURES) if rng.random() < 0.5 else b''
+        return build_sector(code, [partition_entry(False, 0xEE, 1, 0xFFFFFFFF)])
+    if kind == "empty":
+        return build_sector(b'', [])
+    if kind == "no_signature":
+        return build_sector(signature_boot_code(rng, engine, WINDOWS_SIGNATURES), random_mbr_entries(rng),
+                            b'\x00\x00')
+    # Мусор: случайные байты, у части - случайно совпавшая сигнатура
+    sector = bytearray(rng.randbytes(512))
+    if rng.random() < 0.5:
+        sector[510:] = b'\x55\xaa'
+    return bytes(sector)
+
+def generate_sectors(seed, count, engine):
+    """Корпус секторов: (список секторов, счетчик видов) по SECTOR_MIX"""
+    rng = random.Random(seed)
+    kinds = [kind for kind, _ in SECTOR_MIX]
+    weights = [weight for _, weight in SECTOR_MIX]
+    sectors = []
+    mix = {}
+    for kind in rng.choices(kinds, weights, k=count):
+        sectors.append(generate_sector(rng, engine, kind))
+        mix[kind] = mix.get(kind, 0) + 1
+    return sectors, mix
+
+def build_ebr_image(rng, engine, logical):
+    """Образ с расширенным разделом и цепочкой из logical логических разделов"""
+    step = rng.randrange(64, 256)
+    extended_start = 2048
+    total = extended_start + step * logical + 64
+    image = bytearray(total * 512)
+    image[:512] = build_sector(signature_boot_code(rng, engine, WINDOWS_SIGNATURES),
+                               [partition_entry(True, 0x07, 63, extended_start - 63),
+                                partition_entry(False, 0x0F, extended_start, step * logical)])
+    for index in range(logical):
+        entries = [partition_entry(False, rng.choice(MBR_DATA_TYPES), 1, step - 1)]
+        if index < logical - 1:
+            entries.append(partition_entry(False, 0x05, (index + 1) * step, step))
+        lba = extended_start + index * step
+        image[lba * 512:lba * 512 + 512] = build_sector(b'', entries)
+    return bytes(image)
+
+def build_gpt_image(rng, engine, entries, used, sector_size=512):
+    """Диск GPT: защитная MBR, основной и резервный заголовки, entries записей (used заполнено)"""
+    entry_size = 128
+    table_sectors = -(-entries * entry_size // sector_size)
+    disk_sectors = 2 + table_sectors + used * 8 + table_sectors + 2048
+    last = disk_sectors - 1
+
+    table = bytearray(entries * entry_size)
+    lba = 2 + table_sectors
+    for index in range(used):
+        name = f"part{index}".encode('utf-16-le')
+        table[index * entry_size:(index + 1) * entry_size] = struct.pack(
+            '<16s16sQQQ72s', GPT_BASIC_DATA.bytes_le, uuid.UUID(int=rng.getrandbits(128)).bytes_le,
+            lba, lba + 7, 0, name)
+        lba += 8
+    table_crc = zlib.crc32(table)
+    disk_guid = uuid.UUID(int=rng.getrandbits(128)).bytes_le
+
+    def header(current, backup, entries_lba):
+        data = bytearray(struct.pack('<8sIIIIQQQQ16sQIII', b'EFI PART', 0x10000, 92, 0, 0, current, backup,
+                                     2 + table_sectors, last - 1 - table_sectors, disk_guid, entries_lba,
+                                     entries, entry_size, table_crc))
+        data[16:20] = struct.pack('<I', zlib.crc32(data))
+        return bytes(data)
+
+    image = bytearray(disk_sectors * sector_size)
+    code = signature_boot_code(rng, engine, GRUB_SIGNATURES)
+    image[:512] = build_sector(code, [partition_entry(False, 0xEE, 1, min(last, 0xFFFFFFFF))])
+    image[sector_size:sector_size + 92] = header(1, last, 2)
+    image[2 * sector_size:2 * sector_size + len(table)] = table
+    backup_entries = last - table_sectors
+    image[backup_entries * sector_size:backup_entries * sector_size + len(table)] = table
+    image[last * sector_size:last * sector_size + 92] = header(last, 1, backup_entries)
+    return bytes(image)
+
+def write_scan_image(path, seed, size_mb, engine):
+    """Образ для сканирования: случайные данные, нулевые области и вставленные MBR/EBR/VBR
+
+    Пишется блоками по 1 МБ, чтобы не держать образ в памяти. Возвращает число вставленных секторов.
+    """
+    rng = random.Random(seed)
+    planted = 0
+    with open(path, 'wb') as f:
+        for _ in range(size_mb):
+            if rng.random() < 0.25:
+                block = bytearray(1024 * 1024)
+            else:
+                block = bytearray(rng.randbytes(1024 * 1024))
+            for _ in range(rng.randrange(0, 3)):
+                offset = rng.randrange(0, 2048) * 512
+                block[offset:offset + 512] = generate_sector(rng, engine, rng.choice(("windows", "grub", "empty")))
+                planted += 1
+            f.write(block)
+    return planted
+
+def percentiles(samples_ns):
+    """Перцентили задержки в микросекундах"""
+    if not samples_ns:
+        return None
+    ordered = sorted(samples_ns)
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] / 1000, 3)
+
+    return {"p50": at(0.50), "p90": at(0.90), "p99": at(0.99), "max": round(ordered[-1] / 1000, 3)}
+
+def peak_rss_kb():
+    """Пиковый RSS процесса в КБ (None, где resource недоступен)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В macOS ru_maxrss в байтах, в Linux - в килобайтах
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def timed_items(function, items, repeat):
+    """Вызов function для каждого элемента repeat раз: (лучшее время прохода, задержки всех вызовов)"""
+    best = None
+    samples = []
+    clock = time.perf_counter_ns
+    for _ in range(repeat):
+        gc.collect()
+        started = clock()
+        for item in items:
+            before = clock()
+            function(item)
+            samples.append(clock() - before)
+        elapsed = (clock() - started) / 1e9
+        best = elapsed if best is None else min(best, elapsed)
+    return best, samples
+
+def timed_pass(function, repeat):
+    """Вызов function() repeat раз: лучшее время"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def case_result(items, total_bytes, seconds, samples=None, **extra):
+    """Запись результата замера: скорость в элементах и МБ в секунду, перцентили задержки"""
+    result = {
+        "items": items,
+        "bytes": total_bytes,
+        "seconds": round(seconds, 6),
+        "items_per_s": round(items / seconds, 1) if seconds > 0 else None,
+        "mb_per_s": round(total_bytes / seconds / (1024 * 1024), 2) if seconds > 0 else None,
+        "latency_us": percentiles(samples) if samples else None
+    }
+    result.update(extra)
+    return result
+
+def bench_parse(options, include_hex_dump):
+    engine = mbr_analyzer.load_signature_engine()
+    sectors, mix = generate_sectors(options["seed"], CORPUS_SECTORS * options["scale"], engine)
+
+    def parse(sector):
+        mbr_analyzer.parse_mbr_complete(sector, "bench", include_hex_dump=include_hex_dump, signature_engine=engine)
+
+    # Прогрев: кэши сигнатур и дизассемблера заполняются на первом проходе, как в долгом прогоне
+    seconds, samples = timed_items(parse, sectors, options["repeat"])
+    return case_result(len(sectors), len(sectors) * 512, seconds, samples, mix=mix)
+
+def bench_decode(options):
+    engine = mbr_analyzer.load_signature_engine()
+    sectors, mix = generate_sectors(options["seed"], CORPUS_SECTORS * options["scale"], engine)
+    buf = b''.join(sectors)
+    seconds = timed_pass(lambda: mbr_analyzer.decode_partition_tables(buf), options["repeat"])
+    return case_result(len(sectors), len(buf), seconds)
+
+def bench_serialize(options, fmt):
+    engine = mbr_analyzer.load_signature_engine()
+    count = max(1, CORPUS_SECTORS * options["scale"] // 10)
+    sectors, _ = generate_sectors(options["seed"], count, engine)
+    results = [mbr_analyzer.parse_mbr_complete(sector, "bench", signature_engine=engine) for sector in sectors]
+
+    if fmt == "text":
+        serialize = mbr_analyzer.format_text_report
+    else:
+        def serialize(result):
+            mbr_analyzer.format_stream_record(result, fmt)
+
+    seconds, samples = timed_items(serialize, results, options["repeat"])
+    size = sum(len(mbr_analyzer.format_text_report(r) if fmt == "text" else mbr_analyzer.format_stream_record(r, fmt))
+               for r in results[:100]) * len(results) // min(len(results), 100)
+    return case_result(len(results), size, seconds, samples)
+
+def bench_analyze_images(options, kind):
+    engine = mbr_analyzer.load_signature_engine()
+    rng = random.Random(options["seed"])
+    with tempfile.TemporaryDirectory(prefix="mbr_bench_") as directory:
+        paths = []
+        total = 0
+        count = (CORPUS_EBR_IMAGES if kind == "ebr" else CORPUS_GPT_IMAGES) * options["scale"]
+        for index in range(count):
+            if kind == "ebr":
+                data = build_ebr_image(rng, engine, CORPUS_EBR_LOGICAL)
+            else:
+                data = build_gpt_image(rng, engine, CORPUS_GPT_ENTRIES, rng.randint(4, CORPUS_GPT_ENTRIES))
+            path = os.path.join(directory, f"{kind}_{index:05d}.img")
+            with open(path, 'wb') as f:
+                f.write(data)
+            paths.append(path)
+            total += len(data)
+
+        def analyze(path):
+            result = mbr_analyzer.analyze(path, include_hex_dump=False)
+            if "error" in result:
+                raise RuntimeError(f"{path}: {result['error']}")
+
+        seconds, samples = timed_items(analyze, paths, options["repeat"])
+    return case_result(len(paths), total, seconds, samples)
+
+def bench_image_pass(options, kind):
+    engine = mbr_analyzer.load_signature_engine()
+    size_mb = CORPUS_SCAN_MB * options["scale"]
+    with tempfile.TemporaryDirectory(prefix="mbr_bench_") as directory:
+        path = os.path.join(directory, "scan.img")
+        planted = write_scan_image(path, options["seed"], size_mb, engine)
+        found = []
+
+        def run():
+            with mbr_analyzer.open_image(path) as image:
+                if kind == "scan":
+                    found[:] = [candidate["offset"] for candidate in mbr_analyzer.scan_image(image)]
+                else:
+                    for _ in mbr_analyzer.entropy_map(image):
+                        pass
+
+        seconds = timed_pass(run, options["repeat"])
+    extra = {"planted": planted, "candidates": len(found)} if kind == "scan" else {}
+    return case_result(size_mb, size_mb * 1024 * 1024, seconds, **extra)
+
+def timed_process(command, runs):
+    """Запуск command runs раз в новом процессе: задержки в наносекундах"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter_ns()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter_ns() - started)
+    return samples
+
+def bench_startup(options):
+    script = os.path.join(os.path.dirname(os.path.abspath(mbr_analyzer.__file__)), "main.py")
+    command = [sys.executable, script, "--version"]
+    # Первый запуск записывает __pycache__, в замер не входит
+    subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+    runs = STARTUP_RUNS * options["repeat"]
+    samples = timed_process(command, runs)
+    interpreter = percentiles(timed_process([sys.executable, "-S", "-c", "pass"], runs))
+    return case_result(runs, 0, sum(samples) / 1e9, samples, interpreter_us=interpreter)
+
+# Замеры: имя -> (описание, функция от настроек)
+CASES = {
+    "parse": ("parse_mbr_complete() по одному сектору, с HEX-дампом",
+              lambda options: bench_parse(options, True)),
+    "parse-nohex": ("parse_mbr_complete() без HEX-дампа (пакетный режим)",
+                    lambda options: bench_parse(options, False)),
+    "decode": ("decode_partition_tables(): столбцы таблиц разделов подряд идущих секторов",
+               bench_decode),
+    "serialize-text": ("format_text_report()", lambda options: bench_serialize(options, "text")),
+    "serialize-ndjson": ("format_stream_record(), NDJSON", lambda options: bench_serialize(options, "ndjson")),
+    "serialize-yaml": ("format_stream_record(), YAML", lambda options: bench_serialize(options, "yaml")),
+    "analyze-ebr": ("analyze() образов с цепочкой EBR", lambda options: bench_analyze_images(options, "ebr")),
+    "analyze-gpt": ("analyze() дисков GPT", lambda options: bench_analyze_images(options, "gpt")),
+    "scan": ("scan_image(): поиск секторов 0x55AA по образу (элемент - 1 МБ)",
+             lambda options: bench_image_pass(options, "scan")),
+    "entropy": ("entropy_map(): карта энтропии образа (элемент - 1 МБ)",
+                lambda options: bench_image_pass(options, "entropy")),
+    "startup": ("холодный запуск: py main.py --version в новом процессе (элемент - запуск)",
+                bench_startup),
+}
+
+def run_case(name, options):
+    """Один замер (в текущем процессе): результат с пиковой памятью"""
+    rss_before = peak_rss_kb()
+    result = CASES[name][1](options)
+    result["peak_rss_kb"] = peak_rss_kb()
+    if rss_before is not None:
+        result["rss_growth_kb"] = result["peak_rss_kb"] - rss_before
+    return result
+
+def run_case_isolated(name, options):
+    """Замер в новом процессе (spawn): пиковый RSS относится только к этому замеру"""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=1) as pool:
+        return pool.apply(run_case, (name, options))
+
+def corpus_digest(options):
+    """Хеш корпуса секторов: по нему --compare проверяет, что сравниваются одинаковые данные"""
+    sectors, _ = generate_sectors(options["seed"], CORPUS_SECTORS * options["scale"],
+                                  mbr_analyzer.load_signature_engine())
+    return hashlib.sha256(b''.join(sectors)).hexdigest()
+
+def compare_results(current, baseline, tolerance):
+    """Сравнение скоростей с прошлым прогоном: (строки таблицы, число регрессий)"""
+    lines = []
+    regressions = 0
+    for name, result in current["cases"].items():
+        old = baseline.get("cases", {}).get(name)
+        if not old or not old.get("items_per_s") or not result.get("items_per_s"):
+            continue
+        ratio = result["items_per_s"] / old["items_per_s"]
+        mark = ""
+        if ratio < 1 - tolerance:
+            mark = "  РЕГРЕССИЯ"
+            regressions += 1
+        elif ratio > 1 + tolerance:
+            mark = "  быстрее"
+        lines.append(f" {name:<18} {old['items_per_s']:>12,.1f} -> {result['items_per_s']:>12,.1f}/с  "
+                     f"x{ratio:.2f}{mark}")
+    return lines, regressions
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Замеры производительности MBR Analyzer на синтетическом корпусе")
+    parser.add_argument("-o", "--output", metavar="ФАЙЛ", help="сохранить результаты в JSON")
+    parser.add_argument("--only", nargs="+", metavar="ЗАМЕР", choices=sorted(CASES),
+                        help="выполнить только указанные замеры (список: --list)")
+    parser.add_argument("--seed", type=int, default=1, help="зерно генератора корпуса (по умолчанию: 1)")
+    parser.add_argument("--scale", type=int, default=1, help="множитель размера корпуса (по умолчанию: 1)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="повторов каждого замера, берется лучший (по умолчанию: 3)")
+    parser.add_argument("--inline", action="store_true",
+                        help="все замеры в текущем процессе (пиковый RSS тогда общий)")
+    parser.add_argument("--compare", metavar="ФАЙЛ", help="сравнить с результатами прошлого прогона")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"допустимое замедление при --compare, доля (по умолчанию: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_MS, metavar="МС",
+                        help=f"бюджет медианы замера startup, мс (по умолчанию: {STARTUP_BUDGET_MS})")
+    parser.add_argument("--list", action="store_true", help="показать список замеров и выйти")
+    return parser
+
+def main_bench(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.list:
+        for name, (description, _) in CASES.items():
+            print(f" {name:<18} {description}")
+        return 0
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f" ОШИБКА при чтении {args.compare}: {e}", file=sys.stderr)
+            return 2
+
+    options = {"seed": args.seed, "scale": max(1, args.scale), "repeat": max(1, args.repeat)}
+    report = {
+        "analyzer_version": mbr_analyzer.ANALYZER_VERSION,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": options,
+        "corpus_sha256": corpus_digest(options),
+        "cases": {}
+    }
+
+    print(f" {'Замер':<18} {'элем./с':>12} {'МБ/с':>10} {'p50, мкс':>10} {'p99, мкс':>10} {'RSS, МБ':>9}")
+    for name in args.only or CASES:
+        result = run_case(name, options) if args.inline else run_case_isolated(name, options)
+        report["cases"][name] = result
+        latency = result["latency_us"] or {}
+        rss = f"{result['peak_rss_kb'] / 1024:.1f}" if result.get("peak_rss_kb") else "-"
+        print(f" {name:<18} {result['items_per_s'] or 0:>12,.1f} {result['mb_per_s'] or 0:>10,.1f} "
+              f"{latency.get('p50', '-'):>10} {latency.get('p99', '-'):>10} {rss:>9}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ Результаты сохранены в: {os.path.abspath(args.output)}")
+
+    over_budget = False
+    startup = report["cases"].get("startup")
+    if startup:
+        median_ms = startup["latency_us"]["p50"] / 1000
+        interpreter_ms = startup["interpreter_us"]["p50"] / 1000
+        print(f"\nХолодный запуск: {median_ms:.1f} мс (p90 {startup['latency_us']['p90'] / 1000:.1f} мс, "
+              f"интерпретатор {interpreter_ms:.1f} мс), бюджет {args.startup_budget:g} мс")
+        if median_ms > args.startup_budget:
+            print(f" Запуск превышает бюджет на {median_ms - args.startup_budget:.1f} мс", file=sys.stderr)
+            over_budget = True
+
+    if baseline is not None:
+        print()
+        print(f"Сравнение с {args.compare} (версия {baseline.get('analyzer_version', '?')}):")
+        if baseline.get("corpus_sha256") != report["corpus_sha256"]:
+            print(" Внимание: корпус отличается (другие --seed/--scale или генератор) - сравнение приблизительное")
+        lines, regressions = compare_results(report, baseline, args.tolerance)
+        for line in lines:
+            print(line)
+        if regressions:
+            print(f"\n Замедлилось замеров: {regressions}", file=sys.stderr)
+            return 1
+    return 1 if over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
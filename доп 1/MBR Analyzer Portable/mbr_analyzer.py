@@ -0,0 +1,6218 @@
+import struct
+import os
+import stat
+import errno
+import zlib
+import bisect
+import re
+import math
+import sys
+import time
+import argparse
+import mmap
+import functools
+import signal
+from array import array
+from collections import Counter, OrderedDict
+from itertools import chain, compress, islice
+from datetime import datetime
+import json
+
+# Тяжелые и нужные не в каждом запуске модули (yaml, sqlite3, multiprocessing, lzma,
+# hashlib, threading, queue, glob) импортируются там, где используются: разовый
+# запуск из скрипта их не загружает
+
+# Версия анализатора. Меняется при любом изменении результатов анализа -
+# по ней сбрасывается кэш результатов
+ANALYZER_VERSION = "1.7"
+
+PARTITION_TYPES = {
+    0x00: "Пусто", 0x01: "FAT12", 0x04: "FAT16 <32M", 0x05: "Extended",
+    0x06: "FAT16", 0x07: "NTFS/exFAT/HPFS", 0x0B: "FAT32",
+    0x0C: "FAT32 (LBA)", 0x0E: "FAT16 (LBA)", 0x0F: "Extended (LBA)",
+    0x82: "Linux swap", 0x83: "Linux", 0x85: "Linux extended",
+    0x8E: "Linux LVM", 0xFD: "Linux RAID", 0xEF: "EFI System",
+    0xEE: "GPT Protective", 0xFF: "BBT",
+    0x11: "Hidden FAT12", 0x14: "Hidden FAT16 <32M",
+    0x16: "Hidden FAT16", 0x1B: "Hidden FAT32",
+    0x1C: "Hidden FAT32 (LBA)", 0x1E: "Hidden FAT16 (LBA)"
+}
+
+# Запись таблицы разделов: статус, CHS начала (H, S, C), тип, CHS конца, LBA, число секторов
+MBR_ENTRY_FORMAT = 'BBBBBBBBII'
+MBR_ENTRY_STRUCT = struct.Struct('<' + MBR_ENTRY_FORMAT)
+
+# Весь 512-байтный сектор: пропуск кода, 4 записи и сигнатура
+MBR_SECTOR_FORMAT = '<446x' + MBR_ENTRY_FORMAT * 4 + 'H'
+
+# Сколько секторов пакетный декодер раскладывает по столбцам за один шаг
+DECODE_BLOCK_SECTORS = 65536
+
+# Каталог наборов сигнатур загрузчиков по умолчанию (все *.json в нем)
+SIGNATURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "signatures")
+
+# Каталог наборов правил проверки результатов по умолчанию (все *.json в нем)
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules")
+
+# Уровни правил и их подписи в отчетах
+RULE_SEVERITIES = {"issue": "Проблема", "warning": "Предупреждение"}
+
+# Операции условий правил: (значение поля, значение из правила) -> bool.
+# Отсутствующее поле (None) не проходит сравнения на больше/меньше
+RULE_OPERATORS = {
+    "eq": lambda actual, expected: actual == expected,
+    "ne": lambda actual, expected: actual != expected,
+    "lt": lambda actual, expected: actual is not None and actual < expected,
+    "le": lambda actual, expected: actual is not None and actual <= expected,
+    "gt": lambda actual, expected: actual is not None and actual > expected,
+    "ge": lambda actual, expected: actual is not None and actual >= expected,
+    "in": lambda actual, expected: actual in expected,
+    "not_in": lambda actual, expected: actual not in expected,
+    "exists": lambda actual, expected: (actual is not None) == bool(expected),
+    "contains": lambda actual, expected: actual is not None and expected in actual,
+    "count_gt": lambda actual, expected: len(actual or ()) > expected,
+}
+
+# Сигнатуры сжатых образов дисков
+GZIP_MAGIC = b'\x1f\x8b'
+XZ_MAGIC = b'\xfd7zXZ\x00'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+COMPRESSED_FORMATS = ("gzip", "xz", "zstd")
+
+# Сжатые образы распаковываются блоками такого размера; столько последних блоков кэшируется
+COMPRESSED_BLOCK_SIZE = 1024 * 1024
+COMPRESSED_CACHE_BLOCKS = 16
+
+# Шаг и максимальное число копий состояния распаковщика gzip в памяти
+COMPRESSED_CHECKPOINT_INTERVAL = 16 * 1024 * 1024
+COMPRESSED_MAX_CHECKPOINTS = 512
+
+# Сохраняемые в индексе точки входа внутри члена gzip: начало блока deflate (в битах)
+# и 32 КБ распакованных данных перед ним - словарь для продолжения распаковки.
+# Начало блока ищется не дальше GZIP_SEEK_SEARCH сжатых байт от шага и проверяется
+# распаковкой GZIP_SEEK_VERIFY байт
+GZIP_WINDOW_SIZE = 32 * 1024
+GZIP_SEEK_SEARCH = 1024 * 1024
+GZIP_SEEK_VERIFY = 1024
+
+# Индекс точек входа сжатого образа сохраняется в каталоге кэша пользователя
+# (не рядом с образом: каталог с уликами не меняется): <хеш пути образа>.mbridx
+COMPRESSED_INDEX_SUFFIX = ".mbridx"
+COMPRESSED_INDEX_VERSION = 3
+
+# Переменная окружения с каталогом кэша; пустое значение отключает сохранение индексов
+CACHE_DIR_ENV = "MBR_ANALYZER_CACHE"
+
+# Сигнатуры контейнеров виртуальных дисков
+QCOW2_MAGIC = b'QFI\xfb'
+VHD_MAGIC = b'conectix'
+VHDX_MAGIC = b'vhdxfile'
+VMDK_MAGIC = b'KDMV'
+VMDK_DESCRIPTOR_MAGIC = b'# Disk DescriptorFile'
+
+# Размер блока VHD - степень двойки не меньше сектора; у VHDX - от 1 до 256 МБ,
+# логический сектор VHDX - 512 или 4096 байт
+VHD_MIN_BLOCK_SIZE = 512
+
+# Цепочка базовых образов qcow2: не глубже стольких уровней; длина имени базового образа
+QCOW2_MAX_BACKING_DEPTH = 16
+QCOW2_MAX_BACKING_NAME = 1023
+VHDX_BLOCK_SIZE_RANGE = (1024 * 1024, 256 * 1024 * 1024)
+VHDX_SECTOR_SIZES = (512, 4096)
+
+# Двоичная карта энтропии: заголовок (сигнатура, размер блока, размер образа, число блоков),
+# затем по 2 байта на блок - энтропия в 1/32 бита (0-255) и доля нулей в 1/255
+ENTROPY_MAP_MAGIC = b'MBRENT1\x00'
+ENTROPY_MAP_HEADER = struct.Struct('<8sIQQ')
+
+# Сканирование образа: как часто сохранять состояние для продолжения (--resume) и обновлять
+# строку прогресса (в терминале и, реже, в журнале при выводе не в терминал), секунды
+SCAN_CHECKPOINT_INTERVAL = 10.0
+SCAN_PROGRESS_INTERVAL = 0.5
+SCAN_PROGRESS_LOG_INTERVAL = 60.0
+
+# Снятие загрузочных секторов с устройств: ioctl логического размера сектора (Linux),
+# префиксы имен дисков в /sys/block и время ожидания одного устройства по умолчанию, секунды
+BLKSSZGET = 0x1268
+ACQUIRE_DEVICE_PREFIXES = ("sd", "nvme", "vd", "xvd", "hd", "mmcblk", "loop")
+ACQUIRE_TIMEOUT = 10.0
+
+# Профилирование (--profile, --trace): максимум событий в трассировке Chrome на процесс
+PROFILE_TRACE_LIMIT = 1000000
+
+# Символы карты энтропии в терминале: пустые (нулевые) области и четыре уровня энтропии
+ENTROPY_MAP_EMPTY = ' '
+ENTROPY_MAP_LEVELS = ((4.0, '░'), (6.0, '▒'), (7.5, '▓'), (8.1, '█'))
+
+# Отпечатки загрузочного кода для кластеризации: длина n-грамм байтов и полосы LSH
+# (MINHASH_BANDS полос по MINHASH_ROWS корзин MinHash, порог сходства около 0.7)
+MINHASH_NGRAM = 4
+MINHASH_BANDS = 16
+MINHASH_ROWS = 8
+
+# Столько прочитанных таблиц размещения (L2, BAT, таблиц грейнов) и распакованных кластеров кэшируется
+VIRTUAL_DISK_CACHE_TABLES = 64
+
+# Геометрия CHS по умолчанию (трансляция LBA в BIOS): головок, секторов на дорожку
+CHS_DEFAULT_GEOMETRY = (255, 63)
+
+# Последний цилиндр, адресуемый через CHS; разделы дальше записываются с цилиндром 1023
+CHS_MAX_CYLINDER = 1023
+
+# Неразмеченные промежутки между разделами длиннее стольких секторов попадают в
+# предупреждения (короче - выравнивание и место под EBR)
+LAYOUT_GAP_SECTORS = 2048
+
+# Типы расширенных разделов, внутри которых лежит цепочка EBR
+EXTENDED_TYPES = (0x05, 0x0F, 0x85)
+
+# Предел длины цепочки EBR (защита от зацикленных и поврежденных таблиц)
+MAX_EBR_CHAIN = 4096
+
+# Заголовок GPT (92 байта) и запись массива разделов GPT (128 байт)
+GPT_HEADER_STRUCT = struct.Struct('<8sIIIIQQQQ16sQIII')
+GPT_ENTRY_STRUCT = struct.Struct('<16s16sQQQ72s')
+
+# Массив записей GPT читается страницами такого размера
+GPT_PAGE_SIZE = 64 * 1024
+
+# Предел размера массива записей GPT (обычно 128 записей по 128 байт = 16 КБ): массив
+# больше этого из поврежденного или подложного заголовка не читается
+GPT_MAX_ENTRIES_BYTES = 1024 * 1024
+
+GPT_PARTITION_TYPES = {
+    "C12A7328-F81F-11D2-BA4B-00A0C93EC93B": "EFI System",
+    "21686148-6449-6E6F-744E-656564454649": "BIOS boot",
+    "E3C9E316-0B5C-4DB8-817D-F92DF00215AE": "Microsoft Reserved",
+    "EBD0A0A2-B9E5-4433-87C0-68B6B72699C7": "Basic data (NTFS/FAT/exFAT)",
+    "DE94BBA4-06D1-4D40-A16A-BFD50179D6AC": "Windows Recovery",
+    "5808C8AA-7E8F-42E0-85D2-E1E90434CFB3": "Windows LDM metadata",
+    "AF9B60A0-1431-4F62-BC68-3311714A69AD": "Windows LDM data",
+    "0FC63DAF-8483-4772-8E79-3D69D8477DE4": "Linux filesystem",
+    "4F68BCE3-E8CD-4DB1-96E7-FBCAF984B709": "Linux root (x86-64)",
+    "BC13C2FF-59E6-4262-A352-B275FD6F7172": "Linux /boot (XBOOTLDR)",
+    "0657FD6D-A4AB-43C4-84E5-0933C84B4F4F": "Linux swap",
+    "E6D6D379-F507-44C2-A23C-238F2A3DF928": "Linux LVM",
+    "A19D880F-05FC-4D3B-A006-743F0F84911E": "Linux RAID",
+    "933AC7E1-2EB4-4F13-B844-0E14E2AEF915": "Linux /home",
+    "48465300-0000-11AA-AA11-00306543ECAC": "Apple HFS+",
+    "7C3457EF-0000-11AA-AA11-00306543ECAC": "Apple APFS",
+    "516E7CB6-6ECF-11D6-8FF8-00022D09712B": "FreeBSD UFS",
+    "6A898CC3-1DD2-11B2-99A6-080020736631": "Solaris /usr / Apple ZFS",
+}
+
+# Начало раздела, которое читается для определения файловой системы:
+# загрузочный сектор тома и суперблок ext2/3/4 (смещение 1024, 1024 байта)
+VOLUME_HEADER_SIZE = 2048
+
+# Чтения начал разделов, между которыми не больше стольких байт, объединяются в одно
+VOLUME_READ_GAP = 512 * 1024
+
+# Семейства файловых систем, допустимые для кодов типов MBR и GUID типов GPT;
+# пустой кортеж - заголовка файловой системы в разделе быть не должно
+VOLUME_EXPECTED_FAMILIES = {
+    "0x01": ("FAT",), "0x04": ("FAT",), "0x06": ("FAT",), "0x0B": ("FAT",), "0x0C": ("FAT",),
+    "0x0E": ("FAT",), "0x11": ("FAT",), "0x14": ("FAT",), "0x16": ("FAT",), "0x1B": ("FAT",),
+    "0x1C": ("FAT",), "0x1E": ("FAT",), "0xEF": ("FAT",),
+    "0x07": ("NTFS", "exFAT"), "0x83": ("ext",), "0x82": (),
+    "C12A7328-F81F-11D2-BA4B-00A0C93EC93B": ("FAT",),
+    "21686148-6449-6E6F-744E-656564454649": (),
+    "E3C9E316-0B5C-4DB8-817D-F92DF00215AE": (),
+    "EBD0A0A2-B9E5-4433-87C0-68B6B72699C7": ("FAT", "NTFS", "exFAT"),
+    "DE94BBA4-06D1-4D40-A16A-BFD50179D6AC": ("NTFS",),
+    "0FC63DAF-8483-4772-8E79-3D69D8477DE4": ("ext",),
+    "4F68BCE3-E8CD-4DB1-96E7-FBCAF984B709": ("ext",),
+    "BC13C2FF-59E6-4262-A352-B275FD6F7172": ("ext", "FAT"),
+    "933AC7E1-2EB4-4F13-B844-0E14E2AEF915": ("ext",),
+    "0657FD6D-A4AB-43C4-84E5-0933C84B4F4F": (),
+}
+
+def clear_screen():
+    """Очистка экрана консоли (только в терминале; вывод в файл или канал не трогаем)"""
+    if not sys.stdout.isatty():
+        return
+    if os.name == 'nt':
+        os.system('cls')
+    else:
+        # Управляющая последовательность вместо запуска clear в отдельном процессе
+        print("\033[H\033[2J", end="", flush=True)
+
+def print_header():
+    """Вывод заголовка программы"""
+    print("╔══════════════════════════════════════════════════════════╗")
+    print("║              АНАЛИЗАТОР MBR / ЗАГРУЗОЧНЫХ СЕКТОРОВ       ║")
+    print(f"║                     v{ANALYZER_VERSION} - 2025                          ║")
+    print("╚══════════════════════════════════════════════════════════╝")
+    print()
+
+def get_file_path():
+    """Запрос пути к файлу с проверкой"""
+    while True:
+        print("Введите путь к файлу дампа MBR:")
+        print("(Пример: C:/Users/Имя/Downloads/backup.bin или /home/user/dump.bin)")
+        print("Для выхода введите 'q' или 'exit'")
+        print()
+
+        file_path = input(">>> ").strip().strip('"').strip("'")
+
+        # Проверка на выход
+        if file_path.lower() in ['q', 'exit', 'quit', 'выход']:
+            print("\nВыход из программы...")
+            sys.exit(0)
+
+        # Проверка существования файла
+        if not os.path.exists(file_path):
+            print(f"\n ОШИБКА: Файл '{file_path}' не найден!")
+            print("Проверьте правильность пути и повторите ввод.\n")
+            continue
+
+        # Проверка размера файла
+        file_size = os.path.getsize(file_path)
+        if file_size < 512:
+            print(f"\n⚠ ПРЕДУПРЕЖДЕНИЕ: Файл слишком мал ({file_size} байт).")
+            print("Для анализа MBR нужен файл размером не менее 512 байт.")
+
+            choice = input("Продолжить анализ? (y/n): ").lower()
+            if choice != 'y':
+                continue
+
+        return file_path
+
+def load_file_data(file_path):
+    """Загрузка данных из файла"""
+    try:
+        with open(file_path, 'rb') as f:
+            # Читаем первые 512 байт (стандартный размер MBR)
+            data = f.read(512)
+
+        print(f"✓ Файл загружен: {os.path.basename(file_path)}")
+        print(f"✓ Размер прочитанных данных: {len(data)} байт")
+        return data
+
+    except Exception as e:
+        print(f" ОШИБКА при чтении файла: {e}")
+        return None
+
+def analyze(source, name=None, include_hex_dump=True, follow_ebr=True, max_ebr_chain=MAX_EBR_CHAIN,
+            follow_gpt=True, cache=None, signatures=None, follow_volumes=False, rules=None):
+    """Анализ MBR для использования как библиотеки: без глобального состояния и вывода на экран
+
+    source - байты (сектор или образ целиком), путь к файлу или файловый дескриптор.
+    cache - необязательный ResultCache для результатов разбора сектора 0.
+    signatures - пути к наборам сигнатур загрузчиков (по умолчанию - каталог signatures).
+    follow_volumes - читать начало каждого раздела и разбирать заголовок файловой системы.
+    rules - пути к наборам правил проверки (по умолчанию - каталог rules).
+    Возвращает словарь результата (как parse_mbr_complete); при ошибке - словарь с ключом "error".
+    """
+    if name is None:
+        if isinstance(source, str):
+            name = source
+        elif isinstance(source, os.PathLike):
+            name = os.fspath(source)
+        elif isinstance(source, int):
+            name = f"fd:{source}"
+        else:
+            name = "<bytes>"
+
+    engine = load_signature_engine(tuple(signatures) if signatures else None)
+    rule_set = load_rule_set(tuple(rules) if rules else None)
+
+    try:
+        image = open_image(source)
+    except (OSError, TypeError, ValueError) as e:
+        return {"error": f"Ошибка чтения данных: {e}", "filename": os.path.basename(name), "full_path": name}
+
+    try:
+        with image:
+            return analyze_image(image, name, include_hex_dump, follow_ebr, max_ebr_chain, follow_gpt,
+                                 cache, engine, follow_volumes, rule_set)
+    except OSError as e:
+        return {"error": f"Ошибка чтения данных: {e}", "filename": os.path.basename(name), "full_path": name}
+
+def analyze_image(image, name, include_hex_dump, follow_ebr, max_ebr_chain, follow_gpt, cache, engine,
+                  follow_volumes=False, rule_set=None):
+    """Анализ уже открытого образа (см. analyze)"""
+    data = image.read(0, 512)
+    if cache is not None:
+        result = parse_mbr_cached(data, name, cache, include_hex_dump=include_hex_dump, signature_engine=engine)
+    else:
+        result = parse_mbr_complete(data, name, include_hex_dump=include_hex_dump, signature_engine=engine)
+    if "error" in result:
+        result["filename"] = os.path.basename(name)
+        result["full_path"] = name
+        return result
+
+    if follow_ebr:
+        analyze_extended_partitions(result, image, max_ebr_chain)
+
+    if follow_gpt and result["statistics"]["partitions_gpt"] > 0:
+        analyze_gpt(result, image)
+
+    validate_partitions(result, known_image_size(image))
+
+    if follow_volumes:
+        analyze_volumes(result, image)
+
+    if rule_set is not None:
+        apply_rules([result], rule_set)
+
+    return result
+
+def analyze_extended_partitions(result, image, max_chain=MAX_EBR_CHAIN, sector_size=512):
+    """Обход цепочек EBR всех расширенных разделов и добавление логических разделов в результат"""
+    extended = {"ebr_chain": [], "partitions": [], "issues": []}
+
+    for partition in result["sections"]["partition_table"]["partitions"]:
+        if partition["status"] != "Заполнен" or int(partition["type_code"], 16) not in EXTENDED_TYPES:
+            continue
+
+        chain = walk_ebr_chain(image, partition["lba_start"], partition["sectors"], sector_size,
+                               max_chain, first_index=5 + len(extended["partitions"]))
+        extended["ebr_chain"].extend(chain["ebr_chain"])
+        extended["partitions"].extend(chain["partitions"])
+        extended["issues"].extend(chain["issues"])
+
+    if extended["ebr_chain"] or extended["issues"]:
+        result["sections"]["extended"] = extended
+        result["warnings"].extend(extended["issues"])
+        result["statistics"] = calculate_statistics(result)
+
+    return result
+
+def analyze_volumes(result, image):
+    """Разбор заголовков файловых систем всех разделов (MBR, логических, GPT) и сверка с типом раздела
+
+    Начала разделов читаются одним проходом по возрастанию смещения, соседние
+    чтения объединяются (read_coalesced). Найденная файловая система записывается
+    в раздел ("volume"), несоответствия типу - в предупреждения.
+    """
+    targets = []
+    for partition in result["sections"]["partition_table"]["partitions"]:
+        if partition["status"] == "Заполнен" and partition["type_code"] != "0xEE" \
+                and int(partition["type_code"], 16) not in EXTENDED_TYPES:
+            targets.append((partition, 512))
+    for partition in result["sections"].get("extended", {}).get("partitions", []):
+        targets.append((partition, 512))
+    gpt = result["sections"].get("gpt")
+    if gpt:
+        targets.extend((partition, gpt["sector_size"]) for partition in gpt["partitions"])
+
+    image_size = known_image_size(image)
+    requests = {}
+    for partition, sector_size in targets:
+        offset = partition["lba_start"] * sector_size
+        if not partition["sectors"]:
+            continue
+        if image_size is None:
+            requests[id(partition)] = (offset, VOLUME_HEADER_SIZE)
+        elif offset < image_size:
+            requests[id(partition)] = (offset, min(VOLUME_HEADER_SIZE, image_size - offset))
+    headers, reads = read_coalesced(image, requests.values())
+
+    detected = mismatches = 0
+    for partition, sector_size in targets:
+        request = requests.get(id(partition))
+        if request is None:
+            continue
+
+        volume = parse_volume_header(headers[request])
+        if volume is None:
+            partition["volume"] = None
+            partition["analysis"].append(" Файловая система: не распознана")
+            continue
+
+        detected += 1
+        volume["offset"] = request[0]
+        expected = VOLUME_EXPECTED_FAMILIES.get(partition["type_code"])
+        volume["type_match"] = None if expected is None else volume["family"] in expected
+        partition["volume"] = volume
+
+        details = [f"кластер {volume['cluster_size']} байт", f"{volume['size_bytes'] / (1024 ** 3):.3f} GB"]
+        if volume["label"]:
+            details.insert(0, f"метка '{volume['label']}'")
+        partition["analysis"].append(f" Файловая система: {volume['filesystem']} ({', '.join(details)})")
+
+        label = f"Раздел {partition['index']}" + (" GPT" if "partition_guid" in partition else "")
+        if volume["type_match"] is False:
+            mismatches += 1
+            message = (f"тип {partition['type_code']} ({partition['type_name']}) не соответствует "
+                       f"файловой системе {volume['filesystem']}")
+            partition["analysis"].append(f" Внимание: {message}")
+            result["warnings"].append(f"{label}: {message}")
+        if volume["size_bytes"] > partition["sectors"] * sector_size:
+            message = (f"файловая система ({volume['size_bytes']:,} байт) больше раздела "
+                       f"({partition['sectors'] * sector_size:,} байт)")
+            partition["analysis"].append(f" Внимание: {message}")
+            result["warnings"].append(f"{label}: {message}")
+
+    result["sections"]["volumes"] = {
+        "partitions": len(requests),
+        "detected": detected,
+        "mismatches": mismatches,
+        "reads": reads
+    }
+    return result
+
+def read_coalesced(image, requests, max_gap=VOLUME_READ_GAP):
+    """Чтение набора участков (смещение, размер) по возрастанию смещения с объединением соседних
+
+    Участки, между которыми не больше max_gap байт, читаются одним вызовом
+    image.read. Возвращает ({(смещение, размер): байты}, число выполненных чтений).
+    """
+    ordered = sorted(set(requests))
+    found = {}
+    reads = 0
+
+    i = 0
+    while i < len(ordered):
+        start, size = ordered[i]
+        end = start + size
+        j = i + 1
+        while j < len(ordered) and ordered[j][0] - end <= max_gap:
+            end = max(end, ordered[j][0] + ordered[j][1])
+            j += 1
+
+        data = image.read(start, end - start)
+        reads += 1
+        for offset, size in ordered[i:j]:
+            found[(offset, size)] = data[offset - start:offset - start + size]
+        i = j
+
+    return found, reads
+
+def parse_volume_header(data):
+    """Файловая система по началу тома: загрузочный сектор NTFS/exFAT/FAT или суперблок ext2/3/4
+
+    Возвращает словарь (filesystem, family, label, serial, bytes_per_sector,
+    cluster_size, size_bytes, ...) или None, если заголовок не распознан.
+    """
+    volume = parse_volume_boot_sector(data[:512])
+    if volume is not None or len(data) < 2048:
+        return volume
+
+    # Суперблок ext2/3/4: смещение 1024 от начала тома, сигнатура 0xEF53
+    superblock = data[1024:2048]
+    if superblock[0x38:0x3A] != b'\x53\xEF':
+        return None
+
+    inodes, blocks, log_block_size = struct.unpack_from('<II16xI', superblock, 0)
+    compat, incompat, ro_compat = struct.unpack_from('<III', superblock, 0x5C)
+    if log_block_size > 6:
+        return None
+    if incompat & 0x80:  # 64bit: старшая половина числа блоков
+        blocks |= struct.unpack_from('<I', superblock, 0x150)[0] << 32
+    block_size = 1024 << log_block_size
+
+    if incompat & 0x2C0:  # extents, 64bit, flex_bg
+        filesystem = "ext4"
+    elif compat & 0x4:  # has_journal
+        filesystem = "ext3"
+    else:
+        filesystem = "ext2"
+
+    return {
+        "filesystem": filesystem,
+        "family": "ext",
+        "label": superblock[0x78:0x88].split(b'\x00', 1)[0].decode('utf-8', 'replace'),
+        "serial": format_guid(superblock[0x68:0x78], little_endian=False),
+        "bytes_per_sector": None,
+        "cluster_size": block_size,
+        "size_bytes": blocks * block_size,
+        "inodes": inodes,
+        "features": {"compat": f"0x{compat:X}", "incompat": f"0x{incompat:X}", "ro_compat": f"0x{ro_compat:X}"}
+    }
+
+def parse_volume_boot_sector(sector):
+    """Разбор загрузочного сектора тома NTFS, exFAT или FAT12/16/32; None - не загрузочный сектор тома
+
+    FAT32 определяется по расширенному BPB (размер FAT в 16-битном поле равен 0),
+    FAT12 и FAT16 - по числу кластеров, как в спецификации FAT; строка типа в BPB
+    не учитывается.
+    """
+    if len(sector) < 512 or sector[0] not in (0xEB, 0xE9):
+        return None
+    oem_id = sector[3:11]
+    volume = {"oem_id": oem_id.decode('ascii', 'replace').strip()}
+
+    if oem_id == b'NTFS    ':
+        bytes_per_sector, sectors_per_cluster = struct.unpack_from('<HB', sector, 0x0B)
+        total_sectors, mft_cluster = struct.unpack_from('<QQ', sector, 0x28)
+        serial, = struct.unpack_from('<Q', sector, 0x48)
+        # Значения больше 0x80 - отрицательная степень двойки (размер кластера 2^(256 - x) байт)
+        cluster_size = bytes_per_sector * sectors_per_cluster if sectors_per_cluster <= 0x80 \
+            else 1 << (256 - sectors_per_cluster)
+        volume.update(filesystem="NTFS", family="NTFS", label=None, serial=f"{serial:016X}",
+                      bytes_per_sector=bytes_per_sector, cluster_size=cluster_size,
+                      size_bytes=total_sectors * bytes_per_sector, mft_cluster=mft_cluster)
+        return volume
+
+    if oem_id == b'EXFAT   ':
+        volume_length, = struct.unpack_from('<Q', sector, 0x48)
+        serial, = struct.unpack_from('<I', sector, 0x64)
+        sector_shift, cluster_shift = sector[0x6C], sector[0x6D]
+        if not 9 <= sector_shift <= 12 or sector_shift + cluster_shift > 25:
+            return None
+        volume.update(filesystem="exFAT", family="exFAT", label=None, serial=f"{serial:08X}",
+                      bytes_per_sector=1 << sector_shift, cluster_size=1 << (sector_shift + cluster_shift),
+                      size_bytes=volume_length << sector_shift)
+        return volume
+
+    (bytes_per_sector, sectors_per_cluster, reserved, fats, root_entries, total16, media,
+     fat_size) = struct.unpack_from('<HBHBHHBH', sector, 0x0B)
+    if bytes_per_sector not in (512, 1024, 2048, 4096) or not sectors_per_cluster \
+            or sectors_per_cluster & (sectors_per_cluster - 1) or not reserved or fats not in (1, 2) \
+            or not (media == 0xF0 or media >= 0xF8):
+        return None
+
+    total32, = struct.unpack_from('<I', sector, 0x20)
+    total_sectors = total16 or total32
+    fat32 = not fat_size
+    if fat32:
+        fat_size, = struct.unpack_from('<I', sector, 0x24)
+        serial, label = struct.unpack_from('<I11s', sector, 0x43)
+    else:
+        serial, label = struct.unpack_from('<I11s', sector, 0x27)
+    root_sectors = (root_entries * 32 + bytes_per_sector - 1) // bytes_per_sector
+    clusters = (total_sectors - reserved - fats * fat_size - root_sectors) // sectors_per_cluster
+    if not fat_size or clusters <= 0:
+        return None
+
+    filesystem = "FAT32" if fat32 else "FAT12" if clusters < 4085 else "FAT16"
+    label = label.decode('ascii', 'replace').strip()
+    volume.update(filesystem=filesystem, family="FAT", label=None if label in ("", "NO NAME") else label,
+                  serial=f"{serial:08X}", bytes_per_sector=bytes_per_sector,
+                  cluster_size=bytes_per_sector * sectors_per_cluster,
+                  size_bytes=total_sectors * bytes_per_sector, clusters=clusters)
+    return volume
+
+def decode_chs(head, sector, cylinder):
+    """CHS из трех байт записи раздела: старшие 2 бита цилиндра лежат в битах 6-7 байта сектора"""
+    return {"cylinder": (sector & 0xC0) << 2 | cylinder, "head": head, "sector": sector & 0x3F}
+
+def lba_to_chs(lba, heads, sectors_per_track):
+    """Ожидаемый CHS для LBA при заданной геометрии (за 1024 цилиндрами - цилиндр 1023)"""
+    cylinder, rest = divmod(lba, heads * sectors_per_track)
+    if cylinder > CHS_MAX_CYLINDER:
+        return {"cylinder": CHS_MAX_CYLINDER, "head": heads - 1, "sector": sectors_per_track}
+    return {"cylinder": cylinder, "head": rest // sectors_per_track, "sector": rest % sectors_per_track + 1}
+
+def detect_chs_geometry(partitions):
+    """Геометрия (головок, секторов на дорожку) по концам разделов, как у fdisk; иначе 255/63
+
+    Конец раздела задает геометрию, только если раздел кончается на границе
+    цилиндра: CHS конца при такой геометрии совпадает с его LBA. Все такие
+    разделы должны давать одну геометрию. Разделы, выровненные по 1 МБ, кончаются
+    где угодно - для них берется геометрия по умолчанию.
+    """
+    geometries = set()
+    for partition in partitions:
+        end = partition["chs_end"]
+        if not end["sector"] or end["head"] >= 255 or not partition["sectors"]:
+            continue
+        geometry = (end["head"] + 1, end["sector"])
+        if chs_matches(end, lba_to_chs(partition["lba_start"] + partition["sectors"] - 1, *geometry)):
+            geometries.add(geometry)
+    return geometries.pop() if len(geometries) == 1 else CHS_DEFAULT_GEOMETRY
+
+def chs_matches(actual, expected):
+    """Совпадение CHS из записи с ожидаемым; за пределами CHS допускается любой цилиндр 1023"""
+    if expected["cylinder"] == CHS_MAX_CYLINDER and actual["cylinder"] == CHS_MAX_CYLINDER:
+        return True
+    return actual == expected
+
+def find_overlaps_and_gaps(intervals):
+    """Пересечения и промежутки между интервалами [(начало, конец, метка)] за O(n log n)
+
+    Интервалы сортируются по началу, при проходе запоминается интервал с самым
+    дальним концом: следующий интервал, начавшийся раньше этого конца,
+    пересекается с ним. Возвращает ([(метка, метка, секторов)], [(начало, конец, метка, метка)]).
+    """
+    overlaps = []
+    gaps = []
+    reach_end = reach_label = None
+
+    for start, end, label in sorted(intervals):
+        if reach_end is not None:
+            if start < reach_end:
+                overlaps.append((reach_label, label, min(end, reach_end) - start))
+            elif start > reach_end:
+                gaps.append((reach_end, start, reach_label, label))
+        if reach_end is None or end > reach_end:
+            reach_end, reach_label = end, label
+
+    return overlaps, gaps
+
+def validate_partitions(result, image_size=0):
+    """Проверка согласованности всех разделов (основных, логических, GPT)
+
+    - пересечения и промежутки внутри каждой схемы (сортировка по началу);
+    - логические разделы - внутри своего расширенного раздела;
+    - границы образа (если образ больше одного сектора и размер известен -
+      image_size не None) и области GPT;
+    - поля CHS начала и конца против LBA при геометрии, найденной по разделам.
+    Ошибки структуры добавляются в result["issues"], остальное - в result["warnings"];
+    промежутки и геометрия сохраняются в sections.layout.
+    """
+    sections = result["sections"]
+    issues = result.setdefault("issues", [])
+    warnings = result["warnings"]
+
+    primary = [p for p in sections["partition_table"]["partitions"] if p["status"] == "Заполнен"]
+    logical = sections.get("extended", {}).get("partitions", [])
+    gpt = sections.get("gpt")
+    disk_sectors = image_size // 512 if image_size and image_size > 512 else None
+
+    # CHS: разделы MBR и EBR с ненулевым размером (у защитной записи GPT CHS условные)
+    heads, sectors_per_track = detect_chs_geometry(primary + logical)
+    for partition in primary + logical:
+        if not partition["sectors"] or partition["type_code"] == "0xEE":
+            continue
+        if not partition["chs_start"]["sector"] and not partition["chs_end"]["sector"]:
+            # Нулевые поля CHS оставляют многие современные утилиты - это не ошибка
+            partition["analysis"].append(" Поля CHS не заполнены (0/0/0), используется только LBA")
+            continue
+        for name, lba, title in (("chs_start", partition["lba_start"], "начала"),
+                                 ("chs_end", partition["lba_start"] + partition["sectors"] - 1, "конца")):
+            actual = partition[name]
+            expected = lba_to_chs(lba, heads, sectors_per_track)
+            if chs_matches(actual, expected):
+                continue
+            message = (f"CHS {title} {actual['cylinder']}/{actual['head']}/{actual['sector']} не соответствует "
+                       f"LBA {lba} (ожидалось {expected['cylinder']}/{expected['head']}/{expected['sector']}, "
+                       f"геометрия {heads}/{sectors_per_track})")
+            partition["analysis"].append(f" Внимание: {message}")
+            warnings.append(f"Раздел {partition['index']}: {message}")
+
+    # Интервалы по схемам: [начало, конец) в секторах схемы
+    schemes = {"mbr": [], "ebr": [], "gpt": []}
+    containers = []
+    for partition in primary:
+        if not partition["sectors"] or partition["type_code"] == "0xEE":
+            continue
+        interval = (partition["lba_start"], partition["lba_start"] + partition["sectors"])
+        if int(partition["type_code"], 16) in EXTENDED_TYPES:
+            containers.append(interval)
+            schemes["mbr"].append(interval + (f"Расширенный раздел {partition['index']}",))
+        else:
+            schemes["mbr"].append(interval + (f"Раздел {partition['index']}",))
+    for partition in logical:
+        if partition["sectors"]:
+            schemes["ebr"].append((partition["lba_start"], partition["lba_start"] + partition["sectors"],
+                                   f"Логический раздел {partition['index']}"))
+    if gpt:
+        for partition in gpt["partitions"]:
+            if partition["sectors"]:
+                schemes["gpt"].append((partition["lba_start"], partition["lba_start"] + partition["sectors"],
+                                       f"Раздел GPT {partition['index']}"))
+
+    for start, end, label in schemes["ebr"]:
+        if not any(first <= start and end <= last for first, last in containers):
+            issues.append(f"{label} (LBA {start}-{end - 1}) выходит за пределы расширенного раздела")
+
+    if gpt:
+        header = gpt["primary"] if gpt["primary"] and gpt["primary"].get("header_crc_valid") else gpt["backup"]
+        if header and header.get("header_crc_valid"):
+            for start, end, label in schemes["gpt"]:
+                if start < header["first_usable_lba"] or end - 1 > header["last_usable_lba"]:
+                    warnings.append(f"{label} (LBA {start}-{end - 1}) вне области для разделов GPT "
+                                    f"({header['first_usable_lba']}-{header['last_usable_lba']})")
+
+    layout = {"geometry": {"heads": heads, "sectors_per_track": sectors_per_track}, "overlaps": [], "gaps": []}
+    for scheme, intervals in schemes.items():
+        sector_size = gpt["sector_size"] if gpt and scheme == "gpt" else 512
+        scheme_sectors = image_size // sector_size if disk_sectors else None
+
+        if scheme_sectors is not None:
+            for start, end, label in intervals:
+                if end > scheme_sectors:
+                    issues.append(f"{label} (LBA {start}-{end - 1}) выходит за пределы образа "
+                                  f"({scheme_sectors} секторов по {sector_size} байт)")
+
+        overlaps, gaps = find_overlaps_and_gaps(intervals)
+        for first, second, sectors in overlaps:
+            issues.append(f"{first} и {second} пересекаются ({sectors:,} секторов)")
+            layout["overlaps"].append({"scheme": scheme, "first": first, "second": second, "sectors": sectors})
+        for start, end, before, after in gaps:
+            layout["gaps"].append({"scheme": scheme, "lba_start": start, "sectors": end - start,
+                                   "after": before, "before": after})
+            if end - start > LAYOUT_GAP_SECTORS:
+                warnings.append(f"Неразмеченная область между разделами ({before} и {after}): "
+                                f"LBA {start}-{end - 1}, {end - start:,} секторов")
+
+    sections["layout"] = layout
+    return result
+
+def walk_ebr_chain(image, extended_lba, extended_sectors=0, sector_size=512, max_chain=MAX_EBR_CHAIN, first_index=5):
+    """Обход связного списка EBR внутри расширенного раздела
+
+    Каждый EBR читается одним позиционным чтением. Первая запись EBR описывает
+    логический раздел (относительно самого EBR), вторая - ссылку на следующий EBR
+    (относительно начала расширенного раздела). Посещенные LBA запоминаются,
+    поэтому циклы обнаруживаются за O(1) на звено, а вся цепочка - за линейное время.
+    """
+    chain = []
+    partitions = []
+    issues = []
+    visited = set()
+
+    # Размер сжатого потока может быть еще неизвестен: тогда конец образа - по короткому чтению
+    image_size = known_image_size(image)
+    disk_sectors = image_size // sector_size if image_size is not None else None
+    extended_end = extended_lba + extended_sectors if extended_sectors else disk_sectors
+    ebr_lba = extended_lba
+
+    while True:
+        if len(chain) >= max_chain:
+            issues.append(f"Цепочка EBR прервана: превышен предел в {max_chain} звеньев")
+            break
+        if ebr_lba in visited:
+            issues.append(f"Цепочка EBR зациклена: повторная ссылка на LBA {ebr_lba}")
+            break
+        if extended_end is not None and not extended_lba <= ebr_lba < extended_end:
+            issues.append(f"EBR на LBA {ebr_lba} вне расширенного раздела ({extended_lba}-{extended_end - 1})")
+            break
+        if disk_sectors is not None and ebr_lba >= disk_sectors:
+            issues.append(f"EBR на LBA {ebr_lba} за пределами образа ({disk_sectors} секторов)")
+            break
+
+        visited.add(ebr_lba)
+        sector = image.read(ebr_lba * sector_size, 512)
+        if len(sector) < 512:
+            issues.append(f"EBR на LBA {ebr_lba} прочитан не полностью ({len(sector)} байт)")
+            break
+
+        signature_valid = sector[510:512] == b'\x55\xAA'
+        chain.append({
+            "lba": ebr_lba,
+            "offset": ebr_lba * sector_size,
+            "offset_hex": f"0x{ebr_lba * sector_size:X}",
+            "signature_valid": signature_valid
+        })
+        if not signature_valid:
+            issues.append(f"EBR на LBA {ebr_lba}: некорректная сигнатура")
+            break
+
+        entries = parse_partition_table(sector[446:510], lba_base=ebr_lba)
+
+        logical = entries[0]
+        if logical["status"] == "Заполнен":
+            logical["index"] = first_index + len(partitions)
+            logical["ebr_lba"] = ebr_lba
+            partitions.append(logical)
+
+        link = entries[1]
+        if link["status"] != "Заполнен" or int(link["type_code"], 16) not in EXTENDED_TYPES:
+            break
+
+        # Ссылка на следующий EBR задается относительно начала расширенного раздела
+        ebr_lba = extended_lba + (link["lba_start"] - ebr_lba)
+
+    return {"ebr_chain": chain, "partitions": partitions, "issues": issues}
+
+def analyze_gpt(result, image):
+    """Разбор GPT за защитной MBR и добавление его разделов в результат"""
+    gpt = parse_gpt(image)
+    result["sections"]["gpt"] = gpt
+    result["warnings"].extend(gpt["issues"])
+    result["statistics"] = calculate_statistics(result)
+    return result
+
+def parse_gpt(image, sector_size=None):
+    """Разбор основного (LBA 1) и резервного (последний LBA) заголовков GPT и массива разделов"""
+    issues = []
+
+    # Размер логического сектора определяем по положению сигнатуры "EFI PART"
+    if sector_size is None:
+        sector_size = 512
+        for candidate in (512, 4096):
+            if image.read(candidate, 8) == b'EFI PART':
+                sector_size = candidate
+                break
+
+    gpt = {"sector_size": sector_size, "primary": None, "backup": None, "partitions": [], "issues": issues}
+
+    primary = parse_gpt_header(image.read(sector_size, sector_size), 1)
+    gpt["primary"] = primary
+    if not primary["signature_valid"]:
+        issues.append("GPT: основной заголовок на LBA 1 не найден (нет сигнатуры EFI PART)")
+    elif not primary["header_crc_valid"]:
+        issues.append("GPT: неверная CRC32 основного заголовка")
+
+    # Резервный заголовок: по ссылке из основного, иначе - последний сектор образа
+    # (только тогда нужен размер, который у сжатого потока требует полного прохода)
+    linked = primary["signature_valid"] and primary["backup_lba"] > 0
+    image_size = known_image_size(image)
+    if image_size is None and not linked:
+        image_size = image.size
+    disk_sectors = image_size // sector_size if image_size is not None else None
+
+    backup_lba = disk_sectors - 1 if disk_sectors is not None else None
+    if linked and (disk_sectors is None or primary["backup_lba"] < disk_sectors):
+        backup_lba = primary["backup_lba"]
+    backup = None
+    if disk_sectors is None or disk_sectors > 2:
+        backup = parse_gpt_header(image.read(backup_lba * sector_size, sector_size), backup_lba)
+    gpt["backup"] = backup
+
+    if backup is None or not backup["signature_valid"]:
+        issues.append(f"GPT: резервный заголовок на LBA {backup_lba} не найден")
+    elif not backup["header_crc_valid"]:
+        issues.append("GPT: неверная CRC32 резервного заголовка")
+
+    # Проверяем массивы записей обоих заголовков; разделы берем из первого корректного.
+    # Полям заголовка с неверной CRC32 не доверяем: его массив не читается
+    for label, header in (("основного", primary), ("резервного", backup)):
+        if header is None or not header["signature_valid"] or not header["header_crc_valid"]:
+            continue
+
+        partitions, crc, entry_issues = read_gpt_entries(image, header, sector_size,
+                                                         collect=not gpt["partitions"])
+        # Массив не прочитан (некорректный размер записи или слишком велик) - CRC32 не проверена
+        header["entries_crc_valid"] = None if crc is None else f"0x{crc:08X}" == header["entries_crc32"]
+        issues.extend(f"GPT ({label} заголовок): {issue}" for issue in entry_issues)
+        if header["entries_crc_valid"] is False:
+            issues.append(f"GPT: неверная CRC32 массива разделов {label} заголовка")
+        if not gpt["partitions"] and header["header_crc_valid"] and header["entries_crc_valid"]:
+            gpt["partitions"] = partitions
+            gpt["source"] = header["lba"]
+
+    if primary["signature_valid"] and backup and backup["signature_valid"]:
+        if primary["disk_guid"] != backup["disk_guid"]:
+            issues.append("GPT: GUID диска в основном и резервном заголовках не совпадает")
+        if primary["entries_crc32"] != backup["entries_crc32"]:
+            issues.append("GPT: массивы разделов основного и резервного заголовков различаются")
+        if backup["current_lba"] != primary["backup_lba"]:
+            issues.append("GPT: резервный заголовок не находится по адресу из основного заголовка")
+
+    return gpt
+
+def parse_gpt_header(sector, lba):
+    """Разбор заголовка GPT с проверкой CRC32"""
+    header = {"lba": lba, "signature_valid": sector[:8] == b'EFI PART'}
+    if not header["signature_valid"] or len(sector) < GPT_HEADER_STRUCT.size:
+        header["signature_valid"] = False
+        return header
+
+    (_, revision, header_size, header_crc, _, current_lba, backup_lba, first_usable, last_usable,
+     disk_guid, entries_lba, entries_count, entry_size, entries_crc) = GPT_HEADER_STRUCT.unpack_from(sector)
+
+    # CRC32 считается по header_size байтам с обнуленным полем самой CRC
+    header_size_valid = GPT_HEADER_STRUCT.size <= header_size <= len(sector)
+    crc = zlib.crc32(sector[:16] + b'\x00\x00\x00\x00' + sector[20:header_size]) if header_size_valid else None
+
+    header.update({
+        "revision": f"{revision >> 16}.{revision & 0xFFFF}",
+        "header_size": header_size,
+        "header_crc32": f"0x{header_crc:08X}",
+        "header_crc_valid": crc == header_crc,
+        "current_lba": current_lba,
+        "backup_lba": backup_lba,
+        "first_usable_lba": first_usable,
+        "last_usable_lba": last_usable,
+        "disk_guid": format_guid(disk_guid),
+        "entries_lba": entries_lba,
+        "entries_count": entries_count,
+        "entry_size": entry_size,
+        "entries_crc32": f"0x{entries_crc:08X}",
+        "entries_crc_valid": None
+    })
+    return header
+
+def read_gpt_entries(image, header, sector_size=512, collect=True):
+    """Потоковое чтение массива записей GPT страницами с подсчетом CRC32
+
+    Страница декодируется целиком через struct.iter_unpack; полностью пустые
+    страницы (обычный хвост массива) пропускаются без разбора. Массив больше
+    GPT_MAX_ENTRIES_BYTES не читается. Возвращает (разделы, CRC32 массива, замечания).
+    """
+    issues = []
+    partitions = []
+    entry_size = header["entry_size"]
+    entries_count = header["entries_count"]
+
+    if entry_size < GPT_ENTRY_STRUCT.size or entry_size % 8:
+        return partitions, None, [f"некорректный размер записи: {entry_size} байт"]
+
+    start = header["entries_lba"] * sector_size
+    total = entries_count * entry_size
+    if total > GPT_MAX_ENTRIES_BYTES:
+        return partitions, None, [f"массив разделов ({entries_count} записей по {entry_size} байт) "
+                                  f"больше {GPT_MAX_ENTRIES_BYTES:,} байт - не читается"]
+    image_size = known_image_size(image)
+    if image_size is not None and start + total > image_size:
+        issues.append(f"массив разделов ({entries_count} записей) выходит за пределы образа")
+        total = max(0, image_size - start) // entry_size * entry_size
+
+    page_entries = max(1, GPT_PAGE_SIZE // entry_size)
+    page_size = page_entries * entry_size
+    crc = 0
+
+    for page_offset in range(0, total, page_size):
+        if page_offset >= total:
+            break
+        page = image.read(start + page_offset, min(page_size, total - page_offset))
+        if len(page) < min(page_size, total - page_offset):
+            # Конец образа, размер которого не был известен заранее
+            issues.append(f"массив разделов ({entries_count} записей) выходит за пределы образа")
+            page = page[:len(page) // entry_size * entry_size]
+            total = page_offset
+        crc = zlib.crc32(page, crc)
+        if not collect or page.count(0) == len(page):
+            continue
+
+        if entry_size == GPT_ENTRY_STRUCT.size:
+            entries = GPT_ENTRY_STRUCT.iter_unpack(page)
+        else:
+            entries = (GPT_ENTRY_STRUCT.unpack_from(page, i) for i in range(0, len(page), entry_size))
+
+        first_index = page_offset // entry_size
+        for i, (type_guid, unique_guid, first_lba, last_lba, attributes, name) in enumerate(entries):
+            if type_guid == bytes(16):
+                continue
+            index = first_index + i
+            partitions.append(make_gpt_partition(index, start + index * entry_size, type_guid, unique_guid,
+                                                 first_lba, last_lba, attributes, name, sector_size))
+
+    return partitions, crc, issues
+
+def make_gpt_partition(index, offset, type_guid, unique_guid, first_lba, last_lba, attributes, name, sector_size):
+    """Запись раздела GPT в той же схеме, что и разделы MBR"""
+    type_code = format_guid(type_guid)
+    sectors = last_lba - first_lba + 1 if last_lba >= first_lba else 0
+    partition = {
+        "index": index + 1,
+        "offset_hex": f"0x{offset:X}",
+        "offset_dec": offset,
+        "status": "Заполнен",
+        "bootable": bool(attributes & 0x4),
+        "type_code": type_code,
+        "type_name": GPT_PARTITION_TYPES.get(type_code, "Неизвестный"),
+        "lba_start": first_lba,
+        "sectors": sectors,
+        "size_bytes": sectors * sector_size,
+        "size_mb": sectors * sector_size / (1024 * 1024),
+        "size_gb": sectors * sector_size / (1024 * 1024 * 1024),
+        "partition_guid": format_guid(unique_guid),
+        "name": name.decode('utf-16-le', 'replace').split('\x00', 1)[0],
+        "attributes": f"0x{attributes:016X}"
+    }
+
+    analysis = []
+    analysis.append(f" Имя: {partition['name'] or '-'}")
+    analysis.append(f" Тип: {partition['type_name']} ({type_code})")
+    analysis.append(f" Начальный сектор: {first_lba}, конечный: {last_lba}")
+    analysis.append(f" Секторов: {sectors:,}")
+    analysis.append(f" Размер: {partition['size_mb']:.2f} MB ({partition['size_gb']:.3f} GB)")
+    if attributes & 0x1:
+        analysis.append(" Атрибут: системный раздел платформы")
+    if attributes & 0x4:
+        analysis.append(" Атрибут: загрузочный для BIOS (legacy)")
+    if last_lba < first_lba:
+        analysis.append(" Внимание: конечный сектор меньше начального")
+    partition["analysis"] = analysis
+
+    return partition
+
+def parse_mbr_cached(data, source_path, cache, include_hex_dump=True, signature_engine=None):
+    """parse_mbr_complete() через кэш: ключ - SHA-256 самих 512 байт сектора и набора сигнатур"""
+    import hashlib
+    if len(data) != 512:
+        return parse_mbr_complete(data, source_path, include_hex_dump=include_hex_dump,
+                                  signature_engine=signature_engine)
+
+    engine = signature_engine or load_signature_engine()
+    key = hashlib.sha256(data + engine.digest).digest()
+    result = cache.get(key)
+    if result is None:
+        result = parse_mbr_complete(data, source_path, signature_engine=engine)
+        cache.put(key, result)
+    else:
+        # Из кэша берется только содержимое сектора - привязку к файлу обновляем
+        result["filename"] = os.path.basename(source_path)
+        result["full_path"] = source_path
+        result["timestamp"] = datetime.now().isoformat()
+
+    if not include_hex_dump:
+        result.pop("hex_dump", None)
+    return result
+
+def parse_mbr_complete(data, source_path="", include_hex_dump=True, signature_engine=None):
+    """Полный парсинг всех 512 байт MBR (sha256 - хэш самого сектора)"""
+    import hashlib
+    if len(data) < 512:
+        return {"error": f"Некорректный размер MBR: {len(data)} байт (должно быть не менее 512)"}
+
+    warnings = []
+
+    # Если данных больше 512 байт, берем только первые 512
+    if len(data) > 512:
+        data = data[:512]
+        warnings.append("Файл больше 512 байт. Анализируются первые 512 байт.")
+
+    result = {
+        "filename": os.path.basename(source_path),
+        "full_path": source_path,
+        "size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "timestamp": datetime.now().isoformat(),
+        "warnings": warnings,
+        "issues": [],
+        "sections": {}
+    }
+
+    # 1. Загрузочный код (первые 446 байт)
+    boot_code = data[:446]
+    bootloaders = (signature_engine or load_signature_engine()).match(boot_code)
+    stats = byte_stats(boot_code)
+    disassembly = disassemble_boot_code(bytes(boot_code)) if stats["zero_bytes"] != stats["size"] else None
+    result["sections"]["boot_code"] = {
+        "offset": "0x000-0x1BD",
+        "size": 446,
+        "hex_preview": ' '.join(f'{b:02X}' for b in boot_code[:32]),
+        "contains_data": stats["zero_bytes"] != stats["size"],
+        "bootloaders": bootloaders,
+        "stats": {key: value for key, value in stats.items() if key != "histogram"},
+        "disassembly": disassembly,
+        "analysis": parse_boot_code(boot_code, bootloaders, stats, disassembly)
+    }
+
+    # 2. Таблица разделов (64 байта)
+    partition_table = data[446:510]
+    result["sections"]["partition_table"] = {
+        "offset": "0x1BE-0x1FD",
+        "size": 64,
+        "partitions": parse_partition_table(partition_table)
+    }
+
+    # 3. Сигнатура (последние 2 байта)
+    signature = data[510:512]
+    result["sections"]["signature"] = {
+        "offset": "0x1FE-0x1FF",
+        "size": 2,
+        "hex": f"0x{signature[0]:02X} 0x{signature[1]:02X}",
+        "valid": signature == b'\x55\xAA',
+        "analysis": parse_signature(signature)
+    }
+
+    # 4. HEX-дамп всего MBR
+    if include_hex_dump:
+        result["hex_dump"] = create_hex_dump(data)
+
+    # 5. Дополнительная информация
+    result["statistics"] = calculate_statistics(result)
+
+    return result
+
+def parse_boot_code(boot_code, bootloaders=None, stats=None, disassembly=None):
+    """Анализ загрузочного кода
+
+    bootloaders - уже найденные совпадения сигнатур (SignatureEngine.match);
+    если не переданы, поиск выполняется набором сигнатур по умолчанию.
+    stats - статистика байтов (byte_stats), disassembly - результат
+    disassemble_boot_code(); если не переданы, считаются здесь.
+    """
+    analysis = []
+    if stats is None:
+        stats = byte_stats(boot_code)
+
+    # Проверяем, пустой ли код
+    is_empty = stats["zero_bytes"] == stats["size"]
+
+    if is_empty:
+        analysis.append("Загрузочный код: ОТСУТСТВУЕТ (все байты равны 0)")
+        analysis.append("Это означает, что MBR не содержит кода загрузчика")
+        analysis.append("  Возможные причины: чистый диск, поврежденный MBR, GPT диск")
+    else:
+        analysis.append("Загрузочный код: ПРИСУТСТВУЕТ")
+
+        # Ищем известные загрузчики
+        if bootloaders is None:
+            bootloaders = load_signature_engine().match(boot_code)
+
+        for match in bootloaders:
+            version = f" {match['version']}" if match["version"] else ""
+            offsets = ', '.join(f"0x{offset:03X}" for offset in match["offsets"])
+            analysis.append(f" Обнаружен: {match['name']}{version} (смещение {offsets})")
+        if not bootloaders:
+            analysis.append(" Тип загрузчика: Неизвестный или пользовательский")
+
+        # Ищем строки в коде
+        strings = stats["strings"]
+        if strings:
+            analysis.append(f" Обнаружены строки: {', '.join(strings[:3])}")
+
+        # Код, достижимый от смещения 0 по ходу выполнения
+        if disassembly is None:
+            disassembly = disassemble_boot_code(bytes(boot_code))
+        if disassembly["instructions"]:
+            analysis.append(f" Исполняемый код: {disassembly['instructions']} инструкций "
+                            f"({disassembly['code_bytes']} байт) достижимы от смещения 0")
+        for vector, title in ((0x13, "диск"), (0x10, "видео")):
+            calls = [call for call in disassembly["interrupts"] if call["vector"] == vector]
+            if calls:
+                functions = sorted({f"AH={call['ah']:02X}h" for call in calls if call["ah"] is not None})
+                details = f" ({', '.join(functions)})" if functions else ""
+                analysis.append(f" Вызовы INT {vector:02X}h ({title}): {len(calls)}{details}")
+        for jump in disassembly["far_jumps"]:
+            kind = {"jmp": "переход", "call": "вызов", "retf": "переход (через стек, retf)"}[jump["kind"]]
+            segment = "????" if jump["segment"] is None else f"{jump['segment']:04X}"
+            analysis.append(f" Дальний {kind}: {segment}:{jump['target']:04X} "
+                            f"(смещение 0x{jump['offset']:03X})")
+        if disassembly["invalid"]:
+            offsets = ', '.join(f"0x{offset:03X}" for offset in disassembly["invalid"][:3])
+            analysis.append(f" Недопустимые или обрезанные инструкции: {offsets}")
+
+    # Статистика
+    zero_bytes = stats["zero_bytes"]
+    analysis.append(f" Статистика: {zero_bytes}/{stats['size']} нулевых байтов ({stats['zero_ratio'] * 100:.1f}%)")
+    analysis.append(f" Энтропия: {stats['entropy']:.2f} бит/байт, печатных символов: {stats['printable_ratio'] * 100:.1f}%")
+
+    return analysis
+
+# Адреса, по которым BIOS загружает (0x7C00) и куда MBR обычно переносит себя (0x0600)
+BOOT_CODE_LOAD_ADDRESSES = (0x7C00, 0x0600)
+
+# Виды операндов-непосредственных значений в таблицах опкодов:
+# b - 1 байт, v - 2/4 (размер операнда), w - 2, p - дальний адрес (2/4 + 2),
+# o - смещение в памяти (размер адреса), e - ENTER (3 байта)
+X86_OPCODE_RANGES = (
+    # (первый, последний, мнемоника, есть ModR/M, непосредственное, ход выполнения)
+    (0x00, 0x03, "alu", True, None, None), (0x04, 0x04, "alu", False, "b", None),
+    (0x05, 0x05, "alu", False, "v", None), (0x06, 0x07, "push/pop es", False, None, None),
+    (0x08, 0x0B, "alu", True, None, None), (0x0C, 0x0C, "alu", False, "b", None),
+    (0x0D, 0x0D, "alu", False, "v", None), (0x0E, 0x0E, "push cs", False, None, None),
+    (0x0F, 0x0F, "0f", False, None, "escape"),
+    (0x10, 0x13, "alu", True, None, None), (0x14, 0x14, "alu", False, "b", None),
+    (0x15, 0x15, "alu", False, "v", None), (0x16, 0x17, "push/pop ss", False, None, None),
+    (0x18, 0x1B, "alu", True, None, None), (0x1C, 0x1C, "alu", False, "b", None),
+    (0x1D, 0x1D, "alu", False, "v", None), (0x1E, 0x1F, "push/pop ds", False, None, None),
+    (0x20, 0x23, "alu", True, None, None), (0x24, 0x24, "alu", False, "b", None),
+    (0x25, 0x25, "alu", False, "v", None), (0x26, 0x26, "es:", False, None, "prefix"),
+    (0x27, 0x27, "daa", False, None, None),
+    (0x28, 0x2B, "alu", True, None, None), (0x2C, 0x2C, "alu", False, "b", None),
+    (0x2D, 0x2D, "alu", False, "v", None), (0x2E, 0x2E, "cs:", False, None, "prefix"),
+    (0x2F, 0x2F, "das", False, None, None),
+    (0x30, 0x33, "alu", True, None, None), (0x34, 0x34, "alu", False, "b", None),
+    (0x35, 0x35, "alu", False, "v", None), (0x36, 0x36, "ss:", False, None, "prefix"),
+    (0x37, 0x37, "aaa", False, None, None),
+    (0x38, 0x3B, "alu", True, None, None), (0x3C, 0x3C, "alu", False, "b", None),
+    (0x3D, 0x3D, "alu", False, "v", None), (0x3E, 0x3E, "ds:", False, None, "prefix"),
+    (0x3F, 0x3F, "aas", False, None, None),
+    (0x40, 0x4F, "inc/dec", False, None, None), (0x50, 0x5F, "push/pop", False, None, None),
+    (0x60, 0x61, "pusha/popa", False, None, None), (0x62, 0x63, "bound/arpl", True, None, None),
+    (0x64, 0x67, "prefix", False, None, "prefix"), (0x68, 0x68, "push", False, "v", None),
+    (0x69, 0x69, "imul", True, "v", None), (0x6A, 0x6A, "push", False, "b", None),
+    (0x6B, 0x6B, "imul", True, "b", None), (0x6C, 0x6F, "ins/outs", False, None, None),
+    (0x70, 0x7F, "jcc", False, "b", "jcc"),
+    (0x80, 0x80, "grp1", True, "b", None), (0x81, 0x81, "grp1", True, "v", None),
+    (0x82, 0x83, "grp1", True, "b", None), (0x84, 0x8F, "mov/test/xchg/lea", True, None, None),
+    (0x90, 0x99, "nop/xchg/cbw", False, None, None), (0x9A, 0x9A, "call far", False, "p", "far_call"),
+    (0x9B, 0x9F, "flags", False, None, None), (0xA0, 0xA3, "mov moffs", False, "o", None),
+    (0xA4, 0xA7, "movs/cmps", False, None, None), (0xA8, 0xA8, "test", False, "b", None),
+    (0xA9, 0xA9, "test", False, "v", None), (0xAA, 0xAF, "stos/lods/scas", False, None, None),
+    (0xB0, 0xB7, "mov r8", False, "b", None), (0xB8, 0xBF, "mov r16", False, "v", None),
+    (0xC0, 0xC1, "shift", True, "b", None), (0xC2, 0xC2, "ret", False, "w", "ret"),
+    (0xC3, 0xC3, "ret", False, None, "ret"), (0xC4, 0xC5, "les/lds", True, None, None),
+    (0xC6, 0xC6, "mov", True, "b", None), (0xC7, 0xC7, "mov", True, "v", None),
+    (0xC8, 0xC8, "enter", False, "e", None), (0xC9, 0xC9, "leave", False, None, None),
+    (0xCA, 0xCA, "retf", False, "w", "ret"), (0xCB, 0xCB, "retf", False, None, "ret"),
+    (0xCC, 0xCC, "int3", False, None, None), (0xCD, 0xCD, "int", False, "b", "int"),
+    (0xCE, 0xCE, "into", False, None, None), (0xCF, 0xCF, "iret", False, None, "ret"),
+    (0xD0, 0xD3, "shift", True, None, None), (0xD4, 0xD5, "aam/aad", False, "b", None),
+    (0xD6, 0xD7, "salc/xlat", False, None, None), (0xD8, 0xDF, "fpu", True, None, None),
+    (0xE0, 0xE3, "loop/jcxz", False, "b", "jcc"), (0xE4, 0xE7, "in/out", False, "b", None),
+    (0xE8, 0xE8, "call", False, "v", "call"), (0xE9, 0xE9, "jmp", False, "v", "jmp"),
+    (0xEA, 0xEA, "jmp far", False, "p", "far_jmp"), (0xEB, 0xEB, "jmp", False, "b", "jmp"),
+    (0xEC, 0xEF, "in/out", False, None, None), (0xF0, 0xF0, "lock", False, None, "prefix"),
+    (0xF1, 0xF1, "int1", False, None, None), (0xF2, 0xF3, "rep", False, None, "prefix"),
+    (0xF4, 0xF4, "hlt", False, None, "stop"), (0xF5, 0xF5, "cmc", False, None, None),
+    (0xF6, 0xF7, "grp3", True, None, "grp3"), (0xF8, 0xFD, "flags", False, None, None),
+    (0xFE, 0xFE, "grp4", True, None, None), (0xFF, 0xFF, "grp5", True, None, "grp5"),
+)
+
+X86_OPCODE_0F_RANGES = (
+    (0x00, 0x03, "system", True, None, None), (0x06, 0x06, "clts", False, None, None),
+    (0x08, 0x09, "invd", False, None, None), (0x0B, 0x0B, "ud2", False, None, "stop"),
+    (0x20, 0x23, "mov cr/dr", True, None, None), (0x30, 0x33, "msr/tsc", False, None, None),
+    (0x40, 0x4F, "cmovcc", True, None, None), (0x80, 0x8F, "jcc", False, "v", "jcc"),
+    (0x90, 0x9F, "setcc", True, None, None), (0xA0, 0xA2, "push/pop fs, cpuid", False, None, None),
+    (0xA3, 0xA3, "bt", True, None, None), (0xA4, 0xA4, "shld", True, "b", None),
+    (0xA5, 0xA5, "shld", True, None, None), (0xA8, 0xA9, "push/pop gs", False, None, None),
+    (0xAB, 0xAB, "bts", True, None, None), (0xAC, 0xAC, "shrd", True, "b", None),
+    (0xAD, 0xAD, "shrd", True, None, None), (0xAF, 0xB7, "imul/cmpxchg/movzx", True, None, None),
+    (0xBA, 0xBA, "grp8", True, "b", None), (0xBB, 0xBF, "bt/bsf/movsx", True, None, None),
+    (0xC0, 0xC1, "xadd", True, None, None), (0xC8, 0xCF, "bswap", False, None, None),
+)
+
+def build_opcode_table(ranges):
+    """Таблица из 256 записей (мнемоника, ModR/M, непосредственное, ход выполнения); None - неизвестный код"""
+    table = [None] * 256
+    for first, last, *entry in ranges:
+        for opcode in range(first, last + 1):
+            table[opcode] = tuple(entry)
+    return table
+
+X86_OPCODES = build_opcode_table(X86_OPCODE_RANGES)
+X86_OPCODES_0F = build_opcode_table(X86_OPCODE_0F_RANGES)
+
+def modrm_length(code, offset, modrm, address_size):
+    """Число байтов SIB и смещения после байта ModR/M"""
+    mod, rm = modrm >> 6, modrm & 7
+    if mod == 3:
+        return 0
+    if address_size == 2:
+        if mod == 0:
+            return 2 if rm == 6 else 0
+        return 1 if mod == 1 else 2
+
+    # 32-битная адресация (префикс 0x67): SIB и disp32
+    length = 0
+    if rm == 4:
+        length = 1
+        if mod == 0 and offset < len(code) and code[offset] & 7 == 5:
+            return length + 4
+    if mod == 0:
+        return length + (4 if rm == 5 else 0)
+    return length + (1 if mod == 1 else 4)
+
+def disassemble_boot_code(code, load_addresses=BOOT_CODE_LOAD_ADDRESSES):
+    """Дизассемблирование 16-битного кода реального режима по ходу выполнения от смещения 0
+
+    Длины инструкций берутся из таблиц опкодов (X86_OPCODES, X86_OPCODES_0F).
+    Декодер идет линейно, ставит в очередь цели переходов и вызовов и
+    останавливается на безусловных переходах, возвратах, HLT, неизвестных кодах и
+    нулевом заполнении (00 00). Дальние переходы, попадающие в загруженную копию
+    кода (0x7C00 или перенесенную в 0x0600), тоже прослеживаются - в том числе
+    переход через стек (push сегмент; push смещение; retf), которым загрузчики
+    Windows уходят в перенесенную копию. Сам разбор кэшируется
+    (decode_boot_code), а словарь результата каждый раз новый.
+    """
+    instructions, code_bytes, interrupts, far_jumps, invalid = decode_boot_code(bytes(code), load_addresses)
+    return {
+        "instructions": instructions,
+        "code_bytes": code_bytes,
+        "interrupts": [{"offset": offset, "vector": vector, "ah": ah} for offset, vector, ah in interrupts],
+        "far_jumps": [{"offset": offset, "kind": kind, "segment": segment, "target": target}
+                      for offset, kind, segment, target in far_jumps],
+        "invalid": list(invalid)
+    }
+
+def track_stack_values(code, opcode, modrm, immediate_start, end, operand_size, registers, stack):
+    """Известные значения 16-битных регистров и стека для разбора push ...; retf
+
+    registers - {номер регистра: значение} после mov r16, imm16 и xor r16, r16;
+    stack - вталкиваемые значения (None - неизвестное). Инструкции, действие
+    которых здесь не разбирается, сбрасывают все знания о регистрах и стеке.
+    """
+    if operand_size != 2:
+        registers.clear()
+        stack.clear()
+    elif 0xB8 <= opcode <= 0xBF:
+        registers[opcode - 0xB8] = int.from_bytes(code[immediate_start:end], 'little')
+        if opcode == 0xBC:
+            stack.clear()
+    elif opcode in (0x31, 0x33) and modrm >> 6 == 3 and (modrm >> 3) & 7 == modrm & 7:
+        registers[modrm & 7] = 0
+    elif 0x50 <= opcode <= 0x57:
+        stack.append(registers.get(opcode - 0x50) if opcode != 0x54 else None)
+    elif 0x58 <= opcode <= 0x5F:
+        value = stack.pop() if stack else None
+        registers.pop(opcode - 0x58, None)
+        if value is not None:
+            registers[opcode - 0x58] = value
+        if opcode == 0x5C:
+            stack.clear()
+    elif opcode == 0x68:
+        stack.append(int.from_bytes(code[immediate_start:end], 'little'))
+    elif opcode == 0x6A:
+        stack.append(int.from_bytes(code[immediate_start:end], 'little', signed=True) & 0xFFFF)
+    elif opcode in (0x06, 0x0E, 0x16, 0x1E):
+        stack.append(None)
+    elif opcode in (0x07, 0x17, 0x1F):
+        if stack:
+            stack.pop()
+    elif 0xB0 <= opcode <= 0xB7:
+        registers.pop((opcode - 0xB0) & 3, None)
+    elif 0xA4 <= opcode <= 0xA7 or 0xAA <= opcode <= 0xAF:
+        # Строковые инструкции (с rep) меняют CX, SI, DI, а lods - еще и AX
+        for register in (0, 1, 6, 7) if opcode in (0xAC, 0xAD) else (1, 6, 7):
+            registers.pop(register, None)
+    elif opcode not in (0x8E, 0x90, 0xFA, 0xFB, 0xFC, 0xFD):
+        registers.clear()
+        stack.clear()
+
+@functools.lru_cache(maxsize=65536)
+def decode_boot_code(code, load_addresses=BOOT_CODE_LOAD_ADDRESSES):
+    """Разбор для disassemble_boot_code с кэшем по содержимому code (bytes)
+
+    Возвращает только неизменяемые значения - они общие для всех вызовов:
+    (инструкций, байтов кода, ((смещение, вектор, AH), ...),
+    ((смещение, вид, сегмент, цель), ...), (смещения недопустимых инструкций)).
+    """
+    size = len(code)
+    starts = bytearray(size)
+    covered = bytearray(size)
+    pending = [0]
+    instructions = 0
+    interrupts = []
+    far_jumps = []
+    invalid = []
+
+    while pending:
+        offset = pending.pop()
+        ah = None
+        registers = {}
+        stack = []
+
+        while 0 <= offset < size and not starts[offset]:
+            start = offset
+            operand_size = address_size = 2
+            entry = X86_OPCODES[code[offset]]
+            while entry[3] == "prefix" and offset + 1 < size:
+                if code[offset] == 0x66:
+                    operand_size = 4
+                elif code[offset] == 0x67:
+                    address_size = 4
+                offset += 1
+                entry = X86_OPCODES[code[offset]]
+            opcode = code[offset]
+            offset += 1
+
+            if entry[3] == "escape":
+                entry = X86_OPCODES_0F[code[offset]] if offset < size else None
+                offset += 1
+            if entry is None or entry[3] == "prefix":
+                invalid.append(start)
+                break
+
+            _, has_modrm, immediate, flow = entry
+            reg = modrm = 0
+            if has_modrm:
+                if offset >= size:
+                    invalid.append(start)
+                    break
+                modrm = code[offset]
+                if opcode == 0x00 and modrm == 0x00:
+                    # 00 00 (add [bx+si], al) - нулевое заполнение, а не код
+                    break
+                reg = (modrm >> 3) & 7
+                offset += 1 + modrm_length(code, offset + 1, modrm, address_size)
+
+            if flow == "grp3" and reg < 2:
+                immediate = "b" if opcode == 0xF6 else "v"
+            immediate_start = offset
+            if immediate == "b":
+                offset += 1
+            elif immediate == "v":
+                offset += operand_size
+            elif immediate == "w":
+                offset += 2
+            elif immediate == "p":
+                offset += operand_size + 2
+            elif immediate == "o":
+                offset += address_size
+            elif immediate == "e":
+                offset += 3
+
+            if offset > size:
+                invalid.append(start)
+                break
+
+            starts[start] = 1
+            covered[start:offset] = b'\x01' * (offset - start)
+            instructions += 1
+
+            if flow is None or flow == "grp3":
+                if opcode == 0xB4:
+                    ah = code[immediate_start]
+                elif opcode == 0xB8 and operand_size == 2:
+                    ah = code[immediate_start + 1]
+                track_stack_values(code, opcode, modrm, immediate_start, offset, operand_size, registers, stack)
+                continue
+
+            if flow in ("jcc", "jmp", "call"):
+                relative = int.from_bytes(code[immediate_start:offset], 'little', signed=True)
+                target = offset + relative
+                if operand_size == 2:
+                    # IP 16-битный: цель берется по модулю 64 КБ (смещения кода сравнимы с IP по этому модулю)
+                    target &= 0xFFFF
+                pending.append(target)
+                if flow == "jmp":
+                    break
+                if flow == "call":
+                    registers.clear()
+                    stack.clear()
+            elif flow == "int":
+                interrupts.append((start, code[immediate_start], ah))
+                registers.clear()
+            elif flow in ("far_jmp", "far_call"):
+                target = int.from_bytes(code[immediate_start:offset - 2], 'little')
+                segment = int.from_bytes(code[offset - 2:offset], 'little')
+                far_jumps.append((start, "jmp" if flow == "far_jmp" else "call", segment, target))
+                linear = segment * 16 + target
+                for base in load_addresses:
+                    if base <= linear < base + size:
+                        pending.append(linear - base)
+                        break
+                if flow == "far_jmp":
+                    break
+                registers.clear()
+                stack.clear()
+            elif flow == "grp5":
+                # FF /4, /5 - косвенный переход: цель неизвестна
+                if reg in (4, 5):
+                    break
+            elif flow == "ret" and opcode in (0xCA, 0xCB) and stack and stack[-1] is not None:
+                # push сегмент; push смещение; retf - дальний переход; неизвестный сегмент
+                # считается нулевым (загрузочный код работает в сегменте 0)
+                target = stack[-1]
+                segment = stack[-2] if len(stack) > 1 else None
+                far_jumps.append((start, "retf", segment, target))
+                linear = (segment or 0) * 16 + target
+                for base in load_addresses:
+                    if base <= linear < base + size:
+                        pending.append(linear - base)
+                        break
+                break
+            elif flow in ("ret", "stop"):
+                break
+
+    return instructions, sum(covered), tuple(interrupts), tuple(far_jumps), tuple(sorted(set(invalid)))
+
+def format_guid(data, little_endian=True):
+    """GUID из 16 байт в виде строки XXXXXXXX-XXXX-... (как str(uuid.UUID), заглавными)
+
+    В GPT и VHDX первые три поля хранятся в порядке little-endian (bytes_le),
+    в суперблоке ext - все поля big-endian. Модуль uuid не нужен: он заметно
+    замедляет запуск программы.
+    """
+    if little_endian:
+        data = data[3::-1] + data[5:3:-1] + data[7:5:-1] + data[8:16]
+    text = data.hex().upper()
+    return f"{text[:8]}-{text[8:12]}-{text[12:16]}-{text[16:20]}-{text[20:32]}"
+
+def guid_bytes_le(text):
+    """16 байт GUID в порядке GPT (little-endian первые три поля) из строки"""
+    data = bytes.fromhex(text.replace('-', ''))
+    return data[3::-1] + data[5:3:-1] + data[7:5:-1] + data[8:]
+
+@functools.lru_cache(maxsize=None)
+def import_yaml():
+    """PyYAML - только для отчетов и потоков YAML"""
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("для вывода в YAML нужен модуль PyYAML (pip install pyyaml)") from None
+    return yaml
+
+@functools.lru_cache(maxsize=None)
+def import_numpy():
+    """Необязательный NumPy для векторных гистограмм; None, если он не установлен"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def byte_histogram(data):
+    """Гистограмма значений байтов: список из 256 счетчиков за один проход"""
+    numpy = import_numpy()
+    if numpy is not None:
+        return numpy.bincount(numpy.frombuffer(data, dtype=numpy.uint8), minlength=256).tolist()
+    histogram = [0] * 256
+    for value, count in Counter(data).items():
+        histogram[value] = count
+    return histogram
+
+# Значения c*log2(c) для энтропии небольших блоков (сектор, страница 4 КиБ) без вызовов log2
+XLOGX_TABLE = [0.0] + [c * math.log2(c) for c in range(1, 4097)]
+
+def histogram_entropy(histogram, total):
+    """Энтропия Шеннона (бит на байт) по гистограмме: log2(N) - sum(c*log2(c)) / N"""
+    if not total:
+        return 0.0
+    if total < len(XLOGX_TABLE):
+        weighted = sum(map(XLOGX_TABLE.__getitem__, histogram))
+    else:
+        weighted = sum(count * math.log2(count) for count in histogram if count)
+    return max(0.0, math.log2(total) - weighted / total)
+
+def byte_stats(data, min_string=4):
+    """Статистика байтов за один проход: гистограмма, энтропия, доли нулей и печатных символов, строки"""
+    size = len(data)
+    histogram = byte_histogram(data)
+    return {
+        "size": size,
+        "histogram": histogram,
+        "entropy": round(histogram_entropy(histogram, size), 4),
+        "zero_bytes": histogram[0],
+        "zero_ratio": histogram[0] / size if size else 0.0,
+        "printable_ratio": sum(histogram[0x20:0x7F]) / size if size else 0.0,
+        "strings": extract_strings(data, min_string)
+    }
+
+def byte_stats_batch(buf, block_size=512):
+    """Статистика N подряд идущих блоков по block_size байт за один вызов
+
+    Возвращает столбцы (array('d') длиной N): entropy, zero_ratio, printable_ratio.
+    С NumPy гистограммы всех блоков строятся одной bincount на пачку блоков,
+    без него - по одному проходу Counter на блок (нулевые блоки пропускаются).
+    """
+    view = memoryview(buf).cast('B')
+    count = len(view) // block_size
+    columns = {"count": count, "entropy": array('d'), "zero_ratio": array('d'), "printable_ratio": array('d')}
+
+    numpy = import_numpy()
+    if numpy is not None:
+        # Пачки ограничены, чтобы индексный массив bincount не разрастался
+        rows_per_step = max(1, (4 * 1024 * 1024) // block_size)
+        data = numpy.frombuffer(view, dtype=numpy.uint8, count=count * block_size).reshape(count, block_size)
+        for start in range(0, count, rows_per_step):
+            rows = data[start:start + rows_per_step]
+            index = rows + (numpy.arange(len(rows), dtype=numpy.int64) * 256)[:, None]
+            histograms = numpy.bincount(index.ravel(), minlength=len(rows) * 256).reshape(len(rows), 256)
+            p = histograms / block_size
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                entropy = -numpy.where(p > 0, p * numpy.log2(p), 0.0).sum(axis=1)
+            columns["entropy"].extend(entropy.tolist())
+            columns["zero_ratio"].extend(p[:, 0].tolist())
+            columns["printable_ratio"].extend(p[:, 0x20:0x7F].sum(axis=1).tolist())
+        return columns
+
+    for start in range(0, count * block_size, block_size):
+        block = view[start:start + block_size]
+        zero_bytes = block.tobytes().count(0)
+        if zero_bytes == block_size:
+            columns["entropy"].append(0.0)
+            columns["zero_ratio"].append(1.0)
+            columns["printable_ratio"].append(0.0)
+            continue
+        histogram = byte_histogram(block)
+        columns["entropy"].append(histogram_entropy(histogram, block_size))
+        columns["zero_ratio"].append(zero_bytes / block_size)
+        columns["printable_ratio"].append(sum(histogram[0x20:0x7F]) / block_size)
+
+    return columns
+
+class SignatureEngine:
+    """Поиск сигнатур загрузчиков за один проход по данным (автомат Ахо-Корасик)
+
+    В автомат попадает самый длинный участок каждого шаблона без масок ("якорь").
+    Найденный якорь проверяется по полному шаблону (маски, фиксированное смещение),
+    поэтому проход по загрузочному коду один при любом числе сигнатур.
+    """
+
+    def __init__(self, signatures):
+        import hashlib
+        self.signatures = signatures
+        self.patterns = [pattern for signature in signatures for pattern in signature["patterns"]]
+        self._pattern_signature = [index for index, signature in enumerate(signatures)
+                                   for _ in signature["patterns"]]
+        # Номера шаблонов каждой сигнатуры в self.patterns (словари шаблонов не изменяются)
+        self._signature_patterns = []
+        first = 0
+        for signature in signatures:
+            self._signature_patterns.append(range(first, first + len(signature["patterns"])))
+            first += len(signature["patterns"])
+        self.digest = hashlib.sha256(json.dumps(
+            [[s["id"], s["version"], s["match"], s.get("supersedes", []),
+              [(p["bytes"].hex(), p["mask"].hex(), p["offset"]) for p in s["patterns"]]] for s in signatures]
+        ).encode('utf-8')).digest()
+
+        # Бор по якорям; fail - суффиксные ссылки; output - номера шаблонов, заканчивающихся в узле
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for byte in pattern["anchor"]:
+                next_state = self._goto[state].get(byte)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][byte] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern_id)
+
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for byte, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and byte not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(byte, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def match(self, data):
+        """Все сработавшие сигнатуры с id, названием, версией и смещениями совпадений"""
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self.patterns
+        found = {}
+        state = 0
+
+        for position, byte in enumerate(data):
+            while state and byte not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(byte, 0)
+            if not output[state]:
+                continue
+
+            for pattern_id in output[state]:
+                pattern = patterns[pattern_id]
+                start = position - len(pattern["anchor"]) + 1 - pattern["anchor_start"]
+                if pattern["offset"] is not None and start != pattern["offset"]:
+                    continue
+                if not pattern_matches(data, start, pattern):
+                    continue
+                found.setdefault(pattern_id, []).append(start)
+
+        # Проверяем только сигнатуры, у которых совпал хотя бы один шаблон;
+        # одна запись на id, даже если сигнатура с таким id передана несколько раз
+        matches = {}
+        superseded = set()
+        for index in sorted({self._pattern_signature[pattern_id] for pattern_id in found}):
+            signature = self.signatures[index]
+            hits = [found.get(pattern_id) for pattern_id in self._signature_patterns[index]]
+            matched = all(hits) if signature["match"] == "all" else any(hits)
+            if not matched:
+                continue
+            offsets = {offset for offsets in hits if offsets for offset in offsets}
+            if signature["id"] in matches:
+                offsets.update(matches[signature["id"]]["offsets"])
+            else:
+                matches[signature["id"]] = {
+                    "id": signature["id"],
+                    "name": signature["name"],
+                    "version": signature["version"]
+                }
+            matches[signature["id"]]["offsets"] = sorted(offsets)
+            superseded.update(signature.get("supersedes", ()))
+
+        # Общая сигнатура не дублирует более точную, сработавшую на том же секторе
+        return [match for match in matches.values() if match["id"] not in superseded]
+
+def pattern_matches(data, start, pattern):
+    """Проверка шаблона с масками в позиции start"""
+    if start < 0 or start + len(pattern["bytes"]) > len(data):
+        return False
+    if pattern["exact"]:
+        return True
+    window = data[start:start + len(pattern["bytes"])]
+    return all(b & m == v for b, m, v in zip(window, pattern["mask"], pattern["bytes"]))
+
+def compile_signature_pattern(spec):
+    """Шаблон из описания в наборе сигнатур: байты, маска, смещение и якорь для автомата"""
+    offset = spec.get("offset")
+    if "prefix" in spec:
+        tokens = spec["prefix"].split()
+        offset = 0 if offset is None else offset
+    elif "bytes" in spec:
+        tokens = spec["bytes"].split()
+    elif "string" in spec:
+        tokens = [f"{b:02X}" for b in spec["string"].encode('latin-1')]
+    else:
+        raise ValueError(f"неизвестный тип шаблона: {spec}")
+
+    values = bytes(0 if token == "??" else int(token, 16) for token in tokens)
+    mask = bytes(0x00 if token == "??" else 0xFF for token in tokens)
+
+    # Якорь - самый длинный участок без масок
+    best_start, best_length, run_start = 0, 0, None
+    for i, m in enumerate(mask + b'\x00'):
+        if m and run_start is None:
+            run_start = i
+        elif not m and run_start is not None:
+            if i - run_start > best_length:
+                best_start, best_length = run_start, i - run_start
+            run_start = None
+    if not best_length:
+        raise ValueError(f"шаблон без фиксированных байтов: {spec}")
+
+    return {
+        "bytes": values,
+        "mask": mask,
+        "offset": offset,
+        "anchor": values[best_start:best_start + best_length],
+        "anchor_start": best_start,
+        "exact": best_length == len(values)
+    }
+
+def pack_files(paths):
+    """Файлы наборов (JSON) из списка файлов и каталогов, без повторов одного файла"""
+    import glob
+    files = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = sorted(glob.glob(os.path.join(path, "*.json")))
+        else:
+            candidates = [path]
+        for file_name in candidates:
+            key = os.path.normcase(os.path.realpath(file_name))
+            if key not in seen:
+                seen.add(key)
+                files.append(file_name)
+    return files
+
+@functools.lru_cache(maxsize=16)
+def load_signature_engine(paths=None):
+    """Загрузка наборов сигнатур (файлы JSON или каталоги с ними) и построение автомата
+
+    Файл, указанный несколько раз (в том числе через каталог), загружается один раз;
+    повторяющийся id сигнатуры в разных наборах - ошибка.
+    """
+    if paths is None:
+        paths = (SIGNATURES_DIR,)
+
+    files = pack_files(paths)
+
+    signatures = []
+    seen = set()
+    for file_name in files:
+        with open(file_name, 'r', encoding='utf-8') as f:
+            pack = json.load(f)
+        for spec in pack.get("signatures", []):
+            try:
+                if spec["id"] in seen:
+                    raise ValueError("повторяющийся идентификатор")
+                seen.add(spec["id"])
+                patterns = [compile_signature_pattern(p) for p in spec["patterns"]]
+                signatures.append({
+                    "id": spec["id"],
+                    "name": spec.get("name", spec["id"]),
+                    "version": spec.get("version", ""),
+                    "match": spec.get("match", "any"),
+                    "supersedes": list(spec.get("supersedes", [])),
+                    "patterns": patterns
+                })
+            except (KeyError, ValueError, TypeError) as e:
+                raise ValueError(f"{file_name}: ошибка в сигнатуре {spec.get('id', '?')}: {e}") from e
+
+    return SignatureEngine(signatures)
+
+def parse_partition_table(table_data, lba_base=0):
+    """Анализ таблицы разделов (4 записи по 16 байт)
+
+    lba_base добавляется к начальным секторам (в EBR они задаются относительно самого EBR).
+    """
+    partitions = []
+
+    for i in range(4):
+        offset = i * 16
+        entry = table_data[offset:offset + 16]
+
+        try:
+            fields = MBR_ENTRY_STRUCT.unpack(entry)
+        except struct.error as e:
+            partitions.append({
+                "index": i + 1,
+                "offset_hex": f"0x{446 + offset:03X}",
+                "offset_dec": 446 + offset,
+                "raw_hex": ' '.join(f'{b:02X}' for b in entry),
+                "status": "Ошибка",
+                "analysis": [f" Ошибка разбора: {e}"]
+            })
+            continue
+
+        partitions.append(make_mbr_partition(i + 1, 446 + offset, fields, lba_base))
+
+    return partitions
+
+def make_mbr_partition(index, offset, fields, lba_base=0):
+    """Словарь записи раздела MBR/EBR по распакованным полям MBR_ENTRY_STRUCT"""
+    bootable, start_head, start_sector, start_cylinder, type_code, end_head, end_sector, end_cylinder, \
+        lba_relative, sectors = fields
+
+    partition = {
+        "index": index,
+        "offset_hex": f"0x{offset:03X}",
+        "offset_dec": offset,
+        "raw_hex": MBR_ENTRY_STRUCT.pack(*fields).hex(' ').upper()
+    }
+
+    # Проверяем, пустая ли запись
+    if bootable == 0 and type_code == 0:
+        partition["status"] = "Пустой"
+        partition["analysis"] = [" Запись свободна"]
+        return partition
+
+    lba_start = lba_base + lba_relative
+
+    partition["status"] = "Заполнен"
+    partition["bootable"] = bootable == 0x80
+    partition["type_code"] = f"0x{type_code:02X}"
+    partition["type_name"] = PARTITION_TYPES.get(type_code, "Неизвестный")
+    partition["lba_start"] = lba_start
+    partition["sectors"] = sectors
+    partition["chs_start"] = decode_chs(start_head, start_sector, start_cylinder)
+    partition["chs_end"] = decode_chs(end_head, end_sector, end_cylinder)
+    partition["size_bytes"] = sectors * 512
+    partition["size_mb"] = (sectors * 512) / (1024 * 1024)
+    partition["size_gb"] = partition["size_mb"] / 1024
+
+    analysis = []
+    analysis.append(f" Активен: {'ДА' if partition['bootable'] else 'нет'}")
+    analysis.append(f" Тип: {partition['type_name']} ({partition['type_code']})")
+    analysis.append(f" Начальный сектор: {lba_start}")
+    analysis.append(f" Секторов: {sectors:,}")
+    analysis.append(f" Размер: {partition['size_mb']:.2f} MB ({partition['size_gb']:.3f} GB)")
+
+    # Проверка на корректность
+    if sectors == 0:
+        analysis.append(" Внимание: размер раздела равен 0")
+    if lba_relative < 63 and lba_relative != 0:
+        analysis.append(" Внимание: нестандартное начало раздела")
+
+    partition["analysis"] = analysis
+
+    return partition
+
+def decode_partition_tables(buf, sector_size=512):
+    """Пакетное декодирование таблиц разделов N подряд идущих секторов в столбцы
+
+    Все 4*N записей распаковываются через struct.iter_unpack одним проходом
+    без создания словарей и строк. Возвращает словарь столбцов (array) длиной
+    4*N, упорядоченных по сектору, затем по номеру записи; запись i лежит в
+    секторе i // 4 под номером i % 4 + 1. Строки для человека формирует
+    render_partition_row() по требованию.
+    """
+    sector_struct = struct.Struct(MBR_SECTOR_FORMAT + (f'{sector_size - 512}x' if sector_size > 512 else ''))
+    view = memoryview(buf).cast('B')
+    count = len(view) // sector_size
+
+    columns = {
+        "count": count * 4,
+        "status": array('B'),
+        "bootable": array('B'),
+        "type": array('B'),
+        "lba_start": array('I'),
+        "sectors": array('I'),
+        "chs_start": {"cylinder": array('H'), "head": array('B'), "sector": array('B')},
+        "chs_end": {"cylinder": array('H'), "head": array('B'), "sector": array('B')},
+        "signature_valid": array('B')
+    }
+
+    rows = sector_struct.iter_unpack(view[:count * sector_size])
+    while True:
+        block = list(islice(rows, DECODE_BLOCK_SECTORS))
+        if not block:
+            break
+        fields = list(zip(*block))
+
+        def column(field):
+            # Поле field всех четырех записей каждого сектора, по порядку записей
+            return chain.from_iterable(zip(fields[field], fields[field + 10],
+                                           fields[field + 20], fields[field + 30]))
+
+        status = bytes(column(0))
+        columns["status"].frombytes(status)
+        columns["bootable"].frombytes(status.translate(BOOTABLE_TABLE))
+        columns["type"].extend(column(4))
+        columns["lba_start"].extend(column(8))
+        columns["sectors"].extend(column(9))
+
+        for name, first in (("chs_start", 1), ("chs_end", 5)):
+            chs = columns[name]
+            sector_bytes = bytes(column(first + 1))
+            chs["head"].extend(column(first))
+            chs["sector"].frombytes(sector_bytes.translate(CHS_SECTOR_TABLE))
+            chs["cylinder"].extend((s & 0xC0) << 2 | c for s, c in zip(sector_bytes, column(first + 2)))
+
+        columns["signature_valid"].extend(signature == 0xAA55 for signature in fields[40])
+
+    return columns
+
+def render_partition_row(columns, i):
+    """Словарь записи i из столбцов decode_partition_tables() в схеме parse_partition_table()"""
+    slot = i % 4
+    fields = []
+    for name in ("chs_start", "chs_end"):
+        chs = columns[name]
+        cylinder = chs["cylinder"][i]
+        fields.append((chs["head"][i], (cylinder >> 2) & 0xC0 | chs["sector"][i], cylinder & 0xFF))
+
+    (h1, s1, c1), (h2, s2, c2) = fields
+    entry = (columns["status"][i], h1, s1, c1, columns["type"][i], h2, s2, c2,
+             columns["lba_start"][i], columns["sectors"][i])
+
+    partition = make_mbr_partition(slot + 1, 446 + slot * 16, entry)
+    partition["sector_index"] = i // 4
+    return partition
+
+# Таблицы для translate при пакетном декодировании
+BOOTABLE_TABLE = bytes(1 if b == 0x80 else 0 for b in range(256))
+CHS_SECTOR_TABLE = bytes(b & 0x3F for b in range(256))
+
+def parse_signature(signature):
+    """Анализ сигнатуры"""
+    analysis = []
+    b1, b2 = signature[0], signature[1]
+
+    analysis.append(f" Байт 1 (0x1FE): 0x{b1:02X} = {b1:08b} бинарный")
+    analysis.append(f" Байт 2 (0x1FF): 0x{b2:02X} = {b2:08b} бинарный")
+
+    if b1 == 0x55 and b2 == 0xAA:
+        analysis.append(" ✓ СИГНАТУРА КОРРЕКТНА: 0x55 0xAA")
+        analysis.append("   BIOS распознает этот сектор как загрузочный")
+    else:
+        analysis.append("  СИГНАТУРА НЕКОРРЕКТНА: ожидается 0x55 0xAA")
+        if b1 != 0x55:
+            analysis.append(f"Байт 1 должен быть 0x55, а не 0x{b1:02X}")
+        if b2 != 0xAA:
+            analysis.append(f" Байт 2 должен быть 0xAA, а не 0x{b2:02X}")
+
+        # Возможные альтернативные сигнатуры
+        if b1 == 0xAA and b2 == 0x55:
+            analysis.append("  Обнаружена обратная сигнатура (AA 55)")
+
+    return analysis
+
+@functools.lru_cache(maxsize=16)
+def printable_run_pattern(min_len):
+    """Скомпилированный шаблон серии печатных ASCII-символов (0x20-0x7E) длиной от min_len"""
+    return re.compile(rb'[\x20-\x7E]{%d,}' % min_len)
+
+def extract_strings(data, min_len=4):
+    """Извлекает строки из бинарных данных"""
+    return [run.decode('ascii') for run in printable_run_pattern(min_len).findall(data)]
+
+# Столбец ASCII в HEX-дампе: печатные символы как есть, остальные - точка
+HEX_ASCII_TABLE = bytes(b if 32 <= b < 127 else 0x2E for b in range(256))
+
+def format_hex_rows(data, offset=0, width=16):
+    """Строки HEX-дампа блока: [(смещение, hex, ascii)]
+
+    Весь блок форматируется одним вызовом bytes.hex(' ') и одним translate,
+    строки - срезы готового текста.
+    """
+    data = bytes(data)
+    hex_text = data.hex(' ').upper()
+    ascii_text = data.translate(HEX_ASCII_TABLE).decode('ascii')
+    return [(offset + i, hex_text[i * 3:(i + width) * 3 - 1], ascii_text[i:i + width])
+            for i in range(0, len(data), width)]
+
+def create_hex_dump(data):
+    """Создает полный HEX-дамп MBR"""
+    dump = []
+
+    for offset, hex_bytes, ascii_part in format_hex_rows(data[:512]):
+        # Определяем секцию для подсветки
+        if offset < 446:
+            section = "Загрузочный код"
+        elif offset < 510:
+            section = "Таблица разделов"
+        else:
+            section = "Сигнатура"
+
+        dump.append({
+            "offset": f"0x{offset:03X}",
+            "offset_dec": offset,
+            "hex": hex_bytes,
+            "ascii": ascii_part,
+            "section": section
+        })
+
+    return dump
+
+def hex_structure_regions(result=None):
+    """Размеченные структуры образа для HEX-просмотра: [(начало, конец, метка, шаг)] по возрастанию
+
+    Сектор 0 (BOOT, PART1-4, SIGN) размечается всегда; по результату анализа -
+    звенья EBR, заголовки и записи GPT, начала томов. Если шаг не 0, метка
+    нумеруется: к ней добавляется номер записи размером шаг байт (записи GPT).
+    """
+    regions = [(0, 446, "BOOT", 0)]
+    regions.extend((446 + 16 * i, 462 + 16 * i, f"PART{i + 1}", 0) for i in range(4))
+    regions.append((510, 512, "SIGN", 0))
+    if not result or "error" in result:
+        return regions
+
+    sections = result.get("sections", {})
+    for link in sections.get("extended", {}).get("ebr_chain", []):
+        offset = link["offset"]
+        regions.extend([(offset, offset + 446, "EBR", 0), (offset + 446, offset + 462, "EBR.P1", 0),
+                        (offset + 462, offset + 478, "EBR.P2", 0), (offset + 510, offset + 512, "EBR.SIGN", 0)])
+
+    gpt = sections.get("gpt")
+    if gpt:
+        sector_size = gpt["sector_size"]
+        for label, header in (("GPT.HDR", gpt["primary"]), ("GPT.BAK", gpt["backup"])):
+            if not header or not header["signature_valid"]:
+                continue
+            offset = header["lba"] * sector_size
+            regions.append((offset, offset + header["header_size"], label, 0))
+            if header["entry_size"]:
+                start = header["entries_lba"] * sector_size
+                regions.append((start, start + header["entries_count"] * header["entry_size"], "GPT.E",
+                                header["entry_size"]))
+
+        partitions = gpt["partitions"]
+    else:
+        partitions = []
+
+    partitions = sections.get("partition_table", {}).get("partitions", []) + \
+        sections.get("extended", {}).get("partitions", []) + partitions
+    for partition in partitions:
+        volume = partition.get("volume")
+        if volume:
+            regions.append((volume["offset"], volume["offset"] + VOLUME_HEADER_SIZE, f"VOL{partition['index']}", 0))
+
+    regions.sort()
+    return regions
+
+def hex_region_label(regions, starts, offset, width=16):
+    """Метка строки HEX-дампа: структура, содержащая начало строки, иначе начинающаяся внутри нее"""
+    index = bisect.bisect_right(starts, offset) - 1
+    if index >= 0:
+        start, end, label, step = regions[index]
+        if offset < end:
+            return f"{label}{(offset - start) // step + 1}" if step else label
+    if index + 1 < len(regions) and regions[index + 1][0] < offset + width:
+        start, _, label, step = regions[index + 1]
+        return f"{label}1" if step else label
+    return ""
+
+def hex_dump_lines(image, start, end, regions=(), width=16, squeeze=False, chunk_size=1024 * 1024):
+    """Строки HEX-дампа участка образа [start, end) с метками структур (генератор)
+
+    Образ читается окнами по chunk_size байт только по мере выдачи строк (у сырых
+    образов - срезами mmap, в память попадают только показанные страницы).
+    squeeze - повторы одинаковых строк без меток заменяются одной строкой "*".
+    """
+    end = min(end, image.size)
+    digits = max(3, len(f"{max(end - 1, 0):X}"))
+    chunk_size = max(width, chunk_size - chunk_size % width)
+    starts = [region[0] for region in regions]
+    previous = None
+    squeezed = False
+
+    for chunk_start in range(start, end, chunk_size):
+        data = image.read(chunk_start, min(chunk_size, end - chunk_start))
+        if not data:
+            break
+        for offset, hex_bytes, ascii_part in format_hex_rows(data, chunk_start, width):
+            label = hex_region_label(regions, starts, offset, width) if regions else ""
+            if squeeze and not label and hex_bytes == previous:
+                if not squeezed:
+                    squeezed = True
+                    yield "*"
+                continue
+            previous = hex_bytes
+            squeezed = False
+            yield f" 0x{offset:0{digits}X}  {hex_bytes:<{width * 3 - 1}}  {ascii_part:<{width}}  {label}".rstrip()
+
+def calculate_statistics(result):
+    """Вычисление статистики"""
+    stats = {}
+
+    # Статистика по загрузочному коду
+    boot_code_info = result["sections"]["boot_code"]
+    stats["boot_code_has_data"] = boot_code_info["contains_data"]
+
+    # Статистика по разделам
+    partitions = result["sections"]["partition_table"]["partitions"]
+    empty_count = sum(1 for p in partitions if p["status"] == "Пустой")
+    active_count = sum(1 for p in partitions if p.get("bootable", False))
+    gpt_count = sum(1 for p in partitions if p.get("type_code") == "0xEE")
+
+    stats["partitions_total"] = 4
+    stats["partitions_used"] = 4 - empty_count
+    stats["partitions_empty"] = empty_count
+    stats["partitions_active"] = active_count
+    stats["partitions_gpt"] = gpt_count
+    stats["partitions_logical"] = len(result["sections"].get("extended", {}).get("partitions", []))
+
+    gpt = result["sections"].get("gpt")
+    if gpt:
+        headers = [h for h in (gpt["primary"], gpt["backup"]) if h and h["signature_valid"]]
+        stats["gpt_partitions"] = len(gpt["partitions"])
+        stats["gpt_valid"] = len(headers) == 2 and all(
+            h["header_crc_valid"] and h["entries_crc_valid"] for h in headers)
+
+    # Общая статистика
+    stats["signature_valid"] = result["sections"]["signature"]["valid"]
+
+    # Определение типа диска
+    if gpt_count > 0:
+        stats["disk_type"] = "GPT (с защитной MBR)"
+    elif empty_count == 4:
+        stats["disk_type"] = "Пустой диск"
+    else:
+        stats["disk_type"] = "MBR диск"
+
+    return stats
+
+class RuleSet:
+    """Набор правил проверки результатов анализа
+
+    Условия правил компилируются один раз при загрузке. Проверка идет по
+    столбцам: значения каждого упомянутого в правилах поля извлекаются из пачки
+    результатов один раз, затем каждое условие считается одним проходом по
+    своему столбцу, а не отдельным обходом каждого результата.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.fields = sorted({field for rule in rules for field in self._fields(rule["when"])})
+        self._paths = {field: tuple(field.split('.')) for field in self.fields}
+
+    @classmethod
+    def compile_condition(cls, spec):
+        """Проверка и нормализация условия: лист {field, op, value} или all/any/not"""
+        if not isinstance(spec, dict):
+            raise ValueError(f"условие должно быть объектом: {spec!r}")
+        if "all" in spec or "any" in spec:
+            kind = "all" if "all" in spec else "any"
+            if not isinstance(spec[kind], list):
+                raise ValueError(f"'{kind}' должен содержать список условий")
+            return {kind: [cls.compile_condition(item) for item in spec[kind]]}
+        if "not" in spec:
+            return {"not": cls.compile_condition(spec["not"])}
+        if spec.get("op") not in RULE_OPERATORS:
+            raise ValueError(f"неизвестная операция: {spec.get('op')!r}")
+        if not isinstance(spec.get("field"), str) or not spec["field"]:
+            raise ValueError(f"не задано поле условия: {spec!r}")
+        return {"field": spec["field"], "op": spec["op"], "value": spec.get("value")}
+
+    @classmethod
+    def _fields(cls, condition):
+        if "field" in condition:
+            yield condition["field"]
+        for item in condition.get("all", ()) or condition.get("any", ()):
+            yield from cls._fields(item)
+        if "not" in condition:
+            yield from cls._fields(condition["not"])
+
+    def field_value(self, result, field):
+        """Значение поля по пути через точку (индексы списков - числами); нет поля - None"""
+        value = result
+        for key in self._paths[field]:
+            if isinstance(value, dict):
+                value = value.get(key)
+            elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                value = value[int(key)]
+            else:
+                return None
+        return value
+
+    def columns(self, results):
+        """Столбцы значений полей, нужных правилам, для пачки результатов"""
+        return {field: [self.field_value(result, field) for result in results] for field in self.fields}
+
+    def _mask(self, condition, columns, count):
+        if "all" in condition:
+            masks = [self._mask(item, columns, count) for item in condition["all"]]
+            return [all(row) for row in zip(*masks)] if masks else [True] * count
+        if "any" in condition:
+            masks = [self._mask(item, columns, count) for item in condition["any"]]
+            return [any(row) for row in zip(*masks)] if masks else [False] * count
+        if "not" in condition:
+            return [not value for value in self._mask(condition["not"], columns, count)]
+
+        compare = RULE_OPERATORS[condition["op"]]
+        expected = condition["value"]
+        mask = []
+        for actual in columns[condition["field"]]:
+            try:
+                mask.append(compare(actual, expected))
+            except TypeError:
+                # Несравнимые типы (строка против числа и т.п.) - условие не выполнено
+                mask.append(False)
+        return mask
+
+    def evaluate_columns(self, columns, count):
+        """Сработавшие правила для каждой из count строк столбцов columns (см. columns)"""
+        fired = [[] for _ in range(count)]
+        for rule in self.rules:
+            for row in compress(range(count), self._mask(rule["when"], columns, count)):
+                fired[row].append(rule)
+        return fired
+
+    def evaluate(self, results):
+        """Сработавшие правила для каждого результата из списка"""
+        return self.evaluate_columns(self.columns(results), len(results))
+
+@functools.lru_cache(maxsize=16)
+def load_rule_set(paths=None):
+    """Загрузка наборов правил (файлы JSON или каталоги с ними) в один RuleSet"""
+    if paths is None:
+        paths = (RULES_DIR,)
+
+    files = pack_files(paths)
+
+    rules = []
+    seen = set()
+    for file_name in files:
+        with open(file_name, 'r', encoding='utf-8') as f:
+            pack = json.load(f)
+        for spec in pack.get("rules", []):
+            try:
+                if spec["id"] in seen:
+                    raise ValueError("повторяющийся идентификатор")
+                if spec["severity"] not in RULE_SEVERITIES:
+                    raise ValueError(f"неизвестный уровень: {spec['severity']!r}")
+                seen.add(spec["id"])
+                rules.append({
+                    "id": spec["id"],
+                    "severity": spec["severity"],
+                    "message": spec.get("message", spec["id"]),
+                    "when": RuleSet.compile_condition(spec["when"])
+                })
+            except (KeyError, ValueError, TypeError) as e:
+                raise ValueError(f"{file_name}: ошибка в правиле {spec.get('id', '?')}: {e}") from e
+
+    return RuleSet(rules)
+
+def apply_rules(results, rule_set):
+    """Проверка пачки результатов набором правил: в каждый записывается rules_fired"""
+    valid = [result for result in results if "error" not in result]
+    for result, fired in zip(valid, rule_set.evaluate(valid)):
+        result["rules_fired"] = [{"id": rule["id"], "severity": rule["severity"], "message": rule["message"]}
+                                 for rule in fired]
+    return results
+
+def rule_messages(result, severity):
+    """Сообщения сработавших правил заданного уровня"""
+    return [rule["message"] for rule in result.get("rules_fired", []) if rule["severity"] == severity]
+
+def print_mbr_analysis(result):
+    """Выводит результаты анализа в читаемом виде"""
+    clear_screen()
+
+    print("╔════════════════════════════════════════════════════════════════════╗")
+    print("║                     РЕЗУЛЬТАТЫ АНАЛИЗА MBR                        ║")
+    print("╚════════════════════════════════════════════════════════════════════╝")
+    print()
+
+    print("─" * 70)
+    print(" ОБЩАЯ ИНФОРМАЦИЯ")
+    print("─" * 70)
+    print(f" Файл: {result['filename']}")
+    print(f" Путь: {result['full_path']}")
+    print(f" Размер: {result['size']} байт")
+    print(f" Время анализа: {result['timestamp']}")
+    print()
+
+    # Тип диска
+    disk_type = result["statistics"]["disk_type"]
+    print(f" Тип диска: {disk_type}")
+
+    # 1. Загрузочный код
+    print()
+    print("─" * 70)
+    print(" ЗАГРУЗОЧНЫЙ КОД (446 байт, 0x000-0x1BD)")
+    print("─" * 70)
+    boot_info = result["sections"]["boot_code"]
+    for line in boot_info["analysis"]:
+        print(f" {line}")
+    print(f" HEX-просмотр: {boot_info['hex_preview']}...")
+
+    # 2. Таблица разделов
+    print()
+    print("─" * 70)
+    print(" ТАБЛИЦА РАЗДЕЛОВ (64 байта, 0x1BE-0x1FD)")
+    print("─" * 70)
+    partitions = result["sections"]["partition_table"]["partitions"]
+
+    # Статистика разделов
+    empty_count = result["statistics"]["partitions_empty"]
+    active_count = result["statistics"]["partitions_active"]
+
+    print(f" Статистика: {4 - empty_count}/4 заполненных, {active_count} активных")
+    print()
+
+    for partition in partitions:
+        status_icon = "" if partition["status"] == "Заполнен" else "○"
+        boot_icon = "" if partition.get("bootable", False) else " "
+
+        print(f" {status_icon}{boot_icon} РАЗДЕЛ {partition['index']} (смещение {partition['offset_hex']}):")
+        print(f"   HEX: {partition['raw_hex']}")
+
+        if "analysis" in partition:
+            for line in partition["analysis"]:
+                print(f"   {line}")
+        print()
+
+    # Логические разделы из цепочки EBR
+    extended = result["sections"].get("extended")
+    if extended:
+        print("─" * 70)
+        print(f" ЛОГИЧЕСКИЕ РАЗДЕЛЫ (цепочка EBR: {len(extended['ebr_chain'])} звеньев)")
+        print("─" * 70)
+
+        for partition in extended["partitions"]:
+            boot_icon = "" if partition.get("bootable", False) else " "
+            print(f" {boot_icon} РАЗДЕЛ {partition['index']} (EBR на LBA {partition['ebr_lba']}):")
+            print(f"   HEX: {partition['raw_hex']}")
+            for line in partition["analysis"]:
+                print(f"   {line}")
+            print()
+
+    # Разделы GPT
+    gpt = result["sections"].get("gpt")
+    if gpt:
+        print("─" * 70)
+        print(f" GPT (размер сектора {gpt['sector_size']} байт)")
+        print("─" * 70)
+        for label, header in (("Основной", gpt["primary"]), ("Резервный", gpt["backup"])):
+            if not header or not header["signature_valid"]:
+                print(f" {label} заголовок: не найден")
+                continue
+            header_crc = "OK" if header["header_crc_valid"] else "ОШИБКА"
+            entries_crc = {True: "OK", False: "ОШИБКА", None: "не проверена"}[header["entries_crc_valid"]]
+            print(f" {label} заголовок (LBA {header['lba']}): CRC заголовка {header_crc}, "
+                  f"CRC массива {entries_crc}, записей {header['entries_count']}")
+        if gpt["primary"] and gpt["primary"]["signature_valid"]:
+            print(f" GUID диска: {gpt['primary']['disk_guid']}")
+        print()
+
+        for partition in gpt["partitions"]:
+            boot_icon = "" if partition.get("bootable", False) else " "
+            print(f" {boot_icon} РАЗДЕЛ GPT {partition['index']} (GUID {partition['partition_guid']}):")
+            for line in partition["analysis"]:
+                print(f"   {line}")
+            print()
+
+    # 3. Сигнатура
+    print("─" * 70)
+    print(" СИГНАТУРА MBR (2 байта, 0x1FE-0x1FF)")
+    print("─" * 70)
+    sig_info = result["sections"]["signature"]
+    print(f" HEX: {sig_info['hex']}")
+    for line in sig_info["analysis"]:
+        print(f" {line}")
+
+    # 4. Полный HEX-дамп (опционально)
+    print()
+    print("─" * 70)
+    print(" HEX-ДАМП MBR (первые 128 байт)")
+    print("─" * 70)
+    print(" Смещение  00 01 02 03 04 05 06 07 08 09 0A 0B 0C 0D 0E 0F  ASCII")
+    print(" ─" * 60)
+
+    for i, line in enumerate(result["hex_dump"][:8]):  # Показываем первые 8 строк (128 байт)
+        section_marker = ""
+        if line["section"] == "Таблица разделов" and i % 4 == 0:
+            section_marker = f" ← Раздел {i // 4 - 27 + 1}"
+        elif line["section"] == "Сигнатура":
+            section_marker = " ← SIGNATURE"
+
+        print(f" {line['offset']}  {line['hex']:<47}  {line['ascii']}{section_marker}")
+
+    # 5. Итоговая информация
+    print()
+    print("─" * 70)
+    print(" ИТОГОВЫЙ АНАЛИЗ")
+    print("─" * 70)
+
+    # Сработавшие правила проверки (набор rules), затем замечания этапов анализа
+    issues = rule_messages(result, "issue") + result.get("issues", [])
+    warnings = rule_messages(result, "warning") + result.get("warnings", [])
+
+    # Вывод результатов проверок
+    if not issues:
+        print("  MBR имеет корректную структуру")
+        print(" Все проверки пройдены успешно")
+    else:
+        print("  Обнаружены проблемы:")
+        for issue in issues:
+            print(f"   • {issue}")
+
+    if warnings:
+        print()
+        print(" ⚠ Предупреждения:")
+        for warning in warnings:
+            print(f"   • {warning}")
+
+    # Структура MBR
+    print()
+    print("  Структура MBR:")
+    print(f"   • Загрузочный код: 446 байт (87.1%)")
+    print(f"   • Таблица разделов: 64 байта (12.5%)")
+    print(f"   • Сигнатура: 2 байта (0.4%)")
+    print(f"   • Всего: 512 байт (100%)")
+
+    # Меню действий после анализа
+    print()
+    print("─" * 70)
+    print(" ДОПОЛНИТЕЛЬНЫЕ ДЕЙСТВИЯ")
+    print("─" * 70)
+    print(" 1. Показать полный HEX-дамп (512 байт)")
+    print(" 2. Сохранить отчет в файл")
+    print(" 3. Проанализировать другой файл")
+    print(" 4. Выход из программы")
+    print()
+
+def show_full_hex_dump(result, page_size=512):
+    """Постраничный HEX-просмотр образа с любого смещения
+
+    Страница (по умолчанию - один сектор) читается только при показе. Если файл
+    образа недоступен, просматривается сектор 0 из результата анализа.
+    """
+    try:
+        image = open_image(result["full_path"])
+    except (OSError, TypeError, ValueError, KeyError):
+        image = BytesImage(bytes.fromhex(' '.join(line["hex"] for line in result["hex_dump"])))
+
+    regions = hex_structure_regions(result)
+    offset = 0
+    with image:
+        while True:
+            clear_screen()
+            print("╔════════════════════════════════════════════════════════════════════╗")
+            print("║                          HEX-ПРОСМОТР ОБРАЗА                       ║")
+            print("╚════════════════════════════════════════════════════════════════════╝")
+            print(f" Смещение 0x{offset:X} (сектор {offset // 512:,}) из {image.size:,} байт")
+            print()
+            print(" Смещение  00 01 02 03 04 05 06 07 08 09 0A 0B 0C 0D 0E 0F  ASCII             Секция")
+            print(" ─" * 40)
+            for line in hex_dump_lines(image, offset, offset + page_size, regions):
+                print(line)
+
+            print()
+            command = input(" Enter/n - далее, p - назад, g АДРЕС - перейти (0x... или число), "
+                            "s N - к сектору N, q - в меню: ").strip().lower()
+            try:
+                if command in ("", "n"):
+                    offset = min(offset + page_size, max(0, image.size - 1) // page_size * page_size)
+                elif command == "p":
+                    offset = max(0, offset - page_size)
+                elif command.startswith("g "):
+                    offset = int(command[2:].strip(), 0)
+                elif command.startswith("s "):
+                    offset = int(command[2:].strip(), 0) * 512
+                elif command == "q":
+                    break
+            except ValueError:
+                continue
+            offset = min(max(0, offset), max(0, image.size - 1)) // 16 * 16
+
+def save_report(result):
+    """Сохранение отчета в файл"""
+    print()
+    print("─" * 70)
+    print(" СОХРАНЕНИЕ ОТЧЕТА")
+    print("─" * 70)
+
+    # Предлагаем варианты сохранения
+    print("Выберите формат сохранения:")
+    print(" 1. Текстовый файл (.txt)")
+    print(" 2. JSON файл (.json)")
+    print(" 3. YAML файл (.yaml)")
+    print(" 0. Отмена")
+    print()
+
+    choice = input("Ваш выбор: ").strip()
+
+    if choice == "0":
+        print("Сохранение отменено.")
+        return
+
+    # Генерация имени файла по умолчанию
+    base_name = os.path.splitext(result["filename"])[0]
+    default_name = f"mbr_analysis_{base_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    if choice == "1":
+        ext = ".txt"
+        file_content = format_text_report(result)
+    elif choice == "2":
+        ext = ".json"
+        file_content = json.dumps(result, indent=2, ensure_ascii=False, default=str)
+    elif choice == "3":
+        ext = ".yaml"
+        try:
+            file_content = import_yaml().dump(result, allow_unicode=True, default_flow_style=False)
+        except ValueError as e:
+            print(f" ОШИБКА: {e}")
+            return
+    else:
+        print(" Неверный выбор.")
+        return
+
+    # Запрос имени файла
+    print()
+    print(f"Введите имя файла (по умолчанию: {default_name}{ext}):")
+    file_name = input(">>> ").strip()
+
+    if not file_name:
+        file_name = default_name + ext
+    elif not file_name.endswith(ext):
+        file_name += ext
+
+    try:
+        with open(file_name, 'w', encoding='utf-8') as f:
+            f.write(file_content)
+
+        print(f" Отчет успешно сохранен в файл: {file_name}")
+        print(f"   Полный путь: {os.path.abspath(file_name)}")
+
+    except Exception as e:
+        print(f" Ошибка при сохранении файла: {e}")
+
+def format_text_report(result):
+    """Форматирование текстового отчета"""
+    lines = []
+
+    lines.append("=" * 70)
+    lines.append("АНАЛИЗ MBR - ОТЧЕТ")
+    lines.append("=" * 70)
+    lines.append(f"Файл: {result['filename']}")
+    lines.append(f"Полный путь: {result['full_path']}")
+    lines.append(f"Размер: {result['size']} байт")
+    lines.append(f"Время анализа: {result['timestamp']}")
+    lines.append("")
+
+    # Загрузочный код
+    lines.append("=" * 70)
+    lines.append("1. ЗАГРУЗОЧНЫЙ КОД")
+    lines.append("=" * 70)
+    boot_info = result["sections"]["boot_code"]
+    for line in boot_info["analysis"]:
+        lines.append(line)
+
+    # Таблица разделов
+    lines.append("")
+    lines.append("=" * 70)
+    lines.append("2. ТАБЛИЦА РАЗДЕЛОВ")
+    lines.append("=" * 70)
+    for partition in result["sections"]["partition_table"]["partitions"]:
+        lines.append(f"Раздел {partition['index']}:")
+        if "analysis" in partition:
+            for line in partition["analysis"]:
+                lines.append(f"  {line}")
+        lines.append("")
+
+    # Логические разделы
+    extended = result["sections"].get("extended")
+    if extended:
+        for partition in extended["partitions"]:
+            lines.append(f"Логический раздел {partition['index']} (EBR на LBA {partition['ebr_lba']}):")
+            for line in partition["analysis"]:
+                lines.append(f"  {line}")
+            lines.append("")
+
+    # Разделы GPT
+    gpt = result["sections"].get("gpt")
+    if gpt:
+        for partition in gpt["partitions"]:
+            lines.append(f"Раздел GPT {partition['index']} (GUID {partition['partition_guid']}):")
+            for line in partition["analysis"]:
+                lines.append(f"  {line}")
+            lines.append("")
+
+    # Сигнатура
+    lines.append("=" * 70)
+    lines.append("3. СИГНАТУРА")
+    lines.append("=" * 70)
+    sig_info = result["sections"]["signature"]
+    for line in sig_info["analysis"]:
+        lines.append(line)
+
+    # HEX-дамп
+    lines.append("")
+    lines.append("=" * 70)
+    lines.append("4. ПОЛНЫЙ HEX-ДАМП")
+    lines.append("=" * 70)
+    for line in result["hex_dump"]:
+        lines.append(f"{line['offset']}: {line['hex']}  {line['ascii']}")
+
+    # Статистика
+    lines.append("")
+    lines.append("=" * 70)
+    lines.append("5. СТАТИСТИКА")
+    lines.append("=" * 70)
+    stats = result["statistics"]
+    lines.append(f"Тип диска: {stats['disk_type']}")
+    lines.append(f"Разделов использовано: {stats['partitions_used']}/4")
+    lines.append(f"Логических разделов: {stats.get('partitions_logical', 0)}")
+    if "gpt_partitions" in stats:
+        lines.append(f"Разделов GPT: {stats['gpt_partitions']} (CRC {'корректны' if stats['gpt_valid'] else 'с ошибками'})")
+    lines.append(f"Активных разделов: {stats['partitions_active']}")
+    lines.append(f"Сигнатура корректна: {'Да' if stats['signature_valid'] else 'Нет'}")
+    lines.append(f"Загрузочный код присутствует: {'Да' if stats['boot_code_has_data'] else 'Нет'}")
+
+    # Проблемы и предупреждения
+    if result.get("rules_fired") or result.get("issues") or result.get("warnings"):
+        lines.append("")
+        lines.append("=" * 70)
+        lines.append("6. ПРОБЛЕМЫ И ПРЕДУПРЕЖДЕНИЯ")
+        lines.append("=" * 70)
+        for rule in result.get("rules_fired", []):
+            lines.append(f"{RULE_SEVERITIES[rule['severity']]}: {rule['message']} [{rule['id']}]")
+        for issue in result.get("issues", []):
+            lines.append(f"Проблема: {issue}")
+        for warning in result.get("warnings", []):
+            lines.append(f"Предупреждение: {warning}")
+
+    return '\n'.join(lines)
+
+def main_menu(result):
+    """Главное меню после анализа"""
+    while True:
+        choice = input("Выберите действие (1-4): ").strip()
+
+        if choice == "1":
+            show_full_hex_dump(result)
+            print_mbr_analysis(result)  # Возвращаемся к основному выводу
+        elif choice == "2":
+            save_report(result)
+            print_mbr_analysis(result)
+        elif choice == "3":
+            return True  # Сигнализируем о необходимости анализа нового файла
+        elif choice == "4":
+            print("\nВыход из программы...")
+            sys.exit(0)
+        else:
+            print(" Неверный выбор. Попробуйте снова.")
+
+class RawImage:
+    """Образ диска (или блочное устройство) с произвольным доступом через mmap"""
+
+    def __init__(self, path):
+        self.path = path
+        if isinstance(path, int):
+            # Чужой дескриптор не закрываем и не сдвигаем его позицию
+            self._file = None
+            fd = path
+            self.size = os.fstat(fd).st_size
+        else:
+            self._file = open(path, 'rb')
+            fd = self._file.fileno()
+            # Для блочных устройств st_size равен 0, поэтому размер берем через seek
+            self.size = self._file.seek(0, os.SEEK_END)
+        self._map = None
+        self._extents = None
+        if self.size:
+            self._map = mmap.mmap(fd, self.size, access=mmap.ACCESS_READ)
+
+    def read(self, offset, size):
+        """Чтение size байт со смещения offset (у конца образа возвращается меньше)"""
+        if self._map is None or offset < 0 or offset >= self.size:
+            return b''
+        return self._map[offset:offset + size]
+
+    def view(self):
+        """Отображение образа в память для чтения без копирования"""
+        return self._map
+
+    def data_extents(self):
+        """Области с данными [(начало, конец)]: дыры разреженного файла (SEEK_HOLE) пропускаются"""
+        if self._extents is not None:
+            return self._extents
+
+        self._extents = [(0, self.size)] if self.size else []
+        if not self.size or not hasattr(os, 'SEEK_DATA'):
+            return self._extents
+
+        fd = self.path if self._file is None else self._file.fileno()
+        position = os.lseek(fd, 0, os.SEEK_CUR)
+        extents = []
+        offset = 0
+        try:
+            while offset < self.size:
+                start = os.lseek(fd, offset, os.SEEK_DATA)
+                offset = min(os.lseek(fd, start, os.SEEK_HOLE), self.size)
+                extents.append((start, offset))
+            self._extents = extents
+        except OSError as e:
+            # ENXIO - данных дальше нет; остальное (устройство, ФС без SEEK_DATA) - весь образ
+            if e.errno == errno.ENXIO:
+                self._extents = extents
+        finally:
+            os.lseek(fd, position, os.SEEK_SET)
+
+        return self._extents
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class BytesImage:
+    """Образ диска, уже находящийся в памяти (тот же интерфейс, что у RawImage)"""
+
+    def __init__(self, data):
+        self.path = "<bytes>"
+        self._data = bytes(data)
+        self.size = len(self._data)
+
+    def read(self, offset, size):
+        """Чтение size байт со смещения offset"""
+        if offset < 0:
+            return b''
+        return self._data[offset:offset + size]
+
+    def view(self):
+        return self._data
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def device_sector_size(fd):
+    """Логический размер сектора блочного устройства (ioctl BLKSSZGET в Linux), для файлов - 512"""
+    try:
+        import fcntl
+        if stat.S_ISBLK(os.fstat(fd).st_mode):
+            return struct.unpack('i', fcntl.ioctl(fd, BLKSSZGET, b'\x00' * 4))[0]
+    except (ImportError, OSError):
+        pass
+    return 512
+
+class DeviceImage:
+    """Устройство или файл, читаемые блоками, выровненными по логическим секторам
+
+    С direct=True устройство открывается с O_DIRECT (мимо страничного кэша,
+    буфер выровнен по странице); если файловая система O_DIRECT не
+    поддерживает, используется обычное чтение. Все прочитанные секторы
+    запоминаются: повторные обращения анализатора не идут на устройство, а
+    write_snapshot() сохраняет ровно то, что было прочитано.
+    """
+
+    def __init__(self, path, direct=False, sector_size=None):
+        self.path = path
+        flags = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+        self.direct = bool(direct and hasattr(os, 'O_DIRECT'))
+        self._fd = None
+        if self.direct:
+            try:
+                self._fd = os.open(path, flags | os.O_DIRECT)
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    raise
+                self.direct = False
+        if self._fd is None:
+            self._fd = os.open(path, flags)
+        try:
+            self.size = os.lseek(self._fd, 0, os.SEEK_END)
+            self.sector_size = sector_size or device_sector_size(self._fd)
+        except OSError:
+            os.close(self._fd)
+            raise
+        self.sectors = {}
+        self.reads = 0
+        self.bytes_read = 0
+
+    def _read_aligned(self, offset, size):
+        self.reads += 1
+        if self.direct:
+            # O_DIRECT требует буфер, выровненный по странице, - анонимный mmap
+            with mmap.mmap(-1, size) as buf:
+                data = buf[:os.preadv(self._fd, [buf], offset)]
+        elif hasattr(os, 'pread'):
+            data = os.pread(self._fd, size, offset)
+        else:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            data = os.read(self._fd, size)
+        self.bytes_read += len(data)
+        return data
+
+    def prefetch(self, lbas):
+        """Чтение секторов по номерам LBA (соседние - одним запросом)"""
+        sector_size = self.sector_size
+        offsets = sorted({lba * sector_size for lba in lbas if 0 <= lba * sector_size < self.size})
+        run_start = run_end = None
+        for offset in offsets + [None]:
+            if offset is not None and offset in self.sectors:
+                continue
+            if run_start is not None and offset == run_end:
+                run_end += sector_size
+                continue
+            if run_start is not None:
+                data = self._read_aligned(run_start, run_end - run_start)
+                for position in range(0, len(data), sector_size):
+                    self.sectors[run_start + position] = data[position:position + sector_size]
+            if offset is not None:
+                run_start, run_end = offset, offset + sector_size
+
+    def read(self, offset, size):
+        """Чтение size байт со смещения offset (у конца устройства возвращается меньше)"""
+        if offset < 0 or offset >= self.size or size <= 0:
+            return b''
+        end = min(offset + size, self.size)
+        sector_size = self.sector_size
+        first = offset - offset % sector_size
+        self.prefetch(range(first // sector_size, -(-end // sector_size)))
+        data = b''.join(self.sectors.get(position, b'') for position in range(first, end, sector_size))
+        return data[offset - first:end - first]
+
+    def view(self):
+        return None
+
+    def write_snapshot(self, path):
+        """Разреженный образ того же размера, где записаны только прочитанные секторы"""
+        with open(path, 'wb') as f:
+            for offset in sorted(self.sectors):
+                f.seek(offset)
+                f.write(self.sectors[offset])
+            f.truncate(self.size)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def cache_dir():
+    """Каталог кэша анализатора: переменная MBR_ANALYZER_CACHE или кэш пользователя; None - отключен"""
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if directory is not None:
+        return directory or None
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") \
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "mbr_analyzer")
+
+def import_zstandard():
+    """Необязательный модуль zstandard (нужен только для образов .zst)"""
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("для образов zstd нужен модуль zstandard (pip install zstandard)") from None
+    return zstandard
+
+class FileRange:
+    """Участок файла [start, end) как поток для чтения (источник для распаковщика zstd)"""
+
+    def __init__(self, file, start, end):
+        self._file = file
+        self._offset = start
+        self._end = end
+
+    def read(self, size=-1):
+        remaining = self._end - self._offset
+        if size < 0 or size > remaining:
+            size = remaining
+        self._file.seek(self._offset)
+        data = self._file.read(size)
+        self._offset += len(data)
+        return data
+
+def shift_bits(data, shift):
+    """Байты data, сдвинутые на shift бит к началу (поток, начинающийся с середины байта)"""
+    if not shift:
+        return data
+    return (int.from_bytes(data, 'little') >> shift).to_bytes(len(data), 'little')
+
+class CompressedStreamReader:
+    """Потоковая распаковка сжатого образа с точки входа порциями ограниченного размера
+
+    Для gzip чтение идет через границы членов (найденные границы копятся в members),
+    для xz и zstd заканчивается на конце блока или кадра (end). copy() снимает
+    копию состояния распаковщика (только gzip). С window чтение gzip начинается
+    с блока deflate внутри члена: offset и shift - его начало (байт и бит),
+    window - 32 КБ распакованных данных перед ним; такой читатель идет до конца члена (end).
+    """
+
+    INPUT_SIZE = 64 * 1024
+
+    def __init__(self, file, fmt, position, offset, end=None, compressed_end=None, prefix=b'',
+                 window=None, shift=0):
+        self.file = file
+        self.format = fmt
+        self.position = position          # смещение в распакованных данных
+        self.offset = offset              # следующий непрочитанный байт сжатого файла
+        self.end = end                    # конец сегмента в распакованных данных
+        self.compressed_end = compressed_end
+        self.members = []                 # новые границы членов gzip: (распак., сжат.)
+        self.raw = window is not None     # поток deflate без заголовка члена
+        self.shift = shift
+        self._input = prefix
+
+        if fmt == "gzip":
+            if self.raw:
+                self._decompressor = zlib.decompressobj(wbits=-15, zdict=window)
+            else:
+                self._decompressor = zlib.decompressobj(wbits=31)
+        elif fmt == "xz":
+            import lzma
+            self._decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+        else:
+            self._decompressor = import_zstandard().ZstdDecompressor().stream_reader(
+                FileRange(file, offset, compressed_end), read_size=self.INPUT_SIZE)
+
+    def read(self, size):
+        """До size распакованных байт; b'' - конец сегмента (или всего образа для gzip)"""
+        if self.end is not None:
+            size = min(size, self.end - self.position)
+        if size <= 0:
+            return b''
+
+        if self.format == "zstd":
+            data = self._decompressor.read(size)
+        else:
+            data = self._decompress(size)
+        self.position += len(data)
+        return data
+
+    def _decompress(self, size):
+        decompressor = self._decompressor
+        while True:
+            if self.format == "gzip":
+                if decompressor.eof:
+                    if self.raw or not self._next_member():
+                        return b''
+                    decompressor = self._decompressor
+                chunk = decompressor.unconsumed_tail or self._take_input()
+            else:
+                if decompressor.eof:
+                    return b''
+                chunk = self._take_input() if decompressor.needs_input else b''
+                if decompressor.needs_input and not chunk:
+                    raise EOFError("сжатый образ обрезан")
+
+            if self.format == "gzip" and not chunk:
+                raise EOFError("сжатый образ обрезан")
+            data = decompressor.decompress(chunk, size)
+            if data:
+                return data
+
+    def _take_input(self):
+        if self._input:
+            chunk, self._input = self._input, b''
+            return chunk
+        size = self.INPUT_SIZE
+        if self.compressed_end is not None:
+            size = min(size, self.compressed_end - self.offset)
+        self.file.seek(self.offset)
+        if self.shift:
+            # Каждый сдвинутый байт берет старшие биты из следующего
+            chunk = shift_bits(self.file.read(size + 1), self.shift)[:size]
+        else:
+            chunk = self.file.read(size)
+        self.offset += len(chunk)
+        return chunk
+
+    def _next_member(self):
+        """Переход к следующему члену gzip; False - дальше членов нет (конец или хвостовой мусор)"""
+        rest = self._decompressor.unused_data
+        start = self.offset - len(rest)
+        if len(rest) < len(GZIP_MAGIC):
+            rest += self._take_input()
+        if not rest.startswith(GZIP_MAGIC):
+            return False
+
+        self.members.append((self.position, start))
+        self._decompressor = zlib.decompressobj(wbits=31)
+        self._input = rest
+        return True
+
+    def copy(self):
+        clone = object.__new__(CompressedStreamReader)
+        clone.__dict__.update(self.__dict__)
+        clone._decompressor = self._decompressor.copy()
+        clone.members = []
+        return clone
+
+    def seek_point(self):
+        """Ближайшее начало блока deflate, перед которым уже распаковано 32 КБ (как в zran)
+
+        zlib в Python не сообщает границ блоков, поэтому распаковщику подаются сжатые
+        байты по одному: пока читается заголовок блока, вывода нет несколько байт
+        подряд. Начало такой паузы проверяется пробной распаковкой с каждого из
+        ближайших битов. Возвращает [распак. смещение, смещение в битах, окно] или
+        None (до конца члена или GZIP_SEEK_SEARCH байт не нашлось). Читатель после
+        поиска непригоден - искать нужно на копии.
+        """
+        if self.format != "gzip" or self.raw or self._input:
+            return None
+        decompressor = self._decompressor
+        offset = self.offset - len(decompressor.unconsumed_tail)
+        history = bytearray(decompressor.decompress(b''))
+        history_start = self.position
+        position = history_start + len(history)
+        first = offset
+        last_output = offset - 1
+        pauses = []                       # (байт начала паузы, распак. смещение)
+        limit = offset + GZIP_SEEK_SEARCH
+
+        while offset < limit and not decompressor.eof:
+            self.file.seek(offset)
+            chunk = self.file.read(min(self.INPUT_SIZE, limit - offset))
+            if not chunk:
+                return None
+            for i in range(len(chunk)):
+                data = decompressor.decompress(chunk[i:i + 1])
+                if decompressor.eof:
+                    return None
+                if not data:
+                    continue
+                if offset + i - last_output > 4 and last_output >= first:
+                    pauses.append((last_output, position))
+                history += data
+                position += len(data)
+                last_output = offset + i
+
+                while pauses and position >= pauses[0][1] + GZIP_SEEK_VERIFY:
+                    byte, block_start = pauses.pop(0)
+                    if block_start - history_start < GZIP_WINDOW_SIZE:
+                        continue
+                    at = block_start - history_start
+                    point = self._verify_block(byte, block_start, bytes(history[at - GZIP_WINDOW_SIZE:at]),
+                                               bytes(history[at:at + GZIP_SEEK_VERIFY]))
+                    if point is not None:
+                        return point
+                # Хранится только то, что еще понадобится для окна и проверки
+                keep = (pauses[0][1] if pauses else position) - GZIP_WINDOW_SIZE - history_start
+                if keep > len(history) // 2:
+                    del history[:keep]
+                    history_start += keep
+            offset += len(chunk)
+        return None
+
+    def _verify_block(self, byte, position, window, expected):
+        """Пробная распаковка с битов byte*8 .. byte*8+23: начинается ли там блок deflate"""
+        self.file.seek(byte)
+        data = self.file.read(4 * GZIP_SEEK_VERIFY + 1024)
+        for bit in range(24):
+            try:
+                decompressor = zlib.decompressobj(wbits=-15, zdict=window)
+                if decompressor.decompress(shift_bits(data[bit // 8:], bit % 8), len(expected)) == expected:
+                    return [position, byte * 8 + bit, window]
+            except zlib.error:
+                pass
+        return None
+
+class CompressedImage:
+    """Сжатый образ диска (gzip, xz, zstd) с произвольным доступом без полной распаковки
+
+    Точки входа - места, с которых распаковку можно начать заново: члены gzip,
+    блоки xz (по индексу в конце файла) и кадры zstd (по заголовкам кадров и
+    блоков). Они сохраняются в каталоге кэша (см. cache_dir) и при следующем
+    открытии читаются без распаковки. Внутри точки входа распаковка идет потоком
+    блоками по COMPRESSED_BLOCK_SIZE, последние блоки кэшируются; для gzip в памяти
+    дополнительно хранятся копии состояния распаковщика (decompressobj.copy()), а в
+    индекс при первом полном проходе попадают точки входа внутри членов (начало
+    блока deflate и 32 КБ окна перед ним, см. CompressedStreamReader.seek_point).
+    Размер распакованного gzip известен только после полного прохода, поэтому
+    он вычисляется при первом обращении к size и запоминается в индексе; анализ
+    начала диска size не трогает (см. known_image_size).
+    """
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.format = fmt
+        self._file = open(path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self._stamp = {"path": os.path.abspath(path), "compressed_size": stat.st_size,
+                       "mtime_ns": stat.st_mtime_ns}
+        self._size = None
+        # Точки входа: [распак. начало, распак. конец, сжат. начало, сжат. конец, смещение заголовка xz]
+        self._entries = []
+        self._starts = []
+        self._states = {}
+        # Точки входа внутри членов gzip: шаг -> [распак. смещение, смещение в битах, окно]
+        self._seek_points = {}
+        self._interval = COMPRESSED_CHECKPOINT_INTERVAL
+        self._cursor = None
+        self._blocks = OrderedDict()
+
+        import lzma
+        if fmt == "zstd":
+            zstandard = import_zstandard()
+            self._errors = (zlib.error, lzma.LZMAError, EOFError, zstandard.ZstdError)
+        else:
+            self._errors = (zlib.error, lzma.LZMAError, EOFError)
+
+        try:
+            if not self.load_index():
+                if fmt == "gzip":
+                    self._add_entry([0, None, 0, None, None])
+                elif fmt == "xz":
+                    self._index_xz()
+                else:
+                    self._index_zstd()
+                if self._size is not None:
+                    self.save_index()
+        except BaseException:
+            self._file.close()
+            raise
+
+    @property
+    def size(self):
+        """Размер распакованного образа (для gzip без индекса - после полного прохода)"""
+        if self._size is None:
+            self._read_range(max(self._starts), None)
+        return self._size
+
+    @property
+    def size_known(self):
+        """Известен ли размер без распаковки до конца"""
+        return self._size is not None
+
+    @property
+    def index_path(self):
+        """Файл индекса в каталоге кэша; None - сохранение индексов отключено"""
+        import hashlib
+        directory = cache_dir()
+        if directory is None:
+            return None
+        digest = hashlib.sha1(self._stamp["path"].encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(directory, "index", digest + COMPRESSED_INDEX_SUFFIX)
+
+    def load_index(self):
+        """Загрузка сохраненного индекса точек входа; False - индекса нет или он устарел"""
+        import base64
+        if self.index_path is None:
+            return False
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if (index["version"] != COMPRESSED_INDEX_VERSION or index["format"] != self.format
+                    or index["path"] != self._stamp["path"]
+                    or index["compressed_size"] != self._stamp["compressed_size"]
+                    or index["mtime_ns"] != self._stamp["mtime_ns"]):
+                return False
+            for entry in index["entries"]:
+                self._add_entry(entry)
+            self._interval = index["interval"]
+            for position, bit, window in index["seek_points"]:
+                window = zlib.decompress(base64.b64decode(window))
+                if len(window) != GZIP_WINDOW_SIZE or not 0 <= bit < 8 * self._stamp["compressed_size"]:
+                    raise ValueError("поврежденная точка входа")
+                self._seek_points[position // self._interval] = [position, bit, window]
+            self._size = index["size"]
+        except (OSError, ValueError, KeyError, TypeError, zlib.error):
+            self._entries, self._starts, self._seek_points = [], [], {}
+            self._interval = COMPRESSED_CHECKPOINT_INTERVAL
+            return False
+        return True
+
+    def save_index(self):
+        """Сохранение индекса в кэш (молча пропускается, если кэш отключен или недоступен)"""
+        import base64
+        import tempfile
+        index_path = self.index_path
+        if index_path is None:
+            return
+        seek_points = [[position, bit, base64.b64encode(zlib.compress(window)).decode('ascii')]
+                       for position, bit, window in sorted(self._seek_points.values())]
+        index = dict(self._stamp, version=COMPRESSED_INDEX_VERSION, format=self.format,
+                     size=self._size, entries=self._entries, interval=self._interval,
+                     seek_points=seek_points)
+        temp_path = None
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            # Уникальное временное имя: индекс могут сохранять несколько потоков и процессов
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(index_path),
+                                             suffix=".tmp", delete=False) as f:
+                temp_path = f.name
+                json.dump(index, f)
+            os.replace(temp_path, index_path)
+        except OSError:
+            if temp_path is not None:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def read(self, offset, size):
+        """Чтение size байт со смещения offset в распакованных данных"""
+        if offset < 0 or size <= 0:
+            return b''
+
+        parts = []
+        while size > 0:
+            index, skip = divmod(offset, COMPRESSED_BLOCK_SIZE)
+            block = self._block(index)
+            piece = block[skip:skip + size]
+            if not piece:
+                break
+            parts.append(piece)
+            offset += len(piece)
+            size -= len(piece)
+            if len(block) < COMPRESSED_BLOCK_SIZE:
+                break
+
+        return b''.join(parts)
+
+    def view(self):
+        # Отображения в память без распаковки нет - читать через read()
+        return None
+
+    def close(self):
+        self._blocks.clear()
+        self._states.clear()
+        self._cursor = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _block(self, index):
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+
+        try:
+            block = self._read_range(index * COMPRESSED_BLOCK_SIZE, COMPRESSED_BLOCK_SIZE)
+        except self._errors as e:
+            raise OSError(f"ошибка распаковки {self.path}: {e}") from e
+
+        self._blocks[index] = block
+        if len(self._blocks) > COMPRESSED_CACHE_BLOCKS:
+            self._blocks.popitem(last=False)
+        return block
+
+    def _read_range(self, start, size):
+        """Распаковка [start, start + size) (size=None - до конца образа без накопления)"""
+        parts = []
+        remaining = size
+        reader = self._reader_at(start)
+
+        while remaining is None or remaining > 0:
+            skipping = reader.position < start
+            if skipping:
+                data = reader.read(min(COMPRESSED_BLOCK_SIZE, start - reader.position))
+            else:
+                data = reader.read(COMPRESSED_BLOCK_SIZE if remaining is None else remaining)
+            self._track(reader)
+
+            if not data:
+                if reader.end is not None and self._size is not None and reader.position < self._size:
+                    # Конец блока xz или кадра zstd - переходим к следующей точке входа
+                    next_reader = self._reader_at(reader.position)
+                    if next_reader.position == reader.position and next_reader is not reader:
+                        reader = next_reader
+                        continue
+                if self._size is None:
+                    self._size = reader.position
+                    self.save_index()
+                break
+
+            if not skipping and remaining is not None:
+                parts.append(data)
+                remaining -= len(data)
+
+        self._cursor = reader
+        return b''.join(parts)
+
+    def _reader_at(self, offset):
+        """Распаковщик, стоящий не дальше offset: текущий, сохраненная копия или новый с точки входа"""
+        i = bisect.bisect_right(self._starts, offset) - 1
+        entry = self._entries[i]
+        start = entry[0]
+
+        state = max((s for s in self._states.values() if start < s.position <= offset),
+                    key=lambda s: s.position, default=None)
+        # Точке внутри члена нужен его конец, поэтому до полного прохода они не используются
+        point = None
+        if self._size is not None:
+            point = max((p for p in self._seek_points.values() if start < p[0] <= offset),
+                        key=lambda p: p[0], default=None)
+        best = max(state.position if state else start, point[0] if point else start)
+
+        cursor = self._cursor
+        if (cursor is not None and best <= cursor.position <= offset
+                and (cursor.end is None or cursor.position < cursor.end)):
+            return cursor
+        if state is not None and state.position == best:
+            return state.copy()
+        if point is not None:
+            position, bit, window = point
+            end = self._entries[i + 1][0] if i + 1 < len(self._entries) else self._size
+            return CompressedStreamReader(self._file, self.format, position, bit // 8, end,
+                                          window=window, shift=bit % 8)
+        return self._open_entry(entry)
+
+    def _open_entry(self, entry):
+        start, end, compressed_start, compressed_end, header_offset = entry
+        prefix = b''
+        if self.format == "xz":
+            # Блок xz распаковывается как поток из заголовка потока и самого блока
+            self._file.seek(header_offset)
+            prefix = self._file.read(12)
+        return CompressedStreamReader(self._file, self.format, start, compressed_start, end, compressed_end, prefix)
+
+    def _track(self, reader):
+        """Запоминание новых точек входа и копий состояния, встреченных при распаковке"""
+        for position, offset in reader.members:
+            self._add_entry([position, None, offset, None, None])
+        reader.members.clear()
+
+        if self.format != "gzip":
+            return
+        slot = reader.position // self._interval
+        if slot and slot not in self._states:
+            self._states[slot] = reader.copy()
+            if self._size is None and self.index_path is not None:
+                # Индекс еще не сохранен - ищем точку входа для него
+                point = reader.copy().seek_point()
+                if point is not None:
+                    self._seek_points[slot] = point
+            if len(self._states) > COMPRESSED_MAX_CHECKPOINTS:
+                # Прореживаем: вдвое больший шаг, по одной копии на новый интервал
+                self._interval *= 2
+                states = {}
+                for state in sorted(self._states.values(), key=lambda s: s.position):
+                    states.setdefault(state.position // self._interval, state)
+                self._states = states
+                seek_points = {}
+                for point in sorted(self._seek_points.values()):
+                    seek_points.setdefault(point[0] // self._interval, point)
+                self._seek_points = seek_points
+
+    def _add_entry(self, entry):
+        i = bisect.bisect_left(self._starts, entry[0])
+        if i < len(self._starts) and self._starts[i] == entry[0]:
+            return
+        self._starts.insert(i, entry[0])
+        self._entries.insert(i, list(entry))
+
+    def _index_xz(self):
+        """Точки входа xz по индексам потоков в конце файла (без распаковки)"""
+        f = self._file
+        end = self._stamp["compressed_size"]
+        streams = []
+
+        while end > 0:
+            # Нули выравнивания между потоками
+            f.seek(end - 4)
+            while end >= 4 and f.read(4) == b'\x00' * 4:
+                end -= 4
+                f.seek(end - 4)
+
+            f.seek(end - 12)
+            footer = f.read(12)
+            if len(footer) != 12 or footer[10:12] != b'YZ':
+                raise ValueError("поврежден конец потока xz")
+            index_size = (struct.unpack_from('<I', footer, 4)[0] + 1) * 4
+            index_start = end - 12 - index_size
+            f.seek(index_start)
+            index = f.read(index_size)
+            if len(index) != index_size or index[0] != 0 or zlib.crc32(index[:-4]) != struct.unpack('<I', index[-4:])[0]:
+                raise ValueError("поврежден индекс xz")
+
+            position = 1
+            count, position = read_xz_varint(index, position)
+            blocks = []
+            for _ in range(count):
+                unpadded, position = read_xz_varint(index, position)
+                uncompressed, position = read_xz_varint(index, position)
+                blocks.append(((unpadded + 3) & ~3, uncompressed))
+
+            stream_start = index_start - sum(size for size, _ in blocks) - 12
+            f.seek(stream_start)
+            if stream_start < 0 or f.read(6) != XZ_MAGIC:
+                raise ValueError("поврежден заголовок потока xz")
+            streams.append((stream_start, blocks))
+            end = stream_start
+
+        position = 0
+        for stream_start, blocks in reversed(streams):
+            offset = stream_start + 12
+            for compressed, uncompressed in blocks:
+                if uncompressed:
+                    self._add_entry([position, position + uncompressed, offset, offset + compressed, stream_start])
+                position += uncompressed
+                offset += compressed
+
+        if not self._entries:
+            self._add_entry([0, 0, 0, 0, 0])
+        self._size = position
+
+    def _index_zstd(self):
+        """Точки входа zstd по заголовкам кадров и блоков (распаковываются только кадры без размера)"""
+        f = self._file
+        total = self._stamp["compressed_size"]
+        offset = position = 0
+
+        while offset < total:
+            f.seek(offset)
+            header = f.read(18)
+            magic = int.from_bytes(header[:4], 'little')
+            if 0x184D2A50 <= magic <= 0x184D2A5F:
+                # Пропускаемый кадр (метаданные)
+                offset += 8 + int.from_bytes(header[4:8], 'little')
+                continue
+            if header[:4] != ZSTD_MAGIC or len(header) < 6:
+                raise ValueError(f"поврежден кадр zstd (смещение {offset})")
+
+            descriptor = header[4]
+            single_segment = descriptor >> 5 & 1
+            field_start = 5 + (0 if single_segment else 1) + (0, 1, 2, 4)[descriptor & 3]
+            field_size = (single_segment, 2, 4, 8)[descriptor >> 6]
+            content_size = None
+            if field_size:
+                content_size = int.from_bytes(header[field_start:field_start + field_size], 'little')
+                if field_size == 2:
+                    content_size += 256
+
+            block = offset + field_start + field_size
+            while True:
+                f.seek(block)
+                block_header = f.read(3)
+                if len(block_header) != 3:
+                    raise ValueError(f"обрезан кадр zstd (смещение {offset})")
+                value = int.from_bytes(block_header, 'little')
+                kind = value >> 1 & 3
+                if kind == 3:
+                    raise ValueError(f"поврежден блок zstd (смещение {block})")
+                block += 3 + (1 if kind == 1 else value >> 3)
+                if value & 1:
+                    break
+            frame_end = block + (4 if descriptor & 0x04 else 0)
+
+            if content_size is None:
+                reader = CompressedStreamReader(f, "zstd", 0, offset, compressed_end=frame_end)
+                while reader.read(COMPRESSED_BLOCK_SIZE):
+                    pass
+                content_size = reader.position
+
+            if content_size:
+                self._add_entry([position, position + content_size, offset, frame_end, None])
+            position += content_size
+            offset = frame_end
+
+        if not self._entries:
+            self._add_entry([0, 0, 0, 0, None])
+        self._size = position
+
+def read_xz_varint(data, position):
+    """Число переменной длины из индекса xz; возвращает (значение, новая позиция)"""
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, position
+        shift += 7
+
+class VirtualDiskImage:
+    """Образ виртуального диска: гостевые смещения переводятся в смещения файла по таблицам размещения
+
+    Наследники задают size и _map(); прочитанные таблицы (L2, BAT, таблицы грейнов)
+    и распакованные кластеры кэшируются. Неразмещенные области читаются нулями без
+    обращения к файлу (или из базового образа, если он есть).
+    """
+
+    format = "raw"
+
+    def __init__(self, path):
+        self.path = path
+        self.size = 0
+        self._file = open(path, 'rb')
+        self._fd = self._file.fileno()
+        self._tables = OrderedDict()
+        self._backing = None
+
+    def _map(self, offset):
+        """Источник данных гостевого смещения и длина участка с тем же источником
+
+        Возвращает (смещение в файле | None для неразмещенной области | готовые данные, длина).
+        """
+        raise NotImplementedError
+
+    def read(self, offset, size):
+        """Чтение size байт гостевого диска со смещения offset"""
+        if offset < 0 or offset >= self.size:
+            return b''
+        size = min(size, self.size - offset)
+
+        # Соседние кластеры, лежащие в файле подряд, читаются одним pread
+        parts = []
+        run_host = run_length = 0
+        while size > 0:
+            source, length = self._map(offset)
+            length = min(length, size)
+            if isinstance(source, int) and run_length and run_host + run_length == source:
+                run_length += length
+            else:
+                if run_length:
+                    parts.append(self._pread(run_host, run_length))
+                    run_length = 0
+                if isinstance(source, int):
+                    run_host, run_length = source, length
+                elif source is None:
+                    parts.append(self._backing.read(offset, length).ljust(length, b'\x00')
+                                 if self._backing else bytes(length))
+                else:
+                    parts.append(bytes(source[:length]))
+            offset += length
+            size -= length
+
+        if run_length:
+            parts.append(self._pread(run_host, run_length))
+        return b''.join(parts)
+
+    def data_extents(self):
+        """Размещенные области гостевого диска [(начало, конец)]; остальное заведомо нули"""
+        extents = []
+        offset = 0
+        while offset < self.size:
+            source, length = self._map(offset)
+            end = min(offset + length, self.size)
+            if source is not None or self._backing is not None:
+                if extents and extents[-1][1] == offset:
+                    extents[-1] = (extents[-1][0], end)
+                else:
+                    extents.append((offset, end))
+            offset = end
+        return extents
+
+    def view(self):
+        return None
+
+    def close(self):
+        self._tables.clear()
+        if self._backing is not None:
+            self._backing.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _pread(self, offset, size):
+        # За концом файла (обрезанный образ) - нули
+        return os.pread(self._fd, size, offset).ljust(size, b'\x00')
+
+    def _read_array(self, offset, count, typecode, big_endian=False):
+        table = array(typecode)
+        table.frombytes(self._pread(offset, count * table.itemsize))
+        if big_endian != (sys.byteorder == 'big'):
+            table.byteswap()
+        return table
+
+    def _cached(self, key, load):
+        """Таблица или кластер из кэша; при промахе - load() с вытеснением самого старого"""
+        value = self._tables.get(key)
+        if value is not None:
+            self._tables.move_to_end(key)
+            return value
+        value = load()
+        self._tables[key] = value
+        if len(self._tables) > VIRTUAL_DISK_CACHE_TABLES:
+            self._tables.popitem(last=False)
+        return value
+
+class Qcow2Image(VirtualDiskImage):
+    """Образ QEMU qcow2 (версии 2 и 3): таблицы L1/L2, сжатые кластеры, базовый образ
+
+    Базовый образ ищется только в каталоге образа (абсолютное имя и выход через ..
+    разрешает allow_external_backing); chain - образы выше по цепочке, по нему
+    обнаруживаются циклы и слишком длинные цепочки.
+    """
+
+    format = "qcow2"
+    HEADER = struct.Struct('>4sIQIIQIIQQIIQ')
+    OFFSET_MASK = 0x00FFFFFFFFFFFE00
+    COMPRESSED = 1 << 62
+
+    def __init__(self, path, allow_external_backing=False, chain=()):
+        super().__init__(path)
+        try:
+            header = self._pread(0, 112)
+            (_, version, backing_offset, backing_size, self.cluster_bits, self.size, crypt_method,
+             l1_size, l1_offset, *_) = self.HEADER.unpack_from(header)
+            if version not in (2, 3) or not 9 <= self.cluster_bits <= 21:
+                raise ValueError(f"неподдерживаемый qcow2 (версия {version}, cluster_bits {self.cluster_bits})")
+            if crypt_method:
+                raise ValueError("зашифрованные образы qcow2 не поддерживаются")
+
+            self.compression = 0
+            if version == 3:
+                incompatible = struct.unpack_from('>Q', header, 72)[0]
+                if incompatible & ~0b1011:
+                    raise ValueError(f"неподдерживаемые возможности qcow2: 0x{incompatible:X}")
+                if struct.unpack_from('>I', header, 100)[0] > 104:
+                    self.compression = header[104]
+
+            self.cluster_size = 1 << self.cluster_bits
+            self.l2_entries = self.cluster_size // 8
+            if l1_size > -(-self.size // (self.cluster_size * self.l2_entries)):
+                raise ValueError(f"таблица L1 qcow2 больше диска: {l1_size} записей")
+            self._l1 = self._read_array(l1_offset, l1_size, 'Q', big_endian=True)
+            self._zeros = bytes(self.cluster_size)
+
+            if backing_offset:
+                if backing_size > QCOW2_MAX_BACKING_NAME:
+                    raise ValueError(f"слишком длинное имя базового образа qcow2: {backing_size}")
+                name = self._pread(backing_offset, backing_size).decode('utf-8')
+                self._backing = self._open_backing(name, allow_external_backing, chain)
+        except BaseException:
+            self.close()
+            raise
+
+    def _open_backing(self, name, allow_external, chain):
+        directory = os.path.realpath(os.path.dirname(os.path.abspath(self.path)))
+        backing_path = os.path.realpath(os.path.join(directory, name))
+        if not allow_external:
+            try:
+                inside = not os.path.isabs(name) and os.path.commonpath([directory, backing_path]) == directory
+            except ValueError:
+                # Другой диск Windows
+                inside = False
+            if not inside:
+                raise ValueError(f"базовый образ qcow2 вне каталога образа: {name}")
+        if not os.path.exists(backing_path):
+            raise ValueError(f"не найден базовый образ qcow2: {name}")
+
+        chain = (*chain, os.path.realpath(self.path))
+        if backing_path in chain:
+            raise ValueError(f"цикл в цепочке базовых образов qcow2: {name}")
+        if len(chain) >= QCOW2_MAX_BACKING_DEPTH:
+            raise ValueError(f"цепочка базовых образов qcow2 длиннее {QCOW2_MAX_BACKING_DEPTH}")
+        if detect_image_format(backing_path) == "qcow2":
+            return Qcow2Image(backing_path, allow_external, chain)
+        return open_image(backing_path)
+
+    def _map(self, offset):
+        l1_index, rest = divmod(offset, self.cluster_size * self.l2_entries)
+        l2_index, within = divmod(rest, self.cluster_size)
+        if l1_index >= len(self._l1) or not self._l1[l1_index] & self.OFFSET_MASK:
+            return None, self.cluster_size * self.l2_entries - rest
+
+        l2_offset = self._l1[l1_index] & self.OFFSET_MASK
+        entry = self._cached(l2_offset, lambda: self._read_array(l2_offset, self.l2_entries, 'Q', big_endian=True))
+        entry = entry[l2_index]
+        length = self.cluster_size - within
+
+        if entry & self.COMPRESSED:
+            cluster = self._cached(("cluster", entry), lambda: self._decompress_cluster(entry))
+            return memoryview(cluster)[within:], length
+        if entry & 1:
+            # Кластер помечен как нулевой (qcow2 v3)
+            return memoryview(self._zeros)[within:], length
+        if not entry & self.OFFSET_MASK:
+            return None, length
+        return (entry & self.OFFSET_MASK) + within, length
+
+    def _decompress_cluster(self, entry):
+        shift = 62 - (self.cluster_bits - 8)
+        host = entry & ((1 << shift) - 1)
+        sectors = ((entry >> shift) & ((1 << (self.cluster_bits - 8)) - 1)) + 1
+        data = self._pread(host, sectors * 512 - (host & 511))
+        try:
+            if self.compression == 1:
+                data = import_zstandard().ZstdDecompressor().decompressobj().decompress(data)
+            else:
+                data = zlib.decompressobj(-15).decompress(data, self.cluster_size)
+        except Exception as e:
+            raise OSError(f"ошибка распаковки кластера qcow2: {e}") from e
+        return data[:self.cluster_size].ljust(self.cluster_size, b'\x00')
+
+class VhdImage(VirtualDiskImage):
+    """Образ Virtual PC / Hyper-V VHD: фиксированный или динамический (BAT по блокам)"""
+
+    format = "vhd"
+    BAT_PAGE = 1024
+
+    def __init__(self, path):
+        super().__init__(path)
+        try:
+            file_size = os.fstat(self._fd).st_size
+            footer = self._pread(file_size - 512, 512)
+            if not footer.startswith(VHD_MAGIC):
+                # Подвал в конце поврежден - берем копию из начала файла
+                footer = self._pread(0, 512)
+            data_offset, = struct.unpack_from('>Q', footer, 16)
+            self.size, = struct.unpack_from('>Q', footer, 48)
+            disk_type, = struct.unpack_from('>I', footer, 60)
+
+            self.fixed = disk_type == 2
+            if disk_type == 4:
+                raise ValueError("разностные VHD не поддерживаются (нужен родительский образ)")
+            if disk_type == 3:
+                header = self._pread(data_offset, 1024)
+                if not header.startswith(b'cxsparse'):
+                    raise ValueError("поврежден заголовок динамического VHD")
+                self._bat_offset, = struct.unpack_from('>Q', header, 16)
+                self._bat_entries, self.block_size = struct.unpack_from('>II', header, 28)
+                if self.block_size < VHD_MIN_BLOCK_SIZE or self.block_size & (self.block_size - 1):
+                    raise ValueError(f"недопустимый размер блока VHD: {self.block_size}")
+                self._bitmap_size = -(-self.block_size // (512 * 8 * 512)) * 512
+            elif not self.fixed:
+                raise ValueError(f"неизвестный тип VHD: {disk_type}")
+        except BaseException:
+            self.close()
+            raise
+
+    def _map(self, offset):
+        if self.fixed:
+            return offset, self.size - offset
+
+        block, within = divmod(offset, self.block_size)
+        length = self.block_size - within
+        if block >= self._bat_entries:
+            return None, length
+
+        page = block // self.BAT_PAGE
+        bat = self._cached(("bat", page), lambda: self._read_array(
+            self._bat_offset + page * self.BAT_PAGE * 4, self.BAT_PAGE, 'I', big_endian=True))
+        sector = bat[block % self.BAT_PAGE]
+        if sector == 0xFFFFFFFF:
+            return None, length
+        return sector * 512 + self._bitmap_size + within, length
+
+class VhdxImage(VirtualDiskImage):
+    """Образ Hyper-V VHDX: заголовок, таблица регионов, метаданные и BAT с блоками битовых карт"""
+
+    format = "vhdx"
+    BAT_PAGE = 512
+    BAT_REGION = guid_bytes_le("2DC27766-F623-4200-9D64-115E9BFD4A08")
+    METADATA_REGION = guid_bytes_le("8B7CA206-4790-4B9A-B8FE-575F050F886E")
+    FILE_PARAMETERS = guid_bytes_le("CAA16737-FA36-4D43-B3B6-33F0AA44E76B")
+    VIRTUAL_DISK_SIZE = guid_bytes_le("2FA54224-CD1B-4876-B211-5DBED83BF4B8")
+    LOGICAL_SECTOR_SIZE = guid_bytes_le("8141BF1D-A96F-4709-BA47-F233A8FAAB5F")
+
+    def __init__(self, path):
+        super().__init__(path)
+        try:
+            # Действующий заголовок - с большим порядковым номером
+            headers = [self._pread(offset, 4096) for offset in (64 * 1024, 128 * 1024)]
+            headers = [h for h in headers if h.startswith(b'head')]
+            if not headers:
+                raise ValueError("не найден заголовок VHDX")
+            header = max(headers, key=lambda h: struct.unpack_from('<Q', h, 8)[0])
+            if any(header[48:64]):
+                raise ValueError("журнал VHDX не применен (образ закрыт некорректно)")
+
+            regions = self._pread(192 * 1024, 64 * 1024)
+            if not regions.startswith(b'regi'):
+                raise ValueError("не найдена таблица регионов VHDX")
+            region_offsets = {}
+            for i in range(struct.unpack_from('<I', regions, 8)[0]):
+                guid, offset, _, _ = struct.unpack_from('<16sQII', regions, 16 + i * 32)
+                region_offsets[guid] = offset
+            self._bat_offset = region_offsets[self.BAT_REGION]
+            metadata_offset = region_offsets[self.METADATA_REGION]
+
+            metadata = self._pread(metadata_offset, 64 * 1024)
+            if not metadata.startswith(b'metadata'):
+                raise ValueError("не найдены метаданные VHDX")
+            items = {}
+            for i in range(struct.unpack_from('<H', metadata, 10)[0]):
+                guid, offset, length, _, _ = struct.unpack_from('<16sIIII', metadata, 32 + i * 32)
+                items[guid] = self._pread(metadata_offset + offset, length)
+
+            self.block_size, flags = struct.unpack_from('<II', items[self.FILE_PARAMETERS])
+            if flags & 0x02:
+                raise ValueError("разностные VHDX не поддерживаются (нужен родительский образ)")
+            self.size, = struct.unpack_from('<Q', items[self.VIRTUAL_DISK_SIZE])
+            self.sector_size, = struct.unpack_from('<I', items[self.LOGICAL_SECTOR_SIZE])
+            low, high = VHDX_BLOCK_SIZE_RANGE
+            if not low <= self.block_size <= high or self.block_size & (self.block_size - 1):
+                raise ValueError(f"недопустимый размер блока VHDX: {self.block_size}")
+            if self.sector_size not in VHDX_SECTOR_SIZES:
+                raise ValueError(f"недопустимый размер сектора VHDX: {self.sector_size}")
+            # После каждых chunk_ratio записей блоков в BAT идет запись блока битовой карты
+            self._chunk_ratio = (1 << 23) * self.sector_size // self.block_size
+        except KeyError as e:
+            self.close()
+            raise ValueError("в VHDX нет обязательного региона или метаданных") from e
+        except struct.error as e:
+            # Элемент метаданных короче своего значения
+            self.close()
+            raise ValueError(f"поврежденные метаданные VHDX: {e}") from e
+        except BaseException:
+            self.close()
+            raise
+
+    def _map(self, offset):
+        block, within = divmod(offset, self.block_size)
+        length = self.block_size - within
+        index = block + block // self._chunk_ratio
+
+        page = index // self.BAT_PAGE
+        bat = self._cached(("bat", page), lambda: self._read_array(
+            self._bat_offset + page * self.BAT_PAGE * 8, self.BAT_PAGE, 'Q'))
+        entry = bat[index % self.BAT_PAGE]
+        # Данные есть только у блоков в состоянии FULLY/PARTIALLY_PRESENT
+        if entry & 7 not in (6, 7):
+            return None, length
+        return (entry >> 20 << 20) + within, length
+
+class VmdkImage(VirtualDiskImage):
+    """Разреженный экстент VMware VMDK (monolithicSparse, streamOptimized): каталог и таблицы грейнов"""
+
+    format = "vmdk"
+    HEADER = struct.Struct('<4sIIQQQQIQQQB4sH')
+    GD_AT_END = 0xFFFFFFFFFFFFFFFF
+    COMPRESSED = 0x10000
+
+    def __init__(self, path):
+        super().__init__(path)
+        try:
+            header = self._pread(0, 512)
+            fields = self.HEADER.unpack_from(header)
+            if fields[9] == self.GD_AT_END:
+                # streamOptimized: действующий заголовок - в подвале перед маркером конца потока
+                footer = self._pread(os.fstat(self._fd).st_size - 1024, 512)
+                if footer.startswith(VMDK_MAGIC):
+                    fields = self.HEADER.unpack_from(footer)
+            (_, version, self.flags, capacity, grain_sectors, _, _,
+             self._gt_entries, _, gd_offset, *_) = fields
+            if gd_offset == self.GD_AT_END or not grain_sectors or not self._gt_entries:
+                raise ValueError("поврежден заголовок VMDK")
+
+            self.size = capacity * 512
+            self.grain_size = grain_sectors * 512
+            self._gt_coverage = self.grain_size * self._gt_entries
+            self._gd = self._read_array(gd_offset * 512, -(-self.size // self._gt_coverage), 'I')
+        except BaseException:
+            self.close()
+            raise
+
+    def _map(self, offset):
+        gd_index, rest = divmod(offset, self._gt_coverage)
+        gt_sector = self._gd[gd_index] if gd_index < len(self._gd) else 0
+        if not gt_sector:
+            return None, self._gt_coverage - rest
+
+        grain_index, within = divmod(rest, self.grain_size)
+        gt = self._cached(gt_sector, lambda: self._read_array(gt_sector * 512, self._gt_entries, 'I'))
+        grain = gt[grain_index]
+        length = self.grain_size - within
+        # 0 - грейн не размещен, 1 - нулевой грейн
+        if grain <= 1:
+            return None, length
+
+        if self.flags & self.COMPRESSED:
+            data = self._cached(("grain", grain), lambda: self._decompress_grain(grain))
+            return memoryview(data)[within:], length
+        return grain * 512 + within, length
+
+    def _decompress_grain(self, sector):
+        # Сжатый грейн: LBA (8 байт), размер (4 байта), данные deflate
+        size, = struct.unpack('<I', self._pread(sector * 512 + 8, 4))
+        try:
+            data = zlib.decompressobj().decompress(self._pread(sector * 512 + 12, size), self.grain_size)
+        except zlib.error as e:
+            raise OSError(f"ошибка распаковки грейна VMDK: {e}") from e
+        return data.ljust(self.grain_size, b'\x00')
+
+class VmdkDescriptorImage:
+    """Диск VMDK из текстового дескриптора: последовательность экстентов FLAT, SPARSE и ZERO"""
+
+    format = "vmdk"
+    EXTENT_PATTERN = re.compile(r'^(RW|RDONLY|NOACCESS)\s+(\d+)\s+(\w+)(?:\s+"([^"]*)"(?:\s+(\d+))?)?')
+
+    def __init__(self, path):
+        self.path = path
+        # Экстенты: (гостевое начало, длина, образ или None для нулей, смещение в образе)
+        self._extents = []
+        self._starts = []
+        self.size = 0
+
+        with open(path, 'rb') as f:
+            text = f.read(1024 * 1024).decode('utf-8', errors='replace')
+        base = os.path.dirname(os.path.abspath(path))
+
+        try:
+            for line in text.splitlines():
+                line = line.strip()
+                if line.startswith("parentCID") and line.split("=", 1)[1].strip().lower() != "ffffffff":
+                    raise ValueError("разностные VMDK не поддерживаются (нужен родительский образ)")
+                match = self.EXTENT_PATTERN.match(line)
+                if not match:
+                    continue
+                _, sectors, kind, name, offset = match.groups()
+                kind = kind.upper()
+                if kind in ("FLAT", "VMFS"):
+                    image, offset = RawImage(os.path.join(base, name)), int(offset or 0) * 512
+                elif kind in ("SPARSE", "VMFSSPARSE"):
+                    image, offset = VmdkImage(os.path.join(base, name)), 0
+                elif kind == "ZERO":
+                    image, offset = None, 0
+                else:
+                    raise ValueError(f"неподдерживаемый экстент VMDK: {kind}")
+                self._starts.append(self.size)
+                self._extents.append((self.size, int(sectors) * 512, image, offset))
+                self.size += int(sectors) * 512
+        except BaseException:
+            self.close()
+            raise
+
+        if not self._extents:
+            raise ValueError("в дескрипторе VMDK нет экстентов")
+
+    def read(self, offset, size):
+        """Чтение size байт диска со смещения offset через экстенты"""
+        if offset < 0 or offset >= self.size:
+            return b''
+        size = min(size, self.size - offset)
+
+        parts = []
+        i = bisect.bisect_right(self._starts, offset) - 1
+        while size > 0:
+            start, length, image, image_offset = self._extents[i]
+            count = min(size, start + length - offset)
+            if image is None:
+                parts.append(bytes(count))
+            else:
+                parts.append(image.read(image_offset + offset - start, count).ljust(count, b'\x00'))
+            offset += count
+            size -= count
+            i += 1
+
+        return b''.join(parts)
+
+    def data_extents(self):
+        extents = []
+        for start, length, image, image_offset in self._extents:
+            if image is None:
+                continue
+            for begin, end in image.data_extents():
+                begin, end = max(begin, image_offset), min(end, image_offset + length)
+                if begin < end:
+                    extents.append((start + begin - image_offset, start + end - image_offset))
+        return extents
+
+    def view(self):
+        return None
+
+    def close(self):
+        for _, _, image, _ in self._extents:
+            if image is not None:
+                image.close()
+        self._extents = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Классы образов для форматов, распознаваемых detect_image_format()
+VIRTUAL_DISK_FORMATS = {
+    "qcow2": Qcow2Image,
+    "vhd": VhdImage,
+    "vhdx": VhdxImage,
+    "vmdk": VmdkImage,
+    "vmdk-descriptor": VmdkDescriptorImage
+}
+
+def detect_image_format(path):
+    """Формат образа по сигнатурам: сжатый (gzip, xz, zstd), виртуальный диск или raw"""
+    with open(path, 'rb') as f:
+        head = f.read(512)
+        if head.startswith(GZIP_MAGIC):
+            return "gzip"
+        if head.startswith(XZ_MAGIC):
+            return "xz"
+        if head.startswith(ZSTD_MAGIC):
+            return "zstd"
+        if head.startswith(QCOW2_MAGIC):
+            return "qcow2"
+        if head.startswith(VHDX_MAGIC):
+            return "vhdx"
+        if head.startswith(VHD_MAGIC):
+            # Копия подвала в начале - у динамического VHD
+            return "vhd"
+        if head.startswith(VMDK_MAGIC):
+            return "vmdk"
+        if head.lstrip().startswith(VMDK_DESCRIPTOR_MAGIC):
+            return "vmdk-descriptor"
+
+        # Фиксированный VHD - сырой диск с подвалом в последних 512 байтах
+        size = f.seek(0, os.SEEK_END)
+        if size >= 1024:
+            f.seek(size - 512)
+            if f.read(len(VHD_MAGIC)) == VHD_MAGIC:
+                return "vhd"
+    return "raw"
+
+def open_image(source):
+    """Открытие образа диска для произвольного доступа (путь, дескриптор или байты)
+
+    Сжатые образы (gzip, xz, zstd) и виртуальные диски (qcow2, VHD, VHDX, VMDK)
+    распознаются по сигнатуре и читаются как гостевой диск.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesImage(source)
+    if isinstance(source, (str, os.PathLike)) and os.path.isfile(source):
+        fmt = detect_image_format(source)
+        if fmt in COMPRESSED_FORMATS:
+            return CompressedImage(os.fspath(source), fmt)
+        if fmt in VIRTUAL_DISK_FORMATS:
+            return VIRTUAL_DISK_FORMATS[fmt](os.fspath(source))
+    return RawImage(source)
+
+def known_image_size(image):
+    """Размер образа, если он известен без полного прохода; None - неизвестен (поток gzip без индекса)"""
+    return image.size if getattr(image, "size_known", True) else None
+
+# Таблицы для translate: 1 там, где байт совпадает с половиной сигнатуры 0x55AA
+SIGNATURE_FIRST_TABLE = bytes(1 if b == 0x55 else 0 for b in range(256))
+SIGNATURE_SECOND_TABLE = bytes(1 if b == 0xAA else 0 for b in range(256))
+
+def find_signature_sectors(buf, start, end, sector_size=512):
+    """Смещения секторов из [start, end), оканчивающихся сигнатурой 0x55AA
+
+    Из буфера берутся только два последних байта каждого сектора (шаговый срез),
+    совпадения с обеими половинами сигнатуры складываются побитовым AND длинных
+    целых - в Python-цикл попадают только настоящие кандидаты.
+    """
+    first = buf[start + sector_size - 2:end:sector_size].translate(SIGNATURE_FIRST_TABLE)
+    second = buf[start + sector_size - 1:end:sector_size].translate(SIGNATURE_SECOND_TABLE)
+    count = min(len(first), len(second))
+    if count == 0:
+        return []
+
+    mask = int.from_bytes(first[:count], 'little') & int.from_bytes(second[:count], 'little')
+    if not mask:
+        return []
+
+    hits = mask.to_bytes(count, 'little')
+    offsets = []
+    index = hits.find(1)
+    while index != -1:
+        offsets.append(start + index * sector_size)
+        index = hits.find(1, index + 1)
+
+    return offsets
+
+def classify_boot_sector(sector):
+    """Классификация сектора с сигнатурой 0x55AA: MBR, EBR, VBR или неизвестный"""
+    candidate = {"kind": "UNKNOWN", "description": "Неизвестный сектор с сигнатурой 0x55AA"}
+
+    # Загрузочный сектор тома: переход в начале и осмысленный BPB/OEM ID
+    volume = parse_volume_boot_sector(sector)
+    if volume:
+        candidate["kind"] = "VBR"
+        candidate["description"] = f"Загрузочный сектор тома ({volume['filesystem']})"
+        candidate["filesystem"] = volume["filesystem"]
+        candidate["oem_id"] = volume["oem_id"]
+        return candidate
+
+    # Таблица разделов правдоподобна, если флаги активности корректны и есть хотя бы одна запись.
+    # EBR отличается от MBR полностью нулевой областью кода (включая подпись диска 0x1B8)
+    table = sector[446:510]
+    flags = table[0::16]
+    if any(flag not in (0x00, 0x80) for flag in flags):
+        return candidate
+
+    partitions = parse_partition_table(table)
+    used = [p for p in partitions if p["status"] == "Заполнен"]
+    if not used:
+        return candidate
+
+    candidate["partitions"] = [
+        {"index": p["index"], "type_code": p["type_code"], "type_name": p["type_name"],
+         "lba_start": p["lba_start"], "sectors": p["sectors"], "bootable": p["bootable"]}
+        for p in used
+    ]
+
+    boot_code = sector[:446]
+    extended_only_tail = all(p["index"] <= 2 for p in used)
+    if any(p["type_code"] == "0xEE" for p in used):
+        candidate["kind"] = "MBR"
+        candidate["description"] = "Защитная MBR диска GPT"
+    elif extended_only_tail and not any(boot_code):
+        candidate["kind"] = "EBR"
+        candidate["description"] = "Расширенная загрузочная запись (EBR)"
+    else:
+        candidate["kind"] = "MBR"
+        candidate["description"] = "Главная загрузочная запись (MBR)"
+        candidate["boot_code"] = parse_boot_code(boot_code)
+
+    return candidate
+
+def scan_windows(image, sector_size=512, chunk_size=64 * 1024 * 1024):
+    """Окна сканирования [(начало, конец)] по chunk_size байт, выровненные по секторам
+
+    Границы окон кратны размеру сектора, поэтому сектор-кандидат целиком лежит
+    в одном окне и перекрытие окон не нужно. Дыры разреженных файлов и
+    неразмещенные области виртуальных дисков - нули, окна на них не строятся.
+    Разбиение зависит только от образа и параметров, поэтому номер окна
+    годится для продолжения прерванного сканирования.
+    """
+    chunk_size = max(sector_size, chunk_size - chunk_size % sector_size)
+    extents = image.data_extents() if hasattr(image, 'data_extents') else [(0, image.size)]
+    return [(start, min(image.size, -(-min(start + chunk_size, extent_end, image.size) // sector_size) * sector_size))
+            for extent_start, extent_end in extents
+            for start in range(extent_start - extent_start % sector_size, extent_end, chunk_size)]
+
+def scan_window(image, buf, start, end, sector_size=512):
+    """Кандидаты с сигнатурой 0x55AA в одном окне [start, end) образа
+
+    buf - отображение образа в память (image.view()) или None: тогда окно
+    читается через read() (сжатые и виртуальные образы).
+    """
+    if buf is not None:
+        window, base = buf, 0
+    else:
+        window, base = image.read(start, end - start), start
+
+    candidates = []
+    for offset in find_signature_sectors(window, start - base, end - base, sector_size):
+        offset += base
+        candidate = classify_boot_sector(image.read(offset, 512))
+        candidate["offset"] = offset
+        candidate["lba"] = offset // sector_size
+        candidates.append(candidate)
+
+    # Просмотренное окно больше не нужно - отпускаем страницы
+    if hasattr(buf, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+        page_start = start - start % mmap.PAGESIZE
+        buf.madvise(mmap.MADV_DONTNEED, page_start, end - page_start)
+
+    return candidates
+
+def scan_image(image, sector_size=512, chunk_size=64 * 1024 * 1024):
+    """Поиск всех секторов с сигнатурой 0x55AA по всему образу (генератор кандидатов)
+
+    Образ обходится окнами по chunk_size байт, поэтому потребление памяти
+    ограничено размером окна независимо от размера образа. Образы без
+    отображения в память (сжатые) читаются теми же окнами через read().
+    """
+    buf = image.view()
+
+    if hasattr(buf, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+        buf.madvise(mmap.MADV_SEQUENTIAL)
+
+    for start, end in scan_windows(image, sector_size, chunk_size):
+        yield from scan_window(image, buf, start, end, sector_size)
+
+# Образ и его отображение в процессе-исполнителе сканирования (задаются в init_scan_worker
+# или наследуются от основного процесса при fork)
+_scan_image = None
+_scan_view = None
+_scan_config = {}
+
+def init_scan_worker(config):
+    """Инициализация процесса пула сканирования
+
+    При запуске через fork процесс наследует отображение образа основного
+    процесса - все исполнители работают с одним mmap и общим страничным кэшем.
+    Образы без отображения (сжатые, виртуальные) и запуск через spawn
+    открывают образ заново: общий файловый дескриптор с позицией чтения делить нельзя.
+    """
+    global _scan_image, _scan_view, _scan_config
+    # Ctrl+C обрабатывает основной процесс: сохраняет состояние и останавливает пул
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _scan_config = config
+    if _scan_view is None:
+        _scan_image = open_image(config["path"])
+        _scan_view = _scan_image.view()
+    if config.get("profile"):
+        enable_profiling(**config["profile"])
+
+def scan_window_task(task):
+    """Сканирование одного окна (выполняется в процессе пула): (номер, байт, кандидаты, замеры или None)"""
+    index, start, end = task
+    candidates = scan_window(_scan_image, _scan_view, start, end, _scan_config["sector_size"])
+    profile = _profiler.drain() if _profiler is not None and _scan_config.get("profile") else None
+    return index, end - start, candidates, profile
+
+def load_scan_state(path):
+    """Состояние прерванного сканирования или None, если файла нет"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_scan_state(path, state):
+    """Запись состояния сканирования через временный файл: оборванная запись не портит старое"""
+    state["updated"] = datetime.now().isoformat()
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+def format_scan_progress(done, total, session_bytes, elapsed):
+    """Строка прогресса: доля, объем, скорость за текущий запуск и оставшееся время"""
+    speed = session_bytes / elapsed if elapsed > 0 else 0.0
+    if speed > 0:
+        eta = int((total - done) / speed)
+        eta_text = f"{eta // 3600:02d}:{eta // 60 % 60:02d}:{eta % 60:02d}"
+    else:
+        eta_text = "--:--:--"
+    percent = done / total * 100 if total else 100.0
+    return (f" {percent:5.1f}%  {done / 1024 ** 3:,.1f} из {total / 1024 ** 3:,.1f} ГБ, "
+            f"{speed / (1024 * 1024):,.1f} МБ/с, осталось {eta_text}")
+
+def entropy_map(image, block_size=64 * 1024, chunk_size=64 * 1024 * 1024):
+    """Энтропия, доля нулей и печатных символов каждого блока образа (генератор по окнам)
+
+    Выдает (смещение окна, столбцы byte_stats_batch). Образ обходится окнами по
+    chunk_size байт через mmap (или read() для сжатых и виртуальных образов),
+    окна вне областей с данными (дыры, неразмещенные кластеры) не читаются.
+    Последний неполный блок считается отдельно.
+    """
+    chunk_size = max(block_size, chunk_size - chunk_size % block_size)
+    buf = image.view()
+    extents = image.data_extents() if hasattr(image, 'data_extents') else [(0, image.size)]
+
+    if hasattr(buf, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+        buf.madvise(mmap.MADV_SEQUENTIAL)
+
+    for start in range(0, image.size, chunk_size):
+        end = min(start + chunk_size, image.size)
+        if not any(extent_start < end and start < extent_end for extent_start, extent_end in extents):
+            count = -(-(end - start) // block_size)
+            yield start, {"count": count, "entropy": array('d', bytes(8 * count)),
+                          "zero_ratio": array('d', [1.0]) * count, "printable_ratio": array('d', bytes(8 * count))}
+            continue
+
+        if buf is not None:
+            with memoryview(buf) as whole, whole[start:end] as window:
+                columns = byte_stats_batch(window, block_size)
+                tail = bytes(window[columns["count"] * block_size:])
+        else:
+            window = image.read(start, end - start)
+            columns = byte_stats_batch(window, block_size)
+            tail = window[columns["count"] * block_size:]
+
+        if tail:
+            histogram = byte_histogram(tail)
+            columns["count"] += 1
+            columns["entropy"].append(histogram_entropy(histogram, len(tail)))
+            columns["zero_ratio"].append(histogram[0] / len(tail))
+            columns["printable_ratio"].append(sum(histogram[0x20:0x7F]) / len(tail))
+        yield start, columns
+
+        if hasattr(buf, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+            page_start = start - start % mmap.PAGESIZE
+            buf.madvise(mmap.MADV_DONTNEED, page_start, end - page_start)
+
+def entropy_map_char(entropy, zero_ratio):
+    """Символ карты энтропии в терминале для участка со средней энтропией и долей нулей"""
+    if zero_ratio >= 1.0:
+        return ENTROPY_MAP_EMPTY
+    for limit, char in ENTROPY_MAP_LEVELS:
+        if entropy < limit:
+            return char
+    return ENTROPY_MAP_LEVELS[-1][1]
+
+# Коды array для n-грамм длиной 1, 2 и 4 байта (целые без знака той же ширины)
+SHINGLE_TYPECODES = {array(code).itemsize: code for code in 'IHB'}
+
+@functools.lru_cache(maxsize=65536)
+def boot_code_minhash(code, num_hashes=MINHASH_BANDS * MINHASH_ROWS, ngram=MINHASH_NGRAM):
+    """Сигнатура MinHash загрузочного кода с одной перестановкой (one permutation hashing)
+
+    n-граммы байтов (ngram от 1 до 4) хешируются один раз 32-битным
+    мультипликативным хешем; старшие биты хеша выбирают одну из num_hashes
+    корзин, в корзине остается минимальный хеш. Пустые корзины берут значение
+    ближайшей непустой справа со сдвигом на расстояние (densification), поэтому
+    сигнатуры разных кодов всегда сравнимы покорзинно.
+    Результат кэшируется по содержимому code (bytes).
+    """
+    mask = 0xFFFFFFFF
+    typecode = SHINGLE_TYPECODES.get(ngram)
+    if typecode:
+        # n-граммы со всех смещений - ngram сдвинутых копий, разобранных как массивы целых
+        shingles = set()
+        for shift in range(ngram):
+            shingles.update(array(typecode, code[shift:shift + (len(code) - shift) // ngram * ngram]))
+    else:
+        shingles = {int.from_bytes(code[i:i + ngram], 'little') for i in range(len(code) - ngram + 1)}
+
+    # Умножение на нечетную константу переставляет 32-битные значения; при обходе
+    # по убыванию в словаре для каждой корзины остается минимальный хеш
+    hashes = sorted([(value * 0x9E3779B1 + 0x7F4A7C15) & mask for value in shingles], reverse=True)
+    minimums = {(h * num_hashes) >> 32: h for h in hashes}
+    if not minimums:
+        return tuple([mask + 1] * num_hashes)
+
+    bins = [minimums.get(index) for index in range(num_hashes)]
+    if len(minimums) < num_hashes:
+        filled = sorted(minimums)
+        for index in range(num_hashes):
+            if bins[index] is None:
+                source = filled[bisect.bisect_left(filled, index) % len(filled)]
+                bins[index] = minimums[source] + ((source - index) % num_hashes << 32)
+    return tuple(bins)
+
+def minhash_similarity(a, b):
+    """Оценка коэффициента Жаккара по двум сигнатурам MinHash: доля совпавших корзин"""
+    return sum(map(int.__eq__, a, b)) / len(a)
+
+class MinHashLshIndex:
+    """Индекс LSH по сигнатурам MinHash: bands полос по rows корзин
+
+    Элементы с хотя бы одной полностью совпавшей полосой становятся кандидатами;
+    для сходства s вероятность этого 1 - (1 - s^rows)^bands. В ведре хранится только
+    первый попавший в него элемент (лидер), поэтому вставка стоит bands обращений
+    к словарю, а не сравнений со всеми предыдущими элементами.
+    """
+
+    def __init__(self, bands=MINHASH_BANDS, rows=MINHASH_ROWS):
+        self.bands = bands
+        self.rows = rows
+        self._buckets = [{} for _ in range(bands)]
+
+    def insert(self, item, signature):
+        """Добавление элемента; возвращает лидеров ведер, где он оказался не первым"""
+        rows = self.rows
+        candidates = []
+        for band, buckets in enumerate(self._buckets):
+            leader = buckets.setdefault(signature[band * rows:(band + 1) * rows], item)
+            if leader != item and leader not in candidates:
+                candidates.append(leader)
+        return candidates
+
+def cluster_boot_codes(signatures, threshold=0.7, bands=MINHASH_BANDS, rows=MINHASH_ROWS):
+    """Кластеризация сигнатур MinHash: кандидаты из LSH, объединение через систему множеств
+
+    Элемент присоединяется к кластеру лидера ведра, если оценка сходства с ним
+    не ниже threshold. Время работы линейно по числу сигнатур (вместо N² сравнений).
+    Возвращает кластеры - списки номеров сигнатур, крупные первыми.
+    """
+    parent = list(range(len(signatures)))
+
+    def find(item):
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    index = MinHashLshIndex(bands, rows)
+    for item, signature in enumerate(signatures):
+        for leader in index.insert(item, signature):
+            root, other = find(item), find(leader)
+            if root != other and minhash_similarity(signature, signatures[leader]) >= threshold:
+                parent[root] = other
+
+    clusters = {}
+    for item in range(len(signatures)):
+        clusters.setdefault(find(item), []).append(item)
+    return sorted(clusters.values(), key=len, reverse=True)
+
+class ResultCache:
+    """Постоянный кэш результатов анализа по хэшу сектора (SQLite, вытеснение LRU)
+
+    Безопасен для одновременного использования из нескольких процессов (WAL).
+    Число записей хранится в таблице meta и обновляется в той же транзакции,
+    что и вставка, поэтому лимит max_entries не превышается ни одним писателем.
+    Время использования при попаданиях копится в памяти и записывается одной
+    транзакцией (flush): каждые touch_batch попаданий, перед вставкой и при закрытии.
+    При смене ANALYZER_VERSION содержимое кэша сбрасывается.
+    """
+
+    def __init__(self, path, max_entries=1000000, version=ANALYZER_VERSION, touch_batch=1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._touched = {}
+
+        import sqlite3
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                           "hash BLOB PRIMARY KEY, result TEXT NOT NULL, last_used INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != version:
+                self._conn.execute("DELETE FROM results")
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+                self._set_count(0)
+            elif self._count() is None:
+                # Кэш прежней версии без счетчика записей
+                self._set_count(self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0])
+            self._trim()
+
+    def _count(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'count'").fetchone()
+        return None if row is None else int(row[0])
+
+    def _set_count(self, count):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('count', ?)", (str(count),))
+
+    def _trim(self):
+        """Удаление давно не использованных записей сверх max_entries (внутри транзакции)"""
+        count = self._count()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute("DELETE FROM results WHERE hash IN "
+                               "(SELECT hash FROM results ORDER BY last_used LIMIT ?)", (excess,))
+            self._set_count(count - excess)
+            self.evictions += excess
+
+    def _write_touched(self):
+        """Запись накопленных времен использования (внутри транзакции)"""
+        if self._touched:
+            self._conn.executemany("UPDATE results SET last_used = ? WHERE hash = ?",
+                                   [(used, key) for key, used in self._touched.items()])
+            self._touched = {}
+
+    def get(self, key):
+        """Результат по ключу или None; время использования при попадании записывается пачкой"""
+        row = self._conn.execute("SELECT result FROM results WHERE hash = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touched[key] = time.time_ns()
+        if len(self._touched) >= self.touch_batch:
+            self.flush()
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        """Сохранение результата; при превышении лимита вытесняются самые старые записи"""
+        value = json.dumps(result, ensure_ascii=False, default=str)
+        now = time.time_ns()
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            # Сначала попадания: вытеснение должно видеть настоящее время использования
+            self._write_touched()
+            if self._conn.execute("INSERT OR IGNORE INTO results (hash, result, last_used) VALUES (?, ?, ?)",
+                                  (key, value, now)).rowcount:
+                self._set_count(self._count() + 1)
+                self._trim()
+            else:
+                self._conn.execute("UPDATE results SET result = ?, last_used = ? WHERE hash = ?", (value, now, key))
+
+    def flush(self):
+        """Запись накопленных времен использования одной транзакцией"""
+        if self._touched:
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._write_touched()
+
+    def stats(self):
+        """Счетчики попаданий, промахов и вытеснений"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def collect_input_files(patterns):
+    """Сбор списка файлов из каталогов, масок и отдельных путей"""
+    import glob
+    files = []
+    seen = set()
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = []
+            for root, dirs, names in os.walk(pattern):
+                dirs.sort()
+                candidates.extend(os.path.join(root, name) for name in sorted(names))
+        elif any(ch in pattern for ch in '*?['):
+            candidates = [p for p in sorted(glob.glob(pattern, recursive=True)) if os.path.isfile(p)]
+        else:
+            # Несуществующий путь тоже попадает в список - в результатах будет ошибка
+            candidates = [pattern]
+
+        for path in candidates:
+            if path not in seen:
+                seen.add(path)
+                files.append(path)
+
+    return files
+
+def batch_output_name(path):
+    """Имя файла результата для пакетного режима (уникально для каждого входного пути)"""
+    import hashlib
+    base_name = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8', 'surrogateescape')).hexdigest()[:8]
+    return f"mbr_analysis_{base_name}_{digest}.json"
+
+class InventoryStore:
+    """Индексированная база SQLite с результатами анализа: образы, разделы, сигнатуры, загрузчики, правила
+
+    Запись идет пачками в одной транзакции. Повторная загрузка неизмененного
+    образа (тот же путь, размер, время изменения и версия анализатора) пропускается.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS images (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            filename TEXT,
+            file_size INTEGER,
+            mtime_ns INTEGER,
+            sector_sha256 TEXT,
+            analyzer_version TEXT,
+            analyzed_at TEXT,
+            error TEXT,
+            disk_type TEXT,
+            signature_valid INTEGER,
+            boot_code_has_data INTEGER,
+            partitions_used INTEGER,
+            partitions_active INTEGER,
+            partitions_logical INTEGER,
+            gpt_entries INTEGER,
+            gpt_valid INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS partitions (
+            image_id INTEGER NOT NULL REFERENCES images (id) ON DELETE CASCADE,
+            scheme TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            type_code TEXT,
+            type_name TEXT,
+            bootable INTEGER,
+            lba_start INTEGER,
+            sectors INTEGER,
+            size_bytes INTEGER,
+            name TEXT,
+            guid TEXT,
+            PRIMARY KEY (image_id, scheme, idx)
+        );
+        CREATE TABLE IF NOT EXISTS signatures (
+            image_id INTEGER PRIMARY KEY REFERENCES images (id) ON DELETE CASCADE,
+            hex TEXT,
+            valid INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS bootloaders (
+            image_id INTEGER NOT NULL REFERENCES images (id) ON DELETE CASCADE,
+            signature_id TEXT NOT NULL,
+            name TEXT,
+            version TEXT,
+            offsets TEXT,
+            PRIMARY KEY (image_id, signature_id)
+        );
+        CREATE TABLE IF NOT EXISTS rules (
+            image_id INTEGER NOT NULL REFERENCES images (id) ON DELETE CASCADE,
+            rule_id TEXT NOT NULL,
+            severity TEXT,
+            PRIMARY KEY (image_id, rule_id)
+        );
+        CREATE INDEX IF NOT EXISTS images_disk_type ON images (disk_type);
+        CREATE INDEX IF NOT EXISTS images_partitions_active ON images (partitions_active);
+        CREATE INDEX IF NOT EXISTS images_sector_sha256 ON images (sector_sha256);
+        CREATE INDEX IF NOT EXISTS partitions_lba_start ON partitions (lba_start);
+        CREATE INDEX IF NOT EXISTS partitions_type_code ON partitions (type_code);
+        CREATE INDEX IF NOT EXISTS bootloaders_signature_id ON bootloaders (signature_id);
+        CREATE INDEX IF NOT EXISTS rules_rule_id ON rules (rule_id);
+    """
+
+    def __init__(self, path, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.added = 0
+        self._pending = []
+        import sqlite3
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(self.SCHEMA)
+
+    def current_images(self):
+        """Уже загруженные образы: путь -> (размер, время изменения) для текущей версии анализатора"""
+        rows = self._conn.execute("SELECT path, file_size, mtime_ns FROM images WHERE analyzer_version = ?",
+                                  (ANALYZER_VERSION,))
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+    def add(self, record):
+        """Постановка записи inventory_record() в очередь; запись в базу - пачками"""
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Запись накопленных образов одной транзакцией"""
+        if not self._pending:
+            return
+
+        partitions, signatures, bootloaders, rules = [], [], [], []
+        with self._conn:
+            for record in self._pending:
+                image = record["image"]
+                # Старые строки разделов и загрузчиков удаляются каскадно
+                self._conn.execute("DELETE FROM images WHERE path = ?", (image["path"],))
+                cursor = self._conn.execute(
+                    f"INSERT INTO images ({', '.join(image)}) VALUES ({', '.join('?' * len(image))})",
+                    tuple(image.values()))
+                image_id = cursor.lastrowid
+                partitions.extend((image_id,) + row for row in record["partitions"])
+                bootloaders.extend((image_id,) + row for row in record["bootloaders"])
+                rules.extend((image_id,) + row for row in record.get("rules", ()))
+                if record["signature"]:
+                    signatures.append((image_id,) + record["signature"])
+
+            self._conn.executemany("INSERT INTO partitions (image_id, scheme, idx, type_code, type_name, bootable, "
+                                   "lba_start, sectors, size_bytes, name, guid) "
+                                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", partitions)
+            self._conn.executemany("INSERT INTO signatures (image_id, hex, valid) VALUES (?, ?, ?)", signatures)
+            self._conn.executemany("INSERT INTO bootloaders (image_id, signature_id, name, version, offsets) "
+                                   "VALUES (?, ?, ?, ?, ?)", bootloaders)
+            self._conn.executemany("INSERT INTO rules (image_id, rule_id, severity) VALUES (?, ?, ?)", rules)
+
+        self.added += len(self._pending)
+        self._pending = []
+
+    def query(self, sql, params=()):
+        """Выполнение запроса; возвращает (имена столбцов, строки)"""
+        cursor = self._conn.execute(sql, params)
+        columns = [description[0] for description in cursor.description or ()]
+        return columns, cursor.fetchall()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Готовые запросы к базе инвентаризации (main.py query БАЗА --preset ИМЯ)
+INVENTORY_QUERIES = {
+    "multi-active": ("Диски с несколькими активными разделами",
+                     "SELECT path, partitions_active FROM images WHERE partitions_active > 1 ORDER BY path"),
+    "low-start": ("Диски с разделами, начинающимися ниже LBA 63",
+                  "SELECT DISTINCT i.path, p.scheme, p.idx, p.lba_start FROM partitions p "
+                  "JOIN images i ON i.id = p.image_id WHERE p.lba_start > 0 AND p.lba_start < 63 "
+                  "AND p.type_code != '0xEE' ORDER BY i.path"),
+    "bad-signature": ("Диски с некорректной сигнатурой 0x55AA",
+                      "SELECT i.path, s.hex FROM signatures s JOIN images i ON i.id = s.image_id "
+                      "WHERE s.valid = 0 ORDER BY i.path"),
+    "unknown-bootloader": ("Диски с загрузочным кодом без известного загрузчика",
+                           "SELECT path FROM images i WHERE boot_code_has_data = 1 AND NOT EXISTS "
+                           "(SELECT 1 FROM bootloaders b WHERE b.image_id = i.id) ORDER BY path"),
+    "bootloaders": ("Распространенность загрузчиков",
+                    "SELECT name, version, COUNT(*) AS images FROM bootloaders "
+                    "GROUP BY name, version ORDER BY images DESC"),
+    "disk-types": ("Распределение типов дисков",
+                   "SELECT disk_type, COUNT(*) AS images FROM images GROUP BY disk_type ORDER BY images DESC"),
+    "rules": ("Сработавшие правила проверки",
+              "SELECT rule_id, severity, COUNT(*) AS images FROM rules "
+              "GROUP BY rule_id, severity ORDER BY images DESC"),
+}
+
+def inventory_record(result, path, stat=None):
+    """Строки таблиц инвентаризации для одного результата анализа"""
+    stats = result.get("statistics", {})
+    sections = result.get("sections", {})
+
+    def flag(value):
+        return None if value is None else int(bool(value))
+
+    image = {
+        "path": os.path.abspath(path),
+        "filename": os.path.basename(path),
+        "file_size": stat.st_size if stat else None,
+        "mtime_ns": stat.st_mtime_ns if stat else None,
+        "sector_sha256": result.get("sha256"),
+        "analyzer_version": ANALYZER_VERSION,
+        "analyzed_at": result.get("timestamp") or datetime.now().isoformat(),
+        "error": result.get("error"),
+        "disk_type": stats.get("disk_type"),
+        "signature_valid": flag(stats.get("signature_valid")),
+        "boot_code_has_data": flag(stats.get("boot_code_has_data")),
+        "partitions_used": stats.get("partitions_used"),
+        "partitions_active": stats.get("partitions_active"),
+        "partitions_logical": stats.get("partitions_logical"),
+        "gpt_entries": stats.get("gpt_partitions"),
+        "gpt_valid": flag(stats.get("gpt_valid"))
+    }
+
+    partitions = []
+    tables = (
+        ("mbr", sections.get("partition_table", {}).get("partitions", [])),
+        ("ebr", sections.get("extended", {}).get("partitions", [])),
+        ("gpt", sections.get("gpt", {}).get("partitions", []))
+    )
+    for scheme, entries in tables:
+        for p in entries:
+            if p.get("status") != "Заполнен":
+                continue
+            partitions.append((scheme, p["index"], p["type_code"], p["type_name"], int(p["bootable"]),
+                               p["lba_start"], p["sectors"], p["size_bytes"], p.get("name"),
+                               p.get("partition_guid")))
+
+    signature = sections.get("signature")
+    bootloaders = [(m["id"], m["name"], m["version"], ','.join(str(offset) for offset in m["offsets"]))
+                   for m in sections.get("boot_code", {}).get("bootloaders", [])]
+
+    return {
+        "image": image,
+        "partitions": partitions,
+        "signature": (signature["hex"], int(signature["valid"])) if signature else None,
+        "bootloaders": bootloaders,
+        "rules": [(rule["id"], rule["severity"]) for rule in result.get("rules_fired", [])]
+    }
+
+class ReportStreamWriter:
+    """Потоковая запись результатов по мере поступления: NDJSON или многодокументный YAML
+
+    Каждый результат - одна компактная запись (строка JSON или документ YAML).
+    Записи копятся в буфере не больше buffer_size символов и дописываются в файл,
+    поэтому весь прогон никогда не хранится в памяти. Файл создается заново;
+    append=True - продолжить существующий (продолжение прерванного прогона).
+    """
+
+    def __init__(self, path, fmt="ndjson", buffer_size=1024 * 1024, append=False):
+        if fmt not in ("ndjson", "yaml"):
+            raise ValueError(f"неизвестный формат потока: {fmt}")
+        if fmt == "yaml":
+            import_yaml()
+        self.path = path
+        self.format = fmt
+        self.buffer_size = buffer_size
+        self.records = 0
+        self._buffer = []
+        self._buffered = 0
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, result):
+        """Добавление одного результата"""
+        self.write_record(format_stream_record(result, self.format))
+
+    def write_record(self, record):
+        """Добавление уже сериализованной записи (например, подготовленной в процессе пула)"""
+        self._buffer.append(record)
+        self._buffered += len(record)
+        self.records += 1
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+        self._file.flush()
+
+    def tell(self):
+        """Размер файла в байтах со всеми записанными на этот момент записями"""
+        self.flush()
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def format_stream_record(result, fmt):
+    """Сериализация одного результата в запись потока NDJSON или YAML"""
+    if fmt == "ndjson":
+        return json.dumps(result, ensure_ascii=False, separators=(',', ':'), default=str) + "\n"
+
+    return format_yaml_document(result)
+
+def format_yaml_document(result):
+    """Результат как отдельный документ YAML (начинается с ---)"""
+    # Сишный эмиттер libyaml заметно быстрее чистого Python, если PyYAML собран с ним
+    yaml = import_yaml()
+    dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+    return yaml.dump(result, Dumper=dumper, allow_unicode=True, default_flow_style=False,
+                     sort_keys=False, explicit_start=True)
+
+# Кэш результатов и настройки процесса-исполнителя пакетного режима
+# (задаются в init_batch_worker)
+_batch_cache = None
+_batch_config = {}
+
+def init_batch_worker(config):
+    """Инициализация процесса пула: у каждого процесса свое соединение с кэшем"""
+    global _batch_cache, _batch_config
+    _batch_config = config
+    _batch_cache = ResultCache(config["cache"], config["cache_size"]) if config.get("cache") else None
+    if _batch_cache is not None and config.get("pool"):
+        # Процесс пула завершается без atexit: накопленные попадания пишутся финализатором
+        from multiprocessing import util
+        util.Finalize(_batch_cache, _batch_cache.close, exitpriority=10)
+    if config.get("profile"):
+        enable_profiling(**config["profile"])
+
+def analyze_batch_file(path):
+    """Анализ одного файла в пакетном режиме (выполняется в процессе пула)
+
+    Результат сохраняется в отдельный JSON (если задан каталог), а записи для
+    потоков NDJSON/YAML сериализуются здесь же и передаются основному процессу.
+    Для базы инвентаризации здесь же готовятся строки таблиц (inventory_record).
+    Возвращает (путь, ошибка или None, попадание в кэш: True/False/None, {формат: запись},
+    идентификаторы сработавших правил).
+    """
+    options = _batch_config.get("analyze", {})
+    cache_hit = None
+    if _batch_cache is not None:
+        hits, misses = _batch_cache.hits, _batch_cache.misses
+        result = analyze(path, cache=_batch_cache, **options)
+        if _batch_cache.hits != hits or _batch_cache.misses != misses:
+            cache_hit = _batch_cache.hits != hits
+    else:
+        result = analyze(path, **options)
+
+    records = {fmt: format_stream_record(result, fmt) for fmt in _batch_config.get("streams", ())}
+
+    if _batch_config.get("inventory"):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        records["inventory"] = inventory_record(result, path, stat)
+
+    # Замеры этапов уходят основному процессу вместе с записями и там суммируются
+    if _profiler is not None and _batch_config.get("profile"):
+        records["profile"] = _profiler.drain()
+
+    output_dir = _batch_config.get("output_dir")
+    if output_dir:
+        output_path = os.path.join(output_dir, batch_output_name(path))
+        try:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, default=str)
+        except OSError as e:
+            return path, f"Ошибка при сохранении результата: {e}", cache_hit, records, ()
+
+    fired = tuple(rule["id"] for rule in result.get("rules_fired", ()))
+    return path, result.get("error"), cache_hit, records, fired
+
+def fingerprint_batch_file(path):
+    """Загрузочный код и его сигнатура MinHash для одного образа (выполняется в процессе пула)
+
+    Возвращает (путь, ошибка или None, загрузочный код, сигнатура или None для пустого кода).
+    """
+    options = _batch_config.get("cluster", {})
+    try:
+        with open_image(path) as image:
+            code = image.read(0, 446)
+    except (OSError, ValueError) as e:
+        return path, f"Ошибка чтения данных: {e}", None, None
+
+    if not code.strip(b'\x00'):
+        return path, None, code, None
+    return path, None, code, boot_code_minhash(code, **options)
+
+def collect_devices(patterns):
+    """Устройства для снятия: пути и маски (/dev/sd*), без аргументов - диски из /sys/block"""
+    import glob
+    if not patterns:
+        try:
+            names = sorted(os.listdir("/sys/block"))
+        except OSError:
+            return []
+        devices = []
+        for name in names:
+            if not name.startswith(ACQUIRE_DEVICE_PREFIXES):
+                continue
+            try:
+                with open(os.path.join("/sys/block", name, "size")) as f:
+                    if not int(f.read() or 0):
+                        continue
+            except (OSError, ValueError):
+                continue
+            devices.append(os.path.join("/dev", name))
+        return devices
+
+    devices = []
+    for pattern in patterns:
+        for path in (sorted(glob.glob(pattern)) if any(ch in pattern for ch in '*?[') else [pattern]):
+            if path not in devices:
+                devices.append(path)
+    return devices
+
+def acquire_device(path, direct, sector_size, analyze_options, engine, rule_set):
+    """Чтение LBA 0, LBA 1 и последнего LBA устройства и анализ (выполняется в потоке)
+
+    Остальные секторы, нужные анализу (цепочка EBR, записи GPT, заголовки
+    томов), читаются с того же устройства по требованию.
+    Возвращает (результат анализа, DeviceImage или None).
+    """
+    started = time.perf_counter()
+    try:
+        image = DeviceImage(path, direct, sector_size)
+    except OSError as e:
+        return {"error": f"Ошибка чтения данных: {e}", "filename": os.path.basename(path), "full_path": path}, None
+
+    try:
+        with image:
+            image.prefetch((0, 1, image.size // image.sector_size - 1))
+            result = analyze_image(image, path, analyze_options.get("include_hex_dump", False),
+                                   True, MAX_EBR_CHAIN, True, None, engine,
+                                   analyze_options.get("follow_volumes", False), rule_set)
+    except OSError as e:
+        result = {"error": f"Ошибка чтения данных: {e}", "filename": os.path.basename(path), "full_path": path}
+
+    result["acquisition"] = {
+        "device": path,
+        "size": image.size,
+        "sector_size": image.sector_size,
+        "direct": image.direct,
+        "reads": image.reads,
+        "bytes_read": image.bytes_read,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+    return result, image
+
+def acquire_devices(paths, jobs, timeout, **options):
+    """Параллельное снятие и анализ устройств; генератор (путь, результат, DeviceImage или None)
+
+    Потоки-исполнители - демоны: чтение с зависшего устройства нельзя
+    прервать, поэтому по истечении timeout секунд с начала чтения устройство
+    отмечается ошибкой, вместо занятого потока запускается новый, а зависший
+    не мешает завершению программы.
+    """
+    import queue
+    import threading
+    tasks = queue.Queue()
+    done = queue.Queue()
+    for path in paths:
+        tasks.put(path)
+    started = {}
+
+    def worker():
+        while True:
+            try:
+                path = tasks.get_nowait()
+            except queue.Empty:
+                return
+            started[path] = time.monotonic()
+            result, image = acquire_device(path, **options)
+            done.put((path, result, image))
+
+    def start_worker():
+        threading.Thread(target=worker, name="acquire", daemon=True).start()
+
+    for _ in range(max(1, min(jobs, len(paths)))):
+        start_worker()
+
+    finished = set()
+    while len(finished) < len(paths):
+        now = time.monotonic()
+        deadlines = [begin + timeout for path, begin in list(started.items()) if path not in finished]
+        wait = max(0.0, min(deadlines) - now) if deadlines else timeout
+        try:
+            path, result, image = done.get(timeout=min(wait, timeout) + 0.01)
+        except queue.Empty:
+            now = time.monotonic()
+            for path, begin in list(started.items()):
+                if path not in finished and now - begin >= timeout:
+                    finished.add(path)
+                    start_worker()
+                    yield path, {"error": f"Устройство не ответило за {timeout:g} с",
+                                 "filename": os.path.basename(path), "full_path": path}, None
+            continue
+        # Ответ зависшего устройства после истечения времени уже не нужен
+        if path not in finished:
+            finished.add(path)
+            yield path, result, image
+
+def run_acquire(args):
+    """Одновременное снятие загрузочных секторов с устройств и их анализ"""
+    devices = collect_devices(args.devices)
+    if not devices:
+        print(" ОШИБКА: не найдено ни одного устройства (укажите пути или маски)", file=sys.stderr)
+        return 2
+
+    try:
+        engine = load_signature_engine(tuple(args.signatures) if args.signatures else None)
+        rule_set = load_rule_set(tuple(args.rules) if args.rules else None)
+    except (OSError, ValueError) as e:
+        print(f" ОШИБКА в наборе сигнатур или правил: {e}", file=sys.stderr)
+        return 2
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    try:
+        stream = ReportStreamWriter(args.ndjson, "ndjson") if args.ndjson else None
+    except OSError as e:
+        print(f" ОШИБКА при открытии файла отчета: {e}", file=sys.stderr)
+        return 2
+
+    jobs = args.jobs or min(32, len(devices))
+    options = {
+        "direct": args.direct,
+        "sector_size": args.sector_size,
+        "analyze_options": {"follow_volumes": args.volumes},
+        "engine": engine,
+        "rule_set": rule_set
+    }
+
+    errors = 0
+    started = time.perf_counter()
+    print(f" {'Устройство':<24} {'Размер':>18} {'Сектор':>6} {'мс':>9}  Результат")
+    try:
+        for path, result, image in acquire_devices(devices, jobs, args.timeout, **options):
+            acquisition = result.get("acquisition", {})
+            if "error" in result:
+                errors += 1
+                summary = f"ОШИБКА: {result['error']}"
+            else:
+                fired = ", ".join(rule["id"] for rule in result.get("rules_fired", []))
+                summary = result["statistics"]["disk_type"] + (f" [{fired}]" if fired else "")
+            print(f" {path:<24} {acquisition.get('size', 0):>18,} {acquisition.get('sector_size', 0):>6} "
+                  f"{acquisition.get('elapsed_ms', 0):>9.1f}  {summary}")
+
+            if stream:
+                stream.write(result)
+            if args.output and image is not None:
+                name = os.path.abspath(path).strip(os.sep).replace(os.sep, '_')
+                try:
+                    image.write_snapshot(os.path.join(args.output, f"{name}.img"))
+                except OSError as e:
+                    errors += 1
+                    print(f" ОШИБКА при сохранении снимка {path}: {e}", file=sys.stderr)
+    finally:
+        if stream:
+            stream.close()
+
+    elapsed = time.perf_counter() - started
+    print()
+    print(f"✓ Устройств: {len(devices)} (ошибок: {errors}), потоков: {jobs}, время: {elapsed:.2f} с")
+    if args.output:
+        print(f"✓ Снимки (разреженные образы) сохранены в: {os.path.abspath(args.output)}")
+    if stream:
+        print(f"✓ Поток NDJSON: {os.path.abspath(args.ndjson)} ({stream.records} записей)")
+    return 1 if errors else 0
+
+def run_batch(args):
+    """Пакетный анализ множества дампов в пуле процессов без интерактивных запросов"""
+    import sqlite3
+    files = collect_input_files(args.inputs)
+    if not files:
+        print(" ОШИБКА: не найдено ни одного входного файла", file=sys.stderr)
+        return 2
+
+    options = {}
+    if args.volumes:
+        options["follow_volumes"] = True
+    if args.signatures:
+        options["signatures"] = tuple(args.signatures)
+        try:
+            load_signature_engine(options["signatures"])
+        except (OSError, ValueError) as e:
+            print(f" ОШИБКА в наборе сигнатур: {e}", file=sys.stderr)
+            return 2
+    if args.rules:
+        options["rules"] = tuple(args.rules)
+    try:
+        rule_set = load_rule_set(options.get("rules"))
+    except (OSError, ValueError) as e:
+        print(f" ОШИБКА в наборе правил: {e}", file=sys.stderr)
+        return 2
+
+    # Без явно заданных выходов результаты пишутся по одному JSON в каталог по умолчанию
+    output_dir = args.output
+    if not output_dir and not args.ndjson and not args.yaml and not args.inventory:
+        output_dir = "mbr_results"
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    writers = {}
+    try:
+        if args.ndjson:
+            writers["ndjson"] = ReportStreamWriter(args.ndjson, "ndjson")
+        if args.yaml:
+            writers["yaml"] = ReportStreamWriter(args.yaml, "yaml")
+        if args.inventory:
+            writers["inventory"] = InventoryStore(args.inventory)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f" ОШИБКА при открытии файла отчета: {e}", file=sys.stderr)
+        return 2
+
+    # Образы, уже загруженные в базу и не изменившиеся с тех пор, повторно не анализируются
+    skipped = 0
+    if args.inventory:
+        known = writers["inventory"].current_images()
+        pending = []
+        for path in files:
+            try:
+                stat = os.stat(path)
+                unchanged = known.get(os.path.abspath(path)) == (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                unchanged = False
+            if unchanged:
+                skipped += 1
+            else:
+                pending.append(path)
+        files = pending
+
+    jobs = max(1, min(args.jobs or os.cpu_count() or 1, len(files) or 1))
+    # Мелкие задачи раздаем пачками, чтобы не упираться в накладные расходы на IPC
+    chunksize = max(1, min(256, len(files) // (jobs * 4)))
+
+    errors = 0
+    cache_hits = cache_misses = 0
+    rules_fired = Counter()
+    started = time.perf_counter()
+    config = {
+        "cache": args.cache,
+        "cache_size": args.cache_size,
+        "analyze": options,
+        "output_dir": output_dir,
+        "streams": tuple(fmt for fmt in writers if fmt != "inventory"),
+        "inventory": "inventory" in writers,
+        "profile": _profiler.options() if _profiler is not None else None,
+        "pool": jobs != 1
+    }
+
+    if jobs == 1:
+        init_batch_worker(config)
+        outcomes = map(analyze_batch_file, files)
+        pool = None
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(processes=jobs, initializer=init_batch_worker, initargs=(config,))
+        outcomes = pool.imap_unordered(analyze_batch_file, files, chunksize=chunksize)
+
+    try:
+        for path, error, cache_hit, records, fired in outcomes:
+            rules_fired.update(fired)
+            for fmt, record in records.items():
+                if fmt == "profile":
+                    _profiler.merge(record)
+                elif fmt == "inventory":
+                    writers[fmt].add(record)
+                else:
+                    writers[fmt].write_record(record)
+            if cache_hit is not None:
+                cache_hits += cache_hit
+                cache_misses += not cache_hit
+            if error:
+                errors += 1
+                if not args.quiet:
+                    print(f" ОШИБКА: {path}: {error}", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        elif _batch_cache is not None:
+            _batch_cache.close()
+        for writer in writers.values():
+            writer.close()
+
+    elapsed = time.perf_counter() - started
+    rate = len(files) / elapsed if elapsed > 0 else float('inf')
+
+    print(f"✓ Обработано файлов: {len(files)} (ошибок: {errors})")
+    if skipped:
+        print(f"✓ Пропущено неизмененных (уже в базе): {skipped}")
+    print(f"✓ Процессов: {jobs}, время: {elapsed:.2f} с, скорость: {rate:.1f} файлов/с")
+    if args.cache:
+        lookups = cache_hits + cache_misses
+        hit_rate = cache_hits / lookups * 100 if lookups else 0.0
+        print(f"✓ Кэш: попаданий {cache_hits}, промахов {cache_misses} ({hit_rate:.1f}% попаданий)")
+    for rule in rule_set.rules:
+        if rules_fired[rule["id"]]:
+            print(f"✓ Правило {rule['id']} ({RULE_SEVERITIES[rule['severity']].lower()}): "
+                  f"{rules_fired[rule['id']]} файлов")
+    if output_dir:
+        print(f"✓ Результаты сохранены в: {os.path.abspath(output_dir)}")
+    for fmt, writer in writers.items():
+        if fmt == "inventory":
+            print(f"✓ База инвентаризации: {os.path.abspath(writer.path)} (добавлено образов: {writer.added})")
+        else:
+            print(f"✓ Поток {writer.format.upper()}: {os.path.abspath(writer.path)} ({writer.records} записей)")
+
+    return 1 if errors else 0
+
+def read_result_records(paths):
+    """Результаты анализа из файлов NDJSON (по строке на результат) или JSON (один результат)"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith(".json"):
+                yield json.load(f)
+                continue
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def run_rules(args):
+    """Проверка сохраненных результатов (NDJSON/JSON) набором правил без повторного анализа"""
+    try:
+        rule_set = load_rule_set(tuple(args.rules) if args.rules else None)
+    except (OSError, ValueError) as e:
+        print(f" ОШИБКА в наборе правил: {e}", file=sys.stderr)
+        return 2
+
+    if args.list:
+        for rule in rule_set.rules:
+            print(f" {rule['id']:<28} {RULE_SEVERITIES[rule['severity']]:<15} {rule['message']}")
+        return 0
+    if not args.inputs:
+        print(" ОШИБКА: не заданы файлы результатов", file=sys.stderr)
+        return 2
+
+    counts = Counter()
+    total = flagged = 0
+    started = time.perf_counter()
+    writer = None
+    try:
+        if args.output:
+            writer = ReportStreamWriter(args.output, "ndjson")
+        records = read_result_records(args.inputs)
+        # Столбцы строятся пачками: память ограничена размером пачки, а не всего прогона
+        while True:
+            results = [result for result in islice(records, args.chunk) if "error" not in result]
+            if not results:
+                break
+            for result, fired in zip(results, rule_set.evaluate(results)):
+                ids = [rule["id"] for rule in fired]
+                counts.update(ids)
+                flagged += bool(ids)
+                if writer is not None and (ids or args.all):
+                    writer.write_record(format_stream_record(
+                        {"full_path": result.get("full_path"), "rules_fired": ids}, "ndjson"))
+            total += len(results)
+    except (OSError, ValueError) as e:
+        print(f" ОШИБКА при чтении результатов: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ Проверено результатов: {total}, сработало правил хотя бы одно: {flagged} "
+          f"(время: {elapsed:.2f} с)")
+    for rule in rule_set.rules:
+        print(f"   {rule['id']:<28} {RULE_SEVERITIES[rule['severity']]:<15} {counts[rule['id']]}")
+    if writer is not None:
+        print(f"✓ Сработавшие правила сохранены в: {os.path.abspath(args.output)}")
+    return 1 if flagged and args.fail else 0
+
+def run_query(args):
+    """Запрос к базе инвентаризации: готовый (--preset) или произвольный SQL"""
+    import sqlite3
+    if args.list:
+        for name, (title, _) in INVENTORY_QUERIES.items():
+            print(f" {name:<20} {title}")
+        return 0
+
+    if args.preset:
+        if args.preset not in INVENTORY_QUERIES:
+            print(f" ОШИБКА: неизвестный запрос '{args.preset}' (список: --list)", file=sys.stderr)
+            return 2
+        sql = INVENTORY_QUERIES[args.preset][1]
+    elif args.sql:
+        sql = args.sql
+    else:
+        print(" ОШИБКА: укажите SQL-запрос или --preset", file=sys.stderr)
+        return 2
+
+    if not os.path.exists(args.database):
+        print(f" ОШИБКА: база '{args.database}' не найдена", file=sys.stderr)
+        return 2
+
+    try:
+        with InventoryStore(args.database) as store:
+            columns, rows = store.query(sql)
+    except sqlite3.Error as e:
+        print(f" ОШИБКА в запросе: {e}", file=sys.stderr)
+        return 2
+
+    if columns:
+        print('\t'.join(columns))
+    for row in rows:
+        print('\t'.join('' if value is None else str(value) for value in row))
+    print(f"✓ Строк: {len(rows)}", file=sys.stderr)
+    return 0
+
+def run_scan(args):
+    """Сканирование полного образа диска в поисках потерянных MBR/EBR/VBR
+
+    Окна образа раздаются пулу процессов; результаты принимаются по порядку
+    окон, поэтому в файл состояния пишется номер первого необработанного окна и
+    размер выходного файла на этот момент. После прерывания (в том числе Ctrl+C
+    или kill) сканирование с --resume продолжается с этого окна, а выходной
+    файл обрезается до сохраненного размера - без потерь и дубликатов.
+    Без --resume сканирование начинается заново: старые выходной файл и
+    состояние не используются.
+    """
+    global _scan_image, _scan_view
+    state_path = args.state or (args.output + ".state" if args.output else None)
+    if args.resume and not state_path:
+        print(" ОШИБКА: для --resume нужен файл состояния (--state или -o)", file=sys.stderr)
+        return 2
+
+    try:
+        image = open_image(args.image)
+    except (OSError, ValueError) as e:
+        print(f" ОШИБКА при открытии образа: {e}", file=sys.stderr)
+        return 2
+
+    with image:
+        state = load_scan_state(state_path) if args.resume else None
+        if state is not None:
+            if state["image"] != os.path.abspath(args.image) or state["size"] != image.size:
+                print(f" ОШИБКА: состояние {state_path} относится к другому образу "
+                      f"({state['image']}, {state['size']:,} байт)", file=sys.stderr)
+                return 2
+            if args.output and state["output_size"] and (
+                    not os.path.exists(args.output) or os.path.getsize(args.output) < state["output_size"]):
+                print(f" ОШИБКА: {args.output} короче сохраненного в {state_path} "
+                      f"({state['output_size']:,} байт) - продолжение невозможно", file=sys.stderr)
+                return 2
+        else:
+            # Состояние прошлого прогона не должно достаться --resume после нового
+            if state_path and not args.resume and os.path.exists(state_path):
+                os.remove(state_path)
+            if args.resume:
+                print(f" Состояние {state_path} не найдено - сканирование с начала", file=sys.stderr)
+            state = {
+                "image": os.path.abspath(args.image),
+                "size": image.size,
+                "sector_size": args.sector_size,
+                "chunk_size": args.chunk_mb * 1024 * 1024,
+                "next_window": 0,
+                "bytes_done": 0,
+                "output_size": None,
+                "counts": {}
+            }
+
+        # Кандидаты уже обработанных окон остаются в файле, недописанный хвост отрезается
+        if args.output and state["output_size"] is not None and os.path.exists(args.output):
+            if os.path.getsize(args.output) > state["output_size"]:
+                os.truncate(args.output, state["output_size"])
+        output = None
+        if args.output:
+            output = ReportStreamWriter(args.output, "ndjson", append=state["output_size"] is not None)
+        if output and state["output_size"] is None:
+            state["output_size"] = output.tell()
+
+        windows = scan_windows(image, state["sector_size"], state["chunk_size"])
+        total = sum(end - start for start, end in windows)
+        state["windows"] = len(windows)
+        tasks = [(index, start, end) for index, (start, end) in enumerate(windows)
+                 if index >= state["next_window"]]
+        jobs = max(1, min(args.jobs or os.cpu_count() or 1, len(tasks) or 1))
+        counts = Counter(state["counts"])
+
+        print(f"✓ Образ: {args.image} ({image.size:,} байт, окон: {len(windows)}, процессов: {jobs})")
+        if state["next_window"]:
+            print(f"✓ Продолжение с окна {state['next_window']} "
+                  f"({state['bytes_done']:,} байт уже просмотрено, кандидатов: {sum(counts.values())})")
+        print()
+        print(f" {'LBA':>14}  {'Смещение':>18}  {'Тип':<7} Описание")
+
+        # Основной процесс отдает свое отображение образа исполнителям (fork) и себе (jobs == 1)
+        _scan_image, _scan_view = image, image.view()
+        config = {"path": args.image, "sector_size": state["sector_size"],
+                  "profile": _profiler.options() if _profiler is not None else None}
+        if jobs == 1:
+            _scan_config.update(config)
+            outcomes = map(scan_window_task, tasks)
+            pool = None
+        else:
+            import multiprocessing
+            pool = multiprocessing.Pool(processes=jobs, initializer=init_scan_worker, initargs=(config,))
+            outcomes = pool.imap(scan_window_task, tasks)
+
+        interactive = sys.stderr.isatty()
+        started = last_checkpoint = last_progress = time.perf_counter()
+        session_bytes = 0
+        progress_width = 0
+        interrupted = False
+
+        try:
+            for index, size, candidates, profile in outcomes:
+                if profile:
+                    _profiler.merge(profile)
+                if candidates and progress_width:
+                    print("\r" + " " * progress_width + "\r", end="", file=sys.stderr)
+                    progress_width = 0
+                for candidate in candidates:
+                    print(f" {candidate['lba']:>14}  0x{candidate['offset']:016X}  "
+                          f"{candidate['kind']:<7} {candidate['description']}")
+                    if output:
+                        output.write(candidate)
+
+                # Состояние меняется только на границе окна: запись оборвется - окно просмотрят заново
+                if candidates:
+                    counts.update(candidate["kind"] for candidate in candidates)
+                    state["counts"] = dict(counts)
+                    if output:
+                        state["output_size"] = output.tell()
+                state["next_window"] = index + 1
+                state["bytes_done"] += size
+                session_bytes += size
+
+                now = time.perf_counter()
+                if state_path and now - last_checkpoint >= SCAN_CHECKPOINT_INTERVAL:
+                    save_scan_state(state_path, state)
+                    last_checkpoint = now
+                if now - last_progress >= (SCAN_PROGRESS_INTERVAL if interactive else SCAN_PROGRESS_LOG_INTERVAL):
+                    line = format_scan_progress(state["bytes_done"], total, session_bytes, now - started)
+                    if interactive:
+                        sys.stdout.flush()
+                        print("\r" + line.ljust(progress_width), end="", file=sys.stderr, flush=True)
+                        progress_width = len(line)
+                    else:
+                        print(line, file=sys.stderr, flush=True)
+                    last_progress = now
+        except KeyboardInterrupt:
+            interrupted = True
+        finally:
+            if pool is not None:
+                if interrupted:
+                    pool.terminate()
+                else:
+                    pool.close()
+                pool.join()
+            _scan_image = _scan_view = None
+            if progress_width:
+                print("\r" + " " * progress_width + "\r", end="", file=sys.stderr)
+            if state_path:
+                save_scan_state(state_path, state)
+            if output:
+                output.close()
+
+    elapsed = time.perf_counter() - started
+    speed = session_bytes / elapsed / (1024 * 1024) if elapsed > 0 else float('inf')
+    summary = ", ".join(f"{kind}: {count}" for kind, count in sorted(counts.items())) or "нет"
+
+    print()
+    if interrupted:
+        print(f" Сканирование прервано на окне {state['next_window']} из {len(windows)}", file=sys.stderr)
+        if state_path:
+            print(f" Продолжить: --resume (состояние: {state_path})", file=sys.stderr)
+    print(f"✓ Найдено кандидатов: {sum(counts.values())} ({summary})")
+    print(f"✓ Время: {elapsed:.2f} с, скорость: {speed:.1f} МБ/с")
+    return 130 if interrupted else 0
+
+def run_entropy(args):
+    """Карта энтропии образа по блокам: файл CSV или двоичный, грубая карта в терминале"""
+    block_size = args.block_kb * 1024
+    if block_size <= 0:
+        print(" ОШИБКА: размер блока должен быть положительным", file=sys.stderr)
+        return 2
+    for option, value in (("--width", args.width), ("--rows", args.rows), ("--chunk-mb", args.chunk_mb)):
+        if value <= 0:
+            print(f" ОШИБКА: {option} должен быть положительным", file=sys.stderr)
+            return 2
+
+    try:
+        image = open_image(args.image)
+    except (OSError, ValueError) as e:
+        print(f" ОШИБКА при открытии образа: {e}", file=sys.stderr)
+        return 2
+
+    fmt = args.format or ("csv" if args.output and args.output.lower().endswith(".csv") else "bin")
+    output = None
+    started = time.perf_counter()
+
+    try:
+        with image:
+            size = image.size
+            blocks = -(-size // block_size)
+            cells = max(1, min(blocks, args.width * args.rows))
+            blocks_per_cell = -(-blocks // cells) if blocks else 1
+            cell_entropy = [0.0] * cells
+            cell_zero = [0.0] * cells
+            cell_blocks = [0] * cells
+            levels = {"пустые": 0, "низкая (<6)": 0, "средняя (6-7.5)": 0, "высокая (>=7.5)": 0}
+
+            if args.output:
+                if fmt == "csv":
+                    output = open(args.output, 'w', encoding='utf-8', newline='')
+                    output.write("offset,entropy,zero_ratio,printable_ratio\n")
+                else:
+                    output = open(args.output, 'wb')
+                    output.write(ENTROPY_MAP_HEADER.pack(ENTROPY_MAP_MAGIC, block_size, size, blocks))
+
+            print(f"✓ Образ: {args.image} ({size:,} байт, блоков по {args.block_kb} КБ: {blocks:,})")
+
+            block = 0
+            for start, columns in entropy_map(image, block_size, args.chunk_mb * 1024 * 1024):
+                entropy, zero_ratio = columns["entropy"], columns["zero_ratio"]
+                for value, zeros in zip(entropy, zero_ratio):
+                    cell = block // blocks_per_cell
+                    cell_entropy[cell] += value
+                    cell_zero[cell] += zeros
+                    cell_blocks[cell] += 1
+                    if zeros >= 1.0:
+                        levels["пустые"] += 1
+                    elif value < 6.0:
+                        levels["низкая (<6)"] += 1
+                    elif value < 7.5:
+                        levels["средняя (6-7.5)"] += 1
+                    else:
+                        levels["высокая (>=7.5)"] += 1
+                    block += 1
+
+                if output and fmt == "csv":
+                    output.writelines(
+                        f"{start + i * block_size},{value:.4f},{zeros:.4f},{printable:.4f}\n"
+                        for i, (value, zeros, printable) in enumerate(zip(entropy, zero_ratio,
+                                                                           columns["printable_ratio"])))
+                elif output:
+                    output.write(bytes(chain.from_iterable(
+                        (min(255, int(value * 32)), int(zeros * 255)) for value, zeros in zip(entropy, zero_ratio))))
+    finally:
+        if output:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    speed = size / elapsed / (1024 * 1024) if elapsed > 0 else float('inf')
+
+    # Грубая карта: каждый символ - среднее по blocks_per_cell соседним блокам
+    print()
+    line_bytes = blocks_per_cell * block_size * args.width
+    chars = [entropy_map_char(cell_entropy[i] / cell_blocks[i], cell_zero[i] / cell_blocks[i]) if cell_blocks[i] else ' '
+             for i in range(cells)]
+    for row in range(0, cells, args.width):
+        print(f" 0x{row // args.width * line_bytes:012X} │{''.join(chars[row:row + args.width]):<{args.width}}│")
+
+    legend = ", ".join(f"'{char}' <{limit}" for limit, char in ENTROPY_MAP_LEVELS[:-1])
+    print(f" Символ = {blocks_per_cell * block_size:,} байт. '{ENTROPY_MAP_EMPTY}' - нули, {legend}, "
+          f"'{ENTROPY_MAP_LEVELS[-1][1]}' - сжатые/зашифрованные данные")
+    print()
+    for name, count in levels.items():
+        print(f" Энтропия {name:<16} {count:>12,} блоков ({count / blocks * 100 if blocks else 0:5.1f}%)")
+    if args.output:
+        print(f"✓ Карта ({fmt.upper()}): {os.path.abspath(args.output)}")
+    print(f"✓ Время: {elapsed:.2f} с, скорость: {speed:.1f} МБ/с")
+    return 0
+
+def run_cluster(args):
+    """Группировка похожих загрузочных кодов (MinHash + LSH) и отчет о кластерах"""
+    import hashlib
+    files = collect_input_files(args.inputs)
+    if not files:
+        print(" ОШИБКА: не найдено ни одного входного файла", file=sys.stderr)
+        return 2
+    if args.bands <= 0 or args.rows <= 0 or not 0.0 < args.threshold <= 1.0:
+        print(" ОШИБКА: число полос и корзин должно быть положительным, порог - в (0, 1]", file=sys.stderr)
+        return 2
+
+    jobs = max(1, min(args.jobs or os.cpu_count() or 1, len(files)))
+    chunksize = max(1, min(256, len(files) // (jobs * 4)))
+    config = {"cluster": {"num_hashes": args.bands * args.rows, "ngram": args.ngram}}
+    started = time.perf_counter()
+
+    if jobs == 1:
+        init_batch_worker(config)
+        outcomes = map(fingerprint_batch_file, files)
+        pool = None
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(processes=jobs, initializer=init_batch_worker, initargs=(config,))
+        outcomes = pool.imap_unordered(fingerprint_batch_file, files, chunksize=chunksize)
+
+    # Одинаковые коды сводятся к одному варианту до кластеризации
+    variants = {}
+    errors = empty = 0
+    try:
+        for path, error, code, signature in outcomes:
+            if error:
+                errors += 1
+                if not args.quiet:
+                    print(f" ОШИБКА: {path}: {error}", file=sys.stderr)
+            elif signature is None:
+                empty += 1
+            else:
+                variants.setdefault(code, (signature, []))[1].append(path)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    codes = list(variants)
+    signatures = [variants[code][0] for code in codes]
+    engine = load_signature_engine()
+    clusters = []
+
+    for members in cluster_boot_codes(signatures, args.threshold, args.bands, args.rows):
+        # Представитель - вариант, встречающийся чаще всех
+        representative = max(members, key=lambda item: len(variants[codes[item]][1]))
+        similarities = {item: minhash_similarity(signatures[item], signatures[representative]) for item in members}
+        ordered = sorted(members, key=lambda item: (-similarities[item], -len(variants[codes[item]][1])))
+        members_report = [{
+            "sha256": hashlib.sha256(codes[item]).hexdigest(),
+            "similarity": round(similarities[item], 4),
+            "images": len(variants[codes[item]][1]),
+            "paths": variants[codes[item]][1]
+        } for item in ordered]
+        clusters.append({
+            "id": len(clusters) + 1,
+            "images": sum(member["images"] for member in members_report),
+            "variants": len(members),
+            "min_similarity": members_report[-1]["similarity"],
+            "bootloaders": [match["name"] for match in engine.match(codes[representative])],
+            "representative": members_report[0],
+            "outliers": [member for member in reversed(members_report[1:])
+                         if member["similarity"] < 1.0][:args.outliers],
+            "members": members_report
+        })
+    clusters.sort(key=lambda cluster: (-cluster["images"], cluster["id"]))
+    for number, cluster in enumerate(clusters, 1):
+        cluster["id"] = number
+
+    elapsed = time.perf_counter() - started
+    images = sum(cluster["images"] for cluster in clusters)
+    singles = sum(1 for cluster in clusters if cluster["variants"] == 1)
+
+    print(f"✓ Образов: {len(files)} (с загрузочным кодом: {images}, пустых: {empty}, ошибок: {errors})")
+    print(f"✓ Различных вариантов кода: {len(codes)}, кластеров: {len(clusters)} "
+          f"(из одного варианта: {singles})")
+    print()
+    print(f" {'№':>4} {'Образов':>9} {'Вариантов':>10} {'Мин. сход.':>11}  Загрузчик / представитель")
+    for cluster in clusters:
+        if cluster["images"] < args.min_size:
+            continue
+        if cluster["id"] > args.top:
+            print(f" ... еще кластеров: {sum(1 for c in clusters[args.top:] if c['images'] >= args.min_size)}")
+            break
+        name = ', '.join(cluster["bootloaders"]) or "неизвестный"
+        print(f" {cluster['id']:>4} {cluster['images']:>9} {cluster['variants']:>10} "
+              f"{cluster['min_similarity']:>11.2f}  {name}: {cluster['representative']['paths'][0]}")
+        for outlier in cluster["outliers"]:
+            more = f" (+{outlier['images'] - 1})" if outlier["images"] > 1 else ""
+            print(f" {'':>37}выброс {outlier['similarity']:.2f}: {outlier['paths'][0]}{more}")
+
+    if args.output:
+        report = {
+            "analyzer_version": ANALYZER_VERSION,
+            "parameters": {"threshold": args.threshold, "bands": args.bands, "rows": args.rows,
+                           "ngram": args.ngram},
+            "files": len(files),
+            "empty": empty,
+            "errors": errors,
+            "variants": len(codes),
+            "clusters": clusters
+        }
+        try:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f" ОШИБКА при сохранении отчета: {e}", file=sys.stderr)
+            return 2
+        print()
+        print(f"✓ Отчет: {os.path.abspath(args.output)}")
+
+    print(f"✓ Время: {elapsed:.2f} с")
+    return 1 if errors else 0
+
+def run_hexdump(args):
+    """HEX-дамп произвольного участка образа с метками структур (экспорт в файл или на экран)"""
+    try:
+        start = int(args.offset, 0) if args.sector is None else args.sector * args.sector_size
+        length = int(args.length, 0)
+    except ValueError as e:
+        print(f" ОШИБКА: неверное смещение или длина: {e}", file=sys.stderr)
+        return 2
+    if start < 0 or length < 0 or args.width <= 0:
+        print(" ОШИБКА: смещение, длина и ширина строки должны быть неотрицательными", file=sys.stderr)
+        return 2
+
+    try:
+        image = open_image(args.image)
+    except (OSError, ValueError) as e:
+        print(f" ОШИБКА при открытии образа: {e}", file=sys.stderr)
+        return 2
+
+    regions = ()
+    if not args.no_labels:
+        regions = hex_structure_regions(analyze(args.image, include_hex_dump=False, follow_volumes=True))
+
+    output = None
+    started = time.perf_counter()
+    rows = 0
+    try:
+        with image:
+            end = image.size if length == 0 else min(image.size, start + length)
+            output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+            for line in hex_dump_lines(image, start, end, regions, args.width, squeeze=not args.no_squeeze):
+                output.write(line)
+                output.write("\n")
+                rows += 1
+    except OSError as e:
+        print(f" ОШИБКА при записи дампа: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if output is not None and output is not sys.stdout:
+            output.close()
+
+    if args.output:
+        elapsed = time.perf_counter() - started
+        print(f"✓ Участок 0x{start:X}-0x{max(end, start):X} ({max(end - start, 0):,} байт), строк: {rows:,}")
+        print(f"✓ Дамп: {os.path.abspath(args.output)} ({elapsed:.2f} с)")
+    return 0
+
+# Профиль этапов текущего процесса: None - профилирование выключено и функции не обернуты,
+# поэтому без --profile замеры ничего не стоят
+_profiler = None
+_profile_originals = {}
+
+def count_read_bytes(profiler, args, result):
+    # Чтения вложенных образов (экстенты VMDK, файлы внутри контейнера) не учитываются дважды
+    if not profiler.inside_read():
+        profiler.count("байт прочитано", len(result))
+        profiler.count("чтений")
+
+def count_cache_lookup(profiler, args, result):
+    profiler.count("кэш: промахов" if result is None else "кэш: попаданий")
+
+def count_rules_fired(profiler, args, result):
+    profiler.count("правил сработало", sum(len(r.get("rules_fired", ())) for r in result))
+
+def count_sector(profiler, args, result):
+    profiler.count("секторов разобрано")
+
+def count_candidates(profiler, args, result):
+    profiler.count("кандидатов найдено", len(result))
+
+# Функции модуля, которые --profile оборачивает замерами: имя -> счетчик или None
+PROFILE_FUNCTIONS = {
+    "parse_mbr_complete": count_sector,
+    "parse_partition_table": None,
+    "parse_boot_code": None,
+    "disassemble_boot_code": None,
+    "create_hex_dump": None,
+    "calculate_statistics": None,
+    "analyze_extended_partitions": None,
+    "analyze_gpt": None,
+    "validate_partitions": None,
+    "analyze_volumes": None,
+    "apply_rules": count_rules_fired,
+    "format_stream_record": None,
+    "format_yaml_document": None,
+    "format_text_report": None,
+    "inventory_record": None,
+    "find_signature_sectors": None,
+    "classify_boot_sector": None,
+    "scan_window": count_candidates,
+    "boot_code_minhash": None,
+}
+
+# Методы классов: (класс, метод, счетчик)
+PROFILE_METHODS = (
+    ("RawImage", "read", count_read_bytes),
+    ("BytesImage", "read", count_read_bytes),
+    ("DeviceImage", "read", count_read_bytes),
+    ("CompressedImage", "read", count_read_bytes),
+    ("VirtualDiskImage", "read", count_read_bytes),
+    ("VmdkDescriptorImage", "read", count_read_bytes),
+    ("ResultCache", "get", count_cache_lookup),
+    ("ResultCache", "put", None),
+    ("InventoryStore", "flush", None),
+    ("ReportStreamWriter", "flush", None),
+)
+
+class StageProfiler:
+    """Таймеры этапов и счетчики одного процесса
+
+    Для каждого этапа считаются вызовы, полное время и собственное время (без
+    вложенных этапов), поэтому сумма собственных времен не считает одно и то же
+    дважды. Стек этапов свой у каждого потока. С trace=True запоминаются
+    события для трассировки Chrome (chrome://tracing, Perfetto).
+    Процессы пула отдают накопленное через drain(), основной процесс - merge().
+    """
+
+    def __init__(self, trace=False):
+        import threading
+        self.pid = os.getpid()
+        self.trace = trace
+        self.origin = time.perf_counter()
+        self.stages = {}
+        self.counters = Counter()
+        self.events = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._thread_id = threading.get_ident
+
+    def options(self):
+        """Параметры для включения такого же профилирования в процессах пула"""
+        return {"trace": self.trace}
+
+    def call(self, name, function, args, kwargs, counter=None):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [name, 0.0]
+        stack.append(frame)
+        started = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            stack.pop()
+            if stack:
+                stack[-1][1] += elapsed
+            with self._lock:
+                entry = self.stages.get(name)
+                if entry is None:
+                    entry = self.stages[name] = [0, 0.0, 0.0]
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] += elapsed - frame[1]
+                if self.trace and len(self.events) < PROFILE_TRACE_LIMIT:
+                    self.events.append((name, started, elapsed, self.pid, self._thread_id()))
+        if counter is not None:
+            counter(self, args, result)
+        return result
+
+    def inside_read(self):
+        """Идет ли уже чтение образа уровнем выше (для счетчика байтов)"""
+        stack = self._local.stack
+        return len(stack) > 1 and stack[-2][0].endswith(".read")
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def drain(self):
+        """Накопленные замеры (для передачи основному процессу); сами замеры обнуляются"""
+        with self._lock:
+            snapshot = {"stages": self.stages, "counters": dict(self.counters), "events": self.events}
+            self.stages, self.counters, self.events = {}, Counter(), []
+        return snapshot
+
+    def merge(self, snapshot):
+        """Добавление замеров другого процесса (см. drain)"""
+        with self._lock:
+            for name, (calls, total, own) in snapshot["stages"].items():
+                entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+                entry[0] += calls
+                entry[1] += total
+                entry[2] += own
+            self.counters.update(snapshot["counters"])
+            self.events.extend(snapshot["events"][:max(0, PROFILE_TRACE_LIMIT - len(self.events))])
+
+    def report(self, elapsed):
+        """Строки таблицы этапов по убыванию собственного времени и счетчики"""
+        own_total = sum(own for _, _, own in self.stages.values())
+        lines = [
+            f" {'Этап':<36} {'Вызовов':>10} {'Всего, с':>10} {'Собств., с':>11} {'Доля':>7}",
+        ]
+        for name, (calls, total, own) in sorted(self.stages.items(), key=lambda item: -item[1][2]):
+            share = own / own_total * 100 if own_total else 0.0
+            lines.append(f" {name:<36} {calls:>10,} {total:>10.3f} {own:>11.3f} {share:>6.1f}%")
+        lines.append(f" Время работы: {elapsed:.3f} с, в этапах (сумма по процессам и потокам): {own_total:.3f} с")
+        if self.counters:
+            lines.append(" Счетчики: " + ", ".join(f"{name} {value:,}" for name, value in sorted(self.counters.items())))
+        return lines
+
+    def chrome_trace(self):
+        """События в формате Trace Event (complete events, время в микросекундах от начала работы)"""
+        return {
+            "displayTimeUnit": "ms",
+            "traceEvents": [
+                {"name": name, "cat": "stage", "ph": "X", "pid": pid, "tid": tid,
+                 "ts": round((started - self.origin) * 1e6, 3), "dur": round(elapsed * 1e6, 3)}
+                for name, started, elapsed, pid, tid in self.events
+            ]
+        }
+
+def profiled(name, function, counter):
+    """Обертка функции замером этапа name (только при включенном профилировании)"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profiler = _profiler
+        if profiler is None:
+            return function(*args, **kwargs)
+        return profiler.call(name, function, args, kwargs, counter)
+    return wrapper
+
+def enable_profiling(trace=False):
+    """Включение замеров этапов: функции и методы из PROFILE_* оборачиваются один раз
+
+    Процесс пула, созданный через fork, наследует уже обернутые функции и
+    профиль основного процесса - профиль заменяется новым, пустым.
+    """
+    global _profiler
+    _profiler = StageProfiler(trace)
+    if _profile_originals:
+        return _profiler
+
+    module = sys.modules[__name__]
+    for name, counter in PROFILE_FUNCTIONS.items():
+        original = getattr(module, name)
+        _profile_originals[name] = original
+        setattr(module, name, profiled(name, original, counter))
+    for class_name, method, counter in PROFILE_METHODS:
+        cls = getattr(module, class_name)
+        original = cls.__dict__[method]
+        _profile_originals[f"{class_name}.{method}"] = original
+        setattr(cls, method, profiled(f"{class_name}.{method}", original, counter))
+    return _profiler
+
+def run_profiled(args):
+    """Запуск команды с --profile/--trace (замеры этапов) и/или --pstats (cProfile основного процесса)"""
+    if args.profile or args.trace:
+        enable_profiling(trace=bool(args.trace))
+
+    cprofile = None
+    if args.pstats:
+        import cProfile
+        cprofile = cProfile.Profile()
+
+    started = time.perf_counter()
+    try:
+        if cprofile is not None:
+            cprofile.enable()
+        return args.handler(args)
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+        elapsed = time.perf_counter() - started
+        save_profile_outputs(args, _profiler, cprofile, elapsed)
+
+def save_profile_outputs(args, profiler, cprofile, elapsed):
+    """Вывод таблицы этапов и запись файлов pstats и трассировки Chrome"""
+    if profiler is not None and args.profile:
+        print()
+        print("─" * 70)
+        print(" ПРОФИЛЬ ЭТАПОВ")
+        print("─" * 70)
+        for line in profiler.report(elapsed):
+            print(line)
+
+    try:
+        if profiler is not None and args.trace:
+            with open(args.trace, 'w', encoding='utf-8') as f:
+                json.dump(profiler.chrome_trace(), f)
+            print(f"✓ Трассировка Chrome: {os.path.abspath(args.trace)} ({len(profiler.events):,} событий)")
+        if cprofile is not None:
+            cprofile.dump_stats(args.pstats)
+            print(f"✓ Статистика cProfile: {os.path.abspath(args.pstats)} "
+                  f"(просмотр: python -m pstats {args.pstats}; только основной процесс)")
+    except OSError as e:
+        print(f" ОШИБКА при сохранении профиля: {e}", file=sys.stderr)
+
+def build_arg_parser(command=None):
+    """Описание параметров командной строки
+
+    command - описать параметры только этой команды: разовый запуск не тратит
+    время на остальные. Для неизвестной команды строится полное описание.
+    """
+    def wanted(name):
+        return command is None or command == name
+
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Анализатор MBR / загрузочных секторов. Без аргументов запускается интерактивный режим."
+    )
+    parser.add_argument("--version", action="version", version=f"MBR Analyzer {ANALYZER_VERSION}")
+    subparsers = parser.add_subparsers(dest="command", metavar="КОМАНДА")
+
+    if wanted("batch"):
+        batch = subparsers.add_parser("batch", help="пакетный анализ каталогов и масок файлов")
+        batch.add_argument("inputs", nargs="+", metavar="ПУТЬ",
+                           help="файл, каталог (обходится рекурсивно) или маска вида 'dumps/**/*.bin'")
+        batch.add_argument("-o", "--output",
+                           help="каталог для результатов, по одному JSON на входной файл "
+                                "(по умолчанию: mbr_results, если не заданы --ndjson/--yaml)")
+        batch.add_argument("--ndjson", metavar="ФАЙЛ",
+                           help="записать результаты в файл NDJSON (одна строка JSON на файл)")
+        batch.add_argument("--yaml", metavar="ФАЙЛ",
+                           help="записать результаты в многодокументный поток YAML")
+        batch.add_argument("--inventory", metavar="БАЗА",
+                           help="база инвентаризации SQLite; неизмененные образы повторно не анализируются")
+        batch.add_argument("-j", "--jobs", type=int, default=0,
+                           help="число процессов (по умолчанию: число ядер)")
+        batch.add_argument("-q", "--quiet", action="store_true", help="не выводить ошибки по отдельным файлам")
+        batch.add_argument("--cache", metavar="ФАЙЛ",
+                           help="кэш результатов SQLite: одинаковые сектора анализируются один раз")
+        batch.add_argument("--cache-size", type=int, default=1000000,
+                           help="максимум записей в кэше, старые вытесняются (по умолчанию: 1000000)")
+        batch.add_argument("--signatures", action="append", metavar="ПУТЬ",
+                           help="набор сигнатур загрузчиков (JSON или каталог); можно указать несколько раз")
+        batch.add_argument("--volumes", action="store_true",
+                           help="читать начало каждого раздела и разбирать заголовок файловой системы")
+        batch.add_argument("--rules", action="append", metavar="ПУТЬ",
+                           help="набор правил проверки (JSON или каталог, по умолчанию: rules); "
+                                "можно указать несколько раз")
+        batch.set_defaults(handler=run_batch)
+
+    if wanted("acquire"):
+        acquire = subparsers.add_parser("acquire", help="одновременное снятие и анализ загрузочных секторов устройств")
+        acquire.add_argument("devices", nargs="*", metavar="УСТРОЙСТВО",
+                             help="устройство, файл или маска вида '/dev/sd?' (по умолчанию: все диски из /sys/block)")
+        acquire.add_argument("--direct", action="store_true", help="читать с O_DIRECT, мимо страничного кэша")
+        acquire.add_argument("--timeout", type=float, default=ACQUIRE_TIMEOUT,
+                             help=f"время ожидания одного устройства, с (по умолчанию: {ACQUIRE_TIMEOUT:g})")
+        acquire.add_argument("--sector-size", type=int, default=None,
+                             help="логический размер сектора (по умолчанию: у устройства, для файлов 512)")
+        acquire.add_argument("-j", "--jobs", type=int, default=0,
+                             help="число потоков (по умолчанию: по числу устройств, не больше 32)")
+        acquire.add_argument("-o", "--output", metavar="КАТАЛОГ",
+                             help="сохранять снимки: разреженные образы с прочитанными секторами")
+        acquire.add_argument("--ndjson", metavar="ФАЙЛ", help="записать результаты анализа в файл NDJSON")
+        acquire.add_argument("--volumes", action="store_true",
+                             help="читать начало каждого раздела и разбирать заголовок файловой системы")
+        acquire.add_argument("--signatures", action="append", metavar="ПУТЬ",
+                             help="набор сигнатур загрузчиков (JSON или каталог); можно указать несколько раз")
+        acquire.add_argument("--rules", action="append", metavar="ПУТЬ",
+                             help="набор правил проверки (JSON или каталог); можно указать несколько раз")
+        acquire.set_defaults(handler=run_acquire)
+
+    if wanted("rules"):
+        rules = subparsers.add_parser("rules", help="проверка сохраненных результатов набором правил")
+        rules.add_argument("inputs", nargs="*", metavar="ФАЙЛ",
+                           help="результаты 'batch --ndjson' (NDJSON) или отдельные JSON-файлы результатов")
+        rules.add_argument("--rules", action="append", metavar="ПУТЬ",
+                           help="набор правил (JSON или каталог, по умолчанию: rules); можно указать несколько раз")
+        rules.add_argument("-o", "--output", metavar="ФАЙЛ",
+                           help="NDJSON со сработавшими правилами по каждому результату")
+        rules.add_argument("--all", action="store_true", help="писать в --output и результаты без срабатываний")
+        rules.add_argument("--chunk", type=int, default=10000,
+                           help="результатов в одной пачке столбцов (по умолчанию: 10000)")
+        rules.add_argument("--fail", action="store_true", help="код возврата 1, если сработало хотя бы одно правило")
+        rules.add_argument("--list", action="store_true", help="показать правила набора и выйти")
+        rules.set_defaults(handler=run_rules)
+
+    if wanted("query"):
+        query = subparsers.add_parser("query", help="запрос к базе инвентаризации")
+        query.add_argument("database", metavar="БАЗА", help="база, созданная 'batch --inventory'")
+        query.add_argument("sql", nargs="?", help="произвольный SQL-запрос")
+        query.add_argument("--preset", metavar="ИМЯ", help="готовый запрос (список: --list)")
+        query.add_argument("--list", action="store_true", help="показать готовые запросы")
+        query.set_defaults(handler=run_query)
+
+    if wanted("scan"):
+        scan = subparsers.add_parser("scan", help="поиск потерянных MBR/EBR/VBR по всему образу диска")
+        scan.add_argument("image", metavar="ОБРАЗ", help="сырой образ диска или блочное устройство")
+        scan.add_argument("-o", "--output", help="записать кандидатов в файл NDJSON (с --resume - продолжить)")
+        scan.add_argument("--sector-size", type=int, default=512, help="размер сектора (по умолчанию: 512)")
+        scan.add_argument("--chunk-mb", type=int, default=64, help="размер окна сканирования в МБ (по умолчанию: 64)")
+        scan.add_argument("-j", "--jobs", type=int, default=0, help="число процессов (по умолчанию: число ядер)")
+        scan.add_argument("--state", metavar="ФАЙЛ",
+                          help="файл состояния для продолжения (по умолчанию: ВЫХОД.state при заданном -o)")
+        scan.add_argument("--resume", action="store_true",
+                          help="продолжить прерванное сканирование с сохраненного места")
+        scan.set_defaults(handler=run_scan)
+
+    if wanted("entropy"):
+        entropy = subparsers.add_parser("entropy", help="карта энтропии и доли нулей по блокам образа")
+        entropy.add_argument("image", metavar="ОБРАЗ", help="образ диска (сырой, сжатый или виртуальный) или устройство")
+        entropy.add_argument("-o", "--output", help="файл карты: .csv - CSV, иначе двоичный формат")
+        entropy.add_argument("--format", choices=("csv", "bin"), help="формат файла карты (по умолчанию - по расширению)")
+        entropy.add_argument("--block-kb", type=int, default=64, help="размер блока в КБ (по умолчанию: 64)")
+        entropy.add_argument("--chunk-mb", type=int, default=64, help="размер окна чтения в МБ (по умолчанию: 64)")
+        entropy.add_argument("--width", type=int, default=64, help="ширина карты в терминале (по умолчанию: 64)")
+        entropy.add_argument("--rows", type=int, default=16, help="число строк карты в терминале (по умолчанию: 16)")
+        entropy.set_defaults(handler=run_entropy)
+
+    if wanted("cluster"):
+        cluster = subparsers.add_parser("cluster", help="группировка похожих загрузочных кодов (MinHash + LSH)")
+        cluster.add_argument("inputs", nargs="+", metavar="ПУТЬ",
+                             help="файл, каталог (обходится рекурсивно) или маска вида 'dumps/**/*.bin'")
+        cluster.add_argument("-o", "--output", help="полный отчет о кластерах в JSON")
+        cluster.add_argument("--threshold", type=float, default=0.7,
+                             help="минимальное сходство (оценка Жаккара) для объединения (по умолчанию: 0.7)")
+        cluster.add_argument("--bands", type=int, default=MINHASH_BANDS,
+                             help=f"число полос LSH (по умолчанию: {MINHASH_BANDS})")
+        cluster.add_argument("--rows", type=int, default=MINHASH_ROWS,
+                             help=f"корзин MinHash в полосе (по умолчанию: {MINHASH_ROWS})")
+        cluster.add_argument("--ngram", type=int, choices=range(1, 5), default=MINHASH_NGRAM,
+                             help=f"длина n-грамм байтов, 1-4 (по умолчанию: {MINHASH_NGRAM})")
+        cluster.add_argument("--min-size", type=int, default=2,
+                             help="показывать кластеры не меньше стольких образов (по умолчанию: 2)")
+        cluster.add_argument("--top", type=int, default=20, help="показывать столько крупнейших кластеров (по умолчанию: 20)")
+        cluster.add_argument("--outliers", type=int, default=3,
+                             help="выбросов (наименее похожих вариантов) на кластер (по умолчанию: 3)")
+        cluster.add_argument("-j", "--jobs", type=int, default=0, help="число процессов (по умолчанию: число ядер)")
+        cluster.add_argument("-q", "--quiet", action="store_true", help="не выводить ошибки по отдельным файлам")
+        cluster.set_defaults(handler=run_cluster)
+
+    if wanted("hexdump"):
+        hexdump = subparsers.add_parser("hexdump", help="HEX-дамп любого участка образа с метками структур")
+        hexdump.add_argument("image", metavar="ОБРАЗ", help="образ диска (сырой, сжатый или виртуальный) или устройство")
+        hexdump.add_argument("--offset", default="0", help="начальное смещение в байтах, 0x... или число (по умолчанию: 0)")
+        hexdump.add_argument("--sector", type=int, help="начать с сектора N (вместо --offset)")
+        hexdump.add_argument("--sector-size", type=int, default=512, help="размер сектора для --sector (по умолчанию: 512)")
+        hexdump.add_argument("--length", default="512", help="длина в байтах, 0 - до конца образа (по умолчанию: 512)")
+        hexdump.add_argument("--width", type=int, default=16, help="байтов в строке (по умолчанию: 16)")
+        hexdump.add_argument("-o", "--output", help="записать дамп в файл вместо вывода на экран")
+        hexdump.add_argument("--no-labels", action="store_true", help="не размечать структуры (без анализа образа)")
+        hexdump.add_argument("--no-squeeze", action="store_true", help="не сворачивать повторяющиеся строки в '*'")
+        hexdump.set_defaults(handler=run_hexdump)
+
+    # Профилирование доступно в любой команде
+    for subparser in subparsers.choices.values():
+        profiling = subparser.add_argument_group("профилирование")
+        profiling.add_argument("--profile", action="store_true",
+                               help="вывести время по этапам (чтение, разбор, дамп, сериализация) и счетчики")
+        profiling.add_argument("--trace", metavar="ФАЙЛ",
+                               help="сохранить события этапов в JSON трассировки Chrome (chrome://tracing, Perfetto)")
+        profiling.add_argument("--pstats", metavar="ФАЙЛ", help="сохранить статистику cProfile основного процесса")
+
+    if command is not None and not subparsers.choices:
+        return build_arg_parser()
+    return parser
+
+def run_interactive():
+    """Основной интерактивный цикл программы"""
+    while True:
+        clear_screen()
+        print_header()
+
+        # Запрос пути к файлу
+        file_path = get_file_path()
+
+        # Загрузка и анализ файла
+        data = load_file_data(file_path)
+        if data is None:
+            print("\nНе удалось загрузить файл. Попробуйте еще раз.")
+            input("Нажмите Enter для продолжения...")
+            continue
+
+        print("\nАнализирую MBR структуру...")
+
+        # Парсинг MBR (включая логические разделы, если файл - образ диска)
+        result = analyze(file_path, follow_volumes=True)
+
+        if "error" in result:
+            print(f" Ошибка анализа: {result['error']}")
+            input("Нажмите Enter для продолжения...")
+            continue
+
+        # Вывод результатов
+        print_mbr_analysis(result)
+
+        # Обработка действий пользователя
+        need_new_file = main_menu(result)
+        if not need_new_file:
+            break
+
+def main(argv=None):
+    """Точка входа: интерактивный режим без аргументов, иначе - командная строка"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        run_interactive()
+        return 0
+
+    parser = build_arg_parser(argv[0])
+    args = parser.parse_args(argv)
+    if not getattr(args, "handler", None):
+        parser.print_help()
+        return 2
+    if args.profile or args.trace or args.pstats:
+        return run_profiled(args)
+    return args.handler(args)
+
+# Основной цикл программы
+if __name__ == "__main__":
+    sys.exit(main())
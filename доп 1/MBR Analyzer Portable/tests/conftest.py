@@ -0,0 +1,6 @@
+"""Общие настройки тестов: модуль анализатора импортируется из каталога программы"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,273 @@
+"""Небольшие синтетические сектора и образы дисков для тестов"""
+import struct
+import uuid
+import zlib
+
+# Начало загрузчика Windows Vista+ (перенос кода в 0x0600 и переход через push/retf), затем
+# перенесенная часть: проверка расширений INT 13h и переход на 0000:7C00
+NT6_BOOT_CODE = bytes.fromhex(
+    "33C08ED0BC007C8EC08ED8BE007CBF0006B90002FCF3A450681C06CB"
+    "B441BBAA55CD13EA007C0000"
+)
+
+# Начало boot.img GRUB 2 со строками "GRUB " и "Geom"
+GRUB2_BOOT_CODE = b'\xeb\x63\x90' + bytes(0x17D) + b'GRUB \x00\x00\x00Geom'
+
+def partition_entry(type_code, lba_start, sectors, bootable=False, chs_start=(0, 0, 0), chs_end=(0, 0, 0)):
+    """16-байтная запись таблицы разделов; CHS - байты записи (головка, сектор, цилиндр)"""
+    return struct.pack('<B3sB3sII', 0x80 if bootable else 0, bytes(chs_start), type_code, bytes(chs_end),
+                       lba_start, sectors)
+
+def mbr_sector(entries=(), code=b'', signature=b'\x55\xaa'):
+    """Сектор 512 байт: загрузочный код, до 4 записей разделов и сигнатура"""
+    sector = bytearray(512)
+    sector[:len(code)] = code[:446]
+    for index, entry in enumerate(entries):
+        sector[446 + 16 * index:462 + 16 * index] = entry
+    sector[510:] = signature
+    return bytes(sector)
+
+def ntfs_boot_sector(total_sectors, sectors_per_cluster=8):
+    """Загрузочный сектор тома NTFS"""
+    sector = bytearray(512)
+    sector[0:3] = b'\xeb\x52\x90'
+    sector[3:11] = b'NTFS    '
+    struct.pack_into('<HB', sector, 0x0B, 512, sectors_per_cluster)
+    struct.pack_into('<QQ', sector, 0x28, total_sectors, 4)
+    struct.pack_into('<Q', sector, 0x48, 0x1234ABCD5678EF00)
+    sector[510:] = b'\x55\xaa'
+    return bytes(sector)
+
+def fat32_boot_sector(total_sectors, label=b'BOOT', sectors_per_cluster=8):
+    """Загрузочный сектор тома FAT32 с меткой"""
+    sector = bytearray(512)
+    sector[0:3] = b'\xeb\x58\x90'
+    sector[3:11] = b'MSDOS5.0'
+    struct.pack_into('<HBHBHHBH', sector, 0x0B, 512, sectors_per_cluster, 32, 2, 0, 0, 0xF8, 0)
+    struct.pack_into('<II', sector, 0x20, total_sectors, 1000)
+    struct.pack_into('<I11s', sector, 0x43, 0xCAFE1234, label.ljust(11))
+    sector[510:] = b'\x55\xaa'
+    return bytes(sector)
+
+def ext_volume_start(blocks, log_block_size=2, label=b'root', incompat=0x2C2, compat=0x4):
+    """Первые 2048 байт тома ext2/3/4: суперблок со смещения 1024 (по умолчанию ext4)"""
+    data = bytearray(2048)
+    superblock = 1024
+    struct.pack_into('<II16xI', data, superblock, 1024, blocks, log_block_size)
+    struct.pack_into('<H', data, superblock + 0x38, 0xEF53)
+    struct.pack_into('<III', data, superblock + 0x5C, compat, incompat, 0)
+    data[superblock + 0x68:superblock + 0x78] = uuid.UUID(int=0x1234).bytes
+    data[superblock + 0x78:superblock + 0x78 + len(label)] = label
+    return bytes(data)
+
+def write_sectors(path, size, sectors):
+    """Разреженный файл образа размером size байт с секторами {LBA: данные}"""
+    with open(path, 'wb') as f:
+        f.truncate(size)
+        for lba, data in sectors.items():
+            f.seek(lba * 512)
+            f.write(data)
+    return path
+
+def ebr_image(logical, step=100, extended_start=2048, link=None):
+    """Образ с расширенным разделом и цепочкой из logical звеньев EBR по step секторов
+
+    link(i) - LBA следующего EBR относительно начала расширенного раздела для
+    звена i (по умолчанию - следующее звено, у последнего ссылки нет).
+    """
+    total = extended_start + step * logical + 100
+    image = bytearray(total * 512)
+    image[0:512] = mbr_sector([partition_entry(0x07, 63, 1985, bootable=True),
+                               partition_entry(0x0F, extended_start, step * logical)])
+    for i in range(logical):
+        lba = extended_start + i * step
+        entries = [partition_entry(0x83, 63, step - 63)]
+        target = link(i) if link else ((i + 1) * step if i < logical - 1 else None)
+        if target is not None:
+            entries.append(partition_entry(0x05, target, step))
+        image[lba * 512:lba * 512 + 512] = mbr_sector(entries)
+    return image
+
+GPT_BASIC_DATA = uuid.UUID("EBD0A0A2-B9E5-4433-87C0-68B6B72699C7")
+
+def gpt_header(current, backup, entries_lba, first_usable, last_usable, entries_count, entry_size, entries_crc):
+    """Заголовок GPT (92 байта) с правильной CRC32"""
+    header = bytearray(struct.pack('<8sIIIIQQQQ16sQIII', b'EFI PART', 0x10000, 92, 0, 0, current, backup,
+                                   first_usable, last_usable, uuid.UUID(int=7).bytes_le, entries_lba,
+                                   entries_count, entry_size, entries_crc))
+    header[16:20] = struct.pack('<I', zlib.crc32(header))
+    return bytes(header)
+
+def gpt_image(partitions=4, entries=128, disk_sectors=4096, sector_size=512, header_entries=None):
+    """Диск GPT: защитная MBR, основной и резервный заголовки, массивы записей
+
+    Раздел i - "part{i}" типа Basic data длиной 8 секторов с LBA 64 + 8 * i.
+    header_entries - число записей в заголовках, если оно должно отличаться от entries.
+    """
+    image = bytearray(disk_sectors * sector_size)
+    image[0:512] = mbr_sector([partition_entry(0xEE, 1, disk_sectors - 1)])
+    array = bytearray(entries * 128)
+    for i in range(partitions):
+        struct.pack_into('<16s16sQQQ72s', array, i * 128, GPT_BASIC_DATA.bytes_le,
+                         uuid.UUID(int=i + 1).bytes_le, 64 + 8 * i, 64 + 8 * i + 7, 0,
+                         f"part{i}".encode('utf-16-le'))
+    array_sectors = -(-len(array) // sector_size)
+    last = disk_sectors - 1
+    first_usable, last_usable = 2 + array_sectors, last - 1 - array_sectors
+    crc = zlib.crc32(array)
+    header_entries = entries if header_entries is None else header_entries
+
+    image[sector_size:sector_size + 92] = gpt_header(1, last, 2, first_usable, last_usable,
+                                                     header_entries, 128, crc)
+    image[2 * sector_size:2 * sector_size + len(array)] = array
+    backup_entries = last - array_sectors
+    image[backup_entries * sector_size:backup_entries * sector_size + len(array)] = array
+    image[last * sector_size:last * sector_size + 92] = gpt_header(last, 1, backup_entries, first_usable,
+                                                                   last_usable, header_entries, 128, crc)
+    return image
+
+def qcow2_image(disk, cluster_bits=16, compress=True):
+    """Образ qcow2 версии 3: нулевые кластеры не размещаются (часть помечена флагом нулей),
+    каждый третий непустой кластер при compress сжимается raw deflate"""
+    cluster = 1 << cluster_bits
+    l2_entries = cluster // 8
+    clusters = -(-len(disk) // cluster)
+    l1_entries = -(-clusters // l2_entries)
+    l1_offset, l2_offset = cluster, 2 * cluster
+    data_offset = l2_offset + l1_entries * cluster
+    l2 = [0] * (l1_entries * l2_entries)
+    data = bytearray()
+    for index in range(clusters):
+        chunk = disk[index * cluster:(index + 1) * cluster]
+        if not any(chunk):
+            if index % 7 == 3:
+                l2[index] = 1
+            continue
+        if compress and index % 3 == 1:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -12)
+            packed = compressor.compress(chunk) + compressor.flush()
+            host = data_offset + len(data)
+            sectors = (host % 512 + len(packed) + 511) // 512
+            l2[index] = (1 << 62) | ((sectors - 1) << (62 - (cluster_bits - 8))) | host
+            data += packed + bytes(-len(packed) % 512)
+        else:
+            data += bytes(-(data_offset + len(data)) % cluster)
+            l2[index] = (data_offset + len(data)) | (1 << 63)
+            data += chunk
+
+    image = bytearray(data_offset)
+    header = struct.pack('>4sIQIIQIIQQIIQQQQII', b'QFI\xfb', 3, 0, 0, cluster_bits, len(disk), 0, l1_entries,
+                         l1_offset, 0, 0, 0, 0, 0, 0, 0, 4, 104)
+    image[:len(header)] = header
+    l1 = [(l2_offset + i * cluster) | (1 << 63) for i in range(l1_entries)]
+    image[l1_offset:l1_offset + 8 * l1_entries] = struct.pack(f'>{l1_entries}Q', *l1)
+    image[l2_offset:data_offset] = struct.pack(f'>{len(l2)}Q', *l2)
+    return bytes(image + data)
+
+def vhd_footer(size, disk_type, data_offset):
+    """Подвал VHD (тип 2 - фиксированный, 3 - динамический)"""
+    footer = bytearray(512)
+    struct.pack_into('>8sIIQ', footer, 0, b'conectix', 2, 0x10000, data_offset)
+    struct.pack_into('>QQ', footer, 40, size, size)
+    struct.pack_into('>I', footer, 60, disk_type)
+    return bytes(footer)
+
+def vhd_fixed_image(disk):
+    return bytes(disk) + vhd_footer(len(disk), 2, 0xFFFFFFFFFFFFFFFF)
+
+def vhd_dynamic_image(disk, block=2 * 1024 * 1024):
+    """Динамический VHD: пустые блоки не размещаются в BAT"""
+    blocks = -(-len(disk) // block)
+    bat_offset = 512 + 1024
+    bitmap = -(-block // (512 * 8 * 512)) * 512
+    image = bytearray(vhd_footer(len(disk), 3, 512))
+    header = bytearray(1024)
+    struct.pack_into('>8sQQIII', header, 0, b'cxsparse', 0xFFFFFFFFFFFFFFFF, bat_offset, 0x10000, blocks, block)
+    image += header + bytes(-(-blocks * 4 // 512) * 512)
+    bat = [0xFFFFFFFF] * blocks
+    for index in range(blocks):
+        chunk = disk[index * block:(index + 1) * block]
+        if any(chunk):
+            bat[index] = len(image) // 512
+            image += b'\xff' * bitmap + bytes(chunk).ljust(block, b'\0')
+    image[bat_offset:bat_offset + 4 * blocks] = struct.pack(f'>{blocks}I', *bat)
+    return bytes(image + vhd_footer(len(disk), 3, 512))
+
+def vhdx_image(disk, block=1024 * 1024, sector_size=512):
+    """VHDX: регионы BAT и метаданных, пустые блоки - в состояниях NOT_PRESENT и ZERO"""
+    mib = 1024 * 1024
+    image = bytearray(4 * mib)
+    image[:8] = b'vhdxfile'
+    for offset, sequence in ((64 * 1024, 1), (128 * 1024, 2)):
+        struct.pack_into('<4sIQ', image, offset, b'head', 0, sequence)
+    metadata_offset, bat_offset = 2 * mib, 3 * mib
+    for offset in (192 * 1024, 256 * 1024):
+        struct.pack_into('<4sIII', image, offset, b'regi', 0, 2, 0)
+        struct.pack_into('<16sQII', image, offset + 16,
+                         uuid.UUID("2DC27766-F623-4200-9D64-115E9BFD4A08").bytes_le, bat_offset, mib, 1)
+        struct.pack_into('<16sQII', image, offset + 48,
+                         uuid.UUID("8B7CA206-4790-4B9A-B8FE-575F050F886E").bytes_le, metadata_offset, mib, 1)
+    struct.pack_into('<8sHH', image, metadata_offset, b'metadata', 0, 3)
+    items = (("CAA16737-FA36-4D43-B3B6-33F0AA44E76B", struct.pack('<II', block, 0)),
+             ("2FA54224-CD1B-4876-B211-5DBED83BF4B8", struct.pack('<Q', len(disk))),
+             ("8141BF1D-A96F-4709-BA47-F233A8FAAB5F", struct.pack('<I', sector_size)))
+    for index, (guid, value) in enumerate(items):
+        position = 64 * 1024 + 64 * index
+        struct.pack_into('<16sIIII', image, metadata_offset + 32 + 32 * index, uuid.UUID(guid).bytes_le,
+                         position, len(value), 0, 0)
+        image[metadata_offset + position:metadata_offset + position + len(value)] = value
+    chunk_ratio = (1 << 23) * sector_size // block
+    for index in range(-(-len(disk) // block)):
+        chunk = disk[index * block:(index + 1) * block]
+        entry = bat_offset + 8 * (index + index // chunk_ratio)
+        if not any(chunk):
+            struct.pack_into('<Q', image, entry, 0 if index % 2 else 2)
+            continue
+        struct.pack_into('<Q', image, entry, len(image) | 6)
+        image += bytes(chunk).ljust(block, b'\0')
+    return bytes(image)
+
+def vmdk_sparse_image(disk, grain=128, table_entries=512, compressed=False):
+    """Разреженный экстент VMDK (monolithicSparse или streamOptimized при compressed)"""
+    grain_size = grain * 512
+    grains = -(-len(disk) // grain_size)
+    tables = -(-grains // table_entries)
+    table_sectors = table_entries * 4 // 512
+    directory = [1 + -(-tables * 4 // 512) + i * table_sectors for i in range(tables)]
+    data_start = -(-(directory[0] + tables * table_sectors) // grain) * grain
+    image = bytearray(data_start * 512)
+    entries = [0] * (tables * table_entries)
+    for index in range(grains):
+        chunk = disk[index * grain_size:(index + 1) * grain_size]
+        if not any(chunk):
+            if index % 5 == 0:
+                entries[index] = 1
+            continue
+        entries[index] = len(image) // 512
+        if compressed:
+            packed = zlib.compress(chunk)
+            record = struct.pack('<QI', index * grain, len(packed)) + packed
+            image += record + bytes(-len(record) % 512)
+        else:
+            image += chunk
+    header = struct.pack('<4sIIQQQQIQQQB4sH', b'KDMV', 3 if compressed else 1, 0x10003 if compressed else 3,
+                         len(disk) // 512, grain, 0, 0, table_entries, 0, 1, data_start, 0, b'\n \r\n',
+                         1 if compressed else 0)
+    image[:len(header)] = header
+    image[512:512 + 4 * tables] = struct.pack(f'<{tables}I', *directory)
+    image[directory[0] * 512:(directory[0] + tables * table_sectors) * 512] = \
+        struct.pack(f'<{len(entries)}I', *entries)
+    return bytes(image)
+
+def vmdk_descriptor(path, disk):
+    """Дескриптор VMDK с двумя экстентами: первая половина FLAT, вторая - разреженный экстент"""
+    base = path.with_suffix("")
+    half = len(disk) // 2 // 512 * 512
+    flat, sparse = path.with_name(base.name + "-f001.vmdk"), path.with_name(base.name + "-s002.vmdk")
+    flat.write_bytes(disk[:half])
+    sparse.write_bytes(vmdk_sparse_image(disk[half:]))
+    path.write_text('# Disk DescriptorFile\nversion=1\nCID=12345678\nparentCID=ffffffff\n'
+                    'createType="monolithicFlat"\n\n# Extent description\n'
+                    f'RW {half // 512} FLAT "{flat.name}" 0\n'
+                    f'RW {(len(disk) - half) // 512} SPARSE "{sparse.name}"\n')
+    return path
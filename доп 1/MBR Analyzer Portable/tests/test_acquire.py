@@ -0,0 +1,98 @@
+"""Снятие загрузочных секторов: чтение по секторам, снимки, параллельный опрос, команда acquire"""
+import json
+import os
+import threading
+
+import mbr_analyzer
+from images import ebr_image, gpt_image
+
+def test_device_reads_are_aligned_and_remembered(tmp_path):
+    path = tmp_path / "disk.img"
+    data = os.urandom(64 * 1024)
+    path.write_bytes(data)
+
+    with mbr_analyzer.DeviceImage(str(path), sector_size=512) as device:
+        assert device.size == len(data)
+        assert device.read(700, 1000) == data[700:1700]
+        assert device.reads == 1 and device.bytes_read == 1536
+        # Повторное чтение тех же секторов не идет на устройство
+        assert device.read(512, 512) == data[512:1024]
+        assert device.reads == 1
+        # Соседние секторы - одним запросом, уже прочитанные пропускаются: 0, 4-5 и 100
+        device.prefetch([0, 1, 2, 3, 4, 5, 100])
+        assert device.reads == 4
+        assert device.read(len(data) - 10, 100) == data[-10:]
+
+        snapshot = tmp_path / "snapshot.img"
+        device.write_snapshot(str(snapshot))
+    content = snapshot.read_bytes()
+    assert len(content) == len(data)
+    assert content[:3072] == data[:3072] and content[3072:51200] == bytes(48128)
+    assert content[51200:51712] == data[51200:51712]
+
+def test_acquire_reads_only_needed_sectors(tmp_path):
+    disk = tmp_path / "gpt.img"
+    disk.write_bytes(gpt_image())
+    logical = tmp_path / "ebr.img"
+    logical.write_bytes(ebr_image(3))
+
+    found = {path: (result, image) for path, result, image in
+             mbr_analyzer.acquire_devices([str(disk), str(logical)], 2, 10, direct=False, sector_size=None,
+                                          analyze_options={}, engine=mbr_analyzer.load_signature_engine(),
+                                          rule_set=mbr_analyzer.load_rule_set())}
+
+    result, image = found[str(disk)]
+    assert result["sections"]["gpt"] == mbr_analyzer.analyze(str(disk))["sections"]["gpt"]
+    assert result["acquisition"]["sector_size"] == 512
+    assert result["acquisition"]["bytes_read"] < 64 * 1024
+    assert "rules_fired" in result
+
+    result, image = found[str(logical)]
+    assert [p["index"] for p in result["sections"]["extended"]["partitions"]] == [5, 6, 7]
+    assert set(image.sectors) >= {0, 2048 * 512, 2148 * 512, 2248 * 512}
+
+def test_hung_device_times_out(tmp_path, monkeypatch):
+    fast = tmp_path / "fast.img"
+    fast.write_bytes(gpt_image())
+    release = threading.Event()
+    original = mbr_analyzer.acquire_device
+
+    def acquire(path, **options):
+        if path.endswith("hung.img"):
+            release.wait(5)
+        return original(path, **options)
+    monkeypatch.setattr(mbr_analyzer, "acquire_device", acquire)
+
+    try:
+        results = {path: result for path, result, _ in
+                   mbr_analyzer.acquire_devices([str(tmp_path / "hung.img"), str(fast)], 1, 0.3, direct=False,
+                                                sector_size=None, analyze_options={},
+                                                engine=mbr_analyzer.load_signature_engine(), rule_set=None)}
+    finally:
+        release.set()
+
+    assert results[str(tmp_path / "hung.img")]["error"].startswith("Устройство не ответило")
+    assert "error" not in results[str(fast)]
+
+def test_acquire_cli(tmp_path, capsys):
+    for name in ("a.img", "b.img"):
+        (tmp_path / name).write_bytes(gpt_image())
+    snapshots, stream = tmp_path / "snapshots", tmp_path / "out.ndjson"
+
+    code = mbr_analyzer.main(["acquire", str(tmp_path / "*.img"), "-o", str(snapshots), "--ndjson", str(stream)])
+
+    assert code == 0
+    records = [json.loads(line) for line in stream.read_text(encoding='utf-8').splitlines()]
+    assert sorted(r["filename"] for r in records) == ["a.img", "b.img"]
+    names = sorted(os.listdir(snapshots))
+    assert len(names) == 2 and all(name.endswith("_a.img.img") or name.endswith("_b.img.img") for name in names)
+    snapshot = snapshots / names[0]
+    assert snapshot.stat().st_size == len(gpt_image())
+    assert mbr_analyzer.analyze(str(snapshot))["sections"]["gpt"]["partitions"] == \
+        records[0]["sections"]["gpt"]["partitions"]
+    assert "Устройств: 2 (ошибок: 0)" in capsys.readouterr().out
+
+def test_acquire_cli_errors(tmp_path, capsys):
+    assert mbr_analyzer.main(["acquire", str(tmp_path / "missing.img")]) == 1
+    assert "ОШИБКА" in capsys.readouterr().out
+    assert mbr_analyzer.main(["acquire", str(tmp_path / "none*.img")]) == 2
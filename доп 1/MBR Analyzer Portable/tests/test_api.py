@@ -0,0 +1,71 @@
+"""Библиотечный API analyze(): источники данных, ошибки, отсутствие глобального состояния"""
+import os
+
+import mbr_analyzer
+from images import NT6_BOOT_CODE, mbr_sector, partition_entry
+
+SECTOR = mbr_sector([partition_entry(0x07, 2048, 4096, bootable=True), partition_entry(0x83, 6144, 2048)],
+                    NT6_BOOT_CODE)
+
+def without_source(result):
+    """Результат без полей, зависящих от источника и времени"""
+    return {key: value for key, value in result.items() if key not in ("filename", "full_path", "timestamp")}
+
+def test_sources_give_same_result(tmp_path):
+    path = tmp_path / "disk.bin"
+    path.write_bytes(SECTOR)
+
+    from_bytes = mbr_analyzer.analyze(SECTOR)
+    from_str = mbr_analyzer.analyze(str(path))
+    from_pathlike = mbr_analyzer.analyze(path)
+    with open(path, 'rb') as f:
+        f.seek(17)
+        from_fd = mbr_analyzer.analyze(f.fileno())
+        # Позиция чужого дескриптора не меняется
+        assert f.tell() == 17
+        assert from_fd["full_path"] == f"fd:{f.fileno()}"
+
+    assert from_str["full_path"] == str(path)
+    assert without_source(from_bytes) == without_source(from_str) == without_source(from_pathlike) \
+        == without_source(from_fd)
+    partitions = from_bytes["sections"]["partition_table"]["partitions"]
+    assert [p["status"] for p in partitions] == ["Заполнен", "Заполнен", "Пустой", "Пустой"]
+    assert partitions[0]["bootable"] and partitions[0]["lba_start"] == 2048
+
+def test_errors_are_returned_not_raised(tmp_path):
+    short = mbr_analyzer.analyze(b'\x00' * 100, name="short")
+    assert "error" in short and short["full_path"] == "short"
+
+    missing = mbr_analyzer.analyze(str(tmp_path / "missing.bin"))
+    assert "error" in missing and missing["filename"] == "missing.bin"
+
+def test_no_console_output(capsys):
+    mbr_analyzer.analyze(SECTOR)
+    captured = capsys.readouterr()
+    assert captured.out == "" and captured.err == ""
+
+def test_results_are_independent():
+    first = mbr_analyzer.analyze(SECTOR, name="first")
+    second = mbr_analyzer.analyze(SECTOR, name="second")
+
+    first["sections"]["partition_table"]["partitions"][0]["analysis"].append("изменено")
+    first["sections"]["boot_code"]["disassembly"]["interrupts"].clear()
+    first["warnings"].append("изменено")
+
+    third = mbr_analyzer.analyze(SECTOR, name="third")
+    for result in (second, third):
+        assert "изменено" not in result["sections"]["partition_table"]["partitions"][0]["analysis"]
+        assert result["sections"]["boot_code"]["disassembly"]["interrupts"]
+        assert "изменено" not in result["warnings"]
+    assert second["full_path"] == "second"
+
+def test_hex_dump_optional():
+    assert len(mbr_analyzer.analyze(SECTOR)["hex_dump"]) == 32
+    assert "hex_dump" not in mbr_analyzer.analyze(SECTOR, include_hex_dump=False)
+
+def test_large_file_analyzes_first_sector(tmp_path):
+    path = tmp_path / "image.bin"
+    path.write_bytes(SECTOR + os.urandom(4096))
+    result = mbr_analyzer.analyze(str(path))
+    assert "error" not in result
+    assert without_source(result)["sections"] == without_source(mbr_analyzer.analyze(SECTOR))["sections"]
@@ -0,0 +1,63 @@
+"""Пакетный режим: batch по каталогам и маскам, пул процессов, коды возврата"""
+import json
+
+import mbr_analyzer
+from images import NT6_BOOT_CODE, mbr_sector, partition_entry
+
+def make_dumps(directory, count):
+    """count дампов сектора 0 с разными разделами в двух подкаталогах"""
+    paths = []
+    for index in range(count):
+        sub = directory / ("a" if index % 2 else "b")
+        sub.mkdir(parents=True, exist_ok=True)
+        path = sub / f"disk{index}.bin"
+        path.write_bytes(mbr_sector([partition_entry(0x07, 2048, 1000 + index, bootable=True)], NT6_BOOT_CODE))
+        paths.append(path)
+    return paths
+
+def read_ndjson(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+def test_batch_writes_one_json_per_input(tmp_path):
+    make_dumps(tmp_path / "in", 6)
+    # Одинаковые имена в разных каталогах не должны затирать друг друга
+    (tmp_path / "in" / "a" / "same.bin").write_bytes(mbr_sector())
+    (tmp_path / "in" / "b" / "same.bin").write_bytes(mbr_sector())
+    output = tmp_path / "out"
+
+    code = mbr_analyzer.main(["batch", str(tmp_path / "in"), "-o", str(output), "-j", "1"])
+
+    assert code == 0
+    files = sorted(output.iterdir())
+    assert len(files) == 8
+    results = [json.loads(path.read_text(encoding='utf-8')) for path in files]
+    assert sum(result["filename"] == "same.bin" for result in results) == 2
+
+def test_batch_pool_matches_single_process(tmp_path):
+    make_dumps(tmp_path / "in", 40)
+    single, pooled = tmp_path / "single.ndjson", tmp_path / "pooled.ndjson"
+
+    assert mbr_analyzer.main(["batch", str(tmp_path / "in"), "--ndjson", str(single), "-j", "1"]) == 0
+    assert mbr_analyzer.main(["batch", str(tmp_path / "in"), "--ndjson", str(pooled), "-j", "3"]) == 0
+
+    def by_path(path):
+        return {record["full_path"]: record["sections"]["partition_table"] for record in read_ndjson(path)}
+    assert len(by_path(single)) == 40
+    assert by_path(single) == by_path(pooled)
+
+def test_batch_glob_and_errors(tmp_path, capsys):
+    make_dumps(tmp_path, 4)
+    (tmp_path / "a" / "short.bin").write_bytes(b'\x00' * 100)
+    stream = tmp_path / "out.ndjson"
+
+    code = mbr_analyzer.main(["batch", str(tmp_path / "**" / "*.bin"), "--ndjson", str(stream), "-j", "2"])
+
+    assert code == 1
+    records = read_ndjson(stream)
+    assert len(records) == 5
+    assert [r["filename"] for r in records if "error" in r] == ["short.bin"]
+    assert "short.bin" in capsys.readouterr().err
+
+def test_batch_without_inputs_fails(tmp_path, capsys):
+    assert mbr_analyzer.main(["batch", str(tmp_path / "missing*.bin"), "-o", str(tmp_path / "out")]) == 2
+    assert "ОШИБКА" in capsys.readouterr().err
@@ -0,0 +1,70 @@
+"""Замеры производительности: воспроизводимый корпус, сравнение с прошлым прогоном, короткий прогон"""
+import json
+import random
+
+import bench
+import mbr_analyzer
+
+def test_corpus_is_reproducible():
+    engine = mbr_analyzer.load_signature_engine()
+    first, mix = bench.generate_sectors(7, 200, engine)
+    second, _ = bench.generate_sectors(7, 200, engine)
+    other, _ = bench.generate_sectors(8, 200, engine)
+    assert first == second and first != other
+    assert sum(mix.values()) == 200 and set(mix) <= {kind for kind, _ in bench.SECTOR_MIX}
+    assert all(len(sector) == 512 for sector in first)
+
+def test_corpus_images_are_valid(tmp_path):
+    engine = mbr_analyzer.load_signature_engine()
+    rng = random.Random(1)
+    gpt_path = tmp_path / "gpt.img"
+    gpt_path.write_bytes(bench.build_gpt_image(rng, engine, 128, 10))
+    ebr = tmp_path / "ebr.img"
+    ebr.write_bytes(bench.build_ebr_image(rng, engine, 5))
+
+    result = mbr_analyzer.analyze(str(gpt_path), include_hex_dump=False)
+    assert "error" not in result
+    gpt = result["sections"]["gpt"]
+    assert gpt["issues"] == [] and len(gpt["partitions"]) == 10
+    result = mbr_analyzer.analyze(str(ebr), include_hex_dump=False)
+    assert "error" not in result
+    extended = result["sections"]["extended"]
+    assert extended["issues"] == [] and len(extended["partitions"]) == 5
+
+def test_compare_marks_regressions():
+    current = {"cases": {"parse": {"items_per_s": 800.0}, "scan": {"items_per_s": 1500.0},
+                         "decode": {"items_per_s": 1000.0}, "new": {"items_per_s": 5.0}}}
+    baseline = {"cases": {"parse": {"items_per_s": 1000.0}, "scan": {"items_per_s": 1000.0},
+                          "decode": {"items_per_s": 1050.0}}}
+    lines, regressions = bench.compare_results(current, baseline, 0.10)
+    assert regressions == 1
+    assert len(lines) == 3
+    assert "РЕГРЕССИЯ" in lines[0] and "быстрее" in lines[1] and lines[2].rstrip().endswith("x0.95")
+
+def test_short_run_saves_and_compares(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(bench, "CORPUS_SECTORS", 50)
+    output = tmp_path / "results.json"
+    assert bench.main_bench(["--inline", "--repeat", "1", "--only", "decode", "parse-nohex",
+                             "-o", str(output)]) == 0
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["analyzer_version"] == mbr_analyzer.ANALYZER_VERSION
+    assert set(report["cases"]) == {"decode", "parse-nohex"}
+    parse = report["cases"]["parse-nohex"]
+    assert parse["items"] == 50 and parse["bytes"] == 50 * 512
+    assert parse["latency_us"]["p50"] <= parse["latency_us"]["p99"]
+    assert "✓ Результаты сохранены" in capsys.readouterr().out
+
+    # Тот же корпус при сравнении, другой - с предупреждением
+    baseline = dict(report, cases={name: dict(case, items_per_s=case["items_per_s"] * 1000)
+                                   for name, case in report["cases"].items()})
+    output.write_text(json.dumps(baseline), encoding="utf-8")
+    assert bench.main_bench(["--inline", "--repeat", "1", "--only", "decode", "--compare", str(output)]) == 1
+    captured = capsys.readouterr()
+    assert "РЕГРЕССИЯ" in captured.out and "корпус отличается" not in captured.out
+    assert bench.main_bench(["--inline", "--repeat", "1", "--only", "decode", "--seed", "2",
+                             "--compare", str(output)]) == 1
+    assert "корпус отличается" in capsys.readouterr().out
+
+def test_compare_with_unreadable_baseline(tmp_path, capsys):
+    assert bench.main_bench(["--compare", str(tmp_path / "missing.json")]) == 2
+    assert "ОШИБКА" in capsys.readouterr().err
@@ -0,0 +1,119 @@
+"""Кэш результатов по хэшу сектора: попадания, лимит размера, вытеснение, версия"""
+import json
+import sqlite3
+from contextlib import closing
+
+import mbr_analyzer
+from images import NT6_BOOT_CODE, mbr_sector, partition_entry
+
+def row_count(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+def test_limit_holds_after_every_put(tmp_path):
+    path = tmp_path / "cache.db"
+    with mbr_analyzer.ResultCache(str(path), max_entries=10) as cache:
+        for i in range(35):
+            cache.put(bytes([i]), {"i": i})
+            assert row_count(path) == min(i + 1, 10)
+        # Перезапись существующего ключа не увеличивает размер
+        cache.put(bytes([34]), {"i": "new"})
+        assert row_count(path) == 10
+        assert cache.get(bytes([34])) == {"i": "new"}
+        assert cache.stats()["evictions"] == 25
+
+def test_least_recently_used_is_evicted(tmp_path):
+    with mbr_analyzer.ResultCache(str(tmp_path / "cache.db"), max_entries=3) as cache:
+        for key in (b'a', b'b', b'c'):
+            cache.put(key, key.decode())
+        assert cache.get(b'a') == "a"
+        cache.put(b'd', "d")
+        assert cache.get(b'b') is None
+        assert [cache.get(key) for key in (b'a', b'c', b'd')] == ["a", "c", "d"]
+
+def test_smaller_limit_on_reopen_and_version_reset(tmp_path):
+    path = str(tmp_path / "cache.db")
+    with mbr_analyzer.ResultCache(path, max_entries=100) as cache:
+        for i in range(50):
+            cache.put(bytes([i]), i)
+    with mbr_analyzer.ResultCache(path, max_entries=20) as cache:
+        assert row_count(path) == 20
+        assert cache.get(bytes([49])) == 49
+    with mbr_analyzer.ResultCache(path, version="другая") as cache:
+        assert row_count(path) == 0
+        assert cache.get(bytes([49])) is None
+
+def last_used(path):
+    # Соединение закрывается: процессы пула не должны наследовать открытую базу
+    with closing(sqlite3.connect(path)) as conn:
+        return dict(conn.execute("SELECT hash, last_used FROM results"))
+
+def test_hits_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    with mbr_analyzer.ResultCache(path, touch_batch=3) as cache:
+        for key in (b'a', b'b', b'c'):
+            cache.put(key, key.decode())
+        stored = last_used(path)
+        cache.get(b'a')
+        cache.get(b'b')
+        assert last_used(path) == stored
+        cache.get(b'c')
+        touched = last_used(path)
+        assert all(touched[key] > stored[key] for key in stored)
+        cache.get(b'a')
+    # Остаток пачки записывается при закрытии
+    assert last_used(path)[b'a'] > touched[b'a']
+
+def test_cached_result_equals_fresh(tmp_path):
+    sector = mbr_sector([partition_entry(0x07, 2048, 4096, bootable=True)], NT6_BOOT_CODE)
+    with mbr_analyzer.ResultCache(str(tmp_path / "cache.db")) as cache:
+        first = mbr_analyzer.analyze(sector, name="one", cache=cache)
+        second = mbr_analyzer.analyze(sector, name="two", cache=cache)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    fresh = mbr_analyzer.analyze(sector, name="two")
+    for result in (first, second, fresh):
+        result.pop("timestamp")
+    assert second["full_path"] == "two"
+    assert json.loads(json.dumps(fresh)) == second
+
+def write_dumps(directory, count):
+    paths = []
+    for i in range(count):
+        path = directory / f"{i:03d}.bin"
+        path.write_bytes(mbr_sector([partition_entry(0x83, 2048, 100 + i)]))
+        paths.append(str(path))
+    return paths
+
+def test_batch_cache_limit_across_processes(tmp_path):
+    write_dumps(tmp_path, 60)
+    cache = tmp_path / "cache.db"
+    args = ["batch", str(tmp_path / "*.bin"), "--ndjson", str(tmp_path / "out.ndjson"),
+            "--cache", str(cache), "--cache-size", "25", "-j", "3"]
+
+    assert mbr_analyzer.main(args) == 0
+    assert row_count(cache) == 25
+
+def test_batch_reuses_cached_sectors(tmp_path, capsys):
+    paths = write_dumps(tmp_path, 60)
+    cache = str(tmp_path / "cache.db")
+
+    def run(inputs):
+        assert mbr_analyzer.main(["batch", *inputs, "--ndjson", str(tmp_path / "out.ndjson"),
+                                  "--cache", cache, "--cache-size", "25", "-j", "1"]) == 0
+        return capsys.readouterr().out
+
+    assert "попаданий 0, промахов 60" in run(paths)
+    # В кэше остались 25 последних секторов
+    assert "попаданий 25, промахов 0" in run(paths[35:])
+    assert "попаданий 0, промахов 1" in run(paths[:1])
+
+def test_pool_workers_write_hits_on_exit(tmp_path):
+    paths = write_dumps(tmp_path, 20)
+    cache = str(tmp_path / "cache.db")
+    args = ["batch", *paths, "--ndjson", str(tmp_path / "out.ndjson"), "--cache", cache, "-j", "2"]
+    assert mbr_analyzer.main(args) == 0
+    stored = last_used(cache)
+    assert mbr_analyzer.main(args) == 0
+    touched = last_used(cache)
+    assert len(touched) == 20 and all(touched[key] > stored[key] for key in stored)
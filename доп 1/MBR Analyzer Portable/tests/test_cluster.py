@@ -0,0 +1,90 @@
+"""Кластеризация похожих загрузочных кодов: MinHash, индекс LSH, команда cluster"""
+import json
+import random
+
+import pytest
+
+import mbr_analyzer
+from images import mbr_sector, partition_entry
+
+def random_code(seed):
+    return random.Random(seed).randbytes(446)
+
+def patched(code, seed, count):
+    """Вариант кода с count измененными байтами"""
+    rng = random.Random(seed)
+    data = bytearray(code)
+    for offset in rng.sample(range(len(data)), count):
+        data[offset] ^= 0xFF
+    return bytes(data)
+
+def jaccard(a, b, ngram=4):
+    first = {a[i:i + ngram] for i in range(len(a) - ngram + 1)}
+    second = {b[i:i + ngram] for i in range(len(b) - ngram + 1)}
+    return len(first & second) / len(first | second)
+
+@pytest.mark.parametrize("count", [1, 5, 20, 60])
+def test_minhash_estimates_jaccard(count):
+    base = random_code(1)
+    variant = patched(base, count, count)
+    estimate = mbr_analyzer.minhash_similarity(mbr_analyzer.boot_code_minhash(base),
+                                               mbr_analyzer.boot_code_minhash(variant))
+    assert estimate == pytest.approx(jaccard(base, variant), abs=0.15)
+
+@pytest.mark.parametrize("ngram", [1, 2, 3, 4])
+def test_signature_shape(ngram):
+    signature = mbr_analyzer.boot_code_minhash(random_code(2), 32, ngram)
+    assert len(signature) == 32
+    assert mbr_analyzer.minhash_similarity(signature, mbr_analyzer.boot_code_minhash(random_code(2), 32, ngram)) == 1
+    other = mbr_analyzer.boot_code_minhash(random_code(3), 32, ngram)
+    # Однобайтовые n-граммы двух случайных кодов почти совпадают - различие видно только с ngram >= 2
+    assert mbr_analyzer.minhash_similarity(signature, other) < (1.0 if ngram == 1 else 0.5)
+
+def test_similar_codes_are_grouped():
+    families = [random_code(10), random_code(11), random_code(12)]
+    codes = [patched(base, seed, 3) for base in families for seed in range(6)]
+    codes.append(random_code(13))
+    signatures = [mbr_analyzer.boot_code_minhash(code) for code in codes]
+
+    clusters = mbr_analyzer.cluster_boot_codes(signatures)
+
+    assert sorted(map(sorted, clusters)) == [list(range(0, 6)), list(range(6, 12)), list(range(12, 18)), [18]]
+    assert [len(cluster) for cluster in clusters] == [6, 6, 6, 1]
+
+def test_threshold_separates_distant_variants():
+    base = random_code(20)
+    variant = patched(base, 1, 10)
+    signatures = [mbr_analyzer.boot_code_minhash(base), mbr_analyzer.boot_code_minhash(variant)]
+    assert 0.7 < jaccard(base, variant) < 0.99
+    assert len(mbr_analyzer.cluster_boot_codes(signatures, threshold=0.5)) == 1
+    assert len(mbr_analyzer.cluster_boot_codes(signatures, threshold=0.99)) == 2
+
+def test_cluster_cli_report(tmp_path, capsys):
+    table = [partition_entry(0x07, 2048, 1000, bootable=True)]
+    family = random_code(30)
+    for index in range(4):
+        (tmp_path / f"oem{index}.bin").write_bytes(mbr_sector(table, patched(family, index, 2)))
+    # Два одинаковых образа - один вариант кода
+    (tmp_path / "copy.bin").write_bytes(mbr_sector(table, patched(family, 0, 2)))
+    (tmp_path / "other.bin").write_bytes(mbr_sector(table, random_code(31)))
+    (tmp_path / "empty.bin").write_bytes(mbr_sector(table))
+    report = tmp_path / "clusters.json"
+
+    code = mbr_analyzer.main(["cluster", str(tmp_path), "-o", str(report), "-j", "1", "--outliers", "5"])
+
+    assert code == 0
+    data = json.loads(report.read_text(encoding='utf-8'))
+    assert (data["files"], data["empty"], data["errors"], data["variants"]) == (7, 1, 0, 5)
+    first, second = data["clusters"]
+    assert (first["id"], first["images"], first["variants"]) == (1, 5, 4)
+    assert first["representative"]["images"] == 2
+    assert sorted(first["representative"]["paths"]) == [str(tmp_path / "copy.bin"), str(tmp_path / "oem0.bin")]
+    assert len(first["outliers"]) == 3 and all(o["similarity"] < 1.0 for o in first["outliers"])
+    assert (second["images"], second["variants"]) == (1, 1)
+    assert "кластеров: 2" in capsys.readouterr().out
+
+def test_cluster_cli_errors(tmp_path, capsys):
+    assert mbr_analyzer.main(["cluster", str(tmp_path / "missing*.bin")]) == 2
+    (tmp_path / "disk.bin").write_bytes(mbr_sector())
+    assert mbr_analyzer.main(["cluster", str(tmp_path), "--threshold", "0"]) == 2
+    assert "ОШИБКА" in capsys.readouterr().err
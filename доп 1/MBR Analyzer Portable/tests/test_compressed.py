@@ -0,0 +1,130 @@
+"""Сжатые образы gzip/xz/zstd: произвольный доступ, анализ без полной распаковки, индекс в кэше"""
+import gzip
+import lzma
+import os
+import random
+
+import pytest
+
+import mbr_analyzer
+from images import gpt_image
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    """Отдельный каталог кэша на тест"""
+    directory = tmp_path / "cache"
+    monkeypatch.setenv(mbr_analyzer.CACHE_DIR_ENV, str(directory))
+    return directory
+
+def guest_disk():
+    """Диск GPT на 3 МБ с псевдослучайными данными в середине"""
+    disk = gpt_image(disk_sectors=6144)
+    disk[1024 * 1024:2 * 1024 * 1024] = random.Random(1).randbytes(1024 * 1024)
+    return bytes(disk)
+
+def compress(directory, fmt, data):
+    if fmt == "gzip":
+        # Несколько членов gzip - несколько точек входа
+        path = directory / "disk.img.gz"
+        path.write_bytes(b''.join(gzip.compress(data[i:i + 1024 * 1024]) for i in range(0, len(data), 1024 * 1024)))
+    elif fmt == "xz":
+        path = directory / "disk.img.xz"
+        path.write_bytes(lzma.compress(data))
+    else:
+        zstandard = pytest.importorskip("zstandard")
+        path = directory / "disk.img.zst"
+        path.write_bytes(zstandard.ZstdCompressor().compress(data))
+    return path
+
+@pytest.mark.parametrize("fmt", ["gzip", "xz", "zstd"])
+def test_reads_match_raw_image(tmp_path, fmt):
+    disk = guest_disk()
+    path = compress(tmp_path, fmt, disk)
+    assert mbr_analyzer.detect_image_format(str(path)) == fmt
+
+    with mbr_analyzer.open_image(str(path)) as image:
+        assert isinstance(image, mbr_analyzer.CompressedImage)
+        for offset, size in ((0, 512), (1024 * 1024 - 100, 300), (2 * 1024 * 1024 + 7, 5000),
+                             (len(disk) - 10, 100), (len(disk) + 10, 100)):
+            assert image.read(offset, size) == disk[offset:offset + size]
+        assert image.size == len(disk)
+
+    raw = tmp_path / "disk.img"
+    raw.write_bytes(disk)
+    compressed, plain = mbr_analyzer.analyze(str(path)), mbr_analyzer.analyze(str(raw))
+    assert compressed["sections"]["gpt"] == plain["sections"]["gpt"]
+
+def test_analyze_does_not_decompress_whole_gzip(tmp_path, monkeypatch):
+    path = compress(tmp_path, "gzip", guest_disk())
+    opened = []
+    original = mbr_analyzer.CompressedImage.__init__
+
+    def remember(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        opened.append(self)
+    monkeypatch.setattr(mbr_analyzer.CompressedImage, "__init__", remember)
+
+    result = mbr_analyzer.analyze(str(path))
+
+    assert "error" not in result
+    assert opened and not any(image.size_known for image in opened)
+
+def test_index_is_saved_in_cache_dir(tmp_path, cache_home):
+    path = compress(tmp_path, "gzip", guest_disk())
+    with mbr_analyzer.open_image(str(path)) as image:
+        size = image.size
+        index_path = image.index_path
+
+    assert os.path.dirname(os.path.dirname(index_path)) == str(cache_home)
+    assert os.path.isfile(index_path)
+    assert sorted(os.listdir(tmp_path)) == ["cache", "disk.img.gz"]
+
+    # Следующее открытие знает размер без распаковки
+    with mbr_analyzer.open_image(str(path)) as image:
+        assert image.size_known and image.size == size
+
+    # Измененный образ не использует устаревший индекс
+    path.write_bytes(gzip.compress(bytes(4096)))
+    with mbr_analyzer.open_image(str(path)) as image:
+        assert not image.size_known and image.size == 4096
+
+def test_index_keeps_seek_points_inside_gzip_member(tmp_path, monkeypatch):
+    monkeypatch.setattr(mbr_analyzer, "COMPRESSED_CHECKPOINT_INTERVAL", 256 * 1024)
+    rng = random.Random(2)
+    words = [rng.randbytes(rng.randrange(3, 12)) for _ in range(300)]
+    disk = gpt_image(disk_sectors=8192)
+    disk[64 * 512:-64 * 512] = b''.join(rng.choice(words) for _ in range(700000))[:len(disk) - 128 * 512]
+    disk = bytes(disk)
+    # Один член gzip - без точек внутри члена читать пришлось бы с начала
+    path = tmp_path / "disk.img.gz"
+    path.write_bytes(gzip.compress(disk))
+    with mbr_analyzer.open_image(str(path)) as image:
+        assert image.size == len(disk)
+
+    readers = []
+    original = mbr_analyzer.CompressedStreamReader.__init__
+
+    def remember(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        readers.append(self.position)
+    monkeypatch.setattr(mbr_analyzer.CompressedStreamReader, "__init__", remember)
+
+    with mbr_analyzer.open_image(str(path)) as image:
+        offset = len(disk) - 300 * 1024
+        assert image.read(offset, 200 * 1024) == disk[offset:offset + 200 * 1024]
+        assert image.read(len(disk) - 100, 200) == disk[-100:]
+    assert readers and 2 * 1024 * 1024 < min(readers) <= offset
+
+def test_empty_cache_env_disables_index(tmp_path, monkeypatch):
+    monkeypatch.setenv(mbr_analyzer.CACHE_DIR_ENV, "")
+    path = compress(tmp_path, "xz", guest_disk())
+    with mbr_analyzer.open_image(str(path)) as image:
+        assert image.index_path is None
+        assert image.size == 3 * 1024 * 1024
+    assert sorted(os.listdir(tmp_path)) == ["disk.img.xz"]
+
+def test_corrupt_image_is_reported(tmp_path):
+    path = tmp_path / "broken.img.gz"
+    path.write_bytes(gzip.compress(bytes(512))[:10] + b'\xff' * 100)
+    result = mbr_analyzer.analyze(str(path))
+    assert "ошибка распаковки" in result["error"]
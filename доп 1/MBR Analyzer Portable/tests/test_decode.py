@@ -0,0 +1,47 @@
+"""Пакетный декодер таблиц разделов по столбцам против разбора по одному сектору"""
+import random
+
+import mbr_analyzer
+from images import mbr_sector, partition_entry
+
+def random_sectors(count, seed=1):
+    rng = random.Random(seed)
+    sectors = []
+    for _ in range(count):
+        entries = [partition_entry(rng.choice((0x00, 0x07, 0x0F, 0x83, 0xEE)), rng.getrandbits(32),
+                                   rng.getrandbits(32), rng.random() < 0.3,
+                                   tuple(rng.getrandbits(8) for _ in range(3)),
+                                   tuple(rng.getrandbits(8) for _ in range(3)))
+                   for _ in range(rng.randint(0, 4))]
+        sectors.append(mbr_sector(entries, rng.randbytes(446), rng.choice((b'\x55\xaa', b'\x00\x00'))))
+    return sectors
+
+def test_columns_match_per_sector_parser():
+    sectors = random_sectors(300)
+    columns = mbr_analyzer.decode_partition_tables(b''.join(sectors))
+
+    assert columns["count"] == 1200
+    for i in range(columns["count"]):
+        expected = mbr_analyzer.parse_partition_table(sectors[i // 4][446:510])[i % 4]
+        row = mbr_analyzer.render_partition_row(columns, i)
+        assert row.pop("sector_index") == i // 4
+        assert row == expected
+    assert list(columns["signature_valid"]) == [sector[510:] == b'\x55\xaa' for sector in sectors]
+
+def test_chs_high_cylinder_bits():
+    sector = mbr_sector([partition_entry(0x07, 63, 100, chs_start=(1, 0xC1, 0xFF), chs_end=(254, 0xBF, 0x12))])
+    columns = mbr_analyzer.decode_partition_tables(sector)
+    assert columns["chs_start"]["cylinder"][0] == 1023 and columns["chs_start"]["sector"][0] == 1
+    assert columns["chs_end"]["cylinder"][0] == 0x212 and columns["chs_end"]["sector"][0] == 63
+
+def test_large_sectors_and_partial_tail():
+    sectors = random_sectors(10, seed=2)
+    buf = b''.join(sector + bytes(4096 - 512) for sector in sectors) + b'\x00' * 100
+    columns = mbr_analyzer.decode_partition_tables(buf, sector_size=4096)
+    assert columns["count"] == 40
+    assert list(columns["lba_start"]) == [mbr_analyzer.MBR_ENTRY_STRUCT.unpack_from(s, 446 + 16 * j)[8]
+                                          for s in sectors for j in range(4)]
+
+def test_empty_buffer():
+    columns = mbr_analyzer.decode_partition_tables(b'')
+    assert columns["count"] == 0 and len(columns["type"]) == 0
@@ -0,0 +1,72 @@
+"""Табличный дизассемблер 16-битного загрузочного кода: поток управления, прерывания, дальние переходы"""
+import mbr_analyzer
+from images import GRUB2_BOOT_CODE, NT6_BOOT_CODE, mbr_sector
+
+def disassemble(hex_code):
+    return mbr_analyzer.disassemble_boot_code(bytes.fromhex(hex_code).ljust(446, b'\x00'))
+
+def test_nt6_relocation_is_followed():
+    result = mbr_analyzer.disassemble_boot_code(NT6_BOOT_CODE.ljust(446, b'\x00'))
+
+    # push 061C; retf - переход в перенесенную в 0x0600 копию, дальше INT 13h AH=41h и jmp 0000:7C00
+    assert result["far_jumps"] == [
+        {"offset": 0x1B, "kind": "retf", "segment": 0, "target": 0x061C},
+        {"offset": 0x23, "kind": "jmp", "segment": 0, "target": 0x7C00},
+    ]
+    assert result["interrupts"] == [{"offset": 0x21, "vector": 0x13, "ah": 0x41}]
+    assert result["instructions"] == 17 and result["code_bytes"] == len(NT6_BOOT_CODE)
+    assert result["invalid"] == []
+
+def test_zero_padding_is_not_code():
+    assert disassemble("") == {"instructions": 0, "code_bytes": 0, "interrupts": [], "far_jumps": [], "invalid": []}
+    # Раньше нули засчитывались как инструкции
+    boot_code = mbr_analyzer.analyze(mbr_sector())["sections"]["boot_code"]
+    assert not boot_code["contains_data"]
+
+def test_branches_and_calls():
+    # je +2; int 10h; int 13h; hlt - обе ветви условного перехода
+    result = disassemble("7402CD10CD13F4")
+    assert [i["offset"] for i in result["interrupts"]] == [2, 4]
+    assert result["instructions"] == 4
+
+    # call 0004; hlt; mov ah, 0Eh; int 10h; ret
+    result = disassemble("E80100F4B40ECD10C3")
+    assert result["interrupts"] == [{"offset": 6, "vector": 0x10, "ah": 0x0E}]
+    assert result["instructions"] == 5 and result["code_bytes"] == 9
+
+    # Дальний вызов в 0000:7C10 прослеживается в загруженной копии кода
+    result = disassemble("9A107C0000F4" + "90" * 10 + "B441CD13C3")
+    assert result["far_jumps"] == [{"offset": 0, "kind": "call", "segment": 0, "target": 0x7C10}]
+    assert result["interrupts"] == [{"offset": 0x12, "vector": 0x13, "ah": 0x41}]
+
+def test_near_branch_wraps_at_64k():
+    # 16 x nop; jmp -0x13 (E9 ED FF): цель 0x13 + 0xFFED по модулю 64 КБ - начало кода
+    result = disassemble("90" * 16 + "E9EDFF")
+    assert result["instructions"] == 17 and result["invalid"] == []
+    # jmp short назад за начало кода - цель вне загрузочной области, не ошибка
+    assert disassemble("EB80") == {"instructions": 1, "code_bytes": 2, "interrupts": [], "far_jumps": [],
+                                   "invalid": []}
+
+def test_invalid_and_truncated_instructions():
+    assert disassemble("90900FFF")["invalid"] == [2]
+    truncated = mbr_analyzer.disassemble_boot_code(bytes.fromhex("9090B8"))
+    assert truncated["invalid"] == [2] and truncated["instructions"] == 2
+
+def test_results_do_not_share_cached_state():
+    code = NT6_BOOT_CODE.ljust(446, b'\x00')
+    first = mbr_analyzer.disassemble_boot_code(code)
+    first["far_jumps"][0]["target"] = 0
+    first["interrupts"].clear()
+    first["invalid"].append(1)
+
+    second = mbr_analyzer.disassemble_boot_code(bytearray(code))
+    assert second["far_jumps"][0]["target"] == 0x061C
+    assert second["interrupts"] and second["invalid"] == []
+    assert mbr_analyzer.decode_boot_code.cache_info().hits >= 1
+
+def test_analysis_reports_reachable_code():
+    sector = mbr_sector(code=GRUB2_BOOT_CODE)
+    boot_code = mbr_analyzer.analyze(sector)["sections"]["boot_code"]
+    # jmp short 0x65 ведет в нули: достижим только сам переход
+    assert boot_code["disassembly"]["instructions"] == 1
+    assert " Исполняемый код: 1 инструкций (2 байт) достижимы от смещения 0" in boot_code["analysis"]
@@ -0,0 +1,64 @@
+"""Обход цепочки EBR: логические разделы, циклы, выход за границы, число чтений"""
+import mbr_analyzer
+from images import ebr_image
+
+class CountingImage(mbr_analyzer.BytesImage):
+    """Образ в памяти со счетчиком чтений"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, offset, size):
+        self.reads.append(offset)
+        return super().read(offset, size)
+
+def test_logical_partitions_are_numbered_from_five():
+    result = mbr_analyzer.analyze(bytes(ebr_image(6)))
+    extended = result["sections"]["extended"]
+
+    assert [link["lba"] for link in extended["ebr_chain"]] == [2048 + 100 * i for i in range(6)]
+    assert [p["index"] for p in extended["partitions"]] == [5, 6, 7, 8, 9, 10]
+    # Начало логического раздела задается относительно своего EBR
+    assert [p["lba_start"] for p in extended["partitions"]] == [2048 + 100 * i + 63 for i in range(6)]
+    assert extended["issues"] == []
+    assert result["statistics"]["partitions_logical"] == 6
+
+def test_one_read_per_ebr():
+    image = CountingImage(ebr_image(50))
+    chain = mbr_analyzer.walk_ebr_chain(image, 2048, 5000)
+    assert len(chain["partitions"]) == 50
+    assert image.reads == [(2048 + 100 * i) * 512 for i in range(50)]
+
+def test_cycle_is_detected():
+    chain = mbr_analyzer.walk_ebr_chain(mbr_analyzer.BytesImage(ebr_image(3, link=lambda i: (i + 1) % 3 * 100)),
+                                        2048, 300)
+    assert len(chain["ebr_chain"]) == 3
+    assert any("зациклена" in issue for issue in chain["issues"])
+
+def test_link_outside_extended_partition():
+    chain = mbr_analyzer.walk_ebr_chain(mbr_analyzer.BytesImage(ebr_image(2, link=lambda i: 5000 if i == 0 else None)),
+                                        2048, 200)
+    assert len(chain["partitions"]) == 1
+    assert any("вне расширенного раздела" in issue for issue in chain["issues"])
+
+def test_chain_limit():
+    chain = mbr_analyzer.walk_ebr_chain(mbr_analyzer.BytesImage(ebr_image(10)), 2048, 1000, max_chain=4)
+    assert len(chain["partitions"]) == 4
+    assert any("предел в 4" in issue for issue in chain["issues"])
+
+def test_truncated_image_and_bad_signature():
+    image = ebr_image(4)
+    image[(2048 + 200) * 512 + 510] = 0
+    result = mbr_analyzer.analyze(bytes(image))
+    assert len(result["sections"]["extended"]["partitions"]) == 2
+    assert any("некорректная сигнатура" in warning for warning in result["warnings"])
+
+    # Образ обрезан до третьего EBR
+    result = mbr_analyzer.analyze(bytes(ebr_image(4)[:(2048 + 200) * 512]))
+    assert len(result["sections"]["extended"]["partitions"]) == 2
+    assert any("за пределами образа" in warning for warning in result["warnings"])
+
+def test_follow_ebr_can_be_disabled():
+    result = mbr_analyzer.analyze(bytes(ebr_image(3)), follow_ebr=False)
+    assert "extended" not in result["sections"]
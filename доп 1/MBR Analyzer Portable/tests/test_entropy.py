@@ -0,0 +1,107 @@
+"""Карта энтропии образа по блокам: entropy_map и команда entropy (CSV, двоичный формат)"""
+import random
+
+import pytest
+
+import mbr_analyzer
+from images import vhd_dynamic_image
+
+BLOCK = 4096
+
+def disk_regions():
+    """Образ 1 МБ + 1000 байт: нули, случайные данные, текст и неполный последний блок"""
+    rng = random.Random(11)
+    data = bytearray(1024 * 1024 + 1000)
+    data[64 * 1024:256 * 1024] = rng.randbytes(192 * 1024)
+    text = b'Operating system not found. Press any key to reboot. ' * 4000
+    data[512 * 1024:640 * 1024] = text[:128 * 1024]
+    data[-1000:] = rng.randbytes(1000)
+    return bytes(data)
+
+def expected_blocks(data):
+    return [mbr_analyzer.byte_stats(data[i:i + BLOCK]) for i in range(0, len(data), BLOCK)]
+
+def collect(image, chunk_size):
+    offsets, rows = [], []
+    for start, columns in mbr_analyzer.entropy_map(image, BLOCK, chunk_size):
+        offsets.append(start)
+        rows.extend(zip(columns["entropy"], columns["zero_ratio"], columns["printable_ratio"]))
+    return offsets, rows
+
+@pytest.mark.parametrize("chunk_size", [BLOCK, 100 * 1024, 64 * 1024 * 1024])
+def test_map_matches_per_block_stats(tmp_path, chunk_size):
+    data = disk_regions()
+    path = tmp_path / "disk.img"
+    path.write_bytes(data)
+
+    with mbr_analyzer.open_image(str(path)) as image:
+        offsets, rows = collect(image, chunk_size)
+
+    expected = expected_blocks(data)
+    assert len(rows) == len(expected) == 257
+    for (entropy, zeros, printable), stats in zip(rows, expected):
+        assert entropy == pytest.approx(stats["entropy"], abs=1e-4)
+        assert zeros == pytest.approx(stats["zero_ratio"])
+        assert printable == pytest.approx(stats["printable_ratio"])
+    assert offsets == sorted(offsets) and offsets[0] == 0
+    assert rows[0] == (0.0, 1.0, 0.0)
+    assert rows[20][0] > 7.5 and rows[130][2] == 1.0
+
+def test_unallocated_regions_are_not_read(tmp_path, monkeypatch):
+    data = disk_regions() + bytes(8 * 1024 * 1024)
+    data = data[:len(data) // 512 * 512]
+    # Размещен только первый блок VHD (2 МБ), остальные 8 МБ - неразмещенные нули
+    path = tmp_path / "disk.vhd"
+    path.write_bytes(vhd_dynamic_image(data))
+
+    reads = []
+    with mbr_analyzer.open_image(str(path)) as image:
+        original = image.read
+        monkeypatch.setattr(image, "read", lambda offset, size: reads.append(offset) or original(offset, size))
+        _, rows = collect(image, 1024 * 1024)
+
+    assert reads == [0, 1024 * 1024]
+    assert [row[0] for row in rows] == pytest.approx([stats["entropy"] for stats in expected_blocks(data)],
+                                                     abs=1e-4)
+
+def test_entropy_cli_csv(tmp_path, capsys):
+    data = disk_regions()
+    path, output = tmp_path / "disk.img", tmp_path / "map.csv"
+    path.write_bytes(data)
+
+    assert mbr_analyzer.main(["entropy", str(path), "-o", str(output), "--block-kb", "4", "--width", "16",
+                              "--rows", "4"]) == 0
+
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert lines[0] == "offset,entropy,zero_ratio,printable_ratio"
+    assert len(lines) == 258
+    offset, entropy, zeros, _ = lines[17].split(',')
+    assert int(offset) == 16 * BLOCK and float(entropy) > 7.5 and float(zeros) < 0.1
+    out = capsys.readouterr().out
+    assert "█" in out and "✓ Карта (CSV)" in out
+
+def test_entropy_cli_binary(tmp_path):
+    data = disk_regions()
+    path, output = tmp_path / "disk.img", tmp_path / "map.bin"
+    path.write_bytes(data)
+
+    assert mbr_analyzer.main(["entropy", str(path), "-o", str(output), "--block-kb", "4"]) == 0
+
+    content = output.read_bytes()
+    magic, block_size, size, blocks = mbr_analyzer.ENTROPY_MAP_HEADER.unpack_from(content)
+    assert (magic, block_size, size, blocks) == (mbr_analyzer.ENTROPY_MAP_MAGIC, BLOCK, len(data), 257)
+    cells = content[mbr_analyzer.ENTROPY_MAP_HEADER.size:]
+    assert len(cells) == 2 * blocks
+    assert cells[0:2] == b'\x00\xff'
+    assert cells[2 * 20] >= 240 and cells[2 * 20 + 1] < 5
+
+def test_entropy_cli_errors(tmp_path, capsys):
+    assert mbr_analyzer.main(["entropy", str(tmp_path / "missing.img")]) == 2
+    path = tmp_path / "disk.img"
+    path.write_bytes(bytes(4096))
+    assert mbr_analyzer.main(["entropy", str(path), "--block-kb", "0"]) == 2
+    assert "ОШИБКА" in capsys.readouterr().err
+    for option in ("--width", "--rows", "--chunk-mb"):
+        for value in ("0", "-3"):
+            assert mbr_analyzer.main(["entropy", str(path), option, value]) == 2
+            assert f"ОШИБКА: {option}" in capsys.readouterr().err
@@ -0,0 +1,101 @@
+"""Разбор GPT: CRC32 заголовков и массивов, резервная копия, размер сектора, подложные заголовки"""
+import struct
+
+import pytest
+
+import mbr_analyzer
+from images import gpt_image
+
+class CountingImage(mbr_analyzer.BytesImage):
+    """Образ в памяти с подсчетом прочитанных байтов"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, offset, size):
+        data = super().read(offset, size)
+        self.bytes_read += len(data)
+        return data
+
+def test_valid_gpt():
+    result = mbr_analyzer.analyze(bytes(gpt_image(partitions=5)))
+    gpt = result["sections"]["gpt"]
+
+    assert gpt["issues"] == []
+    assert gpt["primary"]["header_crc_valid"] and gpt["primary"]["entries_crc_valid"]
+    assert gpt["backup"]["header_crc_valid"] and gpt["backup"]["entries_crc_valid"]
+    assert gpt["source"] == 1
+    assert [p["name"] for p in gpt["partitions"]] == [f"part{i}" for i in range(5)]
+    assert gpt["partitions"][0]["type_name"] == "Basic data (NTFS/FAT/exFAT)"
+    assert gpt["partitions"][2]["lba_start"] == 80 and gpt["partitions"][2]["sectors"] == 8
+    assert result["statistics"]["gpt_partitions"] == 5 and result["statistics"]["gpt_valid"]
+
+def test_corrupt_primary_header_uses_backup():
+    image = gpt_image()
+    image[512 + 40] ^= 1
+    gpt = mbr_analyzer.analyze(bytes(image))["sections"]["gpt"]
+
+    assert not gpt["primary"]["header_crc_valid"]
+    assert gpt["source"] == 4095
+    assert len(gpt["partitions"]) == 4
+    assert "GPT: неверная CRC32 основного заголовка" in gpt["issues"]
+
+def test_corrupt_entry_array():
+    image = gpt_image()
+    image[2 * 512 + 40] ^= 1
+    result = mbr_analyzer.analyze(bytes(image))
+    gpt = result["sections"]["gpt"]
+
+    assert gpt["primary"]["entries_crc_valid"] is False
+    assert gpt["backup"]["entries_crc_valid"] is True
+    assert gpt["source"] == 4095
+    assert "GPT: неверная CRC32 массива разделов основного заголовка" in gpt["issues"]
+    assert result["statistics"]["gpt_valid"] is False
+
+def test_4k_sectors():
+    gpt = mbr_analyzer.analyze(bytes(gpt_image(disk_sectors=1024, sector_size=4096)))["sections"]["gpt"]
+    assert gpt["sector_size"] == 4096
+    assert gpt["issues"] == []
+    assert len(gpt["partitions"]) == 4 and gpt["partitions"][0]["size_bytes"] == 8 * 4096
+
+def test_missing_headers():
+    image = gpt_image()
+    image[512:1024] = bytes(512)
+    image[-512:] = bytes(512)
+    gpt = mbr_analyzer.analyze(bytes(image))["sections"]["gpt"]
+    assert gpt["partitions"] == []
+    assert any("основной заголовок на LBA 1 не найден" in issue for issue in gpt["issues"])
+    assert any("резервный заголовок" in issue for issue in gpt["issues"])
+
+@pytest.mark.parametrize("entries_count", [0x100000, 0xFFFFFFFF])
+def test_oversized_entry_array_is_not_read(entries_count):
+    # Заголовок с правильной CRC32, но с огромным массивом записей
+    image = gpt_image(disk_sectors=2 ** 16, header_entries=entries_count)
+    counting = CountingImage(image)
+    gpt = mbr_analyzer.parse_gpt(counting)
+
+    assert gpt["primary"]["header_crc_valid"]
+    assert gpt["primary"]["entries_crc_valid"] is None
+    assert gpt["partitions"] == []
+    assert any("не читается" in issue for issue in gpt["issues"])
+    assert counting.bytes_read < 64 * 1024
+
+def test_entries_of_header_with_bad_crc_are_not_read():
+    image = gpt_image()
+    struct.pack_into('<I', image, 512 + 80, 0xFFFFFFFF)
+    image[-512:] = bytes(512)
+    counting = CountingImage(image)
+    gpt = mbr_analyzer.parse_gpt(counting)
+
+    assert not gpt["primary"]["header_crc_valid"]
+    assert gpt["primary"]["entries_crc_valid"] is None
+    assert gpt["partitions"] == []
+    assert counting.bytes_read < 64 * 1024
+
+def test_entry_array_is_read_in_pages():
+    image = CountingImage(gpt_image(partitions=200, entries=1024, disk_sectors=8192))
+    partitions, crc, issues = mbr_analyzer.read_gpt_entries(
+        image, mbr_analyzer.parse_gpt_header(image.read(512, 512), 1))
+    assert len(partitions) == 200 and issues == []
+    assert crc == struct.unpack_from('<I', image.read(512 + 88, 4))[0]
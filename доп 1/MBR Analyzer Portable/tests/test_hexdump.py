@@ -0,0 +1,106 @@
+"""HEX-просмотр участков образа: строки, метки структур, свертка повторов, команда hexdump"""
+import mbr_analyzer
+from images import ebr_image, gpt_image, mbr_sector, partition_entry, write_sectors
+
+class CountingImage(mbr_analyzer.BytesImage):
+    """Образ в памяти со списком чтений (смещение, размер)"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, offset, size):
+        self.reads.append((offset, size))
+        return super().read(offset, size)
+
+def labels(lines):
+    """Смещение строки -> метка"""
+    result = {}
+    for line in lines:
+        if line != "*":
+            fields = line.split("  ")
+            result[int(fields[0], 16)] = fields[3] if len(fields) > 3 else ""
+    return result
+
+def test_rows_match_bytes():
+    data = bytes(range(256)) + b'Hello, world!\x7f'
+    rows = mbr_analyzer.format_hex_rows(data, 0x1000)
+    assert len(rows) == 17
+    for offset, hex_bytes, ascii_part in rows:
+        chunk = data[offset - 0x1000:offset - 0x1000 + 16]
+        assert hex_bytes == ' '.join(f"{b:02X}" for b in chunk)
+        assert ascii_part == ''.join(chr(b) if 32 <= b < 127 else '.' for b in chunk)
+
+def test_sector_zero_labels():
+    sector = mbr_sector([partition_entry(0x07, 2048, 1000)])
+    regions = mbr_analyzer.hex_structure_regions()
+    lines = list(mbr_analyzer.hex_dump_lines(mbr_analyzer.BytesImage(sector), 0, 512, regions))
+
+    assert len(lines) == 32
+    assert lines[0] == " 0x000  " + "00 " * 15 + "00  " + "." * 16 + "  BOOT"
+    assert labels(lines)[0x1C0] == "PART1" and labels(lines)[0x1F0] == "PART4"
+    assert lines[-1].startswith(" 0x1F0 ") and "55 AA  ..............U." in lines[-1]
+
+def test_ebr_and_gpt_labels():
+    disk = bytes(gpt_image())
+    regions = mbr_analyzer.hex_structure_regions(mbr_analyzer.analyze(disk))
+    found = labels(mbr_analyzer.hex_dump_lines(mbr_analyzer.BytesImage(disk), 0x200, 0x600, regions))
+    assert found[0x200] == "GPT.HDR" and found[0x400] == "GPT.E1" and found[0x480] == "GPT.E2"
+    last = len(disk) - 512
+    found = labels(mbr_analyzer.hex_dump_lines(mbr_analyzer.BytesImage(disk), last, len(disk), regions))
+    assert found[last] == "GPT.BAK"
+
+    disk = bytes(ebr_image(2))
+    regions = mbr_analyzer.hex_structure_regions(mbr_analyzer.analyze(disk))
+    found = labels(mbr_analyzer.hex_dump_lines(mbr_analyzer.BytesImage(disk), 2148 * 512, 2149 * 512, regions))
+    assert found[2148 * 512] == "EBR" and found[2148 * 512 + 0x1C0] == "EBR.P1"
+
+def test_squeeze_repeated_rows():
+    image = mbr_analyzer.BytesImage(bytes(4096) + b'\x01' * 16)
+    lines = list(mbr_analyzer.hex_dump_lines(image, 0, 4112, squeeze=True))
+    assert len(lines) == 3 and lines[1] == "*" and lines[2].startswith(" 0x1000 ")
+    assert len(list(mbr_analyzer.hex_dump_lines(image, 0, 4112))) == 257
+    # Строки с метками не сворачиваются
+    regions = mbr_analyzer.hex_structure_regions()
+    lines = list(mbr_analyzer.hex_dump_lines(image, 0, 1024, regions, squeeze=True))
+    assert "*" not in lines[:28] and lines[-1] == "*"
+
+def test_pages_are_read_lazily():
+    image = CountingImage(bytes(16 * 1024 * 1024))
+    lines = mbr_analyzer.hex_dump_lines(image, 0, image.size, chunk_size=4096)
+    for _ in range(300):
+        next(lines)
+    assert image.reads == [(0, 4096), (4096, 4096)]
+
+def test_offsets_beyond_end_and_width():
+    image = mbr_analyzer.BytesImage(bytes(range(100)))
+    lines = list(mbr_analyzer.hex_dump_lines(image, 90, 200, width=8))
+    assert lines == [" 0x05A  5A 5B 5C 5D 5E 5F 60 61  Z[\\]^_`a", " 0x062  62 63                    bc"]
+    assert list(mbr_analyzer.hex_dump_lines(image, 200, 300)) == []
+
+def test_hexdump_cli(tmp_path, capsys):
+    path = write_sectors(tmp_path / "disk.img", 64 * 1024 * 1024 * 1024,
+                         {0: mbr_sector([partition_entry(0x07, 2048, 1000)]),
+                          128 * 1024 * 1024 - 1: b'LAST SECTOR' + bytes(499) + b'\x55\xaa'})
+
+    assert mbr_analyzer.main(["hexdump", str(path), "--sector", str(128 * 1024 * 1024 - 1), "--length", "32"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith(" 0xFFFFFFE00  4C 41 53 54") and lines[0].endswith("LAST SECTOR.....")
+    assert len(lines) == 2
+
+    output = tmp_path / "dump.txt"
+    assert mbr_analyzer.main(["hexdump", str(path), "-o", str(output), "--no-squeeze", "--length", "0x200"]) == 0
+    dumped = output.read_text(encoding='utf-8').splitlines()
+    assert len(dumped) == 32 and dumped[0].endswith("BOOT")
+    assert "✓ Дамп" in capsys.readouterr().out
+
+    assert mbr_analyzer.main(["hexdump", str(path), "--no-labels", "--length", "0x20"]) == 0
+    assert not capsys.readouterr().out.splitlines()[0].endswith("BOOT")
+
+def test_hexdump_cli_errors(tmp_path, capsys):
+    path = tmp_path / "disk.img"
+    path.write_bytes(mbr_sector())
+    assert mbr_analyzer.main(["hexdump", str(path), "--offset", "zz"]) == 2
+    assert mbr_analyzer.main(["hexdump", str(path), "--offset", "-1"]) == 2
+    assert mbr_analyzer.main(["hexdump", str(tmp_path / "missing.img")]) == 2
+    assert "ОШИБКА" in capsys.readouterr().err
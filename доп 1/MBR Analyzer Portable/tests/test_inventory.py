@@ -0,0 +1,97 @@
+"""База инвентаризации: batch --inventory, пропуск неизмененных образов, готовые запросы"""
+import gzip
+import hashlib
+import os
+
+import mbr_analyzer
+from images import gpt_image, mbr_sector, partition_entry
+
+def make_images(directory):
+    """Диск с двумя активными разделами, диск с разделом ниже LBA 63 и диск GPT с тремя разделами
+
+    Защитная запись 0xEE диска GPT начинается с LBA 1, но в запрос low-start попадать не должна.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "multi.bin").write_bytes(mbr_sector([partition_entry(0x07, 2048, 1000, bootable=True),
+                                                      partition_entry(0x07, 4096, 1000, bootable=True)]))
+    (directory / "low.bin").write_bytes(mbr_sector([partition_entry(0x06, 32, 1000)]))
+    (directory / "gpt.img").write_bytes(gpt_image(partitions=3))
+    return directory
+
+def batch(directory, database):
+    return mbr_analyzer.main(["batch", str(directory), "--inventory", str(database), "-j", "1"])
+
+def test_batch_fills_inventory(tmp_path):
+    images = make_images(tmp_path / "in")
+    database = tmp_path / "inventory.db"
+    assert batch(images, database) == 0
+
+    with mbr_analyzer.InventoryStore(str(database)) as store:
+        _, rows = store.query("SELECT filename, partitions_active, gpt_entries FROM images ORDER BY filename")
+        assert rows == [("gpt.img", 0, 3), ("low.bin", 0, None), ("multi.bin", 2, None)]
+        _, rows = store.query("SELECT scheme, COUNT(*) FROM partitions p JOIN images i ON i.id = p.image_id "
+                              "WHERE i.filename = 'gpt.img' GROUP BY scheme ORDER BY scheme")
+        assert rows == [("gpt", 3), ("mbr", 1)]
+        _, rows = store.query(mbr_analyzer.INVENTORY_QUERIES["multi-active"][1])
+        assert [os.path.basename(path) for path, _ in rows] == ["multi.bin"]
+        _, rows = store.query(mbr_analyzer.INVENTORY_QUERIES["low-start"][1])
+        assert [os.path.basename(row[0]) for row in rows] == ["low.bin"]
+
+def test_unchanged_images_are_skipped(tmp_path, capsys):
+    images = make_images(tmp_path / "in")
+    database = tmp_path / "inventory.db"
+    assert batch(images, database) == 0
+    assert "добавлено образов: 3" in capsys.readouterr().out
+
+    assert batch(images, database) == 0
+    assert "добавлено образов: 0" in capsys.readouterr().out
+
+    # Измененный образ анализируется заново, а его старые строки заменяются
+    changed = images / "low.bin"
+    changed.write_bytes(mbr_sector([partition_entry(0x06, 2048, 1000), partition_entry(0x83, 4096, 1000)]))
+    os.utime(changed, ns=(0, 10 ** 9))
+    assert batch(images, database) == 0
+    assert "добавлено образов: 1" in capsys.readouterr().out
+
+    with mbr_analyzer.InventoryStore(str(database)) as store:
+        _, rows = store.query("SELECT COUNT(*) FROM images")
+        assert rows == [(3,)]
+        _, rows = store.query("SELECT p.lba_start FROM partitions p JOIN images i ON i.id = p.image_id "
+                              "WHERE i.filename = 'low.bin' ORDER BY p.idx")
+        assert rows == [(2048,), (4096,)]
+
+def test_query_cli(tmp_path, capsys):
+    images = make_images(tmp_path / "in")
+    database = tmp_path / "inventory.db"
+    assert batch(images, database) == 0
+    capsys.readouterr()
+
+    assert mbr_analyzer.main(["query", str(database), "--list"]) == 0
+    assert "multi-active" in capsys.readouterr().out
+
+    assert mbr_analyzer.main(["query", str(database), "--preset", "multi-active"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "path\tpartitions_active"
+    assert len(lines) == 2 and lines[1].endswith("multi.bin\t2")
+
+    assert mbr_analyzer.main(["query", str(database), "SELECT COUNT(*) AS n FROM images"]) == 0
+    assert capsys.readouterr().out.splitlines() == ["n", "3"]
+
+    assert mbr_analyzer.main(["query", str(database), "--preset", "missing"]) == 2
+    assert mbr_analyzer.main(["query", str(database), "SELECT * FROM missing"]) == 2
+    assert mbr_analyzer.main(["query", str(tmp_path / "missing.db"), "--preset", "rules"]) == 2
+    assert "ОШИБКА" in capsys.readouterr().err
+
+def test_sector_hash_is_of_guest_sector(tmp_path):
+    # Для сжатого образа хэшируется сектор 0 диска, а не заголовок gzip
+    sector = mbr_sector([partition_entry(0x07, 2048, 1000, bootable=True)])
+    images = tmp_path / "in"
+    images.mkdir()
+    (images / "disk.img.gz").write_bytes(gzip.compress(sector + bytes(4096)))
+    (images / "disk.bin").write_bytes(sector)
+    database = tmp_path / "inventory.db"
+    assert batch(images, database) == 0
+
+    with mbr_analyzer.InventoryStore(str(database)) as store:
+        _, rows = store.query("SELECT DISTINCT sector_sha256 FROM images")
+    assert rows == [(hashlib.sha256(sector).hexdigest(),)]
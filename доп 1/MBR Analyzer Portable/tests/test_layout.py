@@ -0,0 +1,113 @@
+"""Проверка разметки: пересечения и промежутки разделов, границы образа, поля CHS"""
+import random
+import struct
+
+import pytest
+
+import mbr_analyzer
+from images import ebr_image, mbr_sector, partition_entry, write_sectors
+
+def chs(lba, heads=255, sectors_per_track=63):
+    """Байты CHS записи раздела для LBA (головка, сектор со старшими битами цилиндра, цилиндр)"""
+    cylinder, rest = divmod(lba, heads * sectors_per_track)
+    if cylinder > 1023:
+        cylinder, head, sector = 1023, heads - 1, sectors_per_track
+    else:
+        head, sector = rest // sectors_per_track, rest % sectors_per_track + 1
+    return head, sector | (cylinder >> 8) << 6, cylinder & 0xFF
+
+def entry(type_code, lba_start, sectors, chs_fields=True):
+    if not chs_fields:
+        return partition_entry(type_code, lba_start, sectors)
+    return partition_entry(type_code, lba_start, sectors, chs_start=chs(lba_start),
+                           chs_end=chs(lba_start + sectors - 1))
+
+def analyze_disk(tmp_path, entries, disk_sectors=1 << 22):
+    path = write_sectors(tmp_path / "disk.img", disk_sectors * 512, {0: mbr_sector(entries)})
+    return mbr_analyzer.analyze(str(path))
+
+def test_overlaps_and_gaps_match_brute_force():
+    rng = random.Random(7)
+    for _ in range(200):
+        intervals = []
+        for index in range(rng.randint(0, 8)):
+            start = rng.randrange(0, 100)
+            intervals.append((start, start + rng.randint(1, 30), f"p{index}"))
+
+        overlaps, gaps = mbr_analyzer.find_overlaps_and_gaps(intervals)
+
+        # Каждый перекрытый сектор покрыт хотя бы двумя интервалами; пересечения находятся,
+        # если они есть, а промежутки - это ровно непокрытые участки между интервалами
+        coverage = [sum(s <= x < e for s, e, _ in intervals) for x in range(140)]
+        assert bool(overlaps) == any(count > 1 for count in coverage)
+        uncovered = {x for x in range(140) if not coverage[x]}
+        if intervals:
+            first = min(s for s, _, _ in intervals)
+            last = max(e for _, e, _ in intervals)
+            assert {x for start, end, _, _ in gaps for x in range(start, end)} == \
+                {x for x in uncovered if first <= x < last}
+
+def test_touching_and_nested_intervals():
+    assert mbr_analyzer.find_overlaps_and_gaps([(10, 20, "b"), (0, 10, "a")]) == ([], [])
+    overlaps, gaps = mbr_analyzer.find_overlaps_and_gaps([(0, 100, "outer"), (10, 20, "inner"), (50, 60, "x")])
+    assert overlaps == [("outer", "inner", 10), ("outer", "x", 10)] and gaps == []
+
+def test_clean_layout(tmp_path):
+    result = analyze_disk(tmp_path, [entry(0x07, 2048, 204800), entry(0x83, 206848, 409600)])
+    assert result["issues"] == []
+    assert not any("CHS" in warning for warning in result["warnings"])
+    assert result["sections"]["layout"] == {"geometry": {"heads": 255, "sectors_per_track": 63},
+                                            "overlaps": [], "gaps": []}
+
+def test_overlap_and_gap(tmp_path):
+    result = analyze_disk(tmp_path, [entry(0x07, 2048, 10000), entry(0x83, 10000, 10000),
+                                     entry(0x82, 30000, 100), entry(0x0C, 30200, 100)])
+    layout = result["sections"]["layout"]
+
+    assert layout["overlaps"] == [{"scheme": "mbr", "first": "Раздел 1", "second": "Раздел 2", "sectors": 2048}]
+    assert "Раздел 1 и Раздел 2 пересекаются (2,048 секторов)" in result["issues"]
+    assert [(gap["lba_start"], gap["sectors"]) for gap in layout["gaps"]] == [(20000, 10000), (30100, 100)]
+    # В предупреждения попадают только крупные промежутки
+    gap_warnings = [w for w in result["warnings"] if w.startswith("Неразмеченная область")]
+    assert len(gap_warnings) == 1 and "LBA 20000-29999" in gap_warnings[0]
+
+def test_partition_past_end_of_image(tmp_path):
+    result = analyze_disk(tmp_path, [entry(0x07, 2048, 10000)], disk_sectors=4096)
+    assert any("выходит за пределы образа (4096 секторов" in issue for issue in result["issues"])
+
+    # Дамп одного сектора ничего не говорит о размере диска
+    result = mbr_analyzer.analyze(mbr_sector([entry(0x07, 2048, 10000)]))
+    assert result["issues"] == []
+
+def test_logical_partition_outside_extended():
+    disk = ebr_image(2)
+    # Логический раздел второго звена длиннее расширенного раздела
+    struct.pack_into('<I', disk, 2148 * 512 + 446 + 12, 5000)
+    result = mbr_analyzer.analyze(bytes(disk))
+    assert any(issue.startswith("Логический раздел 6") and "расширенного раздела" in issue
+               for issue in result["issues"])
+
+def test_chs_mismatch(tmp_path):
+    wrong = partition_entry(0x07, 2048, 204800, chs_start=chs(4096), chs_end=chs(2048 + 204800 - 1))
+    result = analyze_disk(tmp_path, [wrong])
+    assert any(w.startswith("Раздел 1: CHS начала") and "LBA 2048" in w for w in result["warnings"])
+    assert not any("CHS конца" in w for w in result["warnings"])
+
+def test_chs_edge_cases(tmp_path):
+    # Нули в CHS - не ошибка; за 1024 цилиндрами допустим цилиндр 1023
+    result = analyze_disk(tmp_path, [entry(0x07, 2048, 1000, chs_fields=False),
+                                     entry(0x83, 20000000, 2000000)], disk_sectors=1 << 25)
+    partitions = result["sections"]["partition_table"]["partitions"]
+    assert not any("CHS" in w for w in result["warnings"])
+    assert " Поля CHS не заполнены (0/0/0), используется только LBA" in partitions[0]["analysis"]
+
+    # Геометрия берется по концам разделов
+    small = partition_entry(0x06, 63, 16128 - 63, chs_start=chs(63, 16, 63), chs_end=chs(16127, 16, 63))
+    result = analyze_disk(tmp_path, [small])
+    assert result["sections"]["layout"]["geometry"] == {"heads": 16, "sectors_per_track": 63}
+    assert not any("CHS" in w for w in result["warnings"])
+
+@pytest.mark.parametrize("cylinder", [0, 255, 256, 1023])
+def test_decode_chs_high_bits(cylinder):
+    head, sector, low = 7, 5 | (cylinder >> 8) << 6, cylinder & 0xFF
+    assert mbr_analyzer.decode_chs(head, sector, low) == {"cylinder": cylinder, "head": 7, "sector": 5}
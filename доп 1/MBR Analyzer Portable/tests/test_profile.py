@@ -0,0 +1,115 @@
+"""Профилирование: собственное время этапов, слияние замеров процессов, --profile/--trace/--pstats
+
+Включенное профилирование оборачивает функции модуля до конца процесса,
+поэтому команды с --profile запускаются в отдельном процессе.
+"""
+import json
+import os
+import pstats
+import re
+import subprocess
+import sys
+import time
+
+import mbr_analyzer
+from images import NT6_BOOT_CODE, ebr_image, gpt_image, mbr_sector, partition_entry
+
+PROGRAM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+def run_program(*args):
+    return subprocess.run([sys.executable, PROGRAM, *args], capture_output=True, text=True, encoding="utf-8",
+                          timeout=120)
+
+def test_own_time_excludes_nested_stages():
+    profiler = mbr_analyzer.StageProfiler(trace=True)
+
+    def inner():
+        time.sleep(0.02)
+        return b'x' * 10
+
+    def outer():
+        time.sleep(0.01)
+        return [profiler.call("inner", inner, (), {}) for _ in range(2)]
+
+    profiler.call("outer", outer, (), {}, lambda p, args, result: p.count("вызовов inner", len(result)))
+    outer_calls, outer_total, outer_own = profiler.stages["outer"]
+    inner_calls, inner_total, inner_own = profiler.stages["inner"]
+    assert (outer_calls, inner_calls) == (1, 2)
+    assert inner_total == inner_own and inner_total >= 0.04
+    assert abs(outer_own - (outer_total - inner_total)) < 1e-6 and outer_own < inner_own
+    assert profiler.counters["вызовов inner"] == 2
+
+    trace = profiler.chrome_trace()["traceEvents"]
+    assert [event["name"] for event in trace] == ["inner", "inner", "outer"]
+    assert all(event["ph"] == "X" and event["dur"] > 0 for event in trace)
+
+def test_drain_and_merge():
+    worker = mbr_analyzer.StageProfiler()
+    worker.call("parse", len, (b'abc',), {})
+    worker.count("секторов разобрано", 3)
+    snapshot = worker.drain()
+    assert worker.stages == {} and not worker.counters
+
+    merged = mbr_analyzer.StageProfiler()
+    merged.call("parse", len, (b'abc',), {})
+    merged.merge(snapshot)
+    merged.merge(snapshot)
+    assert merged.stages["parse"][0] == 3
+    assert merged.counters["секторов разобрано"] == 6
+    lines = merged.report(1.0)
+    assert lines[1].split()[:2] == ["parse", "3"]
+    assert lines[-1] == " Счетчики: секторов разобрано 6"
+
+def test_disabled_profiling_does_not_wrap(tmp_path, capsys):
+    disk = tmp_path / "disk.img"
+    disk.write_bytes(bytes(ebr_image(2)))
+    assert mbr_analyzer.main(["batch", str(disk), "--ndjson", str(tmp_path / "out.ndjson"), "-j", "1"]) == 0
+    assert "ПРОФИЛЬ" not in capsys.readouterr().out
+    assert mbr_analyzer._profiler is None
+    assert not hasattr(mbr_analyzer.parse_mbr_complete, "__wrapped__")
+    assert not hasattr(mbr_analyzer.RawImage.read, "__wrapped__")
+
+def test_batch_profile_trace_and_pstats(tmp_path):
+    (tmp_path / "gpt.img").write_bytes(bytes(gpt_image(partitions=3)))
+    (tmp_path / "ebr.img").write_bytes(bytes(ebr_image(4)))
+    (tmp_path / "win.bin").write_bytes(mbr_sector([partition_entry(0x07, 2048, 4096, True)], code=NT6_BOOT_CODE))
+    trace = tmp_path / "trace.json"
+    stats = tmp_path / "run.prof"
+
+    # Замеры процессов пула сливаются в основной профиль
+    completed = run_program("batch", str(tmp_path / "gpt.img"), str(tmp_path / "ebr.img"), str(tmp_path / "win.bin"),
+                            "--ndjson", str(tmp_path / "out.ndjson"), "-j", "2",
+                            "--profile", "--trace", str(trace), "--pstats", str(stats))
+    assert completed.returncode == 0, completed.stderr
+    out = completed.stdout
+    assert "ПРОФИЛЬ ЭТАПОВ" in out
+    assert re.search(r"^ parse_mbr_complete\s+3\s", out, re.MULTILINE)
+    assert re.search(r"^ analyze_gpt\s+1\s", out, re.MULTILINE)
+    counters = out[out.index(" Счетчики:"):].splitlines()[0]
+    assert "секторов разобрано 3" in counters and "правил сработало" in counters and "байт прочитано" in counters
+
+    events = json.loads(trace.read_text(encoding="utf-8"))["traceEvents"]
+    assert {"parse_mbr_complete", "RawImage.read"} <= {event["name"] for event in events}
+    assert f"({len(events):,} событий)" in out
+
+    assert any(name == "run_batch" for _, _, name in pstats.Stats(str(stats)).stats)
+
+def test_scan_profile_counts_candidates(tmp_path):
+    disk = bytearray(2 * 1024 * 1024)
+    for offset in (0, 0x40000, 0x180000):
+        disk[offset:offset + 512] = mbr_sector([partition_entry(0x83, 2048, 4096)])
+    (tmp_path / "disk.img").write_bytes(bytes(disk))
+
+    completed = run_program("scan", str(tmp_path / "disk.img"), "-o", str(tmp_path / "scan.json"),
+                            "--chunk-mb", "1", "-j", "2", "--profile")
+    assert completed.returncode == 0, completed.stderr
+    assert re.search(r"^ scan_window\s+2\s", completed.stdout, re.MULTILINE)
+    assert "кандидатов найдено 3" in completed.stdout
+
+def test_unwritable_trace_is_reported(tmp_path):
+    (tmp_path / "disk.img").write_bytes(bytes(ebr_image(1)))
+    completed = run_program("batch", str(tmp_path / "disk.img"), "--ndjson", str(tmp_path / "out.ndjson"),
+                            "-j", "1", "--trace", str(tmp_path / "missing" / "trace.json"))
+    assert completed.returncode == 0
+    assert "ОШИБКА при сохранении профиля" in completed.stderr
+    assert "ПРОФИЛЬ ЭТАПОВ" not in completed.stdout
@@ -0,0 +1,88 @@
+"""Продолжение прерванного сканирования: файл состояния, --resume, новый прогон без --resume"""
+import json
+
+import pytest
+
+import mbr_analyzer
+from images import mbr_sector, ntfs_boot_sector, partition_entry, write_sectors
+
+MIB = 1024 * 1024
+
+@pytest.fixture
+def image(tmp_path):
+    """Образ 8 МБ: MBR и по два кандидата в каждом окне по 1 МБ (всего 17)"""
+    sectors = {0: mbr_sector([partition_entry(0x07, 2048, 12000)])}
+    for window in range(8):
+        sectors[window * 2048 + 100] = ntfs_boot_sector(1000)
+        sectors[window * 2048 + 1500] = mbr_sector([partition_entry(0x83, 63, 500)])
+    return write_sectors(tmp_path / "disk.img", 8 * MIB, sectors)
+
+def scan(image, output, *options):
+    return mbr_analyzer.main(["scan", str(image), "-o", str(output), "--chunk-mb", "1", "-j", "1", *options])
+
+def interrupt_at(monkeypatch, window):
+    """Ctrl+C при обработке окна window"""
+    original = mbr_analyzer.scan_window_task
+
+    def task(arguments):
+        if arguments[0] == window:
+            raise KeyboardInterrupt
+        return original(arguments)
+    monkeypatch.setattr(mbr_analyzer, "scan_window_task", task)
+
+def test_resume_matches_full_scan(tmp_path, image, monkeypatch):
+    expected = tmp_path / "expected.ndjson"
+    assert scan(image, expected) == 0
+    assert len(expected.read_text(encoding='utf-8').splitlines()) == 17
+
+    output = tmp_path / "found.ndjson"
+    with monkeypatch.context() as patch:
+        interrupt_at(patch, 5)
+        assert scan(image, output) == 130
+    state = json.loads((tmp_path / "found.ndjson.state").read_text(encoding='utf-8'))
+    assert state["next_window"] == 5 and state["windows"] > 5
+    assert state["output_size"] == output.stat().st_size
+    # Недописанная строка после сохраненного состояния отрезается при продолжении
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write('{"lba": 1')
+
+    assert scan(image, output, "--resume") == 0
+    assert output.read_text(encoding='utf-8') == expected.read_text(encoding='utf-8')
+    finished = json.loads((tmp_path / "found.ndjson.state").read_text(encoding='utf-8'))
+    assert finished["next_window"] == finished["windows"]
+
+def test_fresh_scan_discards_old_state(tmp_path, image, monkeypatch, capsys):
+    output = tmp_path / "found.ndjson"
+    with monkeypatch.context() as patch:
+        interrupt_at(patch, 3)
+        assert scan(image, output) == 130
+    assert "--resume" in capsys.readouterr().err
+
+    # Новый прогон без --resume начинает с начала и перезаписывает вывод
+    assert scan(image, output) == 0
+    assert len(output.read_text(encoding='utf-8').splitlines()) == 17
+    assert scan(image, output, "--resume") == 0
+    assert len(output.read_text(encoding='utf-8').splitlines()) == 17
+
+def test_resume_without_state_starts_over(tmp_path, image, capsys):
+    output = tmp_path / "found.ndjson"
+    assert scan(image, output, "--resume") == 0
+    assert "не найдено - сканирование с начала" in capsys.readouterr().err
+    assert len(output.read_text(encoding='utf-8').splitlines()) == 17
+
+def test_resume_errors(tmp_path, image, monkeypatch, capsys):
+    output = tmp_path / "found.ndjson"
+    with monkeypatch.context() as patch:
+        interrupt_at(patch, 4)
+        assert scan(image, output) == 130
+
+    other = write_sectors(tmp_path / "other.img", 4 * MIB, {})
+    assert mbr_analyzer.main(["scan", str(other), "-o", str(output), "--chunk-mb", "1", "--resume",
+                              "-j", "1"]) == 2
+    assert "относится к другому образу" in capsys.readouterr().err
+
+    output.write_text("", encoding='utf-8')
+    assert scan(image, output, "--resume") == 2
+    assert "продолжение невозможно" in capsys.readouterr().err
+
+    assert mbr_analyzer.main(["scan", str(image), "--resume"]) == 2
@@ -0,0 +1,124 @@
+"""Правила проверки: загрузка наборов, условия, проверка пачками, команда rules"""
+import json
+
+import pytest
+
+import mbr_analyzer
+from images import NT6_BOOT_CODE, gpt_image, mbr_sector, partition_entry
+
+def write_pack(path, rules):
+    path.write_text(json.dumps({"name": "тест", "rules": rules}, ensure_ascii=False), encoding='utf-8')
+    return path
+
+def fired_ids(result):
+    return [rule["id"] for rule in result["rules_fired"]]
+
+def test_default_rules():
+    multi = mbr_analyzer.analyze(mbr_sector([partition_entry(0x07, 2048, 100, bootable=True),
+                                             partition_entry(0x07, 4096, 100, bootable=True)], NT6_BOOT_CODE))
+    assert fired_ids(multi) == ["multiple-active"]
+    assert fired_ids(mbr_analyzer.analyze(mbr_sector())) == ["boot-code-missing", "partition-table-empty"]
+    assert "signature-invalid" in fired_ids(mbr_analyzer.analyze(mbr_sector(signature=b'\x00\x00')))
+    assert "gpt-protective" in fired_ids(mbr_analyzer.analyze(bytes(gpt_image())))
+
+    result = mbr_analyzer.analyze(mbr_sector())
+    assert mbr_analyzer.rule_messages(result, "issue") == ["Загрузочный код отсутствует", "Таблица разделов пустая"]
+    assert result["rules_fired"][0] == {"id": "boot-code-missing", "severity": "issue",
+                                        "message": "Загрузочный код отсутствует"}
+
+@pytest.mark.parametrize("condition, expected", [
+    ({"field": "statistics.partitions_used", "op": "eq", "value": 2}, [False, True, False]),
+    ({"field": "statistics.partitions_used", "op": "ge", "value": 1}, [True, True, False]),
+    ({"field": "statistics.gpt_partitions", "op": "gt", "value": 0}, [False, False, False]),
+    ({"field": "statistics.gpt_partitions", "op": "exists", "value": False}, [True, True, True]),
+    ({"field": "statistics.disk_type", "op": "in", "value": ["Пустой диск"]}, [False, False, True]),
+    ({"field": "sections.partition_table.partitions.0.type_code", "op": "eq", "value": "0x83"},
+     [True, False, False]),
+    ({"field": "sections.partition_table.partitions.9.type_code", "op": "eq", "value": "0x83"},
+     [False, False, False]),
+    ({"field": "sections.boot_code.stats.strings", "op": "contains", "value": "GRUB "}, [False, False, False]),
+    ({"field": "issues", "op": "count_gt", "value": 0}, [False, True, False]),
+    # Строка против числа - условие не выполнено, а не ошибка
+    ({"field": "statistics.disk_type", "op": "gt", "value": 1}, [False, False, False]),
+    ({"any": [{"field": "statistics.partitions_used", "op": "eq", "value": 1},
+              {"not": {"field": "statistics.partitions_used", "op": "ne", "value": 0}}]}, [True, False, True]),
+    ({"all": [{"field": "statistics.partitions_used", "op": "gt", "value": 0},
+              {"field": "statistics.partitions_active", "op": "eq", "value": 0}]}, [True, False, False]),
+])
+def test_conditions(condition, expected):
+    results = [
+        mbr_analyzer.analyze(mbr_sector([partition_entry(0x83, 2048, 100)])),
+        mbr_analyzer.analyze(mbr_sector([partition_entry(0x07, 2048, 100, bootable=True),
+                                         partition_entry(0x07, 2000, 100, bootable=True)])),
+        mbr_analyzer.analyze(mbr_sector()),
+    ]
+    rule_set = mbr_analyzer.RuleSet([{"id": "r", "severity": "warning", "message": "r",
+                                      "when": mbr_analyzer.RuleSet.compile_condition(condition)}])
+    assert [bool(fired) for fired in rule_set.evaluate(results)] == expected
+
+    # Проверка пачкой совпадает с проверкой по одному результату
+    assert [bool(rule_set.evaluate([result])[0]) for result in results] == expected
+
+def test_custom_pack_and_errors(tmp_path):
+    pack = write_pack(tmp_path / "fleet.json", [
+        {"id": "linux-first", "severity": "warning", "message": "Первый раздел Linux",
+         "when": {"field": "sections.partition_table.partitions.0.type_code", "op": "eq", "value": "0x83"}}])
+    rule_set = mbr_analyzer.load_rule_set((str(pack),))
+    assert [rule["id"] for rule in rule_set.rules] == ["linux-first"]
+    result = mbr_analyzer.analyze(mbr_sector([partition_entry(0x83, 2048, 100)]), rules=[str(pack)])
+    assert fired_ids(result) == ["linux-first"]
+    # Тот же файл через каталог и напрямую загружается один раз
+    assert len(mbr_analyzer.load_rule_set((str(tmp_path), str(pack))).rules) == 1
+
+    bad = [
+        [{"id": "x", "severity": "fatal", "when": {"field": "a", "op": "eq", "value": 1}}],
+        [{"id": "x", "severity": "issue", "when": {"field": "a", "op": "like", "value": 1}}],
+        [{"id": "x", "severity": "issue", "when": {"op": "eq", "value": 1}}],
+        [{"id": "x", "severity": "issue", "when": {"all": {"field": "a", "op": "eq"}}}],
+        [{"id": "x", "severity": "issue"}],
+    ]
+    for index, rules in enumerate(bad):
+        path = write_pack(tmp_path / f"bad{index}.json", rules)
+        with pytest.raises(ValueError, match="ошибка в правиле x"):
+            mbr_analyzer.load_rule_set((str(path),))
+
+    (tmp_path / "other").mkdir()
+    other = write_pack(tmp_path / "other" / "dup.json",
+                       [{"id": "linux-first", "severity": "issue", "when": {"field": "a", "op": "eq", "value": 1}}])
+    with pytest.raises(ValueError, match="повторяющийся идентификатор"):
+        mbr_analyzer.load_rule_set((str(pack), str(other)))
+
+def test_errors_are_not_checked():
+    results = mbr_analyzer.apply_rules([{"error": "нет данных"}, mbr_analyzer.analyze(mbr_sector())],
+                                       mbr_analyzer.load_rule_set())
+    assert "rules_fired" not in results[0] and results[1]["rules_fired"]
+
+def test_rules_cli(tmp_path, capsys):
+    for index in range(5):
+        entries = [partition_entry(0x07, 2048, 100, bootable=True)]
+        if index < 2:
+            entries.append(partition_entry(0x07, 4096, 100, bootable=True))
+        (tmp_path / f"disk{index}.bin").write_bytes(mbr_sector(entries, NT6_BOOT_CODE))
+    stream = tmp_path / "results.ndjson"
+    assert mbr_analyzer.main(["batch", str(tmp_path / "*.bin"), "--ndjson", str(stream), "-j", "1"]) == 0
+    capsys.readouterr()
+
+    output = tmp_path / "fired.ndjson"
+    assert mbr_analyzer.main(["rules", str(stream), "-o", str(output), "--chunk", "2"]) == 0
+    assert "сработало правил хотя бы одно: 2" in capsys.readouterr().out
+    records = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert [r["rules_fired"] for r in records] == [["multiple-active"]] * 2
+
+    assert mbr_analyzer.main(["rules", str(stream), "-o", str(output), "--all"]) == 0
+    assert len(output.read_text(encoding='utf-8').splitlines()) == 5
+    assert mbr_analyzer.main(["rules", str(stream), "--fail"]) == 1
+
+    assert mbr_analyzer.main(["rules", "--list"]) == 0
+    assert "multiple-active" in capsys.readouterr().out
+
+def test_rules_cli_errors(tmp_path, capsys):
+    assert mbr_analyzer.main(["rules"]) == 2
+    assert mbr_analyzer.main(["rules", str(tmp_path / "missing.ndjson")]) == 2
+    bad = write_pack(tmp_path / "bad.json", [{"id": "x", "severity": "fatal", "when": {}}])
+    assert mbr_analyzer.main(["rules", "--rules", str(bad), "--list"]) == 2
+    assert "ОШИБКА" in capsys.readouterr().err
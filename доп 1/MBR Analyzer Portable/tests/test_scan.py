@@ -0,0 +1,60 @@
+"""Сканирование образа: поиск потерянных MBR/EBR/VBR окнами через mmap"""
+import json
+
+import pytest
+
+import mbr_analyzer
+from images import NT6_BOOT_CODE, mbr_sector, ntfs_boot_sector, partition_entry, write_sectors
+
+# LBA -> (сектор, ожидаемый вид кандидата)
+LOST_SECTORS = {
+    0: (mbr_sector([partition_entry(0x07, 2048, 2048, bootable=True), partition_entry(0x0F, 4096, 8192)],
+                   NT6_BOOT_CODE), "MBR"),
+    2048: (ntfs_boot_sector(2048), "VBR"),
+    4096: (mbr_sector([partition_entry(0x83, 63, 1000), partition_entry(0x05, 2048, 2048)]), "EBR"),
+    9000: (b'\xff' * 510 + b'\x55\xaa', "UNKNOWN"),
+    # Последний сектор образа - кандидат на границе окна
+    16383: (mbr_sector([partition_entry(0xEE, 1, 16383)]), "MBR"),
+}
+
+@pytest.fixture
+def disk(tmp_path):
+    return write_sectors(tmp_path / "disk.img", 16384 * 512,
+                         {lba: sector for lba, (sector, _) in LOST_SECTORS.items()})
+
+def test_scan_image_finds_all_candidates(disk):
+    with mbr_analyzer.open_image(str(disk)) as image:
+        candidates = list(mbr_analyzer.scan_image(image, chunk_size=1024 * 1024))
+
+    assert [(c["lba"], c["kind"]) for c in candidates] == [(lba, kind) for lba, (_, kind) in LOST_SECTORS.items()]
+    assert candidates[1]["filesystem"] == "NTFS"
+    assert candidates[-1]["description"] == "Защитная MBR диска GPT"
+
+@pytest.mark.parametrize("chunk_size", [512, 4096 * 3, 1024 * 1024, 64 * 1024 * 1024])
+def test_window_size_does_not_change_result(disk, chunk_size):
+    with mbr_analyzer.open_image(str(disk)) as image:
+        reference = list(mbr_analyzer.scan_image(image))
+        assert list(mbr_analyzer.scan_image(image, chunk_size=chunk_size)) == reference
+
+def test_find_signature_sectors_checks_both_bytes():
+    buf = bytearray(512 * 6)
+    buf[510:512] = b'\x55\xaa'
+    buf[1022:1024] = b'\xaa\x55'
+    buf[1534] = 0x55
+    buf[3070:3072] = b'\x55\xaa'
+    assert mbr_analyzer.find_signature_sectors(bytes(buf), 0, len(buf)) == [0, 2560]
+    assert mbr_analyzer.find_signature_sectors(bytes(buf), 512, 2560) == []
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_scan_command_writes_ndjson(disk, tmp_path, jobs):
+    output = tmp_path / "found.ndjson"
+    code = mbr_analyzer.main(["scan", str(disk), "-o", str(output), "--chunk-mb", "1", "-j", jobs])
+
+    assert code == 0
+    records = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert [(r["lba"], r["kind"]) for r in records] == [(lba, kind) for lba, (_, kind) in LOST_SECTORS.items()]
+    assert records[0]["offset"] == 0 and records[2]["offset"] == 4096 * 512
+
+def test_scan_missing_image_fails(tmp_path, capsys):
+    assert mbr_analyzer.main(["scan", str(tmp_path / "missing.img")]) == 2
+    assert "ОШИБКА" in capsys.readouterr().err
@@ -0,0 +1,109 @@
+"""Движок сигнатур загрузчиков: шаблоны с масками, наборы, повторяющиеся идентификаторы"""
+import json
+import random
+
+import pytest
+
+import mbr_analyzer
+from images import GRUB2_BOOT_CODE, NT6_BOOT_CODE
+
+def write_pack(path, signatures):
+    path.write_text(json.dumps({"signatures": signatures}), encoding='utf-8')
+    return str(path)
+
+def engine_from(tmp_path, signatures):
+    return mbr_analyzer.load_signature_engine((write_pack(tmp_path / "pack.json", signatures),))
+
+def test_default_pack_recognizes_loaders():
+    engine = mbr_analyzer.load_signature_engine()
+    assert [m["id"] for m in engine.match(NT6_BOOT_CODE)] == ["windows-nt6-mbr"]
+    assert engine.match(bytes(446)) == []
+
+def test_grub2_is_reported_once():
+    matches = mbr_analyzer.load_signature_engine().match(GRUB2_BOOT_CODE)
+    assert matches == [{"id": "grub2-boot-img", "name": "GRUB загрузчик", "version": "GRUB 2 (boot.img)",
+                        "offsets": [0x000, 0x180, 0x188]}]
+
+def test_masks_offsets_and_match_modes(tmp_path):
+    engine = engine_from(tmp_path, [
+        {"id": "masked", "patterns": [{"bytes": "AA ?? CC"}]},
+        {"id": "fixed", "patterns": [{"bytes": "11 22", "offset": 4}]},
+        {"id": "all", "match": "all", "patterns": [{"string": "ONE"}, {"string": "TWO"}]},
+        {"id": "prefix", "patterns": [{"prefix": "FA ?? 31"}]},
+    ])
+    assert [m["id"] for m in engine.match(b'\xfa\x00\x31\x00\x11\x22 ONE AA\xaa\x55\xcc')] == \
+        ["masked", "fixed", "prefix"]
+    assert engine.match(b'\x00\x11\x22 TWO ONE')[0] == {"id": "all", "name": "all", "version": "",
+                                                        "offsets": [4, 8]}
+
+def test_matches_naive_search(tmp_path):
+    rng = random.Random(3)
+    # Первый байт фиксирован, остальные - случайные байты и маски
+    specs = [{"id": f"s{i}", "patterns": [{"bytes": ' '.join([rng.choice(("41", "42"))] +
+                                                             [rng.choice(("41", "42", "43", "??")) for _ in range(3)])}]}
+             for i in range(40)]
+    engine = engine_from(tmp_path, specs)
+    data = bytes(rng.choice(b'ABC') for _ in range(2000))
+
+    expected = []
+    for signature in engine.signatures:
+        pattern = signature["patterns"][0]
+        size = len(pattern["bytes"])
+        offsets = [i for i in range(len(data) - size + 1)
+                   if all(b & m == v for b, m, v in zip(data[i:i + size], pattern["mask"], pattern["bytes"]))]
+        if offsets:
+            expected.append((signature["id"], offsets))
+    assert [(m["id"], m["offsets"]) for m in engine.match(data)] == expected
+
+def test_duplicate_ids_across_packs_are_rejected(tmp_path):
+    first = write_pack(tmp_path / "a.json", [{"id": "loader", "patterns": [{"string": "ONE"}]}])
+    second = write_pack(tmp_path / "b.json", [{"id": "loader", "patterns": [{"string": "TWO"}]}])
+    with pytest.raises(ValueError, match="повторяющийся идентификатор"):
+        mbr_analyzer.load_signature_engine((first, second))
+
+def test_same_pack_given_twice_is_loaded_once(tmp_path):
+    pack = write_pack(tmp_path / "a.json", [{"id": "loader", "patterns": [{"string": "ONE"}]}])
+    engine = mbr_analyzer.load_signature_engine((str(tmp_path), pack))
+    assert len(engine.signatures) == 1
+    assert len(mbr_analyzer.analyze(GRUB2_BOOT_CODE.ljust(510, b'\x00') + b'\x55\xaa',
+                                    signatures=[mbr_analyzer.SIGNATURES_DIR,
+                                                mbr_analyzer.SIGNATURES_DIR + "/bootloaders.json"])
+               ["sections"]["boot_code"]["bootloaders"]) == 1
+
+def test_one_match_per_id(tmp_path):
+    pattern = mbr_analyzer.compile_signature_pattern({"string": "ONE"})
+    signatures = [{"id": "loader", "name": "Loader", "version": "", "match": "any",
+                   "patterns": [pattern]} for _ in range(2)]
+    assert mbr_analyzer.SignatureEngine(signatures).match(b'xxONE') == \
+        [{"id": "loader", "name": "Loader", "version": "", "offsets": [2]}]
+
+def test_engine_from_compiled_patterns():
+    # Сигнатуры, собранные без load_signature_engine: у шаблонов нет номеров
+    one, two = (mbr_analyzer.compile_signature_pattern({"string": text}) for text in ("ONE", "TWO"))
+    signatures = [{"id": "both", "name": "Both", "version": "1", "match": "all", "patterns": [one, two]},
+                  {"id": "two", "name": "Two", "version": "", "match": "any", "patterns": [two]}]
+    engine = mbr_analyzer.SignatureEngine(signatures)
+    assert [m["id"] for m in engine.match(b'TWO')] == ["two"]
+    assert [(m["id"], m["offsets"]) for m in engine.match(b'ONE TWO')] == [("both", [0, 4]), ("two", [4])]
+    assert "id" not in one and "id" not in two
+
+def test_supersedes_hides_generic_match(tmp_path):
+    engine = engine_from(tmp_path, [
+        {"id": "generic", "patterns": [{"string": "LOADER"}]},
+        {"id": "specific", "supersedes": ["generic"], "patterns": [{"string": "LOADER v2"}]},
+    ])
+    assert [m["id"] for m in engine.match(b'LOADER v1')] == ["generic"]
+    assert [m["id"] for m in engine.match(b'LOADER v2')] == ["specific"]
+
+def test_invalid_patterns_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="без фиксированных байтов"):
+        engine_from(tmp_path, [{"id": "x", "patterns": [{"bytes": "?? ??"}]}])
+    with pytest.raises(ValueError, match="неизвестный тип шаблона"):
+        engine_from(tmp_path, [{"id": "y", "patterns": [{"regex": "."}]}])
+
+def test_batch_reports_broken_pack(tmp_path, capsys):
+    (tmp_path / "disk.bin").write_bytes(bytes(512))
+    pack = write_pack(tmp_path / "bad.json", [{"id": "x", "patterns": [{"bytes": "??"}]}])
+    assert mbr_analyzer.main(["batch", str(tmp_path / "disk.bin"), "-o", str(tmp_path / "out"),
+                              "--signatures", pack]) == 2
+    assert "ОШИБКА в наборе сигнатур" in capsys.readouterr().err
@@ -0,0 +1,67 @@
+"""Быстрый запуск: запускающий скрипт, отложенные импорты, без дочерних процессов на неинтерактивных путях"""
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import mbr_analyzer
+from images import NT6_BOOT_CODE, ebr_image, mbr_sector, partition_entry
+
+PROGRAM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые разовый запуск не должен загружать
+HEAVY_MODULES = ("yaml", "multiprocessing", "threading", "queue", "cProfile")
+
+def run_python(*args):
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, encoding="utf-8",
+                          cwd=PROGRAM_DIR, timeout=120)
+
+def loaded_modules(argv):
+    """Тяжелые модули, загруженные командой argv в новом процессе"""
+    completed = run_python("-c", "import sys, mbr_analyzer\n"
+                                 f"code = mbr_analyzer.main({argv!r})\n"
+                                 f"print(code, *sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    assert completed.returncode == 0, completed.stderr
+    code, *modules = completed.stdout.splitlines()[-1].split()
+    return int(code), modules
+
+def test_version_through_launcher():
+    completed = run_python("main.py", "--version")
+    assert completed.returncode == 0
+    assert completed.stdout == f"MBR Analyzer {mbr_analyzer.ANALYZER_VERSION}\n"
+
+def test_launcher_does_not_replace_module():
+    completed = run_python("-c", "import sys, main, mbr_analyzer\n"
+                                 "print(sys.modules['main'] is main, main.mbr_analyzer is mbr_analyzer)")
+    assert completed.stdout.split() == ["True", "True"]
+
+def test_one_shot_commands_skip_heavy_imports(tmp_path):
+    disk = tmp_path / "disk.img"
+    disk.write_bytes(bytes(ebr_image(2)))
+    assert loaded_modules(["batch", str(disk), "--ndjson", str(tmp_path / "out.ndjson"), "-j", "1"]) == (0, [])
+    assert loaded_modules(["hexdump", str(disk), "--length", "64"]) == (0, [])
+    assert loaded_modules(["scan", str(disk), "-o", str(tmp_path / "scan.json"), "-j", "1"]) == (0, [])
+    # YAML загружается только для потока YAML
+    assert loaded_modules(["batch", str(disk), "--yaml", str(tmp_path / "out.yaml"), "-j", "1"]) == (0, ["yaml"])
+
+def test_command_parser_describes_only_that_command():
+    parser = mbr_analyzer.build_arg_parser("hexdump")
+    choices = parser._subparsers._group_actions[0].choices
+    assert list(choices) == ["hexdump"]
+    # Неизвестная команда - полное описание, чтобы argparse перечислил все команды
+    choices = mbr_analyzer.build_arg_parser("nonsense")._subparsers._group_actions[0].choices
+    assert {"batch", "scan", "hexdump", "acquire"} <= set(choices)
+
+def test_clear_screen_without_terminal_runs_nothing(monkeypatch, capsys):
+    def forbidden(command):
+        raise AssertionError(f"запуск {command}")
+
+    monkeypatch.setattr(os, "system", forbidden)
+    mbr_analyzer.clear_screen()
+    assert capsys.readouterr().out == ""
+
+def test_spawn_workers_import_module():
+    sector = mbr_sector([partition_entry(0x07, 2048, 4096, True)], code=NT6_BOOT_CODE)
+    with multiprocessing.get_context("spawn").Pool(processes=1) as pool:
+        result = pool.apply(mbr_analyzer.parse_mbr_complete, (sector, "spawn"))
+    assert result["sections"]["partition_table"]["partitions"][0]["lba_start"] == 2048
@@ -0,0 +1,83 @@
+"""Статистика байтов: гистограмма, энтропия, доли нулей и печатных символов, строки"""
+import math
+import random
+from collections import Counter
+
+import pytest
+
+import mbr_analyzer
+from images import GRUB2_BOOT_CODE, mbr_sector
+
+def reference_entropy(data):
+    """Энтропия Шеннона по определению: -sum(p * log2(p))"""
+    if not data:
+        return 0.0
+    return -sum(count / len(data) * math.log2(count / len(data)) for count in Counter(data).values())
+
+BLOCKS = [
+    b'',
+    bytes(512),
+    b'\xf6' * 4096,
+    bytes(range(256)) * 2,
+    random.Random(3).randbytes(512),
+    random.Random(4).randbytes(8192),
+    b'GRUB \x00Geom\x00Hard Disk\x00Read\x00 Error' + bytes(480),
+]
+
+@pytest.mark.parametrize("data", BLOCKS, ids=range(len(BLOCKS)))
+def test_byte_stats_matches_definition(data):
+    stats = mbr_analyzer.byte_stats(data)
+
+    assert stats["size"] == len(data)
+    assert stats["histogram"] == [data.count(value) for value in range(256)]
+    assert stats["entropy"] == pytest.approx(reference_entropy(data), abs=1e-4)
+    assert stats["zero_bytes"] == data.count(0)
+    if data:
+        assert stats["zero_ratio"] == data.count(0) / len(data)
+        assert stats["printable_ratio"] == sum(0x20 <= b < 0x7F for b in data) / len(data)
+
+def test_entropy_bounds():
+    assert mbr_analyzer.byte_stats(bytes(512))["entropy"] == 0.0
+    assert mbr_analyzer.byte_stats(bytes(range(256)) * 20)["entropy"] == pytest.approx(8.0)
+    assert mbr_analyzer.histogram_entropy([0] * 256, 0) == 0.0
+
+def test_strings():
+    data = b'GRUB \x00Geom\x00Hard Disk\x00Rd\x00 Error\xff~~~~'
+    assert mbr_analyzer.byte_stats(data)["strings"] == ["GRUB ", "Geom", "Hard Disk", " Error", "~~~~"]
+    assert mbr_analyzer.extract_strings(data, 6) == ["Hard Disk", " Error"]
+    assert mbr_analyzer.extract_strings(bytes(512)) == []
+
+def per_block(buf, block_size):
+    return [mbr_analyzer.byte_stats(buf[i:i + block_size]) for i in range(0, len(buf) - block_size + 1, block_size)]
+
+def check_columns(columns, buf, block_size):
+    expected = per_block(buf, block_size)
+    assert columns["count"] == len(expected)
+    for name in ("entropy", "zero_ratio", "printable_ratio"):
+        assert len(columns[name]) == len(expected)
+        assert list(columns[name]) == pytest.approx([stats[name] for stats in expected], abs=1e-4)
+
+@pytest.mark.parametrize("block_size", [512, 4096])
+def test_batch_columns_match_per_block(block_size):
+    buf = b''.join(BLOCKS[1:]) * 3 + b'\x01' * 100
+    check_columns(mbr_analyzer.byte_stats_batch(buf, block_size), buf, block_size)
+
+def test_batch_without_numpy(monkeypatch):
+    monkeypatch.setattr(mbr_analyzer, "import_numpy", lambda: None)
+    buf = b''.join(BLOCKS[1:])
+    check_columns(mbr_analyzer.byte_stats_batch(buf), buf, 512)
+    assert mbr_analyzer.byte_histogram(b'\x00\x01\x01') == [1, 2] + [0] * 254
+
+def test_batch_accepts_memoryview():
+    buf = bytearray(random.Random(9).randbytes(2048))
+    assert list(mbr_analyzer.byte_stats_batch(memoryview(buf))["entropy"]) == \
+        list(mbr_analyzer.byte_stats_batch(bytes(buf))["entropy"])
+    assert mbr_analyzer.byte_stats_batch(b'\x00' * 100)["count"] == 0
+
+def test_boot_code_stats_use_same_stage():
+    sector = mbr_sector(code=GRUB2_BOOT_CODE)
+    stats = mbr_analyzer.analyze(sector)["sections"]["boot_code"]["stats"]
+    expected = mbr_analyzer.byte_stats(sector[:446])
+    del expected["histogram"]
+    assert stats == expected
+    assert stats["strings"] == ["GRUB ", "Geom"]
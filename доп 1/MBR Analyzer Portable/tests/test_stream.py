@@ -0,0 +1,64 @@
+"""Потоковая запись NDJSON/YAML: запись по мере поступления, повторные запуски без дубликатов"""
+import json
+
+import pytest
+
+import mbr_analyzer
+from images import mbr_sector, partition_entry, write_sectors
+
+def write_dumps(directory, count):
+    for i in range(count):
+        (directory / f"{i}.bin").write_bytes(mbr_sector([partition_entry(0x07, 2048, 100 + i)]))
+
+def test_writer_truncates_unless_appending(tmp_path):
+    path = tmp_path / "out.ndjson"
+    path.write_text("старое содержимое\n", encoding='utf-8')
+
+    with mbr_analyzer.ReportStreamWriter(str(path)) as writer:
+        writer.write({"n": 1})
+    with mbr_analyzer.ReportStreamWriter(str(path), append=True) as writer:
+        writer.write({"n": 2})
+        assert writer.records == 1
+
+    assert [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()] == [{"n": 1}, {"n": 2}]
+
+def test_buffer_is_flushed_by_size(tmp_path):
+    path = tmp_path / "out.ndjson"
+    writer = mbr_analyzer.ReportStreamWriter(str(path), buffer_size=100)
+    for n in range(10):
+        writer.write({"n": n, "pad": "x" * 40})
+    # Больше буфера в памяти не копится
+    assert path.stat().st_size >= 9 * 50
+    assert writer.tell() == path.stat().st_size
+    writer.close()
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 10
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        mbr_analyzer.ReportStreamWriter("out.xml", "xml")
+
+def test_batch_rerun_does_not_duplicate(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    write_dumps(tmp_path, 3)
+    ndjson, documents = tmp_path / "out.ndjson", tmp_path / "out.yaml"
+    args = ["batch", str(tmp_path / "*.bin"), "--ndjson", str(ndjson), "--yaml", str(documents), "-j", "1"]
+
+    for _ in range(2):
+        assert mbr_analyzer.main(args) == 0
+        records = [json.loads(line) for line in ndjson.read_text(encoding='utf-8').splitlines()]
+        assert sorted(r["filename"] for r in records) == ["0.bin", "1.bin", "2.bin"]
+        assert len(list(yaml.safe_load_all(documents.read_text(encoding='utf-8')))) == 3
+
+def test_yaml_record_matches_json(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    result = mbr_analyzer.analyze(mbr_sector([partition_entry(0x83, 63, 1000)]), include_hex_dump=False)
+    assert yaml.safe_load(mbr_analyzer.format_yaml_document(result)) == \
+        json.loads(mbr_analyzer.format_stream_record(result, "ndjson"))
+
+def test_scan_rerun_does_not_duplicate(tmp_path):
+    image = write_sectors(tmp_path / "disk.img", 4096 * 512,
+                          {0: mbr_sector([partition_entry(0x07, 2048, 2048)]), 3000: b'\xff' * 510 + b'\x55\xaa'})
+    output = tmp_path / "found.ndjson"
+    for _ in range(2):
+        assert mbr_analyzer.main(["scan", str(image), "-o", str(output), "-j", "1"]) == 0
+        assert len(output.read_text(encoding='utf-8').splitlines()) == 2
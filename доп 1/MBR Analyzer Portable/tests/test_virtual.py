@@ -0,0 +1,166 @@
+"""Виртуальные диски qcow2, VHD, VHDX, VMDK: гостевой диск читается так же, как сырой образ"""
+import random
+import struct
+
+import pytest
+
+import mbr_analyzer
+from images import (gpt_image, qcow2_image, vhd_dynamic_image, vhd_fixed_image, vhdx_image, vmdk_descriptor,
+                    vmdk_sparse_image)
+
+@pytest.fixture(scope="module")
+def disk():
+    """Гостевой диск GPT на 8 МБ: разреженные случайные сектора и кандидат MBR в середине"""
+    image = gpt_image(disk_sectors=16384)
+    rng = random.Random(5)
+    for lba in range(300, 16284, 1031):
+        image[lba * 512:lba * 512 + 512] = rng.randbytes(512)
+    image[8192 * 512 + 510:8192 * 512 + 512] = b'\x55\xaa'
+    return bytes(image)
+
+BUILDERS = {
+    "disk.qcow2": ("qcow2", qcow2_image),
+    "small-clusters.qcow2": ("qcow2", lambda disk: qcow2_image(disk, cluster_bits=12, compress=False)),
+    "fixed.vhd": ("vhd", vhd_fixed_image),
+    "dynamic.vhd": ("vhd", vhd_dynamic_image),
+    "disk.vhdx": ("vhdx", vhdx_image),
+    "sparse.vmdk": ("vmdk", vmdk_sparse_image),
+    "stream.vmdk": ("vmdk", lambda disk: vmdk_sparse_image(disk, compressed=True)),
+}
+
+def build(tmp_path, name, disk):
+    path = tmp_path / name
+    if name == "descriptor.vmdk":
+        return vmdk_descriptor(path, disk), "vmdk-descriptor"
+    fmt, builder = BUILDERS[name]
+    path.write_bytes(builder(disk))
+    return path, fmt
+
+@pytest.mark.parametrize("name", [*BUILDERS, "descriptor.vmdk"])
+def test_guest_matches_raw(tmp_path, disk, name):
+    path, fmt = build(tmp_path, name, disk)
+    assert mbr_analyzer.detect_image_format(str(path)) == fmt
+
+    with mbr_analyzer.open_image(str(path)) as image:
+        assert image.size == len(disk)
+        assert image.read(0, len(disk)) == disk
+        # Чтения через границы кластеров, блоков и экстентов и за концом диска
+        for offset, size in ((65536 - 7, 4096), (len(disk) // 2 - 100, 200), (len(disk) - 10, 100),
+                             (len(disk), 512)):
+            assert image.read(offset, size) == disk[offset:offset + size]
+
+    raw = tmp_path / "raw.img"
+    raw.write_bytes(disk)
+    virtual, plain = mbr_analyzer.analyze(str(path)), mbr_analyzer.analyze(str(raw))
+    assert virtual["sections"] == plain["sections"]
+
+def test_scan_virtual_disk(tmp_path, disk, capsys):
+    path, _ = build(tmp_path, "dynamic.vhd", disk)
+    output = tmp_path / "found.ndjson"
+    assert mbr_analyzer.main(["scan", str(path), "-o", str(output), "-j", "1"]) == 0
+    raw = tmp_path / "raw.img"
+    raw.write_bytes(disk)
+    expected = tmp_path / "expected.ndjson"
+    assert mbr_analyzer.main(["scan", str(raw), "-o", str(expected), "-j", "1"]) == 0
+    assert output.read_text(encoding='utf-8') == expected.read_text(encoding='utf-8')
+
+def test_broken_virtual_disk_is_reported(tmp_path, disk):
+    image = bytearray(qcow2_image(disk))
+    image[4:8] = (1).to_bytes(4, 'big')
+    path = tmp_path / "old.qcow2"
+    path.write_bytes(image)
+    assert "неподдерживаемый qcow2" in mbr_analyzer.analyze(str(path))["error"]
+
+    # Обрезанный образ читается нулями за концом файла
+    path = tmp_path / "truncated.vhd"
+    # Данные первого блока начинаются с 2560 байта файла
+    path.write_bytes(vhd_dynamic_image(disk)[:3000])
+    with mbr_analyzer.open_image(str(path)) as truncated:
+        assert truncated.size == len(disk)
+        assert truncated.read(0, 1024) == disk[:440] + bytes(584)
+
+    descriptor = tmp_path / "missing.vmdk"
+    descriptor.write_text('# Disk DescriptorFile\nversion=1\ncreateType="monolithicFlat"\n'
+                          'RW 16384 FLAT "missing-flat.vmdk" 0\n')
+    assert "error" in mbr_analyzer.analyze(str(descriptor))
+
+def test_invalid_vhd_geometry_is_rejected(tmp_path, disk):
+    dynamic = bytearray(vhd_dynamic_image(disk))
+    struct.pack_into('>I', dynamic, 512 + 32, 0)
+    path = tmp_path / "zero-block.vhd"
+    path.write_bytes(dynamic)
+    assert "недопустимый размер блока VHD" in mbr_analyzer.analyze(str(path))["error"]
+
+    # Значения метаданных VHDX лежат с 2 МБ + 64 КБ, длины - в таблице элементов
+    metadata = 2 * 1024 * 1024
+    for field, value, message in ((0, struct.pack('<I', 0), "размер блока"),
+                                  (0, struct.pack('<I', 512 * 1024 * 1024), "размер блока"),
+                                  (128, struct.pack('<I', 1024), "размер сектора")):
+        image = bytearray(vhdx_image(disk))
+        image[metadata + 64 * 1024 + field:metadata + 64 * 1024 + field + 4] = value
+        path = tmp_path / "broken.vhdx"
+        path.write_bytes(image)
+        with pytest.raises(ValueError, match=message):
+            mbr_analyzer.open_image(str(path))
+
+    image = bytearray(vhdx_image(disk))
+    struct.pack_into('<I', image, metadata + 32 + 20, 4)
+    path.write_bytes(image)
+    assert "поврежденные метаданные VHDX" in mbr_analyzer.analyze(str(path))["error"]
+
+def with_backing(image, name):
+    """qcow2 с именем базового образа (в первом кластере за заголовком) и пустыми L2"""
+    image = bytearray(image)
+    name = name.encode('utf-8')
+    struct.pack_into('>QI', image, 8, 1024, len(name))
+    image[1024:1024 + len(name)] = name
+    l1_size, l1_offset = struct.unpack_from('>IQ', image, 36)
+    image[l1_offset:l1_offset + 8 * l1_size] = bytes(8 * l1_size)
+    return bytes(image)
+
+def test_qcow2_backing_chain_is_limited(tmp_path, disk):
+    (tmp_path / "images").mkdir()
+    base = tmp_path / "images" / "base.qcow2"
+    base.write_bytes(qcow2_image(disk))
+    child = tmp_path / "images" / "child.qcow2"
+    child.write_bytes(with_backing(qcow2_image(disk), "base.qcow2"))
+    with mbr_analyzer.open_image(str(child)) as image:
+        assert image.read(0, len(disk)) == disk
+
+    # Образ, ссылающийся сам на себя, и два образа, ссылающиеся друг на друга
+    child.write_bytes(with_backing(qcow2_image(disk), "child.qcow2"))
+    assert "цикл" in mbr_analyzer.analyze(str(child))["error"]
+    base.write_bytes(with_backing(qcow2_image(disk), "child.qcow2"))
+    child.write_bytes(with_backing(qcow2_image(disk), "base.qcow2"))
+    assert "цикл" in mbr_analyzer.analyze(str(child))["error"]
+
+    small = bytes(64 * 1024)
+    for level in range(20):
+        (tmp_path / "images" / f"{level}.qcow2").write_bytes(with_backing(qcow2_image(small), f"{level + 1}.qcow2"))
+    (tmp_path / "images" / "20.qcow2").write_bytes(qcow2_image(small))
+    assert "длиннее" in mbr_analyzer.analyze(str(tmp_path / "images" / "0.qcow2"))["error"]
+    with mbr_analyzer.open_image(str(tmp_path / "images" / "5.qcow2")) as image:
+        assert image.read(0, 512) == bytes(512)
+
+def test_qcow2_backing_outside_directory_is_rejected(tmp_path, disk):
+    (tmp_path / "images").mkdir()
+    outside = tmp_path / "outside.qcow2"
+    outside.write_bytes(qcow2_image(disk))
+    child = tmp_path / "images" / "child.qcow2"
+    for name in ("../outside.qcow2", str(outside)):
+        child.write_bytes(with_backing(qcow2_image(disk), name))
+        assert "вне каталога образа" in mbr_analyzer.analyze(str(child))["error"]
+        with mbr_analyzer.Qcow2Image(str(child), allow_external_backing=True) as image:
+            assert image.read(0, 4096) == disk[:4096]
+
+def test_qcow2_header_limits(tmp_path, disk):
+    path = tmp_path / "disk.qcow2"
+    image = bytearray(qcow2_image(disk))
+    struct.pack_into('>I', image, 36, struct.unpack_from('>I', image, 36)[0] + 1)
+    path.write_bytes(image)
+    assert "таблица L1 qcow2 больше диска" in mbr_analyzer.analyze(str(path))["error"]
+
+    image = bytearray(with_backing(qcow2_image(disk), "base.qcow2"))
+    struct.pack_into('>I', image, 16, 1024)
+    path.write_bytes(image)
+    assert "слишком длинное имя" in mbr_analyzer.analyze(str(path))["error"]
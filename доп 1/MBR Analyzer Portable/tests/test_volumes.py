@@ -0,0 +1,107 @@
+"""Заголовки файловых систем разделов: NTFS, FAT, ext, сверка с типом раздела, объединение чтений"""
+import json
+
+import mbr_analyzer
+from images import (ext_volume_start, fat32_boot_sector, gpt_image, mbr_sector, ntfs_boot_sector,
+                    partition_entry, write_sectors)
+
+class CountingImage(mbr_analyzer.BytesImage):
+    """Образ в памяти со списком чтений (смещение, размер)"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, offset, size):
+        self.reads.append((offset, size))
+        return super().read(offset, size)
+
+def volumes_disk(path, linux_type=0x83):
+    """NTFS с LBA 2048, FAT32 с LBA 10240, ext4 с LBA 20480 и раздел подкачки без файловой системы"""
+    table = [partition_entry(0x07, 2048, 8192, bootable=True), partition_entry(0x0C, 10240, 8192),
+             partition_entry(linux_type, 20480, 8192), partition_entry(0x82, 28672, 2048)]
+    return write_sectors(path, 32768 * 512, {
+        0: mbr_sector(table),
+        2048: ntfs_boot_sector(8191),
+        10240: fat32_boot_sector(8192, label=b'EFI'),
+        20480: ext_volume_start(1024),
+    })
+
+def test_filesystems_are_detected(tmp_path):
+    result = mbr_analyzer.analyze(str(volumes_disk(tmp_path / "disk.img")), follow_volumes=True)
+    partitions = result["sections"]["partition_table"]["partitions"]
+    volumes = [p["volume"] for p in partitions]
+
+    assert [v and v["filesystem"] for v in volumes] == ["NTFS", "FAT32", "ext4", None]
+    assert volumes[0]["size_bytes"] == 8191 * 512 and volumes[0]["cluster_size"] == 4096
+    assert volumes[1]["label"] == "EFI" and volumes[1]["serial"] == "CAFE1234"
+    assert volumes[2]["label"] == "root" and volumes[2]["size_bytes"] == 1024 * 4096
+    assert all(v["type_match"] for v in volumes[:3])
+    assert [v["offset"] for v in volumes[:3]] == [2048 * 512, 10240 * 512, 20480 * 512]
+    assert result["sections"]["volumes"] == {"partitions": 4, "detected": 3, "mismatches": 0, "reads": 4}
+    assert not any("Раздел" in warning for warning in result["warnings"])
+
+def test_type_mismatch_is_reported(tmp_path):
+    # ext4 в разделе с типом NTFS
+    result = mbr_analyzer.analyze(str(volumes_disk(tmp_path / "disk.img", linux_type=0x07)), follow_volumes=True)
+    third = result["sections"]["partition_table"]["partitions"][2]
+
+    assert third["volume"]["type_match"] is False
+    assert result["sections"]["volumes"]["mismatches"] == 1
+    assert any(w.startswith("Раздел 3: тип 0x07") and "ext4" in w for w in result["warnings"])
+
+def test_volume_larger_than_partition(tmp_path):
+    path = write_sectors(tmp_path / "disk.img", 8192 * 512, {
+        0: mbr_sector([partition_entry(0x07, 2048, 1024)]),
+        2048: ntfs_boot_sector(4096),
+    })
+    result = mbr_analyzer.analyze(str(path), follow_volumes=True)
+    assert any("больше раздела" in warning for warning in result["warnings"])
+
+def test_ext_versions_and_gpt_volumes():
+    assert mbr_analyzer.parse_volume_header(ext_volume_start(100, incompat=0, compat=0))["filesystem"] == "ext2"
+    assert mbr_analyzer.parse_volume_header(ext_volume_start(100, incompat=0))["filesystem"] == "ext3"
+    assert mbr_analyzer.parse_volume_header(ext_volume_start(100, log_block_size=9)) is None
+    assert mbr_analyzer.parse_volume_header(bytes(2048)) is None
+
+    disk = gpt_image(partitions=2)
+    disk[64 * 512:65 * 512] = ntfs_boot_sector(8)
+    result = mbr_analyzer.analyze(bytes(disk), follow_volumes=True)
+    gpt_partitions = result["sections"]["gpt"]["partitions"]
+    assert gpt_partitions[0]["volume"]["filesystem"] == "NTFS" and gpt_partitions[0]["volume"]["type_match"]
+    assert gpt_partitions[1]["volume"] is None
+    # Защитная запись 0xEE не читается как том
+    assert "volume" not in result["sections"]["partition_table"]["partitions"][0]
+
+def test_reads_are_sorted_and_coalesced():
+    data = bytes(range(256)) * 64
+    image = CountingImage(data)
+    requests = [(8192, 100), (0, 512), (600, 100), (0, 512), (8000, 50)]
+
+    found, reads = mbr_analyzer.read_coalesced(image, requests, max_gap=256)
+
+    assert reads == 2 and image.reads == [(0, 700), (8000, 292)]
+    for offset, size in requests:
+        assert found[(offset, size)] == data[offset:offset + size]
+
+    _, reads = mbr_analyzer.read_coalesced(image, requests, max_gap=0)
+    assert reads == 4
+
+def test_many_partitions_cost_one_read():
+    entries = [partition_entry(0x07, 64 + 16 * i, 16) for i in range(4)]
+    image = CountingImage(mbr_sector(entries).ljust(64 * 1024, b'\x00'))
+    result = mbr_analyzer.analyze(image.read(0, 512))
+    image.reads.clear()
+
+    mbr_analyzer.analyze_volumes(result, image)
+
+    assert result["sections"]["volumes"]["reads"] == 1
+    assert image.reads == [(64 * 512, 48 * 512 + mbr_analyzer.VOLUME_HEADER_SIZE)]
+
+def test_batch_volumes(tmp_path):
+    volumes_disk(tmp_path / "disk.img")
+    stream = tmp_path / "out.ndjson"
+    assert mbr_analyzer.main(["batch", str(tmp_path / "disk.img"), "--volumes", "--ndjson", str(stream),
+                              "-j", "1"]) == 0
+    record = json.loads(stream.read_text(encoding='utf-8'))
+    assert record["sections"]["volumes"]["detected"] == 3